@@ -40,6 +40,7 @@
 #include "flann/algorithms/linear_index.h"
 #include "flann/algorithms/hierarchical_clustering_index.h"
 #include "flann/algorithms/lsh_index.h"
+#include "flann/algorithms/pq_index.h"
 #include "flann/algorithms/autotuned_index.h"
 #ifdef FLANN_USE_CUDA
 #include "flann/algorithms/kdtree_cuda_3d_index.h"
@@ -182,6 +183,9 @@ inline NNIndex<Distance>*
 	case FLANN_INDEX_LSH:
 		nnIndex = create_index_<LshIndex,Distance,ElementType>(dataset, params, distance);
 		break;
+	case FLANN_INDEX_PQ:
+		nnIndex = create_index_<PQIndex,Distance,ElementType>(dataset, params, distance);
+		break;
 	default:
 		throw FLANNException("Unknown index type");
 	}
@@ -42,6 +42,12 @@
 #include "flann/algorithms/linear_index.h"
 #include "flann/util/logger.h"
 
+#include <chrono>
+#include <string>
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+
 
 namespace flann
 {
@@ -54,7 +60,9 @@ inline NNIndex<Distance>*
 
 struct AutotunedIndexParams : public IndexParams
 {
-    AutotunedIndexParams(float target_precision = 0.8, float build_weight = 0.01, float memory_weight = 0, float sample_fraction = 0.1)
+    AutotunedIndexParams(float target_precision = 0.8, float build_weight = 0.01, float memory_weight = 0, float sample_fraction = 0.1,
+                         float max_tuning_seconds = 0,
+                         int cores = 1)
     {
         (*this)["algorithm"] = FLANN_INDEX_AUTOTUNED;
         // precision desired (used for autotuning, -1 otherwise)
@@ -65,6 +73,10 @@ struct AutotunedIndexParams : public IndexParams
         (*this)["memory_weight"] = memory_weight;
         // what fraction of the dataset to use for autotuning
         (*this)["sample_fraction"] = sample_fraction;
+        // wall clock time limit of the autotuning (0 for none)
+        (*this)["max_tuning_seconds"] = max_tuning_seconds;
+        // number of candidate configurations evaluated in parallel (0 for auto)
+        (*this)["cores"] = cores;
     }
 };
 
@@ -89,6 +101,8 @@ public:
         build_weight_ =  get_param(params,"build_weight", 0.01f);
         memory_weight_ = get_param(params, "memory_weight", 0.0f);
         sample_fraction_ = get_param(params,"sample_fraction", 0.1f);
+        max_tuning_seconds_ = get_param(params,"max_tuning_seconds", 0.0f);
+        cores_ = get_param(params,"cores", 1);
     }
 
     AutotunedIndex(const IndexParams& params = AutotunedIndexParams(), Distance d = Distance()) :
@@ -98,6 +112,8 @@ public:
         build_weight_ =  get_param(params,"build_weight", 0.01f);
         memory_weight_ = get_param(params, "memory_weight", 0.0f);
         sample_fraction_ = get_param(params,"sample_fraction", 0.1f);
+        max_tuning_seconds_ = get_param(params,"max_tuning_seconds", 0.0f);
+        cores_ = get_param(params,"cores", 1);
     }
 
     AutotunedIndex(const AutotunedIndex& other) : BaseClass(other),
@@ -108,7 +124,9 @@ public:
     		target_precision_(other.target_precision_),
     		build_weight_(other.build_weight_),
     		memory_weight_(other.memory_weight_),
-    		sample_fraction_(other.sample_fraction_)
+    		sample_fraction_(other.sample_fraction_),
+    		max_tuning_seconds_(other.max_tuning_seconds_),
+    		cores_(other.cores_)
     {
     		bestIndex_ = other.bestIndex_->clone();
     }
@@ -134,6 +152,7 @@ public:
      */
     void buildIndex()
     {
+        tuningStart_ = std::chrono::steady_clock::now();
         bestParams_ = estimateBuildParams();
         Logger::info("----------------------------------------------------\n");
         Logger::info("Autotuned parameters:\n");
@@ -152,6 +171,7 @@ public:
         Logger::info("----------------------------------------------------\n");
         bestParams_["search_params"] = bestSearchParams_;
         bestParams_["speedup"] = speedup_;
+        bestParams_["tuning_candidates"] = tuningCandidates_;
     }
     
     void buildIndex(const Matrix<ElementType>& dataset)
@@ -236,7 +256,7 @@ public:
             const SearchParams& params) const
     {
         if (params.checks == FLANN_CHECKS_AUTOTUNED) {
-            return bestIndex_->knnSearch(queries, indices, dists, knn, bestSearchParams_);
+            return bestIndex_->knnSearch(queries, indices, dists, knn, autotunedSearchParams(params));
         }
         else {
             return bestIndex_->knnSearch(queries, indices, dists, knn, params);
@@ -250,7 +270,7 @@ public:
             const SearchParams& params) const
     {
         if (params.checks == FLANN_CHECKS_AUTOTUNED) {
-            return bestIndex_->knnSearch(queries, indices, dists, knn, bestSearchParams_);
+            return bestIndex_->knnSearch(queries, indices, dists, knn, autotunedSearchParams(params));
         }
         else {
             return bestIndex_->knnSearch(queries, indices, dists, knn, params);
@@ -265,7 +285,7 @@ public:
             const SearchParams& params) const
     {
         if (params.checks == FLANN_CHECKS_AUTOTUNED) {
-            return bestIndex_->radiusSearch(queries, indices, dists, radius, bestSearchParams_);
+            return bestIndex_->radiusSearch(queries, indices, dists, radius, autotunedSearchParams(params));
         }
         else {
             return bestIndex_->radiusSearch(queries, indices, dists, radius, params);
@@ -279,7 +299,7 @@ public:
             const SearchParams& params) const
     {
         if (params.checks == FLANN_CHECKS_AUTOTUNED) {
-            return bestIndex_->radiusSearch(queries, indices, dists, radius, bestSearchParams_);
+            return bestIndex_->radiusSearch(queries, indices, dists, radius, autotunedSearchParams(params));
         }
         else {
             return bestIndex_->radiusSearch(queries, indices, dists, radius, params);
@@ -332,7 +352,7 @@ public:
     /**
      * The amount of memory (in bytes) this index uses.
      */
-    int usedMemory() const
+    size_t usedMemory() const
     {
         return bestIndex_->usedMemory();
     }
@@ -369,7 +389,7 @@ private:
 
     void evaluate_kmeans(CostData& cost)
     {
-        StartStopTimer t;
+        ThreadCPUTimer t;
         int checks;
         const int nn = 1;
 
@@ -384,7 +404,7 @@ private:
         float buildTime = (float)t.value;
 
         // measure search time
-        float searchTime = test_index_precision(kmeans, sampledDataset_, testDataset_, gt_matches_, target_precision_, checks, distance_, nn);
+        float searchTime = test_index_precision<ThreadCPUTimer>(kmeans, sampledDataset_, testDataset_, gt_matches_, target_precision_, checks, distance_, nn);
 
         float datasetMemory = float(sampledDataset_.rows * sampledDataset_.cols * sizeof(float));
         cost.memoryCost = (kmeans.usedMemory() + datasetMemory) / datasetMemory;
@@ -396,7 +416,7 @@ private:
 
     void evaluate_kdtree(CostData& cost)
     {
-        StartStopTimer t;
+        ThreadCPUTimer t;
         int checks;
         const int nn = 1;
 
@@ -409,7 +429,7 @@ private:
         float buildTime = (float)t.value;
 
         //measure search time
-        float searchTime = test_index_precision(kdtree, sampledDataset_, testDataset_, gt_matches_, target_precision_, checks, distance_, nn);
+        float searchTime = test_index_precision<ThreadCPUTimer>(kdtree, sampledDataset_, testDataset_, gt_matches_, target_precision_, checks, distance_, nn);
 
         float datasetMemory = float(sampledDataset_.rows * sampledDataset_.cols * sizeof(float));
         cost.memoryCost = (kdtree.usedMemory() + datasetMemory) / datasetMemory;
@@ -469,16 +489,14 @@ private:
 
     void optimizeKMeans(std::vector<CostData>& costs)
     {
-        Logger::info("KMEANS, Step 1: Exploring parameter space\n");
-
-        // explore kmeans parameters space using combinations of the parameters below
-        int maxIterations[] = { 1, 5, 10, 15 };
-        int branchingFactors[] = { 16, 32, 64, 128, 256 };
+        // kmeans parameters space, the most promising values first
+        int maxIterations[] = { 5, 1, 10, 15 };
+        int branchingFactors[] = { 32, 16, 64, 128, 256 };
 
         int kmeansParamSpaceSize = FLANN_ARRAY_LEN(maxIterations) * FLANN_ARRAY_LEN(branchingFactors);
         costs.reserve(costs.size() + kmeansParamSpaceSize);
 
-        // evaluate kmeans for all parameter combinations
+        // add kmeans candidates for all parameter combinations
         for (size_t i = 0; i < FLANN_ARRAY_LEN(maxIterations); ++i) {
             for (size_t j = 0; j < FLANN_ARRAY_LEN(branchingFactors); ++j) {
                 CostData cost;
@@ -487,7 +505,6 @@ private:
                 cost.params["iterations"] = maxIterations[i];
                 cost.params["branching"] = branchingFactors[j];
 
-                evaluate_kmeans(cost);
                 costs.push_back(cost);
             }
         }
@@ -517,18 +534,15 @@ private:
 
     void optimizeKDTree(std::vector<CostData>& costs)
     {
-        Logger::info("KD-TREE, Step 1: Exploring parameter space\n");
-
-        // explore kd-tree parameters space using the parameters below
-        int testTrees[] = { 1, 4, 8, 16, 32 };
+        // kd-tree parameters space, the most promising values first
+        int testTrees[] = { 4, 8, 1, 16, 32 };
 
-        // evaluate kdtree for all parameter combinations
+        // add kdtree candidates for all parameter combinations
         for (size_t i = 0; i < FLANN_ARRAY_LEN(testTrees); ++i) {
             CostData cost;
             cost.params["algorithm"] = FLANN_INDEX_KDTREE;
             cost.params["trees"] = testTrees[i];
 
-            evaluate_kdtree(cost);
             costs.push_back(cost);
         }
 
@@ -566,6 +580,8 @@ private:
 
         Logger::info("Entering autotuning, dataset size: %d, sampleSize: %d, testSampleSize: %d, target precision: %g\n", dataset_.rows, sampleSize, testSampleSize, target_precision_);
 
+        tuningCandidates_ = 0;
+
         // For a very small dataset, it makes no sense to build any fancy index, just
         // use linear search
         if (testSampleSize < 10) {
@@ -602,8 +618,74 @@ private:
         // Start parameter autotune process
         Logger::info("Autotuning parameters...\n");
 
-        optimizeKMeans(costs);
-        optimizeKDTree(costs);
+        std::vector<CostData> kmeansCandidates;
+        std::vector<CostData> kdtreeCandidates;
+        optimizeKMeans(kmeansCandidates);
+        optimizeKDTree(kdtreeCandidates);
+
+        // evaluate the candidates in priority order, alternating between
+        // the algorithms, until the time budget is exhausted. The candidates
+        // are evaluated in parallel on cores_ threads (as many as OpenMP
+        // uses by default for 0), their build and search times are the CPU
+        // times of the threads evaluating them.
+        std::vector<CostData> candidates;
+        for (size_t i = 0; i < std::max(kmeansCandidates.size(), kdtreeCandidates.size()); ++i) {
+            if (i < kdtreeCandidates.size()) candidates.push_back(kdtreeCandidates[i]);
+            if (i < kmeansCandidates.size()) candidates.push_back(kmeansCandidates[i]);
+        }
+        int cores = cores_;
+        if (cores <= 0) {
+#ifdef _OPENMP
+            cores = omp_get_max_threads();
+#else
+            cores = 1;
+#endif
+        }
+
+        // each candidate is built with its own seed, drawn in advance, so
+        // that it is the same whichever thread evaluates it
+        std::vector<unsigned int> seeds(candidates.size());
+        for (size_t i = 0; i < candidates.size(); ++i) {
+            seeds[i] = (unsigned int)rand_int();
+        }
+        unsigned int next_seed = (unsigned int)rand_int();
+
+        std::vector<char> evaluated(candidates.size(), 0);
+        std::string error;
+#pragma omp parallel for schedule(dynamic, 1) num_threads(cores)
+        for (int i = 0; i < (int)candidates.size(); ++i) {
+            if (tuningBudgetExhausted()) continue;
+            seed_random(seeds[i]);
+            try {
+                if (get_param<flann_algorithm_t>(candidates[i].params, "algorithm") == FLANN_INDEX_KMEANS) {
+                    evaluate_kmeans(candidates[i]);
+                }
+                else {
+                    evaluate_kdtree(candidates[i]);
+                }
+                evaluated[i] = 1;
+            }
+            catch (const std::exception& e) {
+#pragma omp critical
+                error = e.what();
+            }
+        }
+        if (!error.empty()) {
+            delete[] gt_matches_.ptr();
+            delete[] testDataset_.ptr();
+            delete[] sampledDataset_.ptr();
+            throw FLANNException(error);
+        }
+        // this thread may have evaluated any of the candidates
+        seed_random(next_seed);
+        for (size_t i = 0; i < candidates.size(); ++i) {
+            if (evaluated[i]) costs.push_back(candidates[i]);
+        }
+        // the linear search is a baseline, not a candidate
+        tuningCandidates_ = (int)costs.size() - 1;
+        if (tuningCandidates_ < (int)candidates.size()) {
+            Logger::info("Tuning time budget exhausted, %d of %d candidates evaluated\n", tuningCandidates_, (int)candidates.size());
+        }
 
         float bestTimeCost = costs[0].buildTimeCost * build_weight_ + costs[0].searchTimeCost;
         for (size_t i = 0; i < costs.size(); ++i) {
@@ -684,6 +766,7 @@ private:
                 float best_cb_index = -1;
                 int best_checks = -1;
                 for (cb_index = 0; cb_index < 1.1f; cb_index += 0.2f) {
+                    if (bestSearchTime != -1 && tuningBudgetExhausted()) break;
                     kmeans->set_cb_index(cb_index);
                     searchTime = test_index_precision(*kmeans, dataset_, testDataset, gt_matches, target_precision_, checks, distance_, nn, 1);
                     if ((searchTime < bestSearchTime) || (bestSearchTime == -1)) {
@@ -729,6 +812,31 @@ private:
     	std::swap(build_weight_, other.build_weight_);
     	std::swap(memory_weight_, other.memory_weight_);
     	std::swap(sample_fraction_, other.sample_fraction_);
+    	std::swap(max_tuning_seconds_, other.max_tuning_seconds_);
+    	std::swap(cores_, other.cores_);
+    }
+
+    /**
+     * The tuned search parameters, keeping the filter and the number of
+     * cores of the search they are used for.
+     */
+    SearchParams autotunedSearchParams(const SearchParams& params) const
+    {
+        SearchParams search_params = bestSearchParams_;
+        search_params.filter = params.filter;
+        search_params.cores = params.cores;
+        return search_params;
+    }
+
+    /**
+     * Whether the wall clock time spent since the start of buildIndex()
+     * exceeds max_tuning_seconds (if set).
+     */
+    bool tuningBudgetExhausted() const
+    {
+        if (max_tuning_seconds_ <= 0) return false;
+        std::chrono::duration<double> elapsed = std::chrono::steady_clock::now() - tuningStart_;
+        return elapsed.count() >= max_tuning_seconds_;
     }
 
 private:
@@ -755,6 +863,18 @@ private:
     float build_weight_;
     float memory_weight_;
     float sample_fraction_;
+    float max_tuning_seconds_;
+
+    /**
+     * Number of threads evaluating the candidate configurations
+     */
+    int cores_;
+
+    /**
+     * Start of the tuning and number of configurations evaluated
+     */
+    std::chrono::steady_clock::time_point tuningStart_;
+    int tuningCandidates_;
 
     USING_BASECLASS_SYMBOLS
 };
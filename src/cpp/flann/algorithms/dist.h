@@ -42,6 +42,7 @@ typedef unsigned __int64 uint64_t;
 #endif
 
 #include "flann/defines.h"
+#include "flann/util/float16.h"
 
 
 namespace flann
@@ -58,9 +59,13 @@ struct Accumulator<unsigned int> { typedef float Type; };
 template<>
 struct Accumulator<char>   { typedef float Type; };
 template<>
+struct Accumulator<signed char> { typedef float Type; };
+template<>
 struct Accumulator<short>  { typedef float Type; };
 template<>
 struct Accumulator<int> { typedef float Type; };
+template<>
+struct Accumulator<float16> { typedef float Type; };
 
 
 
@@ -576,6 +581,87 @@ struct Hamming
 };
 
 
+/**
+ * Counts the bits set in a ^ b, two strings of size bytes. The 64 bit
+ * words are loaded with memcpy as the strings need not be aligned.
+ */
+inline unsigned int popcount_xor_generic(const unsigned char* a, const unsigned char* b, size_t size)
+{
+    unsigned int result = 0;
+    size_t i = 0;
+    for (; i + sizeof(uint64_t) <= size; i += sizeof(uint64_t)) {
+        uint64_t wa, wb;
+        memcpy(&wa, a + i, sizeof(uint64_t));
+        memcpy(&wb, b + i, sizeof(uint64_t));
+        result += Hamming<unsigned char>().popcnt64(wa ^ wb);
+    }
+    for (; i < size; ++i) {
+        result += HammingLUT::byteBitsLookUp(a[i] ^ b[i]);
+    }
+    return result;
+}
+
+#if defined(__GNUC__) && (defined(__x86_64__) || defined(__i386__))
+#define FLANN_HAS_POPCNT_DISPATCH
+
+/**
+ * popcount_xor_generic compiled for the processors with the popcnt
+ * instruction, only called when the processor running it has it.
+ */
+__attribute__((target("popcnt")))
+inline unsigned int popcount_xor_popcnt(const unsigned char* a, const unsigned char* b, size_t size)
+{
+    unsigned int result = 0;
+    size_t i = 0;
+    for (; i + sizeof(uint64_t) <= size; i += sizeof(uint64_t)) {
+        uint64_t wa, wb;
+        memcpy(&wa, a + i, sizeof(uint64_t));
+        memcpy(&wb, b + i, sizeof(uint64_t));
+        result += (unsigned int)__builtin_popcountll(wa ^ wb);
+    }
+    for (; i < size; ++i) {
+        result += (unsigned int)__builtin_popcount(a[i] ^ b[i]);
+    }
+    return result;
+}
+#endif
+
+/**
+ * Counts the bits set in a ^ b, using the popcnt instruction if the
+ * processor has it.
+ */
+inline unsigned int popcount_xor(const unsigned char* a, const unsigned char* b, size_t size)
+{
+#ifdef FLANN_HAS_POPCNT_DISPATCH
+    if (__builtin_cpu_supports("popcnt")) {
+        return popcount_xor_popcnt(a, b, size);
+    }
+#endif
+    return popcount_xor_generic(a, b, size);
+}
+
+/**
+ * Hamming distance between the bits of two vectors of integers, with the
+ * same result type as the other distances for that type. This is the
+ * hamming distance of the C bindings, where it is used to match binary
+ * descriptors stored as unsigned char vectors (the C bindings reject the
+ * floating point element types, whose bits it would compare).
+ */
+template<class T>
+struct HammingDistance
+{
+    typedef T ElementType;
+    typedef typename Accumulator<T>::Type ResultType;
+
+    template <typename Iterator1, typename Iterator2>
+    ResultType operator()(Iterator1 a, Iterator2 b, size_t size, ResultType /*worst_dist*/ = -1) const
+    {
+        return ResultType(popcount_xor(reinterpret_cast<const unsigned char*>(&*a),
+                                       reinterpret_cast<const unsigned char*>(&*b), size*sizeof(T)));
+    }
+};
+
+
 
 ////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////
 
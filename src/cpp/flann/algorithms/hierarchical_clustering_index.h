@@ -199,7 +199,7 @@ public:
      * Computes the inde memory usage
      * Returns: memory used by the index
      */
-    int usedMemory() const
+    size_t usedMemory() const
     {
         return pool_.usedMemory+pool_.wastedMemory+memoryCounter_;
     }
@@ -289,7 +289,7 @@ public:
 
     void findNeighbors(ResultSet<DistanceType>& result, const ElementType* vec, const SearchParams& searchParams) const
     {
-    	if (removed_) {
+    	if (removed_ || searchParams.filter!=NULL) {
     		findNeighborsWithRemoved<true>(result, vec, searchParams);
     	}
     	else {
@@ -546,6 +546,7 @@ private:
     void findNeighborsWithRemoved(ResultSet<DistanceType>& result, const ElementType* vec, const SearchParams& searchParams) const
     {
         int maxChecks = searchParams.checks;
+        const DynamicBitset* filter = searchParams.filter;
 
         // Priority queue storing intermediate branches in the best-bin-first search
         Heap<BranchSt>* heap = new Heap<BranchSt>(size_);
@@ -553,13 +554,13 @@ private:
         DynamicBitset checked(size_);
         int checks = 0;
         for (int i=0; i<trees_; ++i) {
-            findNN<with_removed>(tree_roots_[i], result, vec, checks, maxChecks, heap, checked);
+            findNN<with_removed>(tree_roots_[i], result, vec, checks, maxChecks, heap, checked, filter);
         }
 
         BranchSt branch;
         while (heap->popMin(branch) && (checks<maxChecks || !result.full())) {
             NodePtr node = branch.node;
-            findNN<with_removed>(node, result, vec, checks, maxChecks, heap, checked);
+            findNN<with_removed>(node, result, vec, checks, maxChecks, heap, checked, filter);
         }
 
         delete heap;
@@ -580,7 +581,7 @@ private:
 
     template<bool with_removed>
     void findNN(NodePtr node, ResultSet<DistanceType>& result, const ElementType* vec, int& checks, int maxChecks,
-                Heap<BranchSt>* heap,  DynamicBitset& checked) const
+                Heap<BranchSt>* heap,  DynamicBitset& checked, const DynamicBitset* filter) const
     {
         if (node->childs.empty()) {
             if (checks>=maxChecks) {
@@ -590,7 +591,7 @@ private:
             for (size_t i=0; i<node->points.size(); ++i) {
             	PointInfo& pointInfo = node->points[i];
             	if (with_removed) {
-            		if (removed_points_.test(pointInfo.index)) continue;
+            		if (skipPoint(pointInfo.index, filter)) continue;
             	}
                 if (checked.test(pointInfo.index)) continue;
                 DistanceType dist = distance_(pointInfo.point, vec, veclen_);
@@ -615,7 +616,7 @@ private:
                 }
             }
             delete[] domain_distances;
-            findNN<with_removed>(node->childs[best_index],result,vec, checks, maxChecks, heap, checked);
+            findNN<with_removed>(node->childs[best_index],result,vec, checks, maxChecks, heap, checked, filter);
         }
     }
     
@@ -209,9 +209,9 @@ public:
      * Computes the inde memory usage
      * Returns: memory used by the index
      */
-    int usedMemory() const
+    size_t usedMemory() const
     {
-        return int(pool_.usedMemory+pool_.wastedMemory+size_*sizeof(int));  // pool memory and vind array memory
+        return pool_.usedMemory+pool_.wastedMemory+size_*sizeof(int);  // pool memory and vind array memory
     }
 
     /**
@@ -228,20 +228,22 @@ public:
         int maxChecks = searchParams.checks;
         float epsError = 1+searchParams.eps;
 
+        const DynamicBitset* filter = searchParams.filter;
+
         if (maxChecks==FLANN_CHECKS_UNLIMITED) {
-        	if (removed_) {
-        		getExactNeighbors<true>(result, vec, epsError);
+        	if (removed_ || filter!=NULL) {
+        		getExactNeighbors<true>(result, vec, epsError, filter);
         	}
         	else {
-        		getExactNeighbors<false>(result, vec, epsError);
+        		getExactNeighbors<false>(result, vec, epsError, filter);
         	}
         }
         else {
-        	if (removed_) {
-        		getNeighbors<true>(result, vec, maxChecks, epsError);
+        	if (removed_ || filter!=NULL) {
+        		getNeighbors<true>(result, vec, maxChecks, epsError, filter);
         	}
         	else {
-        		getNeighbors<false>(result, vec, maxChecks, epsError);
+        		getNeighbors<false>(result, vec, maxChecks, epsError, filter);
         	}
         }
     }
@@ -266,9 +268,7 @@ protected:
         /* Construct the randomized trees. */
         for (int i = 0; i < trees_; i++) {
             /* Randomize the order of vectors to allow for unbiased sampling. */
-            std::random_device rd;
-            std::mt19937 g(rd());
-            std::shuffle(ind.begin(), ind.end(), g);
+            std::shuffle(ind.begin(), ind.end(), random_generator());
             tree_roots_[i] = divideTree(&ind[0], int(size_) );
         }
         delete[] mean_;
@@ -525,7 +525,8 @@ private:
      * traversal of the tree.
      */
     template<bool with_removed>
-    void getExactNeighbors(ResultSet<DistanceType>& result, const ElementType* vec, float epsError) const
+    void getExactNeighbors(ResultSet<DistanceType>& result, const ElementType* vec, float epsError,
+                           const DynamicBitset* filter) const
     {
         //		checkID -= 1;  /* Set a different unique ID for each search. */
 
@@ -533,7 +534,7 @@ private:
             fprintf(stderr,"It doesn't make any sense to use more than one tree for exact search");
         }
         if (trees_>0) {
-            searchLevelExact<with_removed>(result, vec, tree_roots_[0], 0.0, epsError);
+            searchLevelExact<with_removed>(result, vec, tree_roots_[0], 0.0, epsError, filter);
         }
     }
 
@@ -543,7 +544,8 @@ private:
      * the tree.
      */
     template<bool with_removed>
-    void getNeighbors(ResultSet<DistanceType>& result, const ElementType* vec, int maxCheck, float epsError) const
+    void getNeighbors(ResultSet<DistanceType>& result, const ElementType* vec, int maxCheck, float epsError,
+                      const DynamicBitset* filter) const
     {
         int i;
         BranchSt branch;
@@ -554,12 +556,12 @@ private:
 
         /* Search once through each tree down to root. */
         for (i = 0; i < trees_; ++i) {
-            searchLevel<with_removed>(result, vec, tree_roots_[i], 0, checkCount, maxCheck, epsError, heap, checked);
+            searchLevel<with_removed>(result, vec, tree_roots_[i], 0, checkCount, maxCheck, epsError, heap, checked, filter);
         }
 
         /* Keep searching other branches from heap until finished. */
         while ( heap->popMin(branch) && (checkCount < maxCheck || !result.full() )) {
-            searchLevel<with_removed>(result, vec, branch.node, branch.mindist, checkCount, maxCheck, epsError, heap, checked);
+            searchLevel<with_removed>(result, vec, branch.node, branch.mindist, checkCount, maxCheck, epsError, heap, checked, filter);
         }
 
         delete heap;
@@ -573,7 +575,7 @@ private:
      */
     template<bool with_removed>
     void searchLevel(ResultSet<DistanceType>& result_set, const ElementType* vec, NodePtr node, DistanceType mindist, int& checkCount, int maxCheck,
-                     float epsError, Heap<BranchSt>* heap, DynamicBitset& checked) const
+                     float epsError, Heap<BranchSt>* heap, DynamicBitset& checked, const DynamicBitset* filter) const
     {
         if (result_set.worstDist()<mindist) {
             //			printf("Ignoring branch, too far\n");
@@ -584,7 +586,7 @@ private:
         if ((node->child1 == NULL)&&(node->child2 == NULL)) {
             int index = node->divfeat;
             if (with_removed) {
-            	if (removed_points_.test(index)) return;
+            	if (skipPoint(index, filter)) return;
             }
             /*  Do not check same node more than once when searching multiple trees. */
             if ( checked.test(index) || ((checkCount>=maxCheck)&& result_set.full()) ) return;
@@ -617,20 +619,21 @@ private:
         }
 
         /* Call recursively to search next level down. */
-        searchLevel<with_removed>(result_set, vec, bestChild, mindist, checkCount, maxCheck, epsError, heap, checked);
+        searchLevel<with_removed>(result_set, vec, bestChild, mindist, checkCount, maxCheck, epsError, heap, checked, filter);
     }
 
     /**
      * Performs an exact search in the tree starting from a node.
      */
     template<bool with_removed>
-    void searchLevelExact(ResultSet<DistanceType>& result_set, const ElementType* vec, const NodePtr node, DistanceType mindist, const float epsError) const
+    void searchLevelExact(ResultSet<DistanceType>& result_set, const ElementType* vec, const NodePtr node, DistanceType mindist, const float epsError,
+                          const DynamicBitset* filter) const
     {
         /* If this is a leaf node, then do check and return. */
         if ((node->child1 == NULL)&&(node->child2 == NULL)) {
             int index = node->divfeat;
             if (with_removed) {
-            	if (removed_points_.test(index)) return; // ignore removed points
+            	if (skipPoint(index, filter)) return; // ignore removed and filtered points
             }
             DistanceType dist = distance_(node->point, vec, veclen_);
             result_set.addPoint(dist,index);
@@ -655,10 +658,10 @@ private:
         DistanceType new_distsq = mindist + distance_.accum_dist(val, node->divval, node->divfeat);
 
         /* Call recursively to search next level down. */
-        searchLevelExact<with_removed>(result_set, vec, bestChild, mindist, epsError);
+        searchLevelExact<with_removed>(result_set, vec, bestChild, mindist, epsError, filter);
 
         if (mindist*epsError<=result_set.worstDist()) {
-            searchLevelExact<with_removed>(result_set, vec, otherChild, new_distsq, epsError);
+            searchLevelExact<with_removed>(result_set, vec, otherChild, new_distsq, epsError, filter);
         }
     }
     
@@ -668,10 +671,10 @@ private:
         
         if ((node->child1==NULL) && (node->child2==NULL)) {
             ElementType* leaf_point = node->point;
-            ElementType max_span = 0;
+            ElementType max_span = ElementType(0);
             size_t div_feat = 0;
             for (size_t i=0;i<veclen_;++i) {
-                ElementType span = std::abs(point[i]-leaf_point[i]);
+                ElementType span = ElementType(std::abs(point[i]-leaf_point[i]));
                 if (span > max_span) {
                     max_span = span;
                     div_feat = i;
@@ -203,7 +203,7 @@ public:
      * Computes the inde memory usage
      * Returns: memory used by the index
      */
-    int usedMemory() const
+    size_t usedMemory() const
     {
         return pool_.usedMemory+pool_.wastedMemory+size_*sizeof(int);  // pool memory and vind array memory
     }
@@ -223,11 +223,11 @@ public:
 
         std::vector<DistanceType> dists(veclen_,0);
         DistanceType distsq = computeInitialDistances(vec, dists);
-        if (removed_) {
-            searchLevel<true>(result, vec, root_node_, distsq, dists, epsError);
+        if (removed_ || searchParams.filter!=NULL) {
+            searchLevel<true>(result, vec, root_node_, distsq, dists, epsError, searchParams.filter);
         }
         else {
-            searchLevel<false>(result, vec, root_node_, distsq, dists, epsError);
+            searchLevel<false>(result, vec, root_node_, distsq, dists, epsError, searchParams.filter);
         }
     }
 
@@ -449,11 +449,11 @@ private:
     void middleSplit(int* ind, int count, int& index, int& cutfeat, DistanceType& cutval, const BoundingBox& bbox)
     {
         // find the largest span from the approximate bounding box
-        ElementType max_span = bbox[0].high-bbox[0].low;
+        ElementType max_span = ElementType(bbox[0].high-bbox[0].low);
         cutfeat = 0;
         cutval = (bbox[0].high+bbox[0].low)/2;
         for (size_t i=1; i<veclen_; ++i) {
-            ElementType span = bbox[i].high-bbox[i].low;
+            ElementType span = ElementType(bbox[i].high-bbox[i].low);
             if (span>max_span) {
                 max_span = span;
                 cutfeat = i;
@@ -465,16 +465,16 @@ private:
         ElementType min_elem, max_elem;
         computeMinMax(ind, count, cutfeat, min_elem, max_elem);
         cutval = (min_elem+max_elem)/2;
-        max_span = max_elem - min_elem;
+        max_span = ElementType(max_elem - min_elem);
 
         // check if a dimension of a largest span exists
         size_t k = cutfeat;
         for (size_t i=0; i<veclen_; ++i) {
             if (i==k) continue;
-            ElementType span = bbox[i].high-bbox[i].low;
+            ElementType span = ElementType(bbox[i].high-bbox[i].low);
             if (span>max_span) {
                 computeMinMax(ind, count, i, min_elem, max_elem);
-                span = max_elem - min_elem;
+                span = ElementType(max_elem - min_elem);
                 if (span>max_span) {
                     max_span = span;
                     cutfeat = i;
@@ -591,14 +591,14 @@ private:
      */
     template <bool with_removed>
     void searchLevel(ResultSet<DistanceType>& result_set, const ElementType* vec, const NodePtr node, DistanceType mindistsq,
-                     std::vector<DistanceType>& dists, const float epsError) const
+                     std::vector<DistanceType>& dists, const float epsError, const DynamicBitset* filter) const
     {
         /* If this is a leaf node, then do check and return. */
         if ((node->child1 == NULL)&&(node->child2 == NULL)) {
             DistanceType worst_dist = result_set.worstDist();
             for (int i=node->left; i<node->right; ++i) {
                 if (with_removed) {
-                    if (removed_points_.test(vind_[i])) continue;
+                    if (skipPoint(vind_[i], filter)) continue;
                 }
                 ElementType* point = reorder_ ? data_[i] : points_[vind_[i]];
                 DistanceType dist = distance_(vec, point, veclen_, worst_dist);
@@ -630,13 +630,13 @@ private:
         }
 
         /* Call recursively to search next level down. */
-        searchLevel<with_removed>(result_set, vec, bestChild, mindistsq, dists, epsError);
+        searchLevel<with_removed>(result_set, vec, bestChild, mindistsq, dists, epsError, filter);
 
         DistanceType dst = dists[idx];
         mindistsq = mindistsq + cut_dist - dst;
         dists[idx] = cut_dist;
         if (mindistsq*epsError<=result_set.worstDist()) {
-            searchLevel<with_removed>(result_set, vec, otherChild, mindistsq, dists, epsError);
+            searchLevel<with_removed>(result_set, vec, otherChild, mindistsq, dists, epsError, filter);
         }
         dists[idx] = dst;
     }
@@ -205,7 +205,7 @@ public:
      * Computes the inde memory usage
      * Returns: memory used by the index
      */
-    int usedMemory() const
+    size_t usedMemory() const
     {
         return pool_.usedMemory+pool_.wastedMemory+memoryCounter_;
     }
@@ -282,7 +282,7 @@ public:
 
     void findNeighbors(ResultSet<DistanceType>& result, const ElementType* vec, const SearchParams& searchParams) const
     {
-    	if (removed_) {
+    	if (removed_ || searchParams.filter!=NULL) {
     		findNeighborsWithRemoved<true>(result, vec, searchParams);
     	}
     	else {
@@ -718,21 +718,22 @@ private:
     {
 
         int maxChecks = searchParams.checks;
+        const DynamicBitset* filter = searchParams.filter;
 
         if (maxChecks==FLANN_CHECKS_UNLIMITED) {
-            findExactNN<with_removed>(root_, result, vec);
+            findExactNN<with_removed>(root_, result, vec, filter);
         }
         else {
             // Priority queue storing intermediate branches in the best-bin-first search
             Heap<BranchSt>* heap = new Heap<BranchSt>((int)size_);
 
             int checks = 0;
-            findNN<with_removed>(root_, result, vec, checks, maxChecks, heap);
+            findNN<with_removed>(root_, result, vec, checks, maxChecks, heap, filter);
 
             BranchSt branch;
             while (heap->popMin(branch) && (checks<maxChecks || !result.full())) {
                 NodePtr node = branch.node;
-                findNN<with_removed>(node, result, vec, checks, maxChecks, heap);
+                findNN<with_removed>(node, result, vec, checks, maxChecks, heap, filter);
             }
 
             delete heap;
@@ -755,7 +756,7 @@ private:
 
     template<bool with_removed>
     void findNN(NodePtr node, ResultSet<DistanceType>& result, const ElementType* vec, int& checks, int maxChecks,
-                Heap<BranchSt>* heap) const
+                Heap<BranchSt>* heap, const DynamicBitset* filter) const
     {
         // Ignore those clusters that are too far away
         {
@@ -780,7 +781,7 @@ private:
             	PointInfo& point_info = node->points[i];
                 int index = point_info.index;
                 if (with_removed) {
-                	if (removed_points_.test(index)) continue;
+                	if (skipPoint(index, filter)) continue;
                 }
                 DistanceType dist = distance_(point_info.point, vec, veclen_);
                 result.addPoint(dist, index);
@@ -789,7 +790,7 @@ private:
         }
         else {
             int closest_center = exploreNodeBranches(node, vec, heap);
-            findNN<with_removed>(node->childs[closest_center],result,vec, checks, maxChecks, heap);
+            findNN<with_removed>(node->childs[closest_center],result,vec, checks, maxChecks, heap, filter);
         }
     }
 
@@ -834,7 +835,8 @@ private:
      * Function the performs exact nearest neighbor search by traversing the entire tree.
      */
     template<bool with_removed>
-    void findExactNN(NodePtr node, ResultSet<DistanceType>& result, const ElementType* vec) const
+    void findExactNN(NodePtr node, ResultSet<DistanceType>& result, const ElementType* vec,
+                     const DynamicBitset* filter) const
     {
         // Ignore those clusters that are too far away
         {
@@ -856,7 +858,7 @@ private:
             	PointInfo& point_info = node->points[i];
                 int index = point_info.index;
                 if (with_removed) {
-                	if (removed_points_.test(index)) continue;
+                	if (skipPoint(index, filter)) continue;
                 }
                 DistanceType dist = distance_(point_info.point, vec, veclen_);
                 result.addPoint(dist, index);
@@ -867,7 +869,7 @@ private:
             getCenterOrdering(node, vec, sort_indices);
 
             for (int i=0; i<branching_; ++i) {
-                findExactNN<with_removed>(node->childs[sort_indices[i]],result,vec);
+                findExactNN<with_removed>(node->childs[sort_indices[i]],result,vec, filter);
             }
 
         }
@@ -97,7 +97,7 @@ public:
     }
 
 
-    int usedMemory() const
+    size_t usedMemory() const
     {
         return 0;
     }
@@ -126,11 +126,11 @@ public:
     	la & *this;
     }
 
-    void findNeighbors(ResultSet<DistanceType>& resultSet, const ElementType* vec, const SearchParams& /*searchParams*/) const
+    void findNeighbors(ResultSet<DistanceType>& resultSet, const ElementType* vec, const SearchParams& searchParams) const
     {
-    	if (removed_) {
+    	if (removed_ || searchParams.filter!=NULL) {
     		for (size_t i = 0; i < points_.size(); ++i) {
-    			if (removed_points_.test(i)) continue;
+    			if (skipPoint(i, searchParams.filter)) continue;
     			DistanceType dist = distance_(points_[i], vec, veclen_);
     			resultSet.addPoint(dist, i);
     		}
@@ -208,7 +208,7 @@ public:
      * Computes the index memory usage
      * Returns: memory used by the index
      */
-    int usedMemory() const
+    size_t usedMemory() const
     {
         return size_ * sizeof(int);
     }
@@ -338,9 +338,9 @@ public:
      *     vec = the vector for which to search the nearest neighbors
      *     maxCheck = the maximum number of restarts (in a best-bin-first manner)
      */
-    void findNeighbors(ResultSet<DistanceType>& result, const ElementType* vec, const SearchParams& /*searchParams*/) const
+    void findNeighbors(ResultSet<DistanceType>& result, const ElementType* vec, const SearchParams& searchParams) const
     {
-        getNeighbors(vec, result);
+        getNeighbors(vec, result, searchParams.filter);
     }
 
 protected:
@@ -487,7 +487,7 @@ private:
      * This is a slower version than the above as it uses the ResultSet
      * @param vec the feature to analyze
      */
-    void getNeighbors(const ElementType* vec, ResultSet<DistanceType>& result) const
+    void getNeighbors(const ElementType* vec, ResultSet<DistanceType>& result, const DynamicBitset* filter) const
     {
         typename std::vector<lsh::LshTable<ElementType> >::const_iterator table = tables_.begin();
         typename std::vector<lsh::LshTable<ElementType> >::const_iterator table_end = tables_.end();
@@ -507,7 +507,7 @@ private:
 
                 // Process the rest of the candidates
                 for (; training_index < last_training_index; ++training_index) {
-                	if (removed_ && removed_points_.test(*training_index)) continue;
+                	if (skipPoint(*training_index, filter)) continue;
                     // Compute the Hamming distance
                     hamming_distance = distance_(vec, points_[*training_index], veclen_);
                     result.addPoint(hamming_distance, *training_index);
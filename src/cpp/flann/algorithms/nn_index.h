@@ -57,7 +57,7 @@ public:
 
     virtual flann_algorithm_t getType() const = 0;
 
-    virtual int usedMemory() const = 0;
+    virtual size_t usedMemory() const = 0;
 
     virtual IndexParams getParameters() const = 0;
 
@@ -734,6 +734,23 @@ protected:
     }
 
 
+    /**
+     * Returns true if the point at the given index must be left out of a
+     * search: it was removed from the index, or the search is restricted by
+     * a filter (see SearchParams::filter) that does not have its id.
+     */
+    inline bool skipPoint(size_t index, const DynamicBitset* filter) const
+    {
+    	if (removed_ && removed_points_.test(index)) {
+    		return true;
+    	}
+    	if (filter!=NULL) {
+    		size_t id = removed_ ? ids_[index] : index;
+    		return id>=filter->size() || !filter->test(id);
+    	}
+    	return false;
+    }
+
     void indices_to_ids(const size_t* in, size_t* out, size_t size) const
     {
 		if (removed_) {
@@ -897,7 +914,8 @@ protected:
 		using NNIndex<Distance>::extendDataset;\
 		using NNIndex<Distance>::setDataset;\
 		using NNIndex<Distance>::cleanRemovedPoints;\
-		using NNIndex<Distance>::indices_to_ids;
+		using NNIndex<Distance>::indices_to_ids;\
+		using NNIndex<Distance>::skipPoint;
 
 
 
@@ -0,0 +1,726 @@
+/***********************************************************************
+ * Software License Agreement (BSD License)
+ *
+ * Copyright 2008-2009  Marius Muja (mariusm@cs.ubc.ca). All rights reserved.
+ * Copyright 2008-2009  David G. Lowe (lowe@cs.ubc.ca). All rights reserved.
+ *
+ * THE BSD LICENSE
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ *
+ * 1. Redistributions of source code must retain the above copyright
+ *    notice, this list of conditions and the following disclaimer.
+ * 2. Redistributions in binary form must reproduce the above copyright
+ *    notice, this list of conditions and the following disclaimer in the
+ *    documentation and/or other materials provided with the distribution.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+ * IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+ * OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+ * IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY DIRECT, INDIRECT,
+ * INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+ * NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+ * DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+ * THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+ * THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ *************************************************************************/
+
+#ifndef FLANN_PQ_INDEX_H_
+#define FLANN_PQ_INDEX_H_
+
+#include <algorithm>
+#include <cassert>
+#include <limits>
+#include <vector>
+
+#include "flann/general.h"
+#include "flann/algorithms/nn_index.h"
+#include "flann/algorithms/dist.h"
+#include "flann/util/matrix.h"
+#include "flann/util/result_set.h"
+#include "flann/util/random.h"
+#include "flann/util/saving.h"
+
+namespace flann
+{
+
+/**
+ * The distances of the difference of the points, for which the residuals
+ * of the points to their coarse centers can be encoded instead of the
+ * points.
+ */
+template <typename Distance>
+struct is_translation_invariant { static const bool value = false; };
+
+template <typename T>
+struct is_translation_invariant<L2_Simple<T> > { static const bool value = true; };
+
+template <typename T>
+struct is_translation_invariant<L2_3D<T> > { static const bool value = true; };
+
+template <typename T>
+struct is_translation_invariant<L2<T> > { static const bool value = true; };
+
+template <typename T>
+struct is_translation_invariant<L1<T> > { static const bool value = true; };
+
+template <typename T>
+struct is_translation_invariant<MinkowskiDistance<T> > { static const bool value = true; };
+
+
+struct PQIndexParams : public IndexParams
+{
+    PQIndexParams(int subquantizers = 8, int code_bits = 8, int coarse_clusters = 0, int iterations = 11)
+    {
+        (*this)["algorithm"] = FLANN_INDEX_PQ;
+        // number of subvectors each point is split in, each encoded in one byte
+        (*this)["subquantizers"] = subquantizers;
+        // bits of the code of a subvector (at most 8), the codebooks have 2^code_bits centroids
+        (*this)["code_bits"] = code_bits;
+        // number of inverted lists of the coarse quantizer (IVF+PQ), 0 for an exhaustive PQ scan
+        (*this)["coarse_clusters"] = coarse_clusters;
+        // max iterations of the kmeans clusterings computing the codebooks and the coarse quantizer
+        (*this)["iterations"] = iterations;
+    }
+};
+
+
+/**
+ * Product quantization index
+ *
+ * Each point is split in subquantizers subvectors, and each subvector is
+ * replaced by the id of its nearest centroid in the codebook of its
+ * subspace, so that the index stores one byte per subvector instead of
+ * the point. The queries are compared to the codes with the asymmetric
+ * distance computation: the distances from the query subvectors to all
+ * the centroids are computed once per query, and the distance to a point
+ * is then the sum of one table lookup per subvector. This requires a
+ * distance that is a sum over the dimensions, like the ones usable with
+ * the kd-tree.
+ *
+ * With coarse_clusters > 0 the points are also partitioned by a kmeans
+ * coarse quantizer in inverted lists, and a search only scans the lists
+ * whose centers are closest to the query until checks codes have been
+ * compared. For the distances of the difference of the points (euclidean,
+ * manhattan and minkowski) the codebooks are trained on and encode the
+ * residuals of the points to their coarse centers, which vary much less
+ * than the points, and the table of each list scanned is that of the
+ * residual of the query to the center of the list. For the other
+ * distances the points themselves are encoded.
+ *
+ * The returned distances are the approximate distances to the codes.
+ */
+template <typename Distance>
+class PQIndex : public NNIndex<Distance>
+{
+public:
+    typedef typename Distance::ElementType ElementType;
+    typedef typename Distance::ResultType DistanceType;
+
+    typedef NNIndex<Distance> BaseClass;
+
+    typedef bool needs_kdtree_distance;
+
+    /**
+     * Index constructor
+     *
+     * Params:
+     *          params = parameters passed to the product quantization algorithm
+     */
+    PQIndex(const IndexParams& params = PQIndexParams(), Distance d = Distance()) :
+        BaseClass(params, d)
+    {
+        initParams();
+    }
+
+    /**
+     * Index constructor
+     *
+     * Params:
+     *          inputData = dataset with the input features
+     *          params = parameters passed to the product quantization algorithm
+     */
+    PQIndex(const Matrix<ElementType>& inputData, const IndexParams& params = PQIndexParams(), Distance d = Distance()) :
+        BaseClass(params, d)
+    {
+        initParams();
+        setDataset(inputData);
+    }
+
+    PQIndex(const PQIndex& other) : BaseClass(other),
+        subquantizers_(other.subquantizers_),
+        code_bits_(other.code_bits_),
+        coarse_clusters_(other.coarse_clusters_),
+        iterations_(other.iterations_),
+        centroids_(other.centroids_),
+        sub_offsets_(other.sub_offsets_),
+        codebooks_(other.codebooks_),
+        coarse_centers_(other.coarse_centers_),
+        list_ids_(other.list_ids_),
+        list_codes_(other.list_codes_)
+    {
+    }
+
+    PQIndex& operator=(PQIndex other)
+    {
+        this->swap(other);
+        return *this;
+    }
+
+    virtual ~PQIndex()
+    {
+        freeIndex();
+    }
+
+    BaseClass* clone() const
+    {
+        return new PQIndex(*this);
+    }
+
+    using BaseClass::buildIndex;
+
+    void addPoints(const Matrix<ElementType>& points, float rebuild_threshold = 2)
+    {
+        assert(points.cols==veclen_);
+        size_t old_size = size_;
+
+        checkIdRange(size_+points.rows);
+        extendDataset(points);
+
+        if (rebuild_threshold>1 && size_at_build_*rebuild_threshold<size_) {
+            buildIndex();
+        }
+        else {
+            for (size_t i=old_size;i<size_;++i) {
+                addPointToList(i);
+            }
+        }
+    }
+
+    flann_algorithm_t getType() const
+    {
+        return FLANN_INDEX_PQ;
+    }
+
+    /**
+     * Computes the index memory usage: the codes, the ids of the inverted
+     * lists and the centroids.
+     * Returns: memory used by the index
+     */
+    size_t usedMemory() const
+    {
+        size_t memory = (codebooks_.size()+coarse_centers_.size())*sizeof(DistanceType);
+        for (size_t i=0;i<list_ids_.size();++i) {
+            memory += list_ids_[i].capacity()*sizeof(unsigned int) + list_codes_[i].capacity();
+        }
+        return memory;
+    }
+
+    template<typename Archive>
+    void serialize(Archive& ar)
+    {
+        ar.setObject(this);
+
+        ar & *static_cast<NNIndex<Distance>*>(this);
+
+        ar & subquantizers_;
+        ar & code_bits_;
+        ar & coarse_clusters_;
+        ar & iterations_;
+        ar & centroids_;
+        ar & sub_offsets_;
+        ar & codebooks_;
+        ar & coarse_centers_;
+        ar & list_ids_;
+
+        size_t lists = list_ids_.size();
+        if (Archive::is_loading::value) {
+            list_codes_.resize(lists);
+        }
+        for (size_t i=0;i<lists;++i) {
+            size_t code_size = list_codes_[i].size();
+            ar & code_size;
+            if (Archive::is_loading::value) {
+                list_codes_[i].resize(code_size);
+            }
+            if (code_size>0) {
+                ar & serialization::make_binary_object(&list_codes_[i][0], code_size);
+            }
+        }
+
+        if (Archive::is_loading::value) {
+            index_params_["algorithm"] = getType();
+            index_params_["subquantizers"] = subquantizers_;
+            index_params_["code_bits"] = code_bits_;
+            index_params_["coarse_clusters"] = coarse_clusters_;
+            index_params_["iterations"] = iterations_;
+        }
+    }
+
+    void saveIndex(FILE* stream)
+    {
+        serialization::SaveArchive sa(stream);
+        sa & *this;
+    }
+
+    void loadIndex(FILE* stream)
+    {
+        serialization::LoadArchive la(stream);
+        la & *this;
+    }
+
+    /**
+     * Find set of nearest neighbors to vec. Their indices are stored inside
+     * the result object.
+     *
+     * Params:
+     *     result = the result object in which the indices of the nearest-neighbors are stored
+     *     vec = the vector for which to search the nearest neighbors
+     *     searchParams = parameters that influence the search algorithm (checks)
+     */
+    void findNeighbors(ResultSet<DistanceType>& result, const ElementType* vec, const SearchParams& searchParams) const
+    {
+        if (removed_ || searchParams.filter!=NULL) {
+            findNeighborsWithRemoved<true>(result, vec, searchParams);
+        }
+        else {
+            findNeighborsWithRemoved<false>(result, vec, searchParams);
+        }
+    }
+
+protected:
+
+    void buildIndexImpl()
+    {
+        if (subquantizers_<1 || size_t(subquantizers_)>veclen_) {
+            throw FLANNException("The number of subquantizers must be between 1 and the dimension of the points");
+        }
+        if (code_bits_<1 || code_bits_>8) {
+            throw FLANNException("code_bits must be between 1 and 8");
+        }
+        if (coarse_clusters_<0) {
+            throw FLANNException("coarse_clusters must be positive (0 for no coarse quantizer)");
+        }
+        if (size_==0) {
+            throw FLANNException("Cannot build a product quantization index without points");
+        }
+        checkIdRange(size_);
+
+        // the subspaces differ by at most one dimension
+        centroids_ = 1<<code_bits_;
+        sub_offsets_.resize(subquantizers_+1);
+        for (int j=0;j<=subquantizers_;++j) {
+            sub_offsets_[j] = j*veclen_/subquantizers_;
+        }
+
+        // the coarse quantizer is trained first, as the codebooks may
+        // encode the residuals of the points to the coarse centers
+        std::vector<size_t> sample;
+        std::vector<DistanceType> vectors;
+        coarse_centers_.clear();
+        if (coarse_clusters_>0) {
+            samplePoints(coarse_clusters_, sample);
+            sampleVectors(sample, vectors);
+            coarse_centers_.resize(coarse_clusters_*veclen_);
+            computeClustering(vectors, 0, veclen_, coarse_clusters_, &coarse_centers_[0]);
+        }
+
+        // the codebook of a subspace with dsub dimensions holds centroids_
+        // centroids of dsub values, starting at centroids_*sub_offsets_[j]
+        samplePoints(centroids_, sample);
+        sampleVectors(sample, vectors);
+        codebooks_.resize(centroids_*veclen_);
+        for (int j=0;j<subquantizers_;++j) {
+            computeClustering(vectors, sub_offsets_[j], sub_offsets_[j+1]-sub_offsets_[j], centroids_,
+                              &codebooks_[centroids_*sub_offsets_[j]]);
+        }
+
+        // the points are assigned to the lists first, so that the lists
+        // are allocated with their exact sizes
+        list_ids_.assign(std::max(coarse_clusters_, 1), std::vector<unsigned int>());
+        list_codes_.assign(list_ids_.size(), std::vector<unsigned char>());
+        std::vector<int> lists(size_, 0);
+        std::vector<size_t> counts(list_ids_.size(), 0);
+        for (size_t i=0;i<size_;++i) {
+            if (coarse_clusters_>0) {
+                lists[i] = nearestCentroid(points_[i], &coarse_centers_[0], veclen_, coarse_clusters_);
+            }
+            ++counts[lists[i]];
+        }
+        for (size_t l=0;l<list_ids_.size();++l) {
+            if (coarse_clusters_>0) {
+                list_ids_[l].reserve(counts[l]);
+            }
+            list_codes_[l].reserve(counts[l]*subquantizers_);
+        }
+        std::vector<DistanceType> vec(veclen_);
+        for (size_t i=0;i<size_;++i) {
+            encodePoint(i, lists[i], &vec[0]);
+        }
+    }
+
+    void freeIndex()
+    {
+        codebooks_.clear();
+        coarse_centers_.clear();
+        list_ids_.clear();
+        list_codes_.clear();
+    }
+
+private:
+
+    void initParams()
+    {
+        subquantizers_ = get_param(index_params_,"subquantizers",8);
+        code_bits_ = get_param(index_params_,"code_bits",8);
+        coarse_clusters_ = get_param(index_params_,"coarse_clusters",0);
+        iterations_ = get_param(index_params_,"iterations",11);
+        centroids_ = 0;
+    }
+
+    /**
+     * Picks the points on which the kmeans clusterings computing centroids
+     * centers are run, at most TRAINING_POINTS per center.
+     */
+    void samplePoints(size_t centroids, std::vector<size_t>& sample)
+    {
+        size_t sample_size = std::min(size_, TRAINING_POINTS*centroids);
+        sample.resize(sample_size);
+        if (sample_size==size_) {
+            for (size_t i=0;i<size_;++i) {
+                sample[i] = i;
+            }
+        }
+        else {
+            for (size_t i=0;i<sample_size;++i) {
+                sample[i] = std::min(size_t(rand_double(double(size_))), size_-1);
+            }
+        }
+    }
+
+    /**
+     * Stores in vectors the sample points, veclen_ values each, or their
+     * residuals to their coarse centers once these are computed.
+     */
+    void sampleVectors(const std::vector<size_t>& sample, std::vector<DistanceType>& vectors) const
+    {
+        vectors.resize(sample.size()*veclen_);
+        for (size_t i=0;i<sample.size();++i) {
+            const ElementType* point = points_[sample[i]];
+            size_t list = 0;
+            if (residuals() && !coarse_centers_.empty()) {
+                list = nearestCentroid(point, &coarse_centers_[0], veclen_, coarse_clusters_);
+            }
+            encodedVector(point, list, &vectors[i*veclen_]);
+        }
+    }
+
+    /**
+     * Lloyd's kmeans clustering of the dim dimensions starting at offset
+     * of the vectors (veclen_ values each). The centroids centers (dim
+     * values each) are stored in centers. The initial centers are sample
+     * vectors, and the centers of the clusters that become empty are moved
+     * to random sample vectors.
+     */
+    void computeClustering(const std::vector<DistanceType>& vectors, size_t offset, size_t dim, size_t centroids,
+                           DistanceType* centers)
+    {
+        size_t n = vectors.size()/veclen_;
+        for (size_t c=0;c<centroids;++c) {
+            const DistanceType* point = &vectors[(c%n)*veclen_]+offset;
+            for (size_t k=0;k<dim;++k) {
+                centers[c*dim+k] = DistanceType(point[k]);
+            }
+        }
+
+        std::vector<int> assignment(n, -1);
+        std::vector<DistanceType> sums(centroids*dim);
+        std::vector<size_t> counts(centroids);
+        int iterations = iterations_<0 ? (std::numeric_limits<int>::max)() : iterations_;
+        for (int iteration=0;iteration<iterations;++iteration) {
+            bool converged = true;
+            for (size_t i=0;i<n;++i) {
+                int closest = nearestCentroid(&vectors[i*veclen_]+offset, centers, dim, centroids);
+                if (closest!=assignment[i]) {
+                    assignment[i] = closest;
+                    converged = false;
+                }
+            }
+            if (converged) break;
+
+            std::fill(sums.begin(), sums.end(), DistanceType(0));
+            std::fill(counts.begin(), counts.end(), 0);
+            for (size_t i=0;i<n;++i) {
+                const DistanceType* point = &vectors[i*veclen_]+offset;
+                DistanceType* sum = &sums[assignment[i]*dim];
+                for (size_t k=0;k<dim;++k) {
+                    sum[k] += point[k];
+                }
+                counts[assignment[i]]++;
+            }
+            for (size_t c=0;c<centroids;++c) {
+                if (counts[c]>0) {
+                    for (size_t k=0;k<dim;++k) {
+                        centers[c*dim+k] = sums[c*dim+k]/counts[c];
+                    }
+                }
+                else {
+                    const DistanceType* point = &vectors[rand_int(int(n))*veclen_]+offset;
+                    for (size_t k=0;k<dim;++k) {
+                        centers[c*dim+k] = point[k];
+                    }
+                }
+            }
+        }
+    }
+
+    template <typename T>
+    int nearestCentroid(const T* vec, const DistanceType* centers, size_t dim, size_t centroids) const
+    {
+        int closest = 0;
+        DistanceType closest_dist = distance_(vec, centers, dim);
+        for (size_t c=1;c<centroids;++c) {
+            DistanceType dist = distance_(vec, centers+c*dim, dim, closest_dist);
+            if (dist<closest_dist) {
+                closest = int(c);
+                closest_dist = dist;
+            }
+        }
+        return closest;
+    }
+
+    /**
+     * The ids of the inverted lists are stored in 32 bits, half the memory
+     * of a size_t next to codes of a few bytes.
+     */
+    void checkIdRange(size_t points) const
+    {
+        if (points>size_t(std::numeric_limits<unsigned int>::max())) {
+            throw FLANNException("A product quantization index holds at most 2^32-1 points");
+        }
+    }
+
+    /**
+     * Encodes the point with the given id and appends it to the inverted
+     * list of its nearest coarse center.
+     */
+    void addPointToList(size_t id)
+    {
+        size_t list = 0;
+        if (coarse_clusters_>0) {
+            list = nearestCentroid(points_[id], &coarse_centers_[0], veclen_, coarse_clusters_);
+        }
+        std::vector<DistanceType> vec(veclen_);
+        encodePoint(id, list, &vec[0]);
+    }
+
+    /**
+     * Encodes the point with the given id and appends it to the given list,
+     * vec being veclen_ values of scratch space.
+     */
+    void encodePoint(size_t id, size_t list, DistanceType* vec)
+    {
+        encodedVector(points_[id], list, vec);
+
+        // without coarse quantizer the codes are in the order of the points
+        if (coarse_clusters_>0) {
+            list_ids_[list].push_back((unsigned int)id);
+        }
+        for (int j=0;j<subquantizers_;++j) {
+            size_t dsub = sub_offsets_[j+1]-sub_offsets_[j];
+            int code = nearestCentroid(vec+sub_offsets_[j], &codebooks_[centroids_*sub_offsets_[j]], dsub, centroids_);
+            list_codes_[list].push_back((unsigned char)code);
+        }
+    }
+
+    /**
+     * Whether the codes are those of the residuals of the points to their
+     * coarse centers.
+     */
+    bool residuals() const
+    {
+        return coarse_clusters_>0 && is_translation_invariant<Distance>::value;
+    }
+
+    /**
+     * Stores in vec the vector encoded for a point of the given list: its
+     * residual to the center of the list, or the point itself.
+     */
+    void encodedVector(const ElementType* point, size_t list, DistanceType* vec) const
+    {
+        if (residuals() && !coarse_centers_.empty()) {
+            const DistanceType* center = &coarse_centers_[list*veclen_];
+            for (size_t k=0;k<veclen_;++k) {
+                vec[k] = DistanceType(point[k])-center[k];
+            }
+        }
+        else {
+            for (size_t k=0;k<veclen_;++k) {
+                vec[k] = DistanceType(point[k]);
+            }
+        }
+    }
+
+    /**
+     * Stores in table the distances from the subvectors of vec to all the
+     * centroids of their codebooks.
+     */
+    template <typename T>
+    void computeTable(const T* vec, DistanceType* table) const
+    {
+        for (int j=0;j<subquantizers_;++j) {
+            size_t dsub = sub_offsets_[j+1]-sub_offsets_[j];
+            const T* subvec = vec+sub_offsets_[j];
+            const DistanceType* codebook = &codebooks_[centroids_*sub_offsets_[j]];
+            for (int c=0;c<centroids_;++c) {
+                table[j*centroids_+c] = distance_(subvec, codebook+c*dsub, dsub);
+            }
+        }
+    }
+
+    template<bool with_removed>
+    void findNeighborsWithRemoved(ResultSet<DistanceType>& result, const ElementType* vec, const SearchParams& searchParams) const
+    {
+        // distances from the query subvectors to all the centroids
+        std::vector<DistanceType> table(subquantizers_*centroids_);
+        const DynamicBitset* filter = searchParams.filter;
+        if (!residuals()) {
+            computeTable(vec, &table[0]);
+        }
+        if (coarse_clusters_==0) {
+            scanList<with_removed>(result, &table[0], 0, filter);
+            return;
+        }
+
+        std::vector<std::pair<DistanceType,int> > lists(coarse_clusters_);
+        for (int i=0;i<coarse_clusters_;++i) {
+            lists[i] = std::make_pair(distance_(vec, &coarse_centers_[i*veclen_], veclen_), i);
+        }
+        std::sort(lists.begin(), lists.end());
+
+        std::vector<DistanceType> query(veclen_);
+        int maxChecks = searchParams.checks;
+        size_t checks = 0;
+        for (int i=0;i<coarse_clusters_;++i) {
+            if (maxChecks!=FLANN_CHECKS_UNLIMITED && i>0 && checks>=size_t(std::max(maxChecks,0)) && result.full()) {
+                break;
+            }
+            if (residuals()) {
+                // the codes of the list are residuals to its center
+                encodedVector(vec, lists[i].second, &query[0]);
+                computeTable(&query[0], &table[0]);
+            }
+            checks += scanList<with_removed>(result, &table[0], lists[i].second, filter);
+        }
+    }
+
+    /**
+     * Compares the query with the codes of a list, returning the number of
+     * codes compared (the removed and filtered points are skipped).
+     */
+    template<bool with_removed>
+    size_t scanList(ResultSet<DistanceType>& result, const DistanceType* table, size_t list,
+                    const DynamicBitset* filter) const
+    {
+        const std::vector<unsigned char>& codes = list_codes_[list];
+        if (codes.empty()) return 0;
+
+        size_t count = codes.size()/subquantizers_;
+        const unsigned int* ids = coarse_clusters_>0 ? &list_ids_[list][0] : NULL;
+        const unsigned char* code = &codes[0];
+        size_t compared = 0;
+        for (size_t i=0;i<count;++i, code+=subquantizers_) {
+            size_t id = ids==NULL ? i : ids[i];
+            if (with_removed) {
+                if (skipPoint(id, filter)) continue;
+            }
+            ++compared;
+            DistanceType dist = 0;
+            const DistanceType* subtable = table;
+            for (int j=0;j<subquantizers_;++j, subtable+=centroids_) {
+                dist += subtable[code[j]];
+            }
+            result.addPoint(dist, id);
+        }
+        return compared;
+    }
+
+    void swap(PQIndex& other)
+    {
+        BaseClass::swap(other);
+        std::swap(subquantizers_, other.subquantizers_);
+        std::swap(code_bits_, other.code_bits_);
+        std::swap(coarse_clusters_, other.coarse_clusters_);
+        std::swap(iterations_, other.iterations_);
+        std::swap(centroids_, other.centroids_);
+        std::swap(sub_offsets_, other.sub_offsets_);
+        std::swap(codebooks_, other.codebooks_);
+        std::swap(coarse_centers_, other.coarse_centers_);
+        std::swap(list_ids_, other.list_ids_);
+        std::swap(list_codes_, other.list_codes_);
+    }
+
+    /**
+     * Maximum number of points the kmeans clusterings are run on, per center.
+     */
+    static const size_t TRAINING_POINTS = 64;
+
+    /**
+     * Number of subvectors the points are split in.
+     */
+    int subquantizers_;
+
+    /**
+     * Bits of the code of a subvector.
+     */
+    int code_bits_;
+
+    /**
+     * Number of inverted lists, 0 if there is no coarse quantizer.
+     */
+    int coarse_clusters_;
+
+    /**
+     * Max iterations of the kmeans clusterings, -1 until convergence.
+     */
+    int iterations_;
+
+    /**
+     * Number of centroids of each codebook (2^code_bits).
+     */
+    int centroids_;
+
+    /**
+     * First dimension of each subspace, and veclen_.
+     */
+    std::vector<size_t> sub_offsets_;
+
+    /**
+     * The centroids of the subspaces.
+     */
+    std::vector<DistanceType> codebooks_;
+
+    /**
+     * The centers of the coarse quantizer.
+     */
+    std::vector<DistanceType> coarse_centers_;
+
+    /**
+     * Ids of the points of each inverted list, empty without coarse quantizer.
+     */
+    std::vector<std::vector<unsigned int> > list_ids_;
+
+    /**
+     * Codes of the points of each inverted list, subquantizers_ bytes per point.
+     */
+    std::vector<std::vector<unsigned char> > list_codes_;
+
+    USING_BASECLASS_SYMBOLS
+};
+
+}
+
+#endif //FLANN_PQ_INDEX_H_
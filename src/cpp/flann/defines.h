@@ -88,6 +88,7 @@ enum flann_algorithm_t
 #ifdef FLANN_USE_CUDA
     FLANN_INDEX_KDTREE_CUDA 	= 7,
 #endif
+    FLANN_INDEX_PQ 				= 8,
     FLANN_INDEX_SAVED 			= 254,
     FLANN_INDEX_AUTOTUNED 		= 255,
 };
@@ -140,7 +141,8 @@ enum flann_datatype_t
     FLANN_UINT32 	= 6,
     FLANN_UINT64 	= 7,
     FLANN_FLOAT32 	= 8,
-    FLANN_FLOAT64 	= 9
+    FLANN_FLOAT64 	= 9,
+    FLANN_FLOAT16 	= 10
 };
 
 enum flann_checks_t {
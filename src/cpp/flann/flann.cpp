@@ -29,6 +29,10 @@
 #define FLANN_FIRST_MATCH
 
 #include "flann.h"
+#include "flann/nn/ground_truth.h"
+
+#include <algorithm>
+#include <limits>
 
 
 struct FLANNParameters DEFAULT_FLANN_PARAMETERS = {
@@ -38,7 +42,10 @@ struct FLANNParameters DEFAULT_FLANN_PARAMETERS = {
     4, 4,
     32, 11, FLANN_CENTERS_RANDOM, 0.2f,
     0.9f, 0.01f, 0, 0.1f,
-    FLANN_LOG_NONE, 0
+    12, 20, 2,
+    FLANN_LOG_NONE, 0,
+    0.0f, 0,
+    8, 8, 0
 };
 
 
@@ -81,6 +88,8 @@ flann::IndexParams create_parameters(FLANNParameters* p)
         params["build_weight"] = p->build_weight;
         params["memory_weight"] = p->memory_weight;
         params["sample_fraction"] = p->sample_fraction;
+        params["max_tuning_seconds"] = p->max_tuning_seconds;
+        params["cores"] = p->cores;
     }
 
     if (p->algorithm == FLANN_INDEX_HIERARCHICAL) {
@@ -96,6 +105,13 @@ flann::IndexParams create_parameters(FLANNParameters* p)
         params["multi_probe_level"] = p->multi_probe_level_;
     }
 
+    if (p->algorithm == FLANN_INDEX_PQ) {
+        params["subquantizers"] = p->subquantizers;
+        params["code_bits"] = p->code_bits;
+        params["coarse_clusters"] = p->coarse_clusters;
+        params["iterations"] = p->iterations;
+    }
+
     params["log_level"] = p->log_level;
     params["random_seed"] = p->random_seed;
 
@@ -147,6 +163,9 @@ void update_flann_parameters(const IndexParams& params, FLANNParameters* flann_p
 	if (has_param(params,"sample_fraction")) {
 		flann_params->sample_fraction = get_param<float>(params,"sample_fraction");
 	}
+	if (has_param(params,"tuning_candidates")) {
+		flann_params->tuning_candidates = get_param<int>(params,"tuning_candidates");
+	}
 	if (has_param(params,"table_number")) {
 		flann_params->table_number_ = get_param<unsigned int>(params,"table_number");
 	}
@@ -156,6 +175,15 @@ void update_flann_parameters(const IndexParams& params, FLANNParameters* flann_p
 	if (has_param(params,"multi_probe_level")) {
 		flann_params->multi_probe_level_ = get_param<unsigned int>(params,"multi_probe_level");
 	}
+	if (has_param(params,"subquantizers")) {
+		flann_params->subquantizers = get_param<int>(params,"subquantizers");
+	}
+	if (has_param(params,"code_bits")) {
+		flann_params->code_bits = get_param<int>(params,"code_bits");
+	}
+	if (has_param(params,"coarse_clusters")) {
+		flann_params->coarse_clusters = get_param<int>(params,"coarse_clusters");
+	}
 	if (has_param(params,"log_level")) {
 		flann_params->log_level = get_param<flann_log_level_t>(params,"log_level");
 	}
@@ -175,6 +203,18 @@ void init_flann_parameters(FLANNParameters* p)
     }
 }
 
+/**
+ * Used instead of init_flann_parameters by the functions searching an
+ * existing index. These don't reseed the random number generator, which is
+ * shared by the whole process, so that searches can run concurrently.
+ */
+void init_flann_search_parameters(FLANNParameters* p)
+{
+    if (p != NULL) {
+        flann_log_verbosity(p->log_level);
+    }
+}
+
 
 void flann_log_verbosity(int level)
 {
@@ -200,6 +240,61 @@ int flann_get_distance_order() {
 }
 
 
+/**
+ * What a flann_index_t points to: the index together with the distance it
+ * was created with. Every function taking a flann_index_t uses the distance
+ * stored in the handle rather than the one set by flann_set_distance_type(),
+ * so indexes using different distances can be used at the same time.
+ */
+struct FLANNIndexHandle
+{
+    flann_index_t index;
+    flann_distance_t distance_type;
+    int distance_order;
+};
+
+flann_index_t create_index_handle(flann_index_t index, flann_distance_t distance_type, int distance_order)
+{
+    if (index==NULL) {
+        return NULL;
+    }
+    FLANNIndexHandle* handle = new FLANNIndexHandle();
+    handle->index = index;
+    handle->distance_type = distance_type;
+    handle->distance_order = distance_order;
+    return handle;
+}
+
+flann_distance_t index_distance_type(flann_index_t index_ptr)
+{
+    if (index_ptr==NULL) {
+        return flann_distance_type;
+    }
+    return ((FLANNIndexHandle*)index_ptr)->distance_type;
+}
+
+template<typename Distance>
+Index<Distance>* get_index(flann_index_t index_ptr)
+{
+    return (Index<Distance>*)((FLANNIndexHandle*)index_ptr)->index;
+}
+
+/**
+ * The hamming distance compares the bits of the points, which only makes
+ * sense for integer element types: the points of the other types are
+ * rejected when an index is created or a search is done without one.
+ */
+template<typename T>
+bool hamming_supported()
+{
+    if (std::numeric_limits<T>::is_integer) {
+        return true;
+    }
+    Logger::error("The hamming distance is only supported for integer element types\n");
+    return false;
+}
+
+
 template<typename Distance>
 flann_index_t __flann_build_index(typename Distance::ElementType* dataset, int rows, int cols, float* speedup,
                                   FLANNParameters* flann_params, Distance d = Distance())
@@ -234,58 +329,120 @@ flann_index_t __flann_build_index(typename Distance::ElementType* dataset, int r
 }
 
 template<typename T>
-flann_index_t _flann_build_index(T* dataset, int rows, int cols, float* speedup, FLANNParameters* flann_params)
+flann_index_t _flann_build_index(T* dataset, int rows, int cols, float* speedup, FLANNParameters* flann_params,
+                                 flann_distance_t distance_type, int distance_order)
 {
-    if (flann_distance_type==FLANN_DIST_EUCLIDEAN) {
-        return __flann_build_index<L2<T> >(dataset, rows, cols, speedup, flann_params);
+    flann_index_t index;
+    if (distance_type==FLANN_DIST_EUCLIDEAN) {
+        index = __flann_build_index<L2<T> >(dataset, rows, cols, speedup, flann_params);
     }
-    else if (flann_distance_type==FLANN_DIST_MANHATTAN) {
-        return __flann_build_index<L1<T> >(dataset, rows, cols, speedup, flann_params);
+    else if (distance_type==FLANN_DIST_MANHATTAN) {
+        index = __flann_build_index<L1<T> >(dataset, rows, cols, speedup, flann_params);
     }
-    else if (flann_distance_type==FLANN_DIST_MINKOWSKI) {
-        return __flann_build_index<MinkowskiDistance<T> >(dataset, rows, cols, speedup, flann_params, MinkowskiDistance<T>(flann_distance_order));
+    else if (distance_type==FLANN_DIST_MINKOWSKI) {
+        index = __flann_build_index<MinkowskiDistance<T> >(dataset, rows, cols, speedup, flann_params, MinkowskiDistance<T>(distance_order));
     }
-    else if (flann_distance_type==FLANN_DIST_HIST_INTERSECT) {
-        return __flann_build_index<HistIntersectionDistance<T> >(dataset, rows, cols, speedup, flann_params);
+    else if (distance_type==FLANN_DIST_HIST_INTERSECT) {
+        index = __flann_build_index<HistIntersectionDistance<T> >(dataset, rows, cols, speedup, flann_params);
     }
-    else if (flann_distance_type==FLANN_DIST_HELLINGER) {
-        return __flann_build_index<HellingerDistance<T> >(dataset, rows, cols, speedup, flann_params);
+    else if (distance_type==FLANN_DIST_HELLINGER) {
+        index = __flann_build_index<HellingerDistance<T> >(dataset, rows, cols, speedup, flann_params);
     }
-    else if (flann_distance_type==FLANN_DIST_CHI_SQUARE) {
-        return __flann_build_index<ChiSquareDistance<T> >(dataset, rows, cols, speedup, flann_params);
+    else if (distance_type==FLANN_DIST_CHI_SQUARE) {
+        index = __flann_build_index<ChiSquareDistance<T> >(dataset, rows, cols, speedup, flann_params);
     }
-    else if (flann_distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
-        return __flann_build_index<KL_Divergence<T> >(dataset, rows, cols, speedup, flann_params);
+    else if (distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
+        index = __flann_build_index<KL_Divergence<T> >(dataset, rows, cols, speedup, flann_params);
+    }
+    else if (distance_type==FLANN_DIST_HAMMING) {
+        if (!hamming_supported<T>()) {
+            return NULL;
+        }
+        index = __flann_build_index<HammingDistance<T> >(dataset, rows, cols, speedup, flann_params);
     }
     else {
         Logger::error( "Distance type unsupported in the C bindings, use the C++ bindings instead\n");
         return NULL;
     }
+
+    return create_index_handle(index, distance_type, distance_order);
 }
 
 flann_index_t flann_build_index(float* dataset, int rows, int cols, float* speedup, FLANNParameters* flann_params)
 {
-    return _flann_build_index<float>(dataset, rows, cols, speedup, flann_params);
+    return _flann_build_index<float>(dataset, rows, cols, speedup, flann_params, flann_distance_type, flann_distance_order);
 }
 
 flann_index_t flann_build_index_float(float* dataset, int rows, int cols, float* speedup, FLANNParameters* flann_params)
 {
-    return _flann_build_index<float>(dataset, rows, cols, speedup, flann_params);
+    return _flann_build_index<float>(dataset, rows, cols, speedup, flann_params, flann_distance_type, flann_distance_order);
 }
 
 flann_index_t flann_build_index_double(double* dataset, int rows, int cols, float* speedup, FLANNParameters* flann_params)
 {
-    return _flann_build_index<double>(dataset, rows, cols, speedup, flann_params);
+    return _flann_build_index<double>(dataset, rows, cols, speedup, flann_params, flann_distance_type, flann_distance_order);
 }
 
 flann_index_t flann_build_index_byte(unsigned char* dataset, int rows, int cols, float* speedup, FLANNParameters* flann_params)
 {
-    return _flann_build_index<unsigned char>(dataset, rows, cols, speedup, flann_params);
+    return _flann_build_index<unsigned char>(dataset, rows, cols, speedup, flann_params, flann_distance_type, flann_distance_order);
 }
 
 flann_index_t flann_build_index_int(int* dataset, int rows, int cols, float* speedup, FLANNParameters* flann_params)
 {
-    return _flann_build_index<int>(dataset, rows, cols, speedup, flann_params);
+    return _flann_build_index<int>(dataset, rows, cols, speedup, flann_params, flann_distance_type, flann_distance_order);
+}
+
+flann_index_t flann_build_index_int8(signed char* dataset, int rows, int cols, float* speedup, FLANNParameters* flann_params)
+{
+    return _flann_build_index<signed char>(dataset, rows, cols, speedup, flann_params, flann_distance_type, flann_distance_order);
+}
+
+flann_index_t flann_build_index_float16(flann_float16_t* dataset, int rows, int cols, float* speedup, FLANNParameters* flann_params)
+{
+    return _flann_build_index<float16>(dataset, rows, cols, speedup, flann_params, flann_distance_type, flann_distance_order);
+}
+
+flann_index_t flann_build_index_with_distance(float* dataset, int rows, int cols, float* speedup, FLANNParameters* flann_params,
+                                              flann_distance_t distance_type, int order)
+{
+    return _flann_build_index<float>(dataset, rows, cols, speedup, flann_params, distance_type, order);
+}
+
+flann_index_t flann_build_index_with_distance_float(float* dataset, int rows, int cols, float* speedup, FLANNParameters* flann_params,
+                                                    flann_distance_t distance_type, int order)
+{
+    return _flann_build_index<float>(dataset, rows, cols, speedup, flann_params, distance_type, order);
+}
+
+flann_index_t flann_build_index_with_distance_double(double* dataset, int rows, int cols, float* speedup, FLANNParameters* flann_params,
+                                                     flann_distance_t distance_type, int order)
+{
+    return _flann_build_index<double>(dataset, rows, cols, speedup, flann_params, distance_type, order);
+}
+
+flann_index_t flann_build_index_with_distance_byte(unsigned char* dataset, int rows, int cols, float* speedup, FLANNParameters* flann_params,
+                                                   flann_distance_t distance_type, int order)
+{
+    return _flann_build_index<unsigned char>(dataset, rows, cols, speedup, flann_params, distance_type, order);
+}
+
+flann_index_t flann_build_index_with_distance_int(int* dataset, int rows, int cols, float* speedup, FLANNParameters* flann_params,
+                                                  flann_distance_t distance_type, int order)
+{
+    return _flann_build_index<int>(dataset, rows, cols, speedup, flann_params, distance_type, order);
+}
+
+flann_index_t flann_build_index_with_distance_int8(signed char* dataset, int rows, int cols, float* speedup, FLANNParameters* flann_params,
+                                                   flann_distance_t distance_type, int order)
+{
+    return _flann_build_index<signed char>(dataset, rows, cols, speedup, flann_params, distance_type, order);
+}
+
+flann_index_t flann_build_index_with_distance_float16(flann_float16_t* dataset, int rows, int cols, float* speedup, FLANNParameters* flann_params,
+                                                      flann_distance_t distance_type, int order)
+{
+    return _flann_build_index<float16>(dataset, rows, cols, speedup, flann_params, distance_type, order);
 }
 
 template <typename Distance>
@@ -297,7 +454,7 @@ int __flann_add_points(flann_index_t index_ptr,
         if (index_ptr==NULL) {
             throw FLANNException("Invalid index");
         }
-        Index<Distance>* index = (Index<Distance>*)index_ptr;
+        Index<Distance>* index = get_index<Distance>(index_ptr);
         index->addPoints(Matrix<ElementType>(points, rows, columns),
                          rebuild_threshold);
         return 0;
@@ -312,27 +469,31 @@ int __flann_add_points(flann_index_t index_ptr,
 template <typename T>
 int _flann_add_points(flann_index_t index_ptr, T* points, int rows, int columns,
                 float rebuild_threshold) {
-    if (flann_distance_type==FLANN_DIST_EUCLIDEAN) {
+    flann_distance_t distance_type = index_distance_type(index_ptr);
+    if (distance_type==FLANN_DIST_EUCLIDEAN) {
         return __flann_add_points<L2<T> >(index_ptr, points, rows, columns, rebuild_threshold);
     }
-    else if (flann_distance_type==FLANN_DIST_MANHATTAN) {
+    else if (distance_type==FLANN_DIST_MANHATTAN) {
         return __flann_add_points<L1<T> >(index_ptr, points, rows, columns, rebuild_threshold);
     }
-    else if (flann_distance_type==FLANN_DIST_MINKOWSKI) {
+    else if (distance_type==FLANN_DIST_MINKOWSKI) {
         return __flann_add_points<MinkowskiDistance<T> >(index_ptr, points, rows, columns, rebuild_threshold);
     }
-    else if (flann_distance_type==FLANN_DIST_HIST_INTERSECT) {
+    else if (distance_type==FLANN_DIST_HIST_INTERSECT) {
         return __flann_add_points<HistIntersectionDistance<T> >(index_ptr, points, rows, columns, rebuild_threshold);
     }
-    else if (flann_distance_type==FLANN_DIST_HELLINGER) {
+    else if (distance_type==FLANN_DIST_HELLINGER) {
         return __flann_add_points<HellingerDistance<T> >(index_ptr, points, rows, columns, rebuild_threshold);
     }
-    else if (flann_distance_type==FLANN_DIST_CHI_SQUARE) {
+    else if (distance_type==FLANN_DIST_CHI_SQUARE) {
         return __flann_add_points<ChiSquareDistance<T> >(index_ptr, points, rows, columns, rebuild_threshold);
     }
-    else if (flann_distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
+    else if (distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
         return __flann_add_points<KL_Divergence<T> >(index_ptr, points, rows, columns, rebuild_threshold);
     }
+    else if (distance_type==FLANN_DIST_HAMMING) {
+        return __flann_add_points<HammingDistance<T> >(index_ptr, points, rows, columns, rebuild_threshold);
+    }
     else {
         Logger::error( "Distance type unsupported in the C bindings, use the C++ bindings instead\n");
         return 0;
@@ -364,6 +525,16 @@ int flann_add_points_int(flann_index_t index_ptr, int* points, int rows, int col
     return _flann_add_points<int>(index_ptr, points, rows, columns, rebuild_threshold);
 }
 
+int flann_add_points_int8(flann_index_t index_ptr, signed char* points, int rows, int columns, float rebuild_threshold)
+{
+    return _flann_add_points<signed char>(index_ptr, points, rows, columns, rebuild_threshold);
+}
+
+int flann_add_points_float16(flann_index_t index_ptr, flann_float16_t* points, int rows, int columns, float rebuild_threshold)
+{
+    return _flann_add_points<float16>(index_ptr, points, rows, columns, rebuild_threshold);
+}
+
 template <typename Distance>
 int __flann_remove_point(flann_index_t index_ptr, unsigned int point_id_uint) {
     size_t point_id(point_id_uint);
@@ -371,7 +542,7 @@ int __flann_remove_point(flann_index_t index_ptr, unsigned int point_id_uint) {
         if (index_ptr==NULL) {
             throw FLANNException("Invalid index");
         }
-        Index<Distance>* index = (Index<Distance>*)index_ptr;
+        Index<Distance>* index = get_index<Distance>(index_ptr);
         index->removePoint(point_id);
         return 0;
     }
@@ -384,27 +555,31 @@ int __flann_remove_point(flann_index_t index_ptr, unsigned int point_id_uint) {
 
 template <typename T>
 int _flann_remove_point(flann_index_t index_ptr, unsigned int point_id) {
-    if (flann_distance_type==FLANN_DIST_EUCLIDEAN) {
+    flann_distance_t distance_type = index_distance_type(index_ptr);
+    if (distance_type==FLANN_DIST_EUCLIDEAN) {
         return __flann_remove_point<L2<T> >(index_ptr, point_id);
     }
-    else if (flann_distance_type==FLANN_DIST_MANHATTAN) {
+    else if (distance_type==FLANN_DIST_MANHATTAN) {
         return __flann_remove_point<L1<T> >(index_ptr, point_id);
     }
-    else if (flann_distance_type==FLANN_DIST_MINKOWSKI) {
+    else if (distance_type==FLANN_DIST_MINKOWSKI) {
         return __flann_remove_point<MinkowskiDistance<T> >(index_ptr, point_id);
     }
-    else if (flann_distance_type==FLANN_DIST_HIST_INTERSECT) {
+    else if (distance_type==FLANN_DIST_HIST_INTERSECT) {
         return __flann_remove_point<HistIntersectionDistance<T> >(index_ptr, point_id);
     }
-    else if (flann_distance_type==FLANN_DIST_HELLINGER) {
+    else if (distance_type==FLANN_DIST_HELLINGER) {
         return __flann_remove_point<HellingerDistance<T> >(index_ptr, point_id);
     }
-    else if (flann_distance_type==FLANN_DIST_CHI_SQUARE) {
+    else if (distance_type==FLANN_DIST_CHI_SQUARE) {
         return __flann_remove_point<ChiSquareDistance<T> >(index_ptr, point_id);
     }
-    else if (flann_distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
+    else if (distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
         return __flann_remove_point<KL_Divergence<T> >(index_ptr, point_id);
     }
+    else if (distance_type==FLANN_DIST_HAMMING) {
+        return __flann_remove_point<HammingDistance<T> >(index_ptr, point_id);
+    }
     else {
         Logger::error( "Distance type unsupported in the C bindings, use the C++ bindings instead\n");
         return 0;
@@ -436,6 +611,103 @@ int flann_remove_point_int(flann_index_t index_ptr, unsigned int point_id)
     return _flann_remove_point<int>(index_ptr, point_id);
 }
 
+int flann_remove_point_int8(flann_index_t index_ptr, unsigned int point_id)
+{
+    return _flann_remove_point<signed char>(index_ptr, point_id);
+}
+
+int flann_remove_point_float16(flann_index_t index_ptr, unsigned int point_id)
+{
+    return _flann_remove_point<float16>(index_ptr, point_id);
+}
+
+template <typename Distance>
+int __flann_remove_points(flann_index_t index_ptr, unsigned int* point_ids, int count) {
+    try {
+        if (index_ptr==NULL) {
+            throw FLANNException("Invalid index");
+        }
+        Index<Distance>* index = get_index<Distance>(index_ptr);
+        for (int i=0;i<count;++i) {
+            index->removePoint(point_ids[i]);
+        }
+        return 0;
+    }
+    catch (std::runtime_error& e) {
+        Logger::error("Caught exception: %s\n",e.what());
+        return -1;
+    }
+    return -1;
+}
+
+template <typename T>
+int _flann_remove_points(flann_index_t index_ptr, unsigned int* point_ids, int count) {
+    flann_distance_t distance_type = index_distance_type(index_ptr);
+    if (distance_type==FLANN_DIST_EUCLIDEAN) {
+        return __flann_remove_points<L2<T> >(index_ptr, point_ids, count);
+    }
+    else if (distance_type==FLANN_DIST_MANHATTAN) {
+        return __flann_remove_points<L1<T> >(index_ptr, point_ids, count);
+    }
+    else if (distance_type==FLANN_DIST_MINKOWSKI) {
+        return __flann_remove_points<MinkowskiDistance<T> >(index_ptr, point_ids, count);
+    }
+    else if (distance_type==FLANN_DIST_HIST_INTERSECT) {
+        return __flann_remove_points<HistIntersectionDistance<T> >(index_ptr, point_ids, count);
+    }
+    else if (distance_type==FLANN_DIST_HELLINGER) {
+        return __flann_remove_points<HellingerDistance<T> >(index_ptr, point_ids, count);
+    }
+    else if (distance_type==FLANN_DIST_CHI_SQUARE) {
+        return __flann_remove_points<ChiSquareDistance<T> >(index_ptr, point_ids, count);
+    }
+    else if (distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
+        return __flann_remove_points<KL_Divergence<T> >(index_ptr, point_ids, count);
+    }
+    else if (distance_type==FLANN_DIST_HAMMING) {
+        return __flann_remove_points<HammingDistance<T> >(index_ptr, point_ids, count);
+    }
+    else {
+        Logger::error( "Distance type unsupported in the C bindings, use the C++ bindings instead\n");
+        return -1;
+    }
+}
+
+int flann_remove_points(flann_index_t index_ptr, unsigned int* point_ids, int count)
+{
+    return _flann_remove_points<float>(index_ptr, point_ids, count);
+}
+
+int flann_remove_points_float(flann_index_t index_ptr, unsigned int* point_ids, int count)
+{
+    return _flann_remove_points<float>(index_ptr, point_ids, count);
+}
+
+int flann_remove_points_double(flann_index_t index_ptr, unsigned int* point_ids, int count)
+{
+    return _flann_remove_points<double>(index_ptr, point_ids, count);
+}
+
+int flann_remove_points_byte(flann_index_t index_ptr, unsigned int* point_ids, int count)
+{
+    return _flann_remove_points<unsigned char>(index_ptr, point_ids, count);
+}
+
+int flann_remove_points_int(flann_index_t index_ptr, unsigned int* point_ids, int count)
+{
+    return _flann_remove_points<int>(index_ptr, point_ids, count);
+}
+
+int flann_remove_points_int8(flann_index_t index_ptr, unsigned int* point_ids, int count)
+{
+    return _flann_remove_points<signed char>(index_ptr, point_ids, count);
+}
+
+int flann_remove_points_float16(flann_index_t index_ptr, unsigned int* point_ids, int count)
+{
+    return _flann_remove_points<float16>(index_ptr, point_ids, count);
+}
+
 template <typename Distance>
 typename Distance::ElementType* __flann_get_point(flann_index_t index_ptr,
                                          unsigned int point_id_uint) {
@@ -444,7 +716,7 @@ typename Distance::ElementType* __flann_get_point(flann_index_t index_ptr,
         if (index_ptr==NULL) {
             throw FLANNException("Invalid index");
         }
-        Index<Distance>* index = (Index<Distance>*)index_ptr;
+        Index<Distance>* index = get_index<Distance>(index_ptr);
         return index->getPoint(point_id);
     }
     catch (std::runtime_error& e) {
@@ -455,27 +727,31 @@ typename Distance::ElementType* __flann_get_point(flann_index_t index_ptr,
 
 template <typename T>
 T* _flann_get_point(flann_index_t index_ptr, unsigned int point_id) {
-    if (flann_distance_type==FLANN_DIST_EUCLIDEAN) {
+    flann_distance_t distance_type = index_distance_type(index_ptr);
+    if (distance_type==FLANN_DIST_EUCLIDEAN) {
         return __flann_get_point<L2<T> >(index_ptr, point_id);
     }
-    else if (flann_distance_type==FLANN_DIST_MANHATTAN) {
+    else if (distance_type==FLANN_DIST_MANHATTAN) {
         return __flann_get_point<L1<T> >(index_ptr, point_id);
     }
-    else if (flann_distance_type==FLANN_DIST_MINKOWSKI) {
+    else if (distance_type==FLANN_DIST_MINKOWSKI) {
         return __flann_get_point<MinkowskiDistance<T> >(index_ptr, point_id);
     }
-    else if (flann_distance_type==FLANN_DIST_HIST_INTERSECT) {
+    else if (distance_type==FLANN_DIST_HIST_INTERSECT) {
         return __flann_get_point<HistIntersectionDistance<T> >(index_ptr, point_id);
     }
-    else if (flann_distance_type==FLANN_DIST_HELLINGER) {
+    else if (distance_type==FLANN_DIST_HELLINGER) {
         return __flann_get_point<HellingerDistance<T> >(index_ptr, point_id);
     }
-    else if (flann_distance_type==FLANN_DIST_CHI_SQUARE) {
+    else if (distance_type==FLANN_DIST_CHI_SQUARE) {
         return __flann_get_point<ChiSquareDistance<T> >(index_ptr, point_id);
     }
-    else if (flann_distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
+    else if (distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
         return __flann_get_point<KL_Divergence<T> >(index_ptr, point_id);
     }
+    else if (distance_type==FLANN_DIST_HAMMING) {
+        return __flann_get_point<HammingDistance<T> >(index_ptr, point_id);
+    }
     else {
         Logger::error( "Distance type unsupported in the C bindings, use the C++ bindings instead\n");
         return NULL;
@@ -507,13 +783,23 @@ int* flann_get_point_int(flann_index_t index_ptr, unsigned int point_id)
     return _flann_get_point<int>(index_ptr, point_id);
 }
 
+signed char* flann_get_point_int8(flann_index_t index_ptr, unsigned int point_id)
+{
+    return _flann_get_point<signed char>(index_ptr, point_id);
+}
+
+flann_float16_t* flann_get_point_float16(flann_index_t index_ptr, unsigned int point_id)
+{
+    return _flann_get_point<float16>(index_ptr, point_id);
+}
+
 template <typename Distance>
 unsigned int __flann_veclen(flann_index_t index_ptr) {
     try {
         if (index_ptr==NULL) {
             throw FLANNException("Invalid index");
         }
-        Index<Distance>* index = (Index<Distance>*)index_ptr;
+        Index<Distance>* index = get_index<Distance>(index_ptr);
         return index->veclen();
     }
     catch (std::runtime_error& e) {
@@ -524,27 +810,31 @@ unsigned int __flann_veclen(flann_index_t index_ptr) {
 
 template <typename T>
 unsigned int _flann_veclen(flann_index_t index_ptr) {
-    if (flann_distance_type==FLANN_DIST_EUCLIDEAN) {
+    flann_distance_t distance_type = index_distance_type(index_ptr);
+    if (distance_type==FLANN_DIST_EUCLIDEAN) {
         return __flann_veclen<L2<T> >(index_ptr);
     }
-    else if (flann_distance_type==FLANN_DIST_MANHATTAN) {
+    else if (distance_type==FLANN_DIST_MANHATTAN) {
         return __flann_veclen<L1<T> >(index_ptr);
     }
-    else if (flann_distance_type==FLANN_DIST_MINKOWSKI) {
+    else if (distance_type==FLANN_DIST_MINKOWSKI) {
         return __flann_veclen<MinkowskiDistance<T> >(index_ptr);
     }
-    else if (flann_distance_type==FLANN_DIST_HIST_INTERSECT) {
+    else if (distance_type==FLANN_DIST_HIST_INTERSECT) {
         return __flann_veclen<HistIntersectionDistance<T> >(index_ptr);
     }
-    else if (flann_distance_type==FLANN_DIST_HELLINGER) {
+    else if (distance_type==FLANN_DIST_HELLINGER) {
         return __flann_veclen<HellingerDistance<T> >(index_ptr);
     }
-    else if (flann_distance_type==FLANN_DIST_CHI_SQUARE) {
+    else if (distance_type==FLANN_DIST_CHI_SQUARE) {
         return __flann_veclen<ChiSquareDistance<T> >(index_ptr);
     }
-    else if (flann_distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
+    else if (distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
         return __flann_veclen<KL_Divergence<T> >(index_ptr);
     }
+    else if (distance_type==FLANN_DIST_HAMMING) {
+        return __flann_veclen<HammingDistance<T> >(index_ptr);
+    }
     else {
         Logger::error( "Distance type unsupported in the C bindings, use the C++ bindings instead\n");
         return 0;
@@ -576,13 +866,23 @@ unsigned int flann_veclen_int(flann_index_t index_ptr)
     return _flann_veclen<int>(index_ptr);
 }
 
+unsigned int flann_veclen_int8(flann_index_t index_ptr)
+{
+    return _flann_veclen<signed char>(index_ptr);
+}
+
+unsigned int flann_veclen_float16(flann_index_t index_ptr)
+{
+    return _flann_veclen<float16>(index_ptr);
+}
+
 template <typename Distance>
 unsigned int __flann_size(flann_index_t index_ptr) {
     try {
         if (index_ptr==NULL) {
             throw FLANNException("Invalid index");
         }
-        Index<Distance>* index = (Index<Distance>*)index_ptr;
+        Index<Distance>* index = get_index<Distance>(index_ptr);
         return index->size();
     }
     catch (std::runtime_error& e) {
@@ -593,27 +893,31 @@ unsigned int __flann_size(flann_index_t index_ptr) {
 
 template <typename T>
 unsigned int _flann_size(flann_index_t index_ptr) {
-    if (flann_distance_type==FLANN_DIST_EUCLIDEAN) {
+    flann_distance_t distance_type = index_distance_type(index_ptr);
+    if (distance_type==FLANN_DIST_EUCLIDEAN) {
         return __flann_size<L2<T> >(index_ptr);
     }
-    else if (flann_distance_type==FLANN_DIST_MANHATTAN) {
+    else if (distance_type==FLANN_DIST_MANHATTAN) {
         return __flann_size<L1<T> >(index_ptr);
     }
-    else if (flann_distance_type==FLANN_DIST_MINKOWSKI) {
+    else if (distance_type==FLANN_DIST_MINKOWSKI) {
         return __flann_size<MinkowskiDistance<T> >(index_ptr);
     }
-    else if (flann_distance_type==FLANN_DIST_HIST_INTERSECT) {
+    else if (distance_type==FLANN_DIST_HIST_INTERSECT) {
         return __flann_size<HistIntersectionDistance<T> >(index_ptr);
     }
-    else if (flann_distance_type==FLANN_DIST_HELLINGER) {
+    else if (distance_type==FLANN_DIST_HELLINGER) {
         return __flann_size<HellingerDistance<T> >(index_ptr);
     }
-    else if (flann_distance_type==FLANN_DIST_CHI_SQUARE) {
+    else if (distance_type==FLANN_DIST_CHI_SQUARE) {
         return __flann_size<ChiSquareDistance<T> >(index_ptr);
     }
-    else if (flann_distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
+    else if (distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
         return __flann_size<KL_Divergence<T> >(index_ptr);
     }
+    else if (distance_type==FLANN_DIST_HAMMING) {
+        return __flann_size<HammingDistance<T> >(index_ptr);
+    }
     else {
         Logger::error( "Distance type unsupported in the C bindings, use the C++ bindings instead\n");
         return 0;
@@ -645,14 +949,25 @@ unsigned int flann_size_int(flann_index_t index_ptr)
     return _flann_size<int>(index_ptr);
 }
 
+unsigned int flann_size_int8(flann_index_t index_ptr)
+{
+    return _flann_size<signed char>(index_ptr);
+}
+
+unsigned int flann_size_float16(flann_index_t index_ptr)
+{
+    return _flann_size<float16>(index_ptr);
+}
+
 template <typename Distance>
 int __flann_used_memory(flann_index_t index_ptr) {
     try {
         if (index_ptr==NULL) {
             throw FLANNException("Invalid index");
         }
-        Index<Distance>* index = (Index<Distance>*)index_ptr;
-        return index->usedMemory();
+        Index<Distance>* index = get_index<Distance>(index_ptr);
+        // the memory is returned as an int, saturated past 2GB
+        return int(std::min(index->usedMemory(), size_t(std::numeric_limits<int>::max())));
     }
     catch (std::runtime_error& e) {
         Logger::error("Caught exception: %s\n",e.what());
@@ -662,27 +977,31 @@ int __flann_used_memory(flann_index_t index_ptr) {
 
 template <typename T>
 int _flann_used_memory(flann_index_t index_ptr) {
-    if (flann_distance_type==FLANN_DIST_EUCLIDEAN) {
+    flann_distance_t distance_type = index_distance_type(index_ptr);
+    if (distance_type==FLANN_DIST_EUCLIDEAN) {
         return __flann_used_memory<L2<T> >(index_ptr);
     }
-    else if (flann_distance_type==FLANN_DIST_MANHATTAN) {
+    else if (distance_type==FLANN_DIST_MANHATTAN) {
         return __flann_used_memory<L1<T> >(index_ptr);
     }
-    else if (flann_distance_type==FLANN_DIST_MINKOWSKI) {
+    else if (distance_type==FLANN_DIST_MINKOWSKI) {
         return __flann_used_memory<MinkowskiDistance<T> >(index_ptr);
     }
-    else if (flann_distance_type==FLANN_DIST_HIST_INTERSECT) {
+    else if (distance_type==FLANN_DIST_HIST_INTERSECT) {
         return __flann_used_memory<HistIntersectionDistance<T> >(index_ptr);
     }
-    else if (flann_distance_type==FLANN_DIST_HELLINGER) {
+    else if (distance_type==FLANN_DIST_HELLINGER) {
         return __flann_used_memory<HellingerDistance<T> >(index_ptr);
     }
-    else if (flann_distance_type==FLANN_DIST_CHI_SQUARE) {
+    else if (distance_type==FLANN_DIST_CHI_SQUARE) {
         return __flann_used_memory<ChiSquareDistance<T> >(index_ptr);
     }
-    else if (flann_distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
+    else if (distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
         return __flann_used_memory<KL_Divergence<T> >(index_ptr);
     }
+    else if (distance_type==FLANN_DIST_HAMMING) {
+        return __flann_used_memory<HammingDistance<T> >(index_ptr);
+    }
     else {
         Logger::error( "Distance type unsupported in the C bindings, use the C++ bindings instead\n");
         return 0;
@@ -714,6 +1033,16 @@ int flann_used_memory_int(flann_index_t index_ptr)
     return _flann_used_memory<int>(index_ptr);
 }
 
+int flann_used_memory_int8(flann_index_t index_ptr)
+{
+    return _flann_used_memory<signed char>(index_ptr);
+}
+
+int flann_used_memory_float16(flann_index_t index_ptr)
+{
+    return _flann_used_memory<float16>(index_ptr);
+}
+
 template<typename Distance>
 int __flann_save_index(flann_index_t index_ptr, char* filename)
 {
@@ -722,7 +1051,7 @@ int __flann_save_index(flann_index_t index_ptr, char* filename)
             throw FLANNException("Invalid index");
         }
 
-        Index<Distance>* index = (Index<Distance>*)index_ptr;
+        Index<Distance>* index = get_index<Distance>(index_ptr);
         index->save(filename);
 
         return 0;
@@ -736,27 +1065,31 @@ int __flann_save_index(flann_index_t index_ptr, char* filename)
 template<typename T>
 int _flann_save_index(flann_index_t index_ptr, char* filename)
 {
-    if (flann_distance_type==FLANN_DIST_EUCLIDEAN) {
+    flann_distance_t distance_type = index_distance_type(index_ptr);
+    if (distance_type==FLANN_DIST_EUCLIDEAN) {
         return __flann_save_index<L2<T> >(index_ptr, filename);
     }
-    else if (flann_distance_type==FLANN_DIST_MANHATTAN) {
+    else if (distance_type==FLANN_DIST_MANHATTAN) {
         return __flann_save_index<L1<T> >(index_ptr, filename);
     }
-    else if (flann_distance_type==FLANN_DIST_MINKOWSKI) {
+    else if (distance_type==FLANN_DIST_MINKOWSKI) {
         return __flann_save_index<MinkowskiDistance<T> >(index_ptr, filename);
     }
-    else if (flann_distance_type==FLANN_DIST_HIST_INTERSECT) {
+    else if (distance_type==FLANN_DIST_HIST_INTERSECT) {
         return __flann_save_index<HistIntersectionDistance<T> >(index_ptr, filename);
     }
-    else if (flann_distance_type==FLANN_DIST_HELLINGER) {
+    else if (distance_type==FLANN_DIST_HELLINGER) {
         return __flann_save_index<HellingerDistance<T> >(index_ptr, filename);
     }
-    else if (flann_distance_type==FLANN_DIST_CHI_SQUARE) {
+    else if (distance_type==FLANN_DIST_CHI_SQUARE) {
         return __flann_save_index<ChiSquareDistance<T> >(index_ptr, filename);
     }
-    else if (flann_distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
+    else if (distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
         return __flann_save_index<KL_Divergence<T> >(index_ptr, filename);
     }
+    else if (distance_type==FLANN_DIST_HAMMING) {
+        return __flann_save_index<HammingDistance<T> >(index_ptr, filename);
+    }
     else {
         Logger::error( "Distance type unsupported in the C bindings, use the C++ bindings instead\n");
         return -1;
@@ -788,162 +1121,591 @@ int flann_save_index_int(flann_index_t index_ptr, char* filename)
     return _flann_save_index<int>(index_ptr, filename);
 }
 
+int flann_save_index_int8(flann_index_t index_ptr, char* filename)
+{
+    return _flann_save_index<signed char>(index_ptr, filename);
+}
+
+int flann_save_index_float16(flann_index_t index_ptr, char* filename)
+{
+    return _flann_save_index<float16>(index_ptr, filename);
+}
+
+
+/**
+ * Streams over memory buffers, used to save and load indexes without going
+ * through the filesystem. Where they are not available an anonymous
+ * temporary file is used instead.
+ */
+FILE* open_buffer_for_writing(char** buffer, size_t* size)
+{
+#ifdef _WIN32
+    return tmpfile();
+#else
+    return open_memstream(buffer, size);
+#endif
+}
+
+/**
+ * Closes a stream opened with open_buffer_for_writing(), on success *buffer
+ * then holds what was written to the stream and must be released with free().
+ */
+bool close_buffer_for_writing(FILE* stream, char** buffer, size_t* size)
+{
+#ifdef _WIN32
+    long length = ftell(stream);
+    *buffer = (char*)malloc(length>0 ? length : 1);
+    *size = length;
+    rewind(stream);
+    bool ok = length>=0 && *buffer!=NULL && (length==0 || fread(*buffer, length, 1, stream)==1);
+    fclose(stream);
+    return ok;
+#else
+    return fclose(stream)==0 && *buffer!=NULL;
+#endif
+}
+
+FILE* open_buffer_for_reading(char* buffer, size_t size)
+{
+#ifdef _WIN32
+    FILE* stream = tmpfile();
+    if (stream!=NULL) {
+        fwrite(buffer, size, 1, stream);
+        rewind(stream);
+    }
+    return stream;
+#else
+    return fmemopen(buffer, size, "rb");
+#endif
+}
 
 template<typename Distance>
-flann_index_t __flann_load_index(char* filename, typename Distance::ElementType* dataset, int rows, int cols,
-                                 Distance d = Distance())
+int __flann_save_index_to_buffer(flann_index_t index_ptr, char** buffer, size_t* size)
 {
     try {
-        Index<Distance>* index = new Index<Distance>(Matrix<typename Distance::ElementType>(dataset,rows,cols), SavedIndexParams(filename), d);
-        return index;
+        if (index_ptr==NULL) {
+            throw FLANNException("Invalid index");
+        }
+
+        Index<Distance>* index = get_index<Distance>(index_ptr);
+        FILE* stream = open_buffer_for_writing(buffer, size);
+        if (stream==NULL) {
+            throw FLANNException("Cannot open memory stream");
+        }
+        try {
+            index->save(stream);
+        }
+        catch (...) {
+            close_buffer_for_writing(stream, buffer, size);
+            free(*buffer);
+            *buffer = NULL;
+            throw;
+        }
+        if (!close_buffer_for_writing(stream, buffer, size)) {
+            free(*buffer);
+            *buffer = NULL;
+            throw FLANNException("Cannot write index to memory");
+        }
+
+        return 0;
     }
     catch (std::runtime_error& e) {
         Logger::error("Caught exception: %s\n",e.what());
-        return NULL;
+        return -1;
     }
 }
 
 template<typename T>
-flann_index_t _flann_load_index(char* filename, T* dataset, int rows, int cols)
+int _flann_save_index_to_buffer(flann_index_t index_ptr, char** buffer, size_t* size)
 {
-    if (flann_distance_type==FLANN_DIST_EUCLIDEAN) {
-        return __flann_load_index<L2<T> >(filename, dataset, rows, cols);
+    flann_distance_t distance_type = index_distance_type(index_ptr);
+    if (distance_type==FLANN_DIST_EUCLIDEAN) {
+        return __flann_save_index_to_buffer<L2<T> >(index_ptr, buffer, size);
     }
-    else if (flann_distance_type==FLANN_DIST_MANHATTAN) {
-        return __flann_load_index<L1<T> >(filename, dataset, rows, cols);
+    else if (distance_type==FLANN_DIST_MANHATTAN) {
+        return __flann_save_index_to_buffer<L1<T> >(index_ptr, buffer, size);
     }
-    else if (flann_distance_type==FLANN_DIST_MINKOWSKI) {
-        return __flann_load_index<MinkowskiDistance<T> >(filename, dataset, rows, cols, MinkowskiDistance<T>(flann_distance_order));
+    else if (distance_type==FLANN_DIST_MINKOWSKI) {
+        return __flann_save_index_to_buffer<MinkowskiDistance<T> >(index_ptr, buffer, size);
     }
-    else if (flann_distance_type==FLANN_DIST_HIST_INTERSECT) {
-        return __flann_load_index<HistIntersectionDistance<T> >(filename, dataset, rows, cols);
+    else if (distance_type==FLANN_DIST_HIST_INTERSECT) {
+        return __flann_save_index_to_buffer<HistIntersectionDistance<T> >(index_ptr, buffer, size);
     }
-    else if (flann_distance_type==FLANN_DIST_HELLINGER) {
-        return __flann_load_index<HellingerDistance<T> >(filename, dataset, rows, cols);
+    else if (distance_type==FLANN_DIST_HELLINGER) {
+        return __flann_save_index_to_buffer<HellingerDistance<T> >(index_ptr, buffer, size);
     }
-    else if (flann_distance_type==FLANN_DIST_CHI_SQUARE) {
-        return __flann_load_index<ChiSquareDistance<T> >(filename, dataset, rows, cols);
+    else if (distance_type==FLANN_DIST_CHI_SQUARE) {
+        return __flann_save_index_to_buffer<ChiSquareDistance<T> >(index_ptr, buffer, size);
     }
-    else if (flann_distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
-        return __flann_load_index<KL_Divergence<T> >(filename, dataset, rows, cols);
+    else if (distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
+        return __flann_save_index_to_buffer<KL_Divergence<T> >(index_ptr, buffer, size);
+    }
+    else if (distance_type==FLANN_DIST_HAMMING) {
+        return __flann_save_index_to_buffer<HammingDistance<T> >(index_ptr, buffer, size);
     }
     else {
         Logger::error( "Distance type unsupported in the C bindings, use the C++ bindings instead\n");
-        return NULL;
+        return -1;
     }
 }
 
+int flann_save_index_to_buffer(flann_index_t index_ptr, char** buffer, size_t* size)
+{
+    return _flann_save_index_to_buffer<float>(index_ptr, buffer, size);
+}
 
-flann_index_t flann_load_index(char* filename, float* dataset, int rows, int cols)
+int flann_save_index_to_buffer_float(flann_index_t index_ptr, char** buffer, size_t* size)
 {
-    return _flann_load_index<float>(filename, dataset, rows, cols);
+    return _flann_save_index_to_buffer<float>(index_ptr, buffer, size);
 }
 
-flann_index_t flann_load_index_float(char* filename, float* dataset, int rows, int cols)
+int flann_save_index_to_buffer_double(flann_index_t index_ptr, char** buffer, size_t* size)
 {
-    return _flann_load_index<float>(filename, dataset, rows, cols);
+    return _flann_save_index_to_buffer<double>(index_ptr, buffer, size);
 }
 
-flann_index_t flann_load_index_double(char* filename, double* dataset, int rows, int cols)
+int flann_save_index_to_buffer_byte(flann_index_t index_ptr, char** buffer, size_t* size)
 {
-    return _flann_load_index<double>(filename, dataset, rows, cols);
+    return _flann_save_index_to_buffer<unsigned char>(index_ptr, buffer, size);
 }
 
-flann_index_t flann_load_index_byte(char* filename, unsigned char* dataset, int rows, int cols)
+int flann_save_index_to_buffer_int(flann_index_t index_ptr, char** buffer, size_t* size)
 {
-    return _flann_load_index<unsigned char>(filename, dataset, rows, cols);
+    return _flann_save_index_to_buffer<int>(index_ptr, buffer, size);
 }
 
-flann_index_t flann_load_index_int(char* filename, int* dataset, int rows, int cols)
+int flann_save_index_to_buffer_int8(flann_index_t index_ptr, char** buffer, size_t* size)
 {
-    return _flann_load_index<int>(filename, dataset, rows, cols);
+    return _flann_save_index_to_buffer<signed char>(index_ptr, buffer, size);
 }
 
+int flann_save_index_to_buffer_float16(flann_index_t index_ptr, char** buffer, size_t* size)
+{
+    return _flann_save_index_to_buffer<float16>(index_ptr, buffer, size);
+}
 
 
 template<typename Distance>
-int __flann_find_nearest_neighbors(typename Distance::ElementType* dataset,  int rows, int cols, typename Distance::ElementType* testset, int tcount,
-                                   int* result, typename Distance::ResultType* dists, int nn, FLANNParameters* flann_params, Distance d = Distance())
+flann_index_t __flann_load_index(char* filename, typename Distance::ElementType* dataset, int rows, int cols,
+                                 Distance d = Distance())
 {
-    typedef typename Distance::ElementType ElementType;
-    typedef typename Distance::ResultType DistanceType;
     try {
-        init_flann_parameters(flann_params);
-
-        IndexParams params = create_parameters(flann_params);
-        Index<Distance>* index = new Index<Distance>(Matrix<ElementType>(dataset,rows,cols), params, d);
-        index->buildIndex();
-        Matrix<int> m_indices(result,tcount, nn);
-        Matrix<DistanceType> m_dists(dists,tcount, nn);
-        SearchParams search_params = create_search_params(flann_params);
-        index->knnSearch(Matrix<ElementType>(testset, tcount, index->veclen()),
-                         m_indices,
-                         m_dists, nn, search_params );
-        delete index;
-        return 0;
+        Index<Distance>* index = new Index<Distance>(Matrix<typename Distance::ElementType>(dataset,rows,cols), SavedIndexParams(filename), d);
+        return index;
     }
     catch (std::runtime_error& e) {
         Logger::error("Caught exception: %s\n",e.what());
-        return -1;
+        return NULL;
     }
-
-    return -1;
 }
 
-template<typename T, typename R>
-int _flann_find_nearest_neighbors(T* dataset,  int rows, int cols, T* testset, int tcount,
-                                  int* result, R* dists, int nn, FLANNParameters* flann_params)
+template<typename T>
+flann_index_t _flann_load_index(char* filename, T* dataset, int rows, int cols,
+                                flann_distance_t distance_type, int distance_order)
 {
-    if (flann_distance_type==FLANN_DIST_EUCLIDEAN) {
-        return __flann_find_nearest_neighbors<L2<T> >(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params);
+    flann_index_t index;
+    if (distance_type==FLANN_DIST_EUCLIDEAN) {
+        index = __flann_load_index<L2<T> >(filename, dataset, rows, cols);
     }
-    else if (flann_distance_type==FLANN_DIST_MANHATTAN) {
-        return __flann_find_nearest_neighbors<L1<T> >(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params);
+    else if (distance_type==FLANN_DIST_MANHATTAN) {
+        index = __flann_load_index<L1<T> >(filename, dataset, rows, cols);
     }
-    else if (flann_distance_type==FLANN_DIST_MINKOWSKI) {
-        return __flann_find_nearest_neighbors<MinkowskiDistance<T> >(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params, MinkowskiDistance<T>(flann_distance_order));
+    else if (distance_type==FLANN_DIST_MINKOWSKI) {
+        index = __flann_load_index<MinkowskiDistance<T> >(filename, dataset, rows, cols, MinkowskiDistance<T>(distance_order));
     }
-    else if (flann_distance_type==FLANN_DIST_HIST_INTERSECT) {
-        return __flann_find_nearest_neighbors<HistIntersectionDistance<T> >(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params);
+    else if (distance_type==FLANN_DIST_HIST_INTERSECT) {
+        index = __flann_load_index<HistIntersectionDistance<T> >(filename, dataset, rows, cols);
     }
-    else if (flann_distance_type==FLANN_DIST_HELLINGER) {
-        return __flann_find_nearest_neighbors<HellingerDistance<T> >(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params);
+    else if (distance_type==FLANN_DIST_HELLINGER) {
+        index = __flann_load_index<HellingerDistance<T> >(filename, dataset, rows, cols);
     }
-    else if (flann_distance_type==FLANN_DIST_CHI_SQUARE) {
-        return __flann_find_nearest_neighbors<ChiSquareDistance<T> >(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params);
+    else if (distance_type==FLANN_DIST_CHI_SQUARE) {
+        index = __flann_load_index<ChiSquareDistance<T> >(filename, dataset, rows, cols);
     }
-    else if (flann_distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
-        return __flann_find_nearest_neighbors<KL_Divergence<T> >(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params);
+    else if (distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
+        index = __flann_load_index<KL_Divergence<T> >(filename, dataset, rows, cols);
+    }
+    else if (distance_type==FLANN_DIST_HAMMING) {
+        if (!hamming_supported<T>()) {
+            return NULL;
+        }
+        index = __flann_load_index<HammingDistance<T> >(filename, dataset, rows, cols);
     }
     else {
         Logger::error( "Distance type unsupported in the C bindings, use the C++ bindings instead\n");
-        return -1;
+        return NULL;
     }
+
+    return create_index_handle(index, distance_type, distance_order);
 }
 
-int flann_find_nearest_neighbors(float* dataset,  int rows, int cols, float* testset, int tcount, int* result, float* dists, int nn, FLANNParameters* flann_params)
+
+flann_index_t flann_load_index(char* filename, float* dataset, int rows, int cols)
 {
-    return _flann_find_nearest_neighbors(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params);
+    return _flann_load_index<float>(filename, dataset, rows, cols, flann_distance_type, flann_distance_order);
 }
 
-int flann_find_nearest_neighbors_float(float* dataset,  int rows, int cols, float* testset, int tcount, int* result, float* dists, int nn, FLANNParameters* flann_params)
+flann_index_t flann_load_index_float(char* filename, float* dataset, int rows, int cols)
 {
-    return _flann_find_nearest_neighbors(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params);
+    return _flann_load_index<float>(filename, dataset, rows, cols, flann_distance_type, flann_distance_order);
 }
 
-int flann_find_nearest_neighbors_double(double* dataset,  int rows, int cols, double* testset, int tcount, int* result, double* dists, int nn, FLANNParameters* flann_params)
+flann_index_t flann_load_index_double(char* filename, double* dataset, int rows, int cols)
 {
-    return _flann_find_nearest_neighbors(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params);
+    return _flann_load_index<double>(filename, dataset, rows, cols, flann_distance_type, flann_distance_order);
 }
 
-int flann_find_nearest_neighbors_byte(unsigned char* dataset,  int rows, int cols, unsigned char* testset, int tcount, int* result, float* dists, int nn, FLANNParameters* flann_params)
+flann_index_t flann_load_index_byte(char* filename, unsigned char* dataset, int rows, int cols)
 {
-    return _flann_find_nearest_neighbors(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params);
+    return _flann_load_index<unsigned char>(filename, dataset, rows, cols, flann_distance_type, flann_distance_order);
 }
 
-int flann_find_nearest_neighbors_int(int* dataset,  int rows, int cols, int* testset, int tcount, int* result, float* dists, int nn, FLANNParameters* flann_params)
+flann_index_t flann_load_index_int(char* filename, int* dataset, int rows, int cols)
 {
-    return _flann_find_nearest_neighbors(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params);
+    return _flann_load_index<int>(filename, dataset, rows, cols, flann_distance_type, flann_distance_order);
+}
+
+flann_index_t flann_load_index_int8(char* filename, signed char* dataset, int rows, int cols)
+{
+    return _flann_load_index<signed char>(filename, dataset, rows, cols, flann_distance_type, flann_distance_order);
+}
+
+flann_index_t flann_load_index_float16(char* filename, flann_float16_t* dataset, int rows, int cols)
+{
+    return _flann_load_index<float16>(filename, dataset, rows, cols, flann_distance_type, flann_distance_order);
+}
+
+flann_index_t flann_load_index_with_distance(char* filename, float* dataset, int rows, int cols,
+                                             flann_distance_t distance_type, int order)
+{
+    return _flann_load_index<float>(filename, dataset, rows, cols, distance_type, order);
+}
+
+flann_index_t flann_load_index_with_distance_float(char* filename, float* dataset, int rows, int cols,
+                                                   flann_distance_t distance_type, int order)
+{
+    return _flann_load_index<float>(filename, dataset, rows, cols, distance_type, order);
+}
+
+flann_index_t flann_load_index_with_distance_double(char* filename, double* dataset, int rows, int cols,
+                                                    flann_distance_t distance_type, int order)
+{
+    return _flann_load_index<double>(filename, dataset, rows, cols, distance_type, order);
+}
+
+flann_index_t flann_load_index_with_distance_byte(char* filename, unsigned char* dataset, int rows, int cols,
+                                                  flann_distance_t distance_type, int order)
+{
+    return _flann_load_index<unsigned char>(filename, dataset, rows, cols, distance_type, order);
+}
+
+flann_index_t flann_load_index_with_distance_int(char* filename, int* dataset, int rows, int cols,
+                                                 flann_distance_t distance_type, int order)
+{
+    return _flann_load_index<int>(filename, dataset, rows, cols, distance_type, order);
+}
+
+flann_index_t flann_load_index_with_distance_int8(char* filename, signed char* dataset, int rows, int cols,
+                                                  flann_distance_t distance_type, int order)
+{
+    return _flann_load_index<signed char>(filename, dataset, rows, cols, distance_type, order);
+}
+
+flann_index_t flann_load_index_with_distance_float16(char* filename, flann_float16_t* dataset, int rows, int cols,
+                                                     flann_distance_t distance_type, int order)
+{
+    return _flann_load_index<float16>(filename, dataset, rows, cols, distance_type, order);
+}
+
+
+template<typename Distance>
+flann_index_t __flann_load_index_from_buffer(char* buffer, size_t size, typename Distance::ElementType* dataset, int rows, int cols,
+                                             Distance d = Distance())
+{
+    try {
+        FILE* stream = open_buffer_for_reading(buffer, size);
+        if (stream==NULL) {
+            throw FLANNException("Cannot open memory stream");
+        }
+        Index<Distance>* index;
+        try {
+            index = new Index<Distance>(Matrix<typename Distance::ElementType>(dataset,rows,cols), stream, d);
+        }
+        catch (...) {
+            fclose(stream);
+            throw;
+        }
+        fclose(stream);
+        return index;
+    }
+    catch (std::runtime_error& e) {
+        Logger::error("Caught exception: %s\n",e.what());
+        return NULL;
+    }
+}
+
+template<typename T>
+flann_index_t _flann_load_index_from_buffer(char* buffer, size_t size, T* dataset, int rows, int cols,
+                                            flann_distance_t distance_type, int distance_order)
+{
+    flann_index_t index;
+    if (distance_type==FLANN_DIST_EUCLIDEAN) {
+        index = __flann_load_index_from_buffer<L2<T> >(buffer, size, dataset, rows, cols);
+    }
+    else if (distance_type==FLANN_DIST_MANHATTAN) {
+        index = __flann_load_index_from_buffer<L1<T> >(buffer, size, dataset, rows, cols);
+    }
+    else if (distance_type==FLANN_DIST_MINKOWSKI) {
+        index = __flann_load_index_from_buffer<MinkowskiDistance<T> >(buffer, size, dataset, rows, cols, MinkowskiDistance<T>(distance_order));
+    }
+    else if (distance_type==FLANN_DIST_HIST_INTERSECT) {
+        index = __flann_load_index_from_buffer<HistIntersectionDistance<T> >(buffer, size, dataset, rows, cols);
+    }
+    else if (distance_type==FLANN_DIST_HELLINGER) {
+        index = __flann_load_index_from_buffer<HellingerDistance<T> >(buffer, size, dataset, rows, cols);
+    }
+    else if (distance_type==FLANN_DIST_CHI_SQUARE) {
+        index = __flann_load_index_from_buffer<ChiSquareDistance<T> >(buffer, size, dataset, rows, cols);
+    }
+    else if (distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
+        index = __flann_load_index_from_buffer<KL_Divergence<T> >(buffer, size, dataset, rows, cols);
+    }
+    else if (distance_type==FLANN_DIST_HAMMING) {
+        if (!hamming_supported<T>()) {
+            return NULL;
+        }
+        index = __flann_load_index_from_buffer<HammingDistance<T> >(buffer, size, dataset, rows, cols);
+    }
+    else {
+        Logger::error( "Distance type unsupported in the C bindings, use the C++ bindings instead\n");
+        return NULL;
+    }
+
+    return create_index_handle(index, distance_type, distance_order);
+}
+
+
+flann_index_t flann_load_index_from_buffer(char* buffer, size_t size, float* dataset, int rows, int cols)
+{
+    return _flann_load_index_from_buffer<float>(buffer, size, dataset, rows, cols, flann_distance_type, flann_distance_order);
+}
+
+flann_index_t flann_load_index_from_buffer_float(char* buffer, size_t size, float* dataset, int rows, int cols)
+{
+    return _flann_load_index_from_buffer<float>(buffer, size, dataset, rows, cols, flann_distance_type, flann_distance_order);
+}
+
+flann_index_t flann_load_index_from_buffer_double(char* buffer, size_t size, double* dataset, int rows, int cols)
+{
+    return _flann_load_index_from_buffer<double>(buffer, size, dataset, rows, cols, flann_distance_type, flann_distance_order);
+}
+
+flann_index_t flann_load_index_from_buffer_byte(char* buffer, size_t size, unsigned char* dataset, int rows, int cols)
+{
+    return _flann_load_index_from_buffer<unsigned char>(buffer, size, dataset, rows, cols, flann_distance_type, flann_distance_order);
+}
+
+flann_index_t flann_load_index_from_buffer_int(char* buffer, size_t size, int* dataset, int rows, int cols)
+{
+    return _flann_load_index_from_buffer<int>(buffer, size, dataset, rows, cols, flann_distance_type, flann_distance_order);
+}
+
+flann_index_t flann_load_index_from_buffer_int8(char* buffer, size_t size, signed char* dataset, int rows, int cols)
+{
+    return _flann_load_index_from_buffer<signed char>(buffer, size, dataset, rows, cols, flann_distance_type, flann_distance_order);
+}
+
+flann_index_t flann_load_index_from_buffer_float16(char* buffer, size_t size, flann_float16_t* dataset, int rows, int cols)
+{
+    return _flann_load_index_from_buffer<float16>(buffer, size, dataset, rows, cols, flann_distance_type, flann_distance_order);
+}
+
+flann_index_t flann_load_index_from_buffer_with_distance(char* buffer, size_t size, float* dataset, int rows, int cols,
+                                                         flann_distance_t distance_type, int order)
+{
+    return _flann_load_index_from_buffer<float>(buffer, size, dataset, rows, cols, distance_type, order);
+}
+
+flann_index_t flann_load_index_from_buffer_with_distance_float(char* buffer, size_t size, float* dataset, int rows, int cols,
+                                                               flann_distance_t distance_type, int order)
+{
+    return _flann_load_index_from_buffer<float>(buffer, size, dataset, rows, cols, distance_type, order);
+}
+
+flann_index_t flann_load_index_from_buffer_with_distance_double(char* buffer, size_t size, double* dataset, int rows, int cols,
+                                                                flann_distance_t distance_type, int order)
+{
+    return _flann_load_index_from_buffer<double>(buffer, size, dataset, rows, cols, distance_type, order);
+}
+
+flann_index_t flann_load_index_from_buffer_with_distance_byte(char* buffer, size_t size, unsigned char* dataset, int rows, int cols,
+                                                              flann_distance_t distance_type, int order)
+{
+    return _flann_load_index_from_buffer<unsigned char>(buffer, size, dataset, rows, cols, distance_type, order);
+}
+
+flann_index_t flann_load_index_from_buffer_with_distance_int(char* buffer, size_t size, int* dataset, int rows, int cols,
+                                                             flann_distance_t distance_type, int order)
+{
+    return _flann_load_index_from_buffer<int>(buffer, size, dataset, rows, cols, distance_type, order);
+}
+
+flann_index_t flann_load_index_from_buffer_with_distance_int8(char* buffer, size_t size, signed char* dataset, int rows, int cols,
+                                                              flann_distance_t distance_type, int order)
+{
+    return _flann_load_index_from_buffer<signed char>(buffer, size, dataset, rows, cols, distance_type, order);
+}
+
+flann_index_t flann_load_index_from_buffer_with_distance_float16(char* buffer, size_t size, flann_float16_t* dataset, int rows, int cols,
+                                                                 flann_distance_t distance_type, int order)
+{
+    return _flann_load_index_from_buffer<float16>(buffer, size, dataset, rows, cols, distance_type, order);
+}
+
+
+
+template<typename Distance>
+int __flann_find_nearest_neighbors(typename Distance::ElementType* dataset,  int rows, int cols, typename Distance::ElementType* testset, int tcount,
+                                   int* result, typename Distance::ResultType* dists, int nn, FLANNParameters* flann_params, Distance d = Distance())
+{
+    typedef typename Distance::ElementType ElementType;
+    typedef typename Distance::ResultType DistanceType;
+    try {
+        init_flann_parameters(flann_params);
+
+        IndexParams params = create_parameters(flann_params);
+        Index<Distance>* index = new Index<Distance>(Matrix<ElementType>(dataset,rows,cols), params, d);
+        index->buildIndex();
+        Matrix<int> m_indices(result,tcount, nn);
+        Matrix<DistanceType> m_dists(dists,tcount, nn);
+        SearchParams search_params = create_search_params(flann_params);
+        index->knnSearch(Matrix<ElementType>(testset, tcount, index->veclen()),
+                         m_indices,
+                         m_dists, nn, search_params );
+        delete index;
+        return 0;
+    }
+    catch (std::runtime_error& e) {
+        Logger::error("Caught exception: %s\n",e.what());
+        return -1;
+    }
+
+    return -1;
+}
+
+template<typename T, typename R>
+int _flann_find_nearest_neighbors(T* dataset,  int rows, int cols, T* testset, int tcount,
+                                  int* result, R* dists, int nn, FLANNParameters* flann_params,
+                                  flann_distance_t distance_type, int distance_order)
+{
+    if (distance_type==FLANN_DIST_EUCLIDEAN) {
+        return __flann_find_nearest_neighbors<L2<T> >(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params);
+    }
+    else if (distance_type==FLANN_DIST_MANHATTAN) {
+        return __flann_find_nearest_neighbors<L1<T> >(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params);
+    }
+    else if (distance_type==FLANN_DIST_MINKOWSKI) {
+        return __flann_find_nearest_neighbors<MinkowskiDistance<T> >(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params, MinkowskiDistance<T>(distance_order));
+    }
+    else if (distance_type==FLANN_DIST_HIST_INTERSECT) {
+        return __flann_find_nearest_neighbors<HistIntersectionDistance<T> >(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params);
+    }
+    else if (distance_type==FLANN_DIST_HELLINGER) {
+        return __flann_find_nearest_neighbors<HellingerDistance<T> >(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params);
+    }
+    else if (distance_type==FLANN_DIST_CHI_SQUARE) {
+        return __flann_find_nearest_neighbors<ChiSquareDistance<T> >(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params);
+    }
+    else if (distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
+        return __flann_find_nearest_neighbors<KL_Divergence<T> >(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params);
+    }
+    else if (distance_type==FLANN_DIST_HAMMING) {
+        if (!hamming_supported<T>()) {
+            return -1;
+        }
+        return __flann_find_nearest_neighbors<HammingDistance<T> >(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params);
+    }
+    else {
+        Logger::error( "Distance type unsupported in the C bindings, use the C++ bindings instead\n");
+        return -1;
+    }
+}
+
+int flann_find_nearest_neighbors(float* dataset,  int rows, int cols, float* testset, int tcount, int* result, float* dists, int nn, FLANNParameters* flann_params)
+{
+    return _flann_find_nearest_neighbors(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params, flann_distance_type, flann_distance_order);
+}
+
+int flann_find_nearest_neighbors_float(float* dataset,  int rows, int cols, float* testset, int tcount, int* result, float* dists, int nn, FLANNParameters* flann_params)
+{
+    return _flann_find_nearest_neighbors(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params, flann_distance_type, flann_distance_order);
+}
+
+int flann_find_nearest_neighbors_double(double* dataset,  int rows, int cols, double* testset, int tcount, int* result, double* dists, int nn, FLANNParameters* flann_params)
+{
+    return _flann_find_nearest_neighbors(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params, flann_distance_type, flann_distance_order);
+}
+
+int flann_find_nearest_neighbors_byte(unsigned char* dataset,  int rows, int cols, unsigned char* testset, int tcount, int* result, float* dists, int nn, FLANNParameters* flann_params)
+{
+    return _flann_find_nearest_neighbors(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params, flann_distance_type, flann_distance_order);
+}
+
+int flann_find_nearest_neighbors_int(int* dataset,  int rows, int cols, int* testset, int tcount, int* result, float* dists, int nn, FLANNParameters* flann_params)
+{
+    return _flann_find_nearest_neighbors(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params, flann_distance_type, flann_distance_order);
+}
+
+int flann_find_nearest_neighbors_int8(signed char* dataset,  int rows, int cols, signed char* testset, int tcount, int* result, float* dists, int nn, FLANNParameters* flann_params)
+{
+    return _flann_find_nearest_neighbors(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params, flann_distance_type, flann_distance_order);
+}
+
+int flann_find_nearest_neighbors_float16(flann_float16_t* dataset,  int rows, int cols, flann_float16_t* testset, int tcount, int* result, float* dists, int nn, FLANNParameters* flann_params)
+{
+    return _flann_find_nearest_neighbors(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params, flann_distance_type, flann_distance_order);
+}
+
+int flann_find_nearest_neighbors_with_distance(float* dataset,  int rows, int cols, float* testset, int tcount, int* result, float* dists, int nn, FLANNParameters* flann_params,
+                                               flann_distance_t distance_type, int order)
+{
+    return _flann_find_nearest_neighbors(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params, distance_type, order);
+}
+
+int flann_find_nearest_neighbors_with_distance_float(float* dataset,  int rows, int cols, float* testset, int tcount, int* result, float* dists, int nn, FLANNParameters* flann_params,
+                                                     flann_distance_t distance_type, int order)
+{
+    return _flann_find_nearest_neighbors(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params, distance_type, order);
+}
+
+int flann_find_nearest_neighbors_with_distance_double(double* dataset,  int rows, int cols, double* testset, int tcount, int* result, double* dists, int nn, FLANNParameters* flann_params,
+                                                      flann_distance_t distance_type, int order)
+{
+    return _flann_find_nearest_neighbors(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params, distance_type, order);
+}
+
+int flann_find_nearest_neighbors_with_distance_byte(unsigned char* dataset,  int rows, int cols, unsigned char* testset, int tcount, int* result, float* dists, int nn, FLANNParameters* flann_params,
+                                                    flann_distance_t distance_type, int order)
+{
+    return _flann_find_nearest_neighbors(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params, distance_type, order);
+}
+
+int flann_find_nearest_neighbors_with_distance_int(int* dataset,  int rows, int cols, int* testset, int tcount, int* result, float* dists, int nn, FLANNParameters* flann_params,
+                                                   flann_distance_t distance_type, int order)
+{
+    return _flann_find_nearest_neighbors(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params, distance_type, order);
+}
+
+int flann_find_nearest_neighbors_with_distance_int8(signed char* dataset,  int rows, int cols, signed char* testset, int tcount, int* result, float* dists, int nn, FLANNParameters* flann_params,
+                                                    flann_distance_t distance_type, int order)
+{
+    return _flann_find_nearest_neighbors(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params, distance_type, order);
+}
+
+int flann_find_nearest_neighbors_with_distance_float16(flann_float16_t* dataset,  int rows, int cols, flann_float16_t* testset, int tcount, int* result, float* dists, int nn, FLANNParameters* flann_params,
+                                                       flann_distance_t distance_type, int order)
+{
+    return _flann_find_nearest_neighbors(dataset, rows, cols, testset, tcount, result, dists, nn, flann_params, distance_type, order);
 }
 
 
@@ -955,11 +1717,11 @@ int __flann_find_nearest_neighbors_index(flann_index_t index_ptr, typename Dista
     typedef typename Distance::ResultType DistanceType;
 
     try {
-        init_flann_parameters(flann_params);
+        init_flann_search_parameters(flann_params);
         if (index_ptr==NULL) {
             throw FLANNException("Invalid index");
         }
-        Index<Distance>* index = (Index<Distance>*)index_ptr;
+        Index<Distance>* index = get_index<Distance>(index_ptr);
 
         Matrix<int> m_indices(result,tcount, nn);
         Matrix<DistanceType> m_dists(dists, tcount, nn);
@@ -983,27 +1745,31 @@ template<typename T, typename R>
 int _flann_find_nearest_neighbors_index(flann_index_t index_ptr, T* testset, int tcount,
                                         int* result, R* dists, int nn, FLANNParameters* flann_params)
 {
-    if (flann_distance_type==FLANN_DIST_EUCLIDEAN) {
+    flann_distance_t distance_type = index_distance_type(index_ptr);
+    if (distance_type==FLANN_DIST_EUCLIDEAN) {
         return __flann_find_nearest_neighbors_index<L2<T> >(index_ptr, testset, tcount, result, dists, nn, flann_params);
     }
-    else if (flann_distance_type==FLANN_DIST_MANHATTAN) {
+    else if (distance_type==FLANN_DIST_MANHATTAN) {
         return __flann_find_nearest_neighbors_index<L1<T> >(index_ptr, testset, tcount, result, dists, nn, flann_params);
     }
-    else if (flann_distance_type==FLANN_DIST_MINKOWSKI) {
+    else if (distance_type==FLANN_DIST_MINKOWSKI) {
         return __flann_find_nearest_neighbors_index<MinkowskiDistance<T> >(index_ptr, testset, tcount, result, dists, nn, flann_params);
     }
-    else if (flann_distance_type==FLANN_DIST_HIST_INTERSECT) {
+    else if (distance_type==FLANN_DIST_HIST_INTERSECT) {
         return __flann_find_nearest_neighbors_index<HistIntersectionDistance<T> >(index_ptr, testset, tcount, result, dists, nn, flann_params);
     }
-    else if (flann_distance_type==FLANN_DIST_HELLINGER) {
+    else if (distance_type==FLANN_DIST_HELLINGER) {
         return __flann_find_nearest_neighbors_index<HellingerDistance<T> >(index_ptr, testset, tcount, result, dists, nn, flann_params);
     }
-    else if (flann_distance_type==FLANN_DIST_CHI_SQUARE) {
+    else if (distance_type==FLANN_DIST_CHI_SQUARE) {
         return __flann_find_nearest_neighbors_index<ChiSquareDistance<T> >(index_ptr, testset, tcount, result, dists, nn, flann_params);
     }
-    else if (flann_distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
+    else if (distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
         return __flann_find_nearest_neighbors_index<KL_Divergence<T> >(index_ptr, testset, tcount, result, dists, nn, flann_params);
     }
+    else if (distance_type==FLANN_DIST_HAMMING) {
+        return __flann_find_nearest_neighbors_index<HammingDistance<T> >(index_ptr, testset, tcount, result, dists, nn, flann_params);
+    }
     else {
         Logger::error( "Distance type unsupported in the C bindings, use the C++ bindings instead\n");
         return -1;
@@ -1036,6 +1802,152 @@ int flann_find_nearest_neighbors_index_int(flann_index_t index_ptr, int* testset
     return _flann_find_nearest_neighbors_index(index_ptr, testset, tcount, result, dists, nn, flann_params);
 }
 
+int flann_find_nearest_neighbors_index_int8(flann_index_t index_ptr, signed char* testset, int tcount, int* result, float* dists, int nn, FLANNParameters* flann_params)
+{
+    return _flann_find_nearest_neighbors_index(index_ptr, testset, tcount, result, dists, nn, flann_params);
+}
+
+int flann_find_nearest_neighbors_index_float16(flann_index_t index_ptr, flann_float16_t* testset, int tcount, int* result, float* dists, int nn, FLANNParameters* flann_params)
+{
+    return _flann_find_nearest_neighbors_index(index_ptr, testset, tcount, result, dists, nn, flann_params);
+}
+
+
+template<typename Distance>
+int __flann_find_nearest_neighbors_index_filtered(flann_index_t index_ptr, typename Distance::ElementType* testset, int tcount,
+                                                  int* result, typename Distance::ResultType* dists, int nn,
+                                                  const unsigned char* filter, int filter_size, FLANNParameters* flann_params)
+{
+    typedef typename Distance::ElementType ElementType;
+    typedef typename Distance::ResultType DistanceType;
+
+    try {
+        init_flann_search_parameters(flann_params);
+        if (index_ptr==NULL) {
+            throw FLANNException("Invalid index");
+        }
+        if (filter_size<0) {
+            throw FLANNException("Invalid filter size");
+        }
+        Index<Distance>* index = get_index<Distance>(index_ptr);
+
+        // bit i of the filter (least significant bit first) is set if the
+        // point with id i can be returned
+        DynamicBitset allowed(filter_size);
+        for (int i=0;i<filter_size;i+=8) {
+            unsigned char bits = filter[i/8];
+            for (int j=0;bits!=0 && j<8 && i+j<filter_size;++j, bits>>=1) {
+                if (bits&1) allowed.set(i+j);
+            }
+        }
+
+        // less than nn neighbors are found if less than nn points pass the
+        // filter, the remaining ones are returned as -1 at an infinite distance
+        Matrix<size_t> m_indices(new size_t[tcount*nn], tcount, nn);
+        Matrix<DistanceType> m_dists(dists, tcount, nn);
+        std::fill(m_indices.ptr(), m_indices.ptr()+tcount*nn, size_t(-1));
+        std::fill(dists, dists+tcount*nn, std::numeric_limits<DistanceType>::infinity());
+
+        SearchParams search_params = create_search_params(flann_params);
+        search_params.filter = &allowed;
+        index->knnSearch(Matrix<ElementType>(testset, tcount, index->veclen()),
+                         m_indices,
+                         m_dists, nn, search_params );
+
+        for (int i=0;i<tcount*nn;++i) {
+            result[i] = m_indices.ptr()[i]==size_t(-1) ? -1 : int(m_indices.ptr()[i]);
+        }
+        delete[] m_indices.ptr();
+
+        return 0;
+    }
+    catch (std::runtime_error& e) {
+        Logger::error("Caught exception: %s\n",e.what());
+        return -1;
+    }
+
+    return -1;
+}
+
+template<typename T, typename R>
+int _flann_find_nearest_neighbors_index_filtered(flann_index_t index_ptr, T* testset, int tcount,
+                                                 int* result, R* dists, int nn,
+                                                 const unsigned char* filter, int filter_size, FLANNParameters* flann_params)
+{
+    flann_distance_t distance_type = index_distance_type(index_ptr);
+    if (distance_type==FLANN_DIST_EUCLIDEAN) {
+        return __flann_find_nearest_neighbors_index_filtered<L2<T> >(index_ptr, testset, tcount, result, dists, nn, filter, filter_size, flann_params);
+    }
+    else if (distance_type==FLANN_DIST_MANHATTAN) {
+        return __flann_find_nearest_neighbors_index_filtered<L1<T> >(index_ptr, testset, tcount, result, dists, nn, filter, filter_size, flann_params);
+    }
+    else if (distance_type==FLANN_DIST_MINKOWSKI) {
+        return __flann_find_nearest_neighbors_index_filtered<MinkowskiDistance<T> >(index_ptr, testset, tcount, result, dists, nn, filter, filter_size, flann_params);
+    }
+    else if (distance_type==FLANN_DIST_HIST_INTERSECT) {
+        return __flann_find_nearest_neighbors_index_filtered<HistIntersectionDistance<T> >(index_ptr, testset, tcount, result, dists, nn, filter, filter_size, flann_params);
+    }
+    else if (distance_type==FLANN_DIST_HELLINGER) {
+        return __flann_find_nearest_neighbors_index_filtered<HellingerDistance<T> >(index_ptr, testset, tcount, result, dists, nn, filter, filter_size, flann_params);
+    }
+    else if (distance_type==FLANN_DIST_CHI_SQUARE) {
+        return __flann_find_nearest_neighbors_index_filtered<ChiSquareDistance<T> >(index_ptr, testset, tcount, result, dists, nn, filter, filter_size, flann_params);
+    }
+    else if (distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
+        return __flann_find_nearest_neighbors_index_filtered<KL_Divergence<T> >(index_ptr, testset, tcount, result, dists, nn, filter, filter_size, flann_params);
+    }
+    else if (distance_type==FLANN_DIST_HAMMING) {
+        return __flann_find_nearest_neighbors_index_filtered<HammingDistance<T> >(index_ptr, testset, tcount, result, dists, nn, filter, filter_size, flann_params);
+    }
+    else {
+        Logger::error( "Distance type unsupported in the C bindings, use the C++ bindings instead\n");
+        return -1;
+    }
+}
+
+
+int flann_find_nearest_neighbors_index_filtered(flann_index_t index_ptr, float* testset, int tcount, int* result, float* dists, int nn,
+                                                const unsigned char* filter, int filter_size, FLANNParameters* flann_params)
+{
+    return _flann_find_nearest_neighbors_index_filtered(index_ptr, testset, tcount, result, dists, nn, filter, filter_size, flann_params);
+}
+
+int flann_find_nearest_neighbors_index_filtered_float(flann_index_t index_ptr, float* testset, int tcount, int* result, float* dists, int nn,
+                                                const unsigned char* filter, int filter_size, FLANNParameters* flann_params)
+{
+    return _flann_find_nearest_neighbors_index_filtered(index_ptr, testset, tcount, result, dists, nn, filter, filter_size, flann_params);
+}
+
+int flann_find_nearest_neighbors_index_filtered_double(flann_index_t index_ptr, double* testset, int tcount, int* result, double* dists, int nn,
+                                                const unsigned char* filter, int filter_size, FLANNParameters* flann_params)
+{
+    return _flann_find_nearest_neighbors_index_filtered(index_ptr, testset, tcount, result, dists, nn, filter, filter_size, flann_params);
+}
+
+int flann_find_nearest_neighbors_index_filtered_byte(flann_index_t index_ptr, unsigned char* testset, int tcount, int* result, float* dists, int nn,
+                                                const unsigned char* filter, int filter_size, FLANNParameters* flann_params)
+{
+    return _flann_find_nearest_neighbors_index_filtered(index_ptr, testset, tcount, result, dists, nn, filter, filter_size, flann_params);
+}
+
+int flann_find_nearest_neighbors_index_filtered_int(flann_index_t index_ptr, int* testset, int tcount, int* result, float* dists, int nn,
+                                                const unsigned char* filter, int filter_size, FLANNParameters* flann_params)
+{
+    return _flann_find_nearest_neighbors_index_filtered(index_ptr, testset, tcount, result, dists, nn, filter, filter_size, flann_params);
+}
+
+int flann_find_nearest_neighbors_index_filtered_int8(flann_index_t index_ptr, signed char* testset, int tcount, int* result, float* dists, int nn,
+                                                const unsigned char* filter, int filter_size, FLANNParameters* flann_params)
+{
+    return _flann_find_nearest_neighbors_index_filtered(index_ptr, testset, tcount, result, dists, nn, filter, filter_size, flann_params);
+}
+
+int flann_find_nearest_neighbors_index_filtered_float16(flann_index_t index_ptr, flann_float16_t* testset, int tcount, int* result, float* dists, int nn,
+                                                const unsigned char* filter, int filter_size, FLANNParameters* flann_params)
+{
+    return _flann_find_nearest_neighbors_index_filtered(index_ptr, testset, tcount, result, dists, nn, filter, filter_size, flann_params);
+}
+
 
 template<typename Distance>
 int __flann_radius_search(flann_index_t index_ptr,
@@ -1050,11 +1962,11 @@ int __flann_radius_search(flann_index_t index_ptr,
     typedef typename Distance::ResultType DistanceType;
 
     try {
-        init_flann_parameters(flann_params);
+        init_flann_search_parameters(flann_params);
         if (index_ptr==NULL) {
             throw FLANNException("Invalid index");
         }
-        Index<Distance>* index = (Index<Distance>*)index_ptr;
+        Index<Distance>* index = get_index<Distance>(index_ptr);
 
         Matrix<int> m_indices(indices, 1, max_nn);
         Matrix<DistanceType> m_dists(dists, 1, max_nn);
@@ -1081,27 +1993,31 @@ int _flann_radius_search(flann_index_t index_ptr,
                          float radius,
                          FLANNParameters* flann_params)
 {
-    if (flann_distance_type==FLANN_DIST_EUCLIDEAN) {
+    flann_distance_t distance_type = index_distance_type(index_ptr);
+    if (distance_type==FLANN_DIST_EUCLIDEAN) {
         return __flann_radius_search<L2<T> >(index_ptr, query, indices, dists, max_nn, radius, flann_params);
     }
-    else if (flann_distance_type==FLANN_DIST_MANHATTAN) {
+    else if (distance_type==FLANN_DIST_MANHATTAN) {
         return __flann_radius_search<L1<T> >(index_ptr, query, indices, dists, max_nn, radius, flann_params);
     }
-    else if (flann_distance_type==FLANN_DIST_MINKOWSKI) {
+    else if (distance_type==FLANN_DIST_MINKOWSKI) {
         return __flann_radius_search<MinkowskiDistance<T> >(index_ptr, query, indices, dists, max_nn, radius, flann_params);
     }
-    else if (flann_distance_type==FLANN_DIST_HIST_INTERSECT) {
+    else if (distance_type==FLANN_DIST_HIST_INTERSECT) {
         return __flann_radius_search<HistIntersectionDistance<T> >(index_ptr, query, indices, dists, max_nn, radius, flann_params);
     }
-    else if (flann_distance_type==FLANN_DIST_HELLINGER) {
+    else if (distance_type==FLANN_DIST_HELLINGER) {
         return __flann_radius_search<HellingerDistance<T> >(index_ptr, query, indices, dists, max_nn, radius, flann_params);
     }
-    else if (flann_distance_type==FLANN_DIST_CHI_SQUARE) {
+    else if (distance_type==FLANN_DIST_CHI_SQUARE) {
         return __flann_radius_search<ChiSquareDistance<T> >(index_ptr, query, indices, dists, max_nn, radius, flann_params);
     }
-    else if (flann_distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
+    else if (distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
         return __flann_radius_search<KL_Divergence<T> >(index_ptr, query, indices, dists, max_nn, radius, flann_params);
     }
+    else if (distance_type==FLANN_DIST_HAMMING) {
+        return __flann_radius_search<HammingDistance<T> >(index_ptr, query, indices, dists, max_nn, radius, flann_params);
+    }
     else {
         Logger::error( "Distance type unsupported in the C bindings, use the C++ bindings instead\n");
         return -1;
@@ -1163,6 +2079,215 @@ int flann_radius_search_int(flann_index_t index_ptr,
     return _flann_radius_search(index_ptr, query, indices, dists, max_nn, radius, flann_params);
 }
 
+int flann_radius_search_int8(flann_index_t index_ptr,
+                             signed char* query,
+                             int* indices,
+                             float* dists,
+                             int max_nn,
+                             float radius,
+                             FLANNParameters* flann_params)
+{
+    return _flann_radius_search(index_ptr, query, indices, dists, max_nn, radius, flann_params);
+}
+
+int flann_radius_search_float16(flann_index_t index_ptr,
+                                flann_float16_t* query,
+                                int* indices,
+                                float* dists,
+                                int max_nn,
+                                float radius,
+                                FLANNParameters* flann_params)
+{
+    return _flann_radius_search(index_ptr, query, indices, dists, max_nn, radius, flann_params);
+}
+
+
+template<typename Distance>
+int __flann_radius_search_multi(flann_index_t index_ptr,
+                                typename Distance::ElementType* queries,
+                                int tcount,
+                                int* indptr,
+                                int** indices,
+                                typename Distance::ResultType** dists,
+                                float radius,
+                                FLANNParameters* flann_params)
+{
+    typedef typename Distance::ElementType ElementType;
+    typedef typename Distance::ResultType DistanceType;
+
+    try {
+        init_flann_search_parameters(flann_params);
+        if (index_ptr==NULL) {
+            throw FLANNException("Invalid index");
+        }
+        Index<Distance>* index = get_index<Distance>(index_ptr);
+
+        std::vector<std::vector<int> > v_indices(tcount);
+        std::vector<std::vector<DistanceType> > v_dists(tcount);
+        SearchParams search_params = create_search_params(flann_params);
+        index->radiusSearch(Matrix<ElementType>(queries, tcount, index->veclen()),
+                            v_indices,
+                            v_dists, radius, search_params);
+
+        indptr[0] = 0;
+        for (int i=0;i<tcount;++i) {
+            indptr[i+1] = indptr[i] + v_indices[i].size();
+        }
+        int count = indptr[tcount];
+
+        // always allocate at least one element so the caller gets valid pointers to free
+        *indices = (int*)malloc(std::max(count,1)*sizeof(int));
+        *dists = (DistanceType*)malloc(std::max(count,1)*sizeof(DistanceType));
+        if (*indices==NULL || *dists==NULL) {
+            free(*indices);
+            free(*dists);
+            *indices = NULL;
+            *dists = NULL;
+            throw FLANNException("Cannot allocate memory for the radius search results");
+        }
+        for (int i=0;i<tcount;++i) {
+            std::copy(v_indices[i].begin(), v_indices[i].end(), *indices + indptr[i]);
+            std::copy(v_dists[i].begin(), v_dists[i].end(), *dists + indptr[i]);
+        }
+
+        return count;
+    }
+    catch (std::runtime_error& e) {
+        Logger::error("Caught exception: %s\n",e.what());
+        return -1;
+    }
+}
+
+template<typename T, typename R>
+int _flann_radius_search_multi(flann_index_t index_ptr,
+                               T* queries,
+                               int tcount,
+                               int* indptr,
+                               int** indices,
+                               R** dists,
+                               float radius,
+                               FLANNParameters* flann_params)
+{
+    flann_distance_t distance_type = index_distance_type(index_ptr);
+    if (distance_type==FLANN_DIST_EUCLIDEAN) {
+        return __flann_radius_search_multi<L2<T> >(index_ptr, queries, tcount, indptr, indices, dists, radius, flann_params);
+    }
+    else if (distance_type==FLANN_DIST_MANHATTAN) {
+        return __flann_radius_search_multi<L1<T> >(index_ptr, queries, tcount, indptr, indices, dists, radius, flann_params);
+    }
+    else if (distance_type==FLANN_DIST_MINKOWSKI) {
+        return __flann_radius_search_multi<MinkowskiDistance<T> >(index_ptr, queries, tcount, indptr, indices, dists, radius, flann_params);
+    }
+    else if (distance_type==FLANN_DIST_HIST_INTERSECT) {
+        return __flann_radius_search_multi<HistIntersectionDistance<T> >(index_ptr, queries, tcount, indptr, indices, dists, radius, flann_params);
+    }
+    else if (distance_type==FLANN_DIST_HELLINGER) {
+        return __flann_radius_search_multi<HellingerDistance<T> >(index_ptr, queries, tcount, indptr, indices, dists, radius, flann_params);
+    }
+    else if (distance_type==FLANN_DIST_CHI_SQUARE) {
+        return __flann_radius_search_multi<ChiSquareDistance<T> >(index_ptr, queries, tcount, indptr, indices, dists, radius, flann_params);
+    }
+    else if (distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
+        return __flann_radius_search_multi<KL_Divergence<T> >(index_ptr, queries, tcount, indptr, indices, dists, radius, flann_params);
+    }
+    else if (distance_type==FLANN_DIST_HAMMING) {
+        return __flann_radius_search_multi<HammingDistance<T> >(index_ptr, queries, tcount, indptr, indices, dists, radius, flann_params);
+    }
+    else {
+        Logger::error( "Distance type unsupported in the C bindings, use the C++ bindings instead\n");
+        return -1;
+    }
+}
+
+int flann_radius_search_multi(flann_index_t index_ptr,
+                              float* queries,
+                              int tcount,
+                              int* indptr,
+                              int** indices,
+                              float** dists,
+                              float radius,
+                              FLANNParameters* flann_params)
+{
+    return _flann_radius_search_multi(index_ptr, queries, tcount, indptr, indices, dists, radius, flann_params);
+}
+
+int flann_radius_search_multi_float(flann_index_t index_ptr,
+                                    float* queries,
+                                    int tcount,
+                                    int* indptr,
+                                    int** indices,
+                                    float** dists,
+                                    float radius,
+                                    FLANNParameters* flann_params)
+{
+    return _flann_radius_search_multi(index_ptr, queries, tcount, indptr, indices, dists, radius, flann_params);
+}
+
+int flann_radius_search_multi_double(flann_index_t index_ptr,
+                                     double* queries,
+                                     int tcount,
+                                     int* indptr,
+                                     int** indices,
+                                     double** dists,
+                                     float radius,
+                                     FLANNParameters* flann_params)
+{
+    return _flann_radius_search_multi(index_ptr, queries, tcount, indptr, indices, dists, radius, flann_params);
+}
+
+int flann_radius_search_multi_byte(flann_index_t index_ptr,
+                                   unsigned char* queries,
+                                   int tcount,
+                                   int* indptr,
+                                   int** indices,
+                                   float** dists,
+                                   float radius,
+                                   FLANNParameters* flann_params)
+{
+    return _flann_radius_search_multi(index_ptr, queries, tcount, indptr, indices, dists, radius, flann_params);
+}
+
+int flann_radius_search_multi_int(flann_index_t index_ptr,
+                                  int* queries,
+                                  int tcount,
+                                  int* indptr,
+                                  int** indices,
+                                  float** dists,
+                                  float radius,
+                                  FLANNParameters* flann_params)
+{
+    return _flann_radius_search_multi(index_ptr, queries, tcount, indptr, indices, dists, radius, flann_params);
+}
+
+int flann_radius_search_multi_int8(flann_index_t index_ptr,
+                                   signed char* queries,
+                                   int tcount,
+                                   int* indptr,
+                                   int** indices,
+                                   float** dists,
+                                   float radius,
+                                   FLANNParameters* flann_params)
+{
+    return _flann_radius_search_multi(index_ptr, queries, tcount, indptr, indices, dists, radius, flann_params);
+}
+
+int flann_radius_search_multi_float16(flann_index_t index_ptr,
+                                      flann_float16_t* queries,
+                                      int tcount,
+                                      int* indptr,
+                                      int** indices,
+                                      float** dists,
+                                      float radius,
+                                      FLANNParameters* flann_params)
+{
+    return _flann_radius_search_multi(index_ptr, queries, tcount, indptr, indices, dists, radius, flann_params);
+}
+
+void flann_free_buffer(void* buffer)
+{
+    free(buffer);
+}
+
 
 template<typename Distance>
 int __flann_free_index(flann_index_t index_ptr, FLANNParameters* flann_params)
@@ -1172,8 +2297,9 @@ int __flann_free_index(flann_index_t index_ptr, FLANNParameters* flann_params)
         if (index_ptr==NULL) {
             throw FLANNException("Invalid index");
         }
-        Index<Distance>* index = (Index<Distance>*)index_ptr;
+        Index<Distance>* index = get_index<Distance>(index_ptr);
         delete index;
+        delete (FLANNIndexHandle*)index_ptr;
 
         return 0;
     }
@@ -1186,27 +2312,31 @@ int __flann_free_index(flann_index_t index_ptr, FLANNParameters* flann_params)
 template<typename T>
 int _flann_free_index(flann_index_t index_ptr, FLANNParameters* flann_params)
 {
-    if (flann_distance_type==FLANN_DIST_EUCLIDEAN) {
+    flann_distance_t distance_type = index_distance_type(index_ptr);
+    if (distance_type==FLANN_DIST_EUCLIDEAN) {
         return __flann_free_index<L2<T> >(index_ptr, flann_params);
     }
-    else if (flann_distance_type==FLANN_DIST_MANHATTAN) {
+    else if (distance_type==FLANN_DIST_MANHATTAN) {
         return __flann_free_index<L1<T> >(index_ptr, flann_params);
     }
-    else if (flann_distance_type==FLANN_DIST_MINKOWSKI) {
+    else if (distance_type==FLANN_DIST_MINKOWSKI) {
         return __flann_free_index<MinkowskiDistance<T> >(index_ptr, flann_params);
     }
-    else if (flann_distance_type==FLANN_DIST_HIST_INTERSECT) {
+    else if (distance_type==FLANN_DIST_HIST_INTERSECT) {
         return __flann_free_index<HistIntersectionDistance<T> >(index_ptr, flann_params);
     }
-    else if (flann_distance_type==FLANN_DIST_HELLINGER) {
+    else if (distance_type==FLANN_DIST_HELLINGER) {
         return __flann_free_index<HellingerDistance<T> >(index_ptr, flann_params);
     }
-    else if (flann_distance_type==FLANN_DIST_CHI_SQUARE) {
+    else if (distance_type==FLANN_DIST_CHI_SQUARE) {
         return __flann_free_index<ChiSquareDistance<T> >(index_ptr, flann_params);
     }
-    else if (flann_distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
+    else if (distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
         return __flann_free_index<KL_Divergence<T> >(index_ptr, flann_params);
     }
+    else if (distance_type==FLANN_DIST_HAMMING) {
+        return __flann_free_index<HammingDistance<T> >(index_ptr, flann_params);
+    }
     else {
         Logger::error( "Distance type unsupported in the C bindings, use the C++ bindings instead\n");
         return -1;
@@ -1238,6 +2368,16 @@ int flann_free_index_int(flann_index_t index_ptr, FLANNParameters* flann_params)
     return _flann_free_index<int>(index_ptr, flann_params);
 }
 
+int flann_free_index_int8(flann_index_t index_ptr, FLANNParameters* flann_params)
+{
+    return _flann_free_index<signed char>(index_ptr, flann_params);
+}
+
+int flann_free_index_float16(flann_index_t index_ptr, FLANNParameters* flann_params)
+{
+    return _flann_free_index<float16>(index_ptr, flann_params);
+}
+
 
 template<typename Distance>
 int __flann_compute_cluster_centers(typename Distance::ElementType* dataset, int rows, int cols, int clusters,
@@ -1264,27 +2404,28 @@ int __flann_compute_cluster_centers(typename Distance::ElementType* dataset, int
 
 
 template<typename T, typename R>
-int _flann_compute_cluster_centers(T* dataset, int rows, int cols, int clusters, R* result, FLANNParameters* flann_params)
+int _flann_compute_cluster_centers(T* dataset, int rows, int cols, int clusters, R* result, FLANNParameters* flann_params,
+                                   flann_distance_t distance_type, int distance_order)
 {
-    if (flann_distance_type==FLANN_DIST_EUCLIDEAN) {
+    if (distance_type==FLANN_DIST_EUCLIDEAN) {
         return __flann_compute_cluster_centers<L2<T> >(dataset, rows, cols, clusters, result, flann_params);
     }
-    else if (flann_distance_type==FLANN_DIST_MANHATTAN) {
+    else if (distance_type==FLANN_DIST_MANHATTAN) {
         return __flann_compute_cluster_centers<L1<T> >(dataset, rows, cols, clusters, result, flann_params);
     }
-    else if (flann_distance_type==FLANN_DIST_MINKOWSKI) {
-        return __flann_compute_cluster_centers<MinkowskiDistance<T> >(dataset, rows, cols, clusters, result, flann_params, MinkowskiDistance<T>(flann_distance_order));
+    else if (distance_type==FLANN_DIST_MINKOWSKI) {
+        return __flann_compute_cluster_centers<MinkowskiDistance<T> >(dataset, rows, cols, clusters, result, flann_params, MinkowskiDistance<T>(distance_order));
     }
-    else if (flann_distance_type==FLANN_DIST_HIST_INTERSECT) {
+    else if (distance_type==FLANN_DIST_HIST_INTERSECT) {
         return __flann_compute_cluster_centers<HistIntersectionDistance<T> >(dataset, rows, cols, clusters, result, flann_params);
     }
-    else if (flann_distance_type==FLANN_DIST_HELLINGER) {
+    else if (distance_type==FLANN_DIST_HELLINGER) {
         return __flann_compute_cluster_centers<HellingerDistance<T> >(dataset, rows, cols, clusters, result, flann_params);
     }
-    else if (flann_distance_type==FLANN_DIST_CHI_SQUARE) {
+    else if (distance_type==FLANN_DIST_CHI_SQUARE) {
         return __flann_compute_cluster_centers<ChiSquareDistance<T> >(dataset, rows, cols, clusters, result, flann_params);
     }
-    else if (flann_distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
+    else if (distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
         return __flann_compute_cluster_centers<KL_Divergence<T> >(dataset, rows, cols, clusters, result, flann_params);
     }
     else {
@@ -1295,26 +2436,220 @@ int _flann_compute_cluster_centers(T* dataset, int rows, int cols, int clusters,
 
 int flann_compute_cluster_centers(float* dataset, int rows, int cols, int clusters, float* result, FLANNParameters* flann_params)
 {
-    return _flann_compute_cluster_centers(dataset, rows, cols, clusters, result, flann_params);
+    return _flann_compute_cluster_centers(dataset, rows, cols, clusters, result, flann_params, flann_distance_type, flann_distance_order);
 }
 
 int flann_compute_cluster_centers_float(float* dataset, int rows, int cols, int clusters, float* result, FLANNParameters* flann_params)
 {
-    return _flann_compute_cluster_centers(dataset, rows, cols, clusters, result, flann_params);
+    return _flann_compute_cluster_centers(dataset, rows, cols, clusters, result, flann_params, flann_distance_type, flann_distance_order);
 }
 
 int flann_compute_cluster_centers_double(double* dataset, int rows, int cols, int clusters, double* result, FLANNParameters* flann_params)
 {
-    return _flann_compute_cluster_centers(dataset, rows, cols, clusters, result, flann_params);
+    return _flann_compute_cluster_centers(dataset, rows, cols, clusters, result, flann_params, flann_distance_type, flann_distance_order);
 }
 
 int flann_compute_cluster_centers_byte(unsigned char* dataset, int rows, int cols, int clusters, float* result, FLANNParameters* flann_params)
 {
-    return _flann_compute_cluster_centers(dataset, rows, cols, clusters, result, flann_params);
+    return _flann_compute_cluster_centers(dataset, rows, cols, clusters, result, flann_params, flann_distance_type, flann_distance_order);
 }
 
 int flann_compute_cluster_centers_int(int* dataset, int rows, int cols, int clusters, float* result, FLANNParameters* flann_params)
 {
-    return _flann_compute_cluster_centers(dataset, rows, cols, clusters, result, flann_params);
+    return _flann_compute_cluster_centers(dataset, rows, cols, clusters, result, flann_params, flann_distance_type, flann_distance_order);
+}
+
+int flann_compute_cluster_centers_int8(signed char* dataset, int rows, int cols, int clusters, float* result, FLANNParameters* flann_params)
+{
+    return _flann_compute_cluster_centers(dataset, rows, cols, clusters, result, flann_params, flann_distance_type, flann_distance_order);
+}
+
+int flann_compute_cluster_centers_float16(flann_float16_t* dataset, int rows, int cols, int clusters, float* result, FLANNParameters* flann_params)
+{
+    return _flann_compute_cluster_centers(dataset, rows, cols, clusters, result, flann_params, flann_distance_type, flann_distance_order);
+}
+
+int flann_compute_cluster_centers_with_distance(float* dataset, int rows, int cols, int clusters, float* result, FLANNParameters* flann_params,
+                                                flann_distance_t distance_type, int order)
+{
+    return _flann_compute_cluster_centers(dataset, rows, cols, clusters, result, flann_params, distance_type, order);
+}
+
+int flann_compute_cluster_centers_with_distance_float(float* dataset, int rows, int cols, int clusters, float* result, FLANNParameters* flann_params,
+                                                      flann_distance_t distance_type, int order)
+{
+    return _flann_compute_cluster_centers(dataset, rows, cols, clusters, result, flann_params, distance_type, order);
+}
+
+int flann_compute_cluster_centers_with_distance_double(double* dataset, int rows, int cols, int clusters, double* result, FLANNParameters* flann_params,
+                                                       flann_distance_t distance_type, int order)
+{
+    return _flann_compute_cluster_centers(dataset, rows, cols, clusters, result, flann_params, distance_type, order);
+}
+
+int flann_compute_cluster_centers_with_distance_byte(unsigned char* dataset, int rows, int cols, int clusters, float* result, FLANNParameters* flann_params,
+                                                     flann_distance_t distance_type, int order)
+{
+    return _flann_compute_cluster_centers(dataset, rows, cols, clusters, result, flann_params, distance_type, order);
+}
+
+int flann_compute_cluster_centers_with_distance_int(int* dataset, int rows, int cols, int clusters, float* result, FLANNParameters* flann_params,
+                                                    flann_distance_t distance_type, int order)
+{
+    return _flann_compute_cluster_centers(dataset, rows, cols, clusters, result, flann_params, distance_type, order);
+}
+
+int flann_compute_cluster_centers_with_distance_int8(signed char* dataset, int rows, int cols, int clusters, float* result, FLANNParameters* flann_params,
+                                                     flann_distance_t distance_type, int order)
+{
+    return _flann_compute_cluster_centers(dataset, rows, cols, clusters, result, flann_params, distance_type, order);
+}
+
+int flann_compute_cluster_centers_with_distance_float16(flann_float16_t* dataset, int rows, int cols, int clusters, float* result, FLANNParameters* flann_params,
+                                                        flann_distance_t distance_type, int order)
+{
+    return _flann_compute_cluster_centers(dataset, rows, cols, clusters, result, flann_params, distance_type, order);
+}
+
+
+template<typename Distance>
+int __flann_compute_ground_truth(typename Distance::ElementType* dataset, int rows, int cols, typename Distance::ElementType* testset, int tcount,
+                                 int* result, int nn, int skip, FLANNParameters* flann_params, Distance d = Distance())
+{
+    typedef typename Distance::ElementType ElementType;
+    try {
+        init_flann_search_parameters(flann_params);
+
+        if (nn + skip > rows) {
+            throw FLANNException("More neighbors requested than there are points in the dataset");
+        }
+        std::vector<size_t> matches_data((size_t)tcount*nn);
+        Matrix<size_t> matches(&matches_data[0], tcount, nn);
+        compute_ground_truth<Distance>(Matrix<ElementType>(dataset,rows,cols), Matrix<ElementType>(testset,tcount,cols),
+                                       matches, skip, d, flann_params==NULL ? 1 : flann_params->cores);
+        for (size_t i=0; i<matches_data.size(); ++i) {
+            result[i] = (int)matches_data[i];
+        }
+        return 0;
+    }
+    catch (std::runtime_error& e) {
+        Logger::error("Caught exception: %s\n",e.what());
+        return -1;
+    }
 }
 
+
+template<typename T>
+int _flann_compute_ground_truth(T* dataset, int rows, int cols, T* testset, int tcount, int* result, int nn, int skip,
+                                FLANNParameters* flann_params, flann_distance_t distance_type, int distance_order)
+{
+    if (distance_type==FLANN_DIST_EUCLIDEAN) {
+        return __flann_compute_ground_truth<L2<T> >(dataset, rows, cols, testset, tcount, result, nn, skip, flann_params);
+    }
+    else if (distance_type==FLANN_DIST_MANHATTAN) {
+        return __flann_compute_ground_truth<L1<T> >(dataset, rows, cols, testset, tcount, result, nn, skip, flann_params);
+    }
+    else if (distance_type==FLANN_DIST_MINKOWSKI) {
+        return __flann_compute_ground_truth<MinkowskiDistance<T> >(dataset, rows, cols, testset, tcount, result, nn, skip, flann_params, MinkowskiDistance<T>(distance_order));
+    }
+    else if (distance_type==FLANN_DIST_HIST_INTERSECT) {
+        return __flann_compute_ground_truth<HistIntersectionDistance<T> >(dataset, rows, cols, testset, tcount, result, nn, skip, flann_params);
+    }
+    else if (distance_type==FLANN_DIST_HELLINGER) {
+        return __flann_compute_ground_truth<HellingerDistance<T> >(dataset, rows, cols, testset, tcount, result, nn, skip, flann_params);
+    }
+    else if (distance_type==FLANN_DIST_CHI_SQUARE) {
+        return __flann_compute_ground_truth<ChiSquareDistance<T> >(dataset, rows, cols, testset, tcount, result, nn, skip, flann_params);
+    }
+    else if (distance_type==FLANN_DIST_KULLBACK_LEIBLER) {
+        return __flann_compute_ground_truth<KL_Divergence<T> >(dataset, rows, cols, testset, tcount, result, nn, skip, flann_params);
+    }
+    else if (distance_type==FLANN_DIST_HAMMING) {
+        if (!hamming_supported<T>()) {
+            return -1;
+        }
+        return __flann_compute_ground_truth<HammingDistance<T> >(dataset, rows, cols, testset, tcount, result, nn, skip, flann_params);
+    }
+    else {
+        Logger::error( "Distance type unsupported in the C bindings, use the C++ bindings instead\n");
+        return -1;
+    }
+}
+
+int flann_compute_ground_truth(float* dataset, int rows, int cols, float* testset, int tcount, int* result, int nn, int skip, FLANNParameters* flann_params)
+{
+    return _flann_compute_ground_truth(dataset, rows, cols, testset, tcount, result, nn, skip, flann_params, flann_distance_type, flann_distance_order);
+}
+
+int flann_compute_ground_truth_float(float* dataset, int rows, int cols, float* testset, int tcount, int* result, int nn, int skip, FLANNParameters* flann_params)
+{
+    return _flann_compute_ground_truth(dataset, rows, cols, testset, tcount, result, nn, skip, flann_params, flann_distance_type, flann_distance_order);
+}
+
+int flann_compute_ground_truth_double(double* dataset, int rows, int cols, double* testset, int tcount, int* result, int nn, int skip, FLANNParameters* flann_params)
+{
+    return _flann_compute_ground_truth(dataset, rows, cols, testset, tcount, result, nn, skip, flann_params, flann_distance_type, flann_distance_order);
+}
+
+int flann_compute_ground_truth_byte(unsigned char* dataset, int rows, int cols, unsigned char* testset, int tcount, int* result, int nn, int skip, FLANNParameters* flann_params)
+{
+    return _flann_compute_ground_truth(dataset, rows, cols, testset, tcount, result, nn, skip, flann_params, flann_distance_type, flann_distance_order);
+}
+
+int flann_compute_ground_truth_int(int* dataset, int rows, int cols, int* testset, int tcount, int* result, int nn, int skip, FLANNParameters* flann_params)
+{
+    return _flann_compute_ground_truth(dataset, rows, cols, testset, tcount, result, nn, skip, flann_params, flann_distance_type, flann_distance_order);
+}
+
+int flann_compute_ground_truth_int8(signed char* dataset, int rows, int cols, signed char* testset, int tcount, int* result, int nn, int skip, FLANNParameters* flann_params)
+{
+    return _flann_compute_ground_truth(dataset, rows, cols, testset, tcount, result, nn, skip, flann_params, flann_distance_type, flann_distance_order);
+}
+
+int flann_compute_ground_truth_float16(flann_float16_t* dataset, int rows, int cols, flann_float16_t* testset, int tcount, int* result, int nn, int skip, FLANNParameters* flann_params)
+{
+    return _flann_compute_ground_truth(dataset, rows, cols, testset, tcount, result, nn, skip, flann_params, flann_distance_type, flann_distance_order);
+}
+
+int flann_compute_ground_truth_with_distance(float* dataset, int rows, int cols, float* testset, int tcount, int* result, int nn, int skip, FLANNParameters* flann_params,
+                                             flann_distance_t distance_type, int order)
+{
+    return _flann_compute_ground_truth(dataset, rows, cols, testset, tcount, result, nn, skip, flann_params, distance_type, order);
+}
+
+int flann_compute_ground_truth_with_distance_float(float* dataset, int rows, int cols, float* testset, int tcount, int* result, int nn, int skip, FLANNParameters* flann_params,
+                                                   flann_distance_t distance_type, int order)
+{
+    return _flann_compute_ground_truth(dataset, rows, cols, testset, tcount, result, nn, skip, flann_params, distance_type, order);
+}
+
+int flann_compute_ground_truth_with_distance_double(double* dataset, int rows, int cols, double* testset, int tcount, int* result, int nn, int skip, FLANNParameters* flann_params,
+                                                    flann_distance_t distance_type, int order)
+{
+    return _flann_compute_ground_truth(dataset, rows, cols, testset, tcount, result, nn, skip, flann_params, distance_type, order);
+}
+
+int flann_compute_ground_truth_with_distance_byte(unsigned char* dataset, int rows, int cols, unsigned char* testset, int tcount, int* result, int nn, int skip, FLANNParameters* flann_params,
+                                                  flann_distance_t distance_type, int order)
+{
+    return _flann_compute_ground_truth(dataset, rows, cols, testset, tcount, result, nn, skip, flann_params, distance_type, order);
+}
+
+int flann_compute_ground_truth_with_distance_int(int* dataset, int rows, int cols, int* testset, int tcount, int* result, int nn, int skip, FLANNParameters* flann_params,
+                                                 flann_distance_t distance_type, int order)
+{
+    return _flann_compute_ground_truth(dataset, rows, cols, testset, tcount, result, nn, skip, flann_params, distance_type, order);
+}
+
+
+int flann_compute_ground_truth_with_distance_int8(signed char* dataset, int rows, int cols, signed char* testset, int tcount, int* result, int nn, int skip, FLANNParameters* flann_params,
+                                                  flann_distance_t distance_type, int order)
+{
+    return _flann_compute_ground_truth(dataset, rows, cols, testset, tcount, result, nn, skip, flann_params, distance_type, order);
+}
+
+int flann_compute_ground_truth_with_distance_float16(flann_float16_t* dataset, int rows, int cols, flann_float16_t* testset, int tcount, int* result, int nn, int skip, FLANNParameters* flann_params,
+                                                     flann_distance_t distance_type, int order)
+{
+    return _flann_compute_ground_truth(dataset, rows, cols, testset, tcount, result, nn, skip, flann_params, distance_type, order);
+}
\ No newline at end of file
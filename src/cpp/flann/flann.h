@@ -31,8 +31,18 @@
 #ifndef FLANN_H_
 #define FLANN_H_
 
+#include <stddef.h>
+
 #include "defines.h"
 
+#ifdef __cplusplus
+#include "util/float16.h"
+typedef flann::float16 flann_float16_t;
+#else
+/* IEEE 754 half precision number, given as its bits */
+typedef unsigned short flann_float16_t;
+#endif
+
 #ifdef __cplusplus
 extern "C"
 {
@@ -49,7 +59,7 @@ struct FLANNParameters
     float eps;     /* eps parameter for eps-knn search */
     int sorted;     /* indicates if results returned by radius search should be sorted or not */
     int max_neighbors;  /* limits the maximum number of neighbors should be returned by radius search */
-    int cores;      /* number of paralel cores to use for searching */
+    int cores;      /* number of paralel cores to use for searching (and autotuning) */
 
     /*  kdtree index parameters */
     int trees;                 /* number of randomized trees to use (for kdtree) */
@@ -75,6 +85,15 @@ struct FLANNParameters
     /* other parameters */
     enum flann_log_level_t log_level;    /* determines the verbosity of each flann function */
     long random_seed;            /* random seed to use */
+
+    /* autotuning time budget */
+    float max_tuning_seconds;  /* wall clock time limit of the autotuning, 0 for none */
+    int tuning_candidates;     /* set by the autotuning: number of configurations evaluated */
+
+    /* product quantization index parameters */
+    int subquantizers;         /* number of subvectors each point is split in (one byte code each) */
+    int code_bits;             /* bits of the code of a subvector, at most 8 */
+    int coarse_clusters;       /* inverted lists of the coarse quantizer (IVF+PQ), 0 for none */
 };
 
 
@@ -97,6 +116,8 @@ FLANN_EXPORT void flann_log_verbosity(int level);
  * Sets the distance type to use throughout FLANN.
  * If distance type specified is MINKOWSKI, the second argument
  * specifies which order the minkowski distance should have.
+ * An index keeps the distance in use when it was built or loaded, use
+ * flann_build_index_with_distance() to set the distance per index instead.
  */
 FLANN_EXPORT void flann_set_distance_type(enum flann_distance_t distance_type, int order);
 
@@ -155,6 +176,84 @@ FLANN_EXPORT flann_index_t flann_build_index_int(int* dataset,
                                                  float* speedup,
                                                  struct FLANNParameters* flann_params);
 
+FLANN_EXPORT flann_index_t flann_build_index_int8(signed char* dataset,
+                                                  int rows,
+                                                  int cols,
+                                                  float* speedup,
+                                                  struct FLANNParameters* flann_params);
+
+FLANN_EXPORT flann_index_t flann_build_index_float16(flann_float16_t* dataset,
+                                                     int rows,
+                                                     int cols,
+                                                     float* speedup,
+                                                     struct FLANNParameters* flann_params);
+
+/**
+   Same as flann_build_index, but builds the index with the given distance instead of
+   the one set with flann_set_distance_type(). The distance is stored in the returned
+   index and used by all the functions taking the index as argument, so indexes using
+   different distances can be built and used concurrently.
+
+   Params:
+    distance_type = distance to build the index with
+    order = order of the distance, only used by FLANN_DIST_MINKOWSKI
+ */
+FLANN_EXPORT flann_index_t flann_build_index_with_distance(float* dataset,
+                                                           int rows,
+                                                           int cols,
+                                                           float* speedup,
+                                                           struct FLANNParameters* flann_params,
+                                                           enum flann_distance_t distance_type,
+                                                           int order);
+
+FLANN_EXPORT flann_index_t flann_build_index_with_distance_float(float* dataset,
+                                                                 int rows,
+                                                                 int cols,
+                                                                 float* speedup,
+                                                                 struct FLANNParameters* flann_params,
+                                                                 enum flann_distance_t distance_type,
+                                                                 int order);
+
+FLANN_EXPORT flann_index_t flann_build_index_with_distance_double(double* dataset,
+                                                                  int rows,
+                                                                  int cols,
+                                                                  float* speedup,
+                                                                  struct FLANNParameters* flann_params,
+                                                                  enum flann_distance_t distance_type,
+                                                                  int order);
+
+FLANN_EXPORT flann_index_t flann_build_index_with_distance_byte(unsigned char* dataset,
+                                                                int rows,
+                                                                int cols,
+                                                                float* speedup,
+                                                                struct FLANNParameters* flann_params,
+                                                                enum flann_distance_t distance_type,
+                                                                int order);
+
+FLANN_EXPORT flann_index_t flann_build_index_with_distance_int(int* dataset,
+                                                               int rows,
+                                                               int cols,
+                                                               float* speedup,
+                                                               struct FLANNParameters* flann_params,
+                                                               enum flann_distance_t distance_type,
+                                                               int order);
+
+FLANN_EXPORT flann_index_t flann_build_index_with_distance_int8(signed char* dataset,
+                                                                int rows,
+                                                                int cols,
+                                                                float* speedup,
+                                                                struct FLANNParameters* flann_params,
+                                                                enum flann_distance_t distance_type,
+                                                                int order);
+
+FLANN_EXPORT flann_index_t flann_build_index_with_distance_float16(flann_float16_t* dataset,
+                                                                   int rows,
+                                                                   int cols,
+                                                                   float* speedup,
+                                                                   struct FLANNParameters* flann_params,
+                                                                   enum flann_distance_t distance_type,
+                                                                   int order);
+
 /**
   Adds points to pre-built index.
 
@@ -189,6 +288,14 @@ FLANN_EXPORT int flann_add_points_int(flann_index_t index_ptr, int* points,
                                       int rows, int columns,
                                       float rebuild_threshold);
 
+FLANN_EXPORT int flann_add_points_int8(flann_index_t index_ptr,
+                                       signed char* points, int rows,
+                                       int columns, float rebuild_threshold);
+
+FLANN_EXPORT int flann_add_points_float16(flann_index_t index_ptr,
+                                          flann_float16_t* points, int rows,
+                                          int columns, float rebuild_threshold);
+
 /**
  * Removes a point from a pre-built index.
  *
@@ -210,6 +317,42 @@ FLANN_EXPORT int flann_remove_point_byte(flann_index_t index_ptr,
 FLANN_EXPORT int flann_remove_point_int(flann_index_t index_ptr,
                                         unsigned int point_id);
 
+FLANN_EXPORT int flann_remove_point_int8(flann_index_t index_ptr,
+                                         unsigned int point_id);
+
+FLANN_EXPORT int flann_remove_point_float16(flann_index_t index_ptr,
+                                            unsigned int point_id);
+
+/**
+ * Removes several points from a pre-built index.
+ *
+ * index_ptr = pointer to pre-built index.
+ * point_ids = array with the indices of the datapoints to remove.
+ * count = number of elements in point_ids.
+ *
+ * Returns: 0 if success otherwise -1
+*/
+FLANN_EXPORT int flann_remove_points(flann_index_t index_ptr,
+                                     unsigned int* point_ids, int count);
+
+FLANN_EXPORT int flann_remove_points_float(flann_index_t index_ptr,
+                                           unsigned int* point_ids, int count);
+
+FLANN_EXPORT int flann_remove_points_double(flann_index_t index_ptr,
+                                            unsigned int* point_ids, int count);
+
+FLANN_EXPORT int flann_remove_points_byte(flann_index_t index_ptr,
+                                          unsigned int* point_ids, int count);
+
+FLANN_EXPORT int flann_remove_points_int(flann_index_t index_ptr,
+                                         unsigned int* point_ids, int count);
+
+FLANN_EXPORT int flann_remove_points_int8(flann_index_t index_ptr,
+                                          unsigned int* point_ids, int count);
+
+FLANN_EXPORT int flann_remove_points_float16(flann_index_t index_ptr,
+                                             unsigned int* point_ids, int count);
+
 /**
  * Gets a point from a given index position.
  *
@@ -233,6 +376,12 @@ FLANN_EXPORT unsigned char* flann_get_point_byte(flann_index_t index_ptr,
 FLANN_EXPORT int* flann_get_point_int(flann_index_t index_ptr,
                                       unsigned int point_id);
 
+FLANN_EXPORT signed char* flann_get_point_int8(flann_index_t index_ptr,
+                                                 unsigned int point_id);
+
+FLANN_EXPORT flann_float16_t* flann_get_point_float16(flann_index_t index_ptr,
+                                                    unsigned int point_id);
+
 /**
  * Returns the number of datapoints stored in index.
  *
@@ -249,6 +398,10 @@ FLANN_EXPORT unsigned int flann_veclen_byte(flann_index_t index_ptr);
 
 FLANN_EXPORT unsigned int flann_veclen_int(flann_index_t index_ptr);
 
+FLANN_EXPORT unsigned int flann_veclen_int8(flann_index_t index_ptr);
+
+FLANN_EXPORT unsigned int flann_veclen_float16(flann_index_t index_ptr);
+
 /**
  * Returns the dimensionality of datapoints stored in index.
  *
@@ -265,6 +418,10 @@ FLANN_EXPORT unsigned int flann_size_byte(flann_index_t index_ptr);
 
 FLANN_EXPORT unsigned int flann_size_int(flann_index_t index_ptr);
 
+FLANN_EXPORT unsigned int flann_size_int8(flann_index_t index_ptr);
+
+FLANN_EXPORT unsigned int flann_size_float16(flann_index_t index_ptr);
+
 /**
  * Returns the number of bytes consumed by the index.
  *
@@ -281,6 +438,10 @@ FLANN_EXPORT int flann_used_memory_byte(flann_index_t index_ptr);
 
 FLANN_EXPORT int flann_used_memory_int(flann_index_t index_ptr);
 
+FLANN_EXPORT int flann_used_memory_int8(flann_index_t index_ptr);
+
+FLANN_EXPORT int flann_used_memory_float16(flann_index_t index_ptr);
+
 
 /**
  * Saves the index to a file. Only the index is saved into the file, the dataset corresponding to the index is not saved.
@@ -304,6 +465,12 @@ FLANN_EXPORT int flann_save_index_byte(flann_index_t index_id,
 FLANN_EXPORT int flann_save_index_int(flann_index_t index_id,
                                       char* filename);
 
+FLANN_EXPORT int flann_save_index_int8(flann_index_t index_id,
+                                       char* filename);
+
+FLANN_EXPORT int flann_save_index_float16(flann_index_t index_id,
+                                          char* filename);
+
 /**
  * Loads an index from a file.
  *
@@ -338,6 +505,222 @@ FLANN_EXPORT flann_index_t flann_load_index_int(char* filename,
                                                 int rows,
                                                 int cols);
 
+FLANN_EXPORT flann_index_t flann_load_index_int8(char* filename,
+                                                 signed char* dataset,
+                                                 int rows,
+                                                 int cols);
+
+FLANN_EXPORT flann_index_t flann_load_index_float16(char* filename,
+                                                    flann_float16_t* dataset,
+                                                    int rows,
+                                                    int cols);
+
+/**
+ * Same as flann_load_index, but the loaded index uses the given distance instead of
+ * the one set with flann_set_distance_type().
+ *
+ * @param distance_type Distance the index was built with.
+ * @param order Order of the distance, only used by FLANN_DIST_MINKOWSKI.
+ */
+FLANN_EXPORT flann_index_t flann_load_index_with_distance(char* filename,
+                                                          float* dataset,
+                                                          int rows,
+                                                          int cols,
+                                                          enum flann_distance_t distance_type,
+                                                          int order);
+
+FLANN_EXPORT flann_index_t flann_load_index_with_distance_float(char* filename,
+                                                                float* dataset,
+                                                                int rows,
+                                                                int cols,
+                                                                enum flann_distance_t distance_type,
+                                                                int order);
+
+FLANN_EXPORT flann_index_t flann_load_index_with_distance_double(char* filename,
+                                                                 double* dataset,
+                                                                 int rows,
+                                                                 int cols,
+                                                                 enum flann_distance_t distance_type,
+                                                                 int order);
+
+FLANN_EXPORT flann_index_t flann_load_index_with_distance_byte(char* filename,
+                                                               unsigned char* dataset,
+                                                               int rows,
+                                                               int cols,
+                                                               enum flann_distance_t distance_type,
+                                                               int order);
+
+FLANN_EXPORT flann_index_t flann_load_index_with_distance_int(char* filename,
+                                                              int* dataset,
+                                                              int rows,
+                                                              int cols,
+                                                              enum flann_distance_t distance_type,
+                                                              int order);
+
+FLANN_EXPORT flann_index_t flann_load_index_with_distance_int8(char* filename,
+                                                               signed char* dataset,
+                                                               int rows,
+                                                               int cols,
+                                                               enum flann_distance_t distance_type,
+                                                               int order);
+
+FLANN_EXPORT flann_index_t flann_load_index_with_distance_float16(char* filename,
+                                                                  flann_float16_t* dataset,
+                                                                  int rows,
+                                                                  int cols,
+                                                                  enum flann_distance_t distance_type,
+                                                                  int order);
+
+/**
+ * Saves an index to a memory buffer, in the same format as flann_save_index.
+ *
+ * @param index_id The index to save.
+ * @param buffer Output parameter, set to a buffer holding the saved index,
+ *  to be released with flann_free_buffer().
+ * @param size Output parameter, set to the size of the buffer.
+ * @return zero or -1 for error
+ */
+FLANN_EXPORT int flann_save_index_to_buffer(flann_index_t index_id,
+                                            char** buffer,
+                                            size_t* size);
+
+FLANN_EXPORT int flann_save_index_to_buffer_float(flann_index_t index_id,
+                                                  char** buffer,
+                                                  size_t* size);
+
+FLANN_EXPORT int flann_save_index_to_buffer_double(flann_index_t index_id,
+                                                   char** buffer,
+                                                   size_t* size);
+
+FLANN_EXPORT int flann_save_index_to_buffer_byte(flann_index_t index_id,
+                                                 char** buffer,
+                                                 size_t* size);
+
+FLANN_EXPORT int flann_save_index_to_buffer_int(flann_index_t index_id,
+                                                char** buffer,
+                                                size_t* size);
+
+FLANN_EXPORT int flann_save_index_to_buffer_int8(flann_index_t index_id,
+                                                 char** buffer,
+                                                 size_t* size);
+
+FLANN_EXPORT int flann_save_index_to_buffer_float16(flann_index_t index_id,
+                                                    char** buffer,
+                                                    size_t* size);
+
+/**
+ * Loads an index from a memory buffer filled by flann_save_index_to_buffer
+ * (or holding the contents of an index file).
+ *
+ * @param buffer Buffer holding the saved index.
+ * @param size Size of the buffer.
+ * @param dataset The dataset corresponding to the index.
+ * @param rows Dataset rows
+ * @param cols Dataset columns
+ * @return the loaded index or NULL for error
+ */
+FLANN_EXPORT flann_index_t flann_load_index_from_buffer(char* buffer,
+                                                        size_t size,
+                                                        float* dataset,
+                                                        int rows,
+                                                        int cols);
+
+FLANN_EXPORT flann_index_t flann_load_index_from_buffer_float(char* buffer,
+                                                              size_t size,
+                                                              float* dataset,
+                                                              int rows,
+                                                              int cols);
+
+FLANN_EXPORT flann_index_t flann_load_index_from_buffer_double(char* buffer,
+                                                               size_t size,
+                                                               double* dataset,
+                                                               int rows,
+                                                               int cols);
+
+FLANN_EXPORT flann_index_t flann_load_index_from_buffer_byte(char* buffer,
+                                                             size_t size,
+                                                             unsigned char* dataset,
+                                                             int rows,
+                                                             int cols);
+
+FLANN_EXPORT flann_index_t flann_load_index_from_buffer_int(char* buffer,
+                                                            size_t size,
+                                                            int* dataset,
+                                                            int rows,
+                                                            int cols);
+
+FLANN_EXPORT flann_index_t flann_load_index_from_buffer_int8(char* buffer,
+                                                             size_t size,
+                                                             signed char* dataset,
+                                                             int rows,
+                                                             int cols);
+
+FLANN_EXPORT flann_index_t flann_load_index_from_buffer_float16(char* buffer,
+                                                                size_t size,
+                                                                flann_float16_t* dataset,
+                                                                int rows,
+                                                                int cols);
+
+/**
+ * Same as flann_load_index_from_buffer, but the loaded index uses the given
+ * distance instead of the one set with flann_set_distance_type().
+ */
+FLANN_EXPORT flann_index_t flann_load_index_from_buffer_with_distance(char* buffer,
+                                                                      size_t size,
+                                                                      float* dataset,
+                                                                      int rows,
+                                                                      int cols,
+                                                                      enum flann_distance_t distance_type,
+                                                                      int order);
+
+FLANN_EXPORT flann_index_t flann_load_index_from_buffer_with_distance_float(char* buffer,
+                                                                            size_t size,
+                                                                            float* dataset,
+                                                                            int rows,
+                                                                            int cols,
+                                                                            enum flann_distance_t distance_type,
+                                                                            int order);
+
+FLANN_EXPORT flann_index_t flann_load_index_from_buffer_with_distance_double(char* buffer,
+                                                                             size_t size,
+                                                                             double* dataset,
+                                                                             int rows,
+                                                                             int cols,
+                                                                             enum flann_distance_t distance_type,
+                                                                             int order);
+
+FLANN_EXPORT flann_index_t flann_load_index_from_buffer_with_distance_byte(char* buffer,
+                                                                           size_t size,
+                                                                           unsigned char* dataset,
+                                                                           int rows,
+                                                                           int cols,
+                                                                           enum flann_distance_t distance_type,
+                                                                           int order);
+
+FLANN_EXPORT flann_index_t flann_load_index_from_buffer_with_distance_int(char* buffer,
+                                                                          size_t size,
+                                                                          int* dataset,
+                                                                          int rows,
+                                                                          int cols,
+                                                                          enum flann_distance_t distance_type,
+                                                                          int order);
+
+FLANN_EXPORT flann_index_t flann_load_index_from_buffer_with_distance_int8(char* buffer,
+                                                                           size_t size,
+                                                                           signed char* dataset,
+                                                                           int rows,
+                                                                           int cols,
+                                                                           enum flann_distance_t distance_type,
+                                                                           int order);
+
+FLANN_EXPORT flann_index_t flann_load_index_from_buffer_with_distance_float16(char* buffer,
+                                                                              size_t size,
+                                                                              flann_float16_t* dataset,
+                                                                              int rows,
+                                                                              int cols,
+                                                                              enum flann_distance_t distance_type,
+                                                                              int order);
+
 
 /**
    Builds an index and uses it to find nearest neighbors.
@@ -405,6 +788,114 @@ FLANN_EXPORT int flann_find_nearest_neighbors_int(int* dataset,
                                                   int nn,
                                                   struct FLANNParameters* flann_params);
 
+FLANN_EXPORT int flann_find_nearest_neighbors_int8(signed char* dataset,
+                                                   int rows,
+                                                   int cols,
+                                                   signed char* testset,
+                                                   int trows,
+                                                   int* indices,
+                                                   float* dists,
+                                                   int nn,
+                                                   struct FLANNParameters* flann_params);
+
+FLANN_EXPORT int flann_find_nearest_neighbors_float16(flann_float16_t* dataset,
+                                                      int rows,
+                                                      int cols,
+                                                      flann_float16_t* testset,
+                                                      int trows,
+                                                      int* indices,
+                                                      float* dists,
+                                                      int nn,
+                                                      struct FLANNParameters* flann_params);
+
+/**
+   Same as flann_find_nearest_neighbors, but uses the given distance instead of the one
+   set with flann_set_distance_type().
+ */
+FLANN_EXPORT int flann_find_nearest_neighbors_with_distance(float* dataset,
+                                                            int rows,
+                                                            int cols,
+                                                            float* testset,
+                                                            int trows,
+                                                            int* indices,
+                                                            float* dists,
+                                                            int nn,
+                                                            struct FLANNParameters* flann_params,
+                                                            enum flann_distance_t distance_type,
+                                                            int order);
+
+FLANN_EXPORT int flann_find_nearest_neighbors_with_distance_float(float* dataset,
+                                                                  int rows,
+                                                                  int cols,
+                                                                  float* testset,
+                                                                  int trows,
+                                                                  int* indices,
+                                                                  float* dists,
+                                                                  int nn,
+                                                                  struct FLANNParameters* flann_params,
+                                                                  enum flann_distance_t distance_type,
+                                                                  int order);
+
+FLANN_EXPORT int flann_find_nearest_neighbors_with_distance_double(double* dataset,
+                                                                   int rows,
+                                                                   int cols,
+                                                                   double* testset,
+                                                                   int trows,
+                                                                   int* indices,
+                                                                   double* dists,
+                                                                   int nn,
+                                                                   struct FLANNParameters* flann_params,
+                                                                   enum flann_distance_t distance_type,
+                                                                   int order);
+
+FLANN_EXPORT int flann_find_nearest_neighbors_with_distance_byte(unsigned char* dataset,
+                                                                 int rows,
+                                                                 int cols,
+                                                                 unsigned char* testset,
+                                                                 int trows,
+                                                                 int* indices,
+                                                                 float* dists,
+                                                                 int nn,
+                                                                 struct FLANNParameters* flann_params,
+                                                                 enum flann_distance_t distance_type,
+                                                                 int order);
+
+FLANN_EXPORT int flann_find_nearest_neighbors_with_distance_int(int* dataset,
+                                                                int rows,
+                                                                int cols,
+                                                                int* testset,
+                                                                int trows,
+                                                                int* indices,
+                                                                float* dists,
+                                                                int nn,
+                                                                struct FLANNParameters* flann_params,
+                                                                enum flann_distance_t distance_type,
+                                                                int order);
+
+FLANN_EXPORT int flann_find_nearest_neighbors_with_distance_int8(signed char* dataset,
+                                                                 int rows,
+                                                                 int cols,
+                                                                 signed char* testset,
+                                                                 int trows,
+                                                                 int* indices,
+                                                                 float* dists,
+                                                                 int nn,
+                                                                 struct FLANNParameters* flann_params,
+                                                                 enum flann_distance_t distance_type,
+                                                                 int order);
+
+FLANN_EXPORT int flann_find_nearest_neighbors_with_distance_float16(flann_float16_t* dataset,
+                                                                    int rows,
+                                                                    int cols,
+                                                                    flann_float16_t* testset,
+                                                                    int trows,
+                                                                    int* indices,
+                                                                    float* dists,
+                                                                    int nn,
+                                                                    struct FLANNParameters* flann_params,
+                                                                    enum flann_distance_t distance_type,
+                                                                    int order);
+
 
 /**
    Searches for nearest neighbors using the index provided
@@ -462,6 +953,118 @@ FLANN_EXPORT int flann_find_nearest_neighbors_index_int(flann_index_t index_id,
                                                         int nn,
                                                         struct FLANNParameters* flann_params);
 
+FLANN_EXPORT int flann_find_nearest_neighbors_index_int8(flann_index_t index_id,
+                                                         signed char* testset,
+                                                         int trows,
+                                                         int* indices,
+                                                         float* dists,
+                                                         int nn,
+                                                         struct FLANNParameters* flann_params);
+
+FLANN_EXPORT int flann_find_nearest_neighbors_index_float16(flann_index_t index_id,
+                                                            flann_float16_t* testset,
+                                                            int trows,
+                                                            int* indices,
+                                                            float* dists,
+                                                            int nn,
+                                                            struct FLANNParameters* flann_params);
+
+
+/**
+   Searches for nearest neighbors using the index provided, only among the
+   points allowed by a filter. The points filtered out are skipped during
+   the search, as removed points are, so they do not count in the checks.
+
+   Params:
+    index_id = the index (constructed previously using flann_build_index).
+    testset = pointer to a query set stored in row major order
+    trows = number of rows (features) in the query dataset (same dimensionality as features in the dataset)
+    indices = pointer to matrix for the indices of the nearest neighbors of the testset features in the dataset
+            (must have trows number of rows and nn number of columns)
+    dists = pointer to matrix for the distances of the nearest neighbors of the testset features in the dataset
+            (must have trows number of rows and nn number of columns)
+    nn = how many nearest neighbors to return
+    filter = bitset of the ids of the points that can be returned: bit i, stored
+            in bit i%8 (least significant first) of byte i/8, is set if the point
+            with id i is allowed
+    filter_size = number of bits in filter, the points with larger ids are not allowed
+    flann_params = generic flann parameters
+
+   When less than nn allowed points are found for a query, the remaining
+   indices are -1 and the remaining distances are infinite.
+
+   Returns: zero or a number <0 for error
+ */
+FLANN_EXPORT int flann_find_nearest_neighbors_index_filtered(flann_index_t index_id,
+                                                             float* testset,
+                                                             int trows,
+                                                             int* indices,
+                                                             float* dists,
+                                                             int nn,
+                                                             const unsigned char* filter,
+                                                             int filter_size,
+                                                             struct FLANNParameters* flann_params);
+
+FLANN_EXPORT int flann_find_nearest_neighbors_index_filtered_float(flann_index_t index_id,
+                                                                   float* testset,
+                                                                   int trows,
+                                                                   int* indices,
+                                                                   float* dists,
+                                                                   int nn,
+                                                                   const unsigned char* filter,
+                                                                   int filter_size,
+                                                                   struct FLANNParameters* flann_params);
+
+FLANN_EXPORT int flann_find_nearest_neighbors_index_filtered_double(flann_index_t index_id,
+                                                                    double* testset,
+                                                                    int trows,
+                                                                    int* indices,
+                                                                    double* dists,
+                                                                    int nn,
+                                                                    const unsigned char* filter,
+                                                                    int filter_size,
+                                                                    struct FLANNParameters* flann_params);
+
+FLANN_EXPORT int flann_find_nearest_neighbors_index_filtered_byte(flann_index_t index_id,
+                                                                  unsigned char* testset,
+                                                                  int trows,
+                                                                  int* indices,
+                                                                  float* dists,
+                                                                  int nn,
+                                                                  const unsigned char* filter,
+                                                                  int filter_size,
+                                                                  struct FLANNParameters* flann_params);
+
+FLANN_EXPORT int flann_find_nearest_neighbors_index_filtered_int(flann_index_t index_id,
+                                                                 int* testset,
+                                                                 int trows,
+                                                                 int* indices,
+                                                                 float* dists,
+                                                                 int nn,
+                                                                 const unsigned char* filter,
+                                                                 int filter_size,
+                                                                 struct FLANNParameters* flann_params);
+
+FLANN_EXPORT int flann_find_nearest_neighbors_index_filtered_int8(flann_index_t index_id,
+                                                                  signed char* testset,
+                                                                  int trows,
+                                                                  int* indices,
+                                                                  float* dists,
+                                                                  int nn,
+                                                                  const unsigned char* filter,
+                                                                  int filter_size,
+                                                                  struct FLANNParameters* flann_params);
+
+FLANN_EXPORT int flann_find_nearest_neighbors_index_filtered_float16(flann_index_t index_id,
+                                                                     flann_float16_t* testset,
+                                                                     int trows,
+                                                                     int* indices,
+                                                                     float* dists,
+                                                                     int nn,
+                                                                     const unsigned char* filter,
+                                                                     int filter_size,
+                                                                     struct FLANNParameters* flann_params);
+
 
 /**
  * Performs an radius search using an already constructed index.
@@ -517,6 +1120,106 @@ FLANN_EXPORT int flann_radius_search_int(flann_index_t index_ptr, /* the index *
                                          float radius, /* search radius (squared radius for euclidian metric) */
                                          struct FLANNParameters* flann_params);
 
+FLANN_EXPORT int flann_radius_search_int8(flann_index_t index_ptr, /* the index */
+                                          signed char* query, /* query point */
+                                          int* indices, /* array for storing the indices found (will be modified) */
+                                          float* dists, /* similar, but for storing distances */
+                                          int max_nn,  /* size of arrays indices and dists */
+                                          float radius, /* search radius (squared radius for euclidian metric) */
+                                          struct FLANNParameters* flann_params);
+
+FLANN_EXPORT int flann_radius_search_float16(flann_index_t index_ptr, /* the index */
+                                             flann_float16_t* query, /* query point */
+                                             int* indices, /* array for storing the indices found (will be modified) */
+                                             float* dists, /* similar, but for storing distances */
+                                             int max_nn,  /* size of arrays indices and dists */
+                                             float radius, /* search radius (squared radius for euclidian metric) */
+                                             struct FLANNParameters* flann_params);
+
+/**
+ * Performs a radius search for several query points at once using an already
+ * constructed index.
+ *
+ * The results are returned in compressed row layout: the neighbours of query i
+ * are stored in (*indices)[indptr[i]..indptr[i+1]-1] and the corresponding
+ * distances in (*dists)[indptr[i]..indptr[i+1]-1]. The indices and dists arrays
+ * are allocated by FLANN and must be released with flann_free_buffer().
+ *
+ * The max_neighbors field of FLANNParameters limits the number of neighbours
+ * returned for each query point (-1 for no limit). The search is performed in
+ * parallel if the cores field is different than 1.
+ *
+ * Returns: the total number of neighbours returned or a number <0 for error
+ */
+FLANN_EXPORT int flann_radius_search_multi(flann_index_t index_ptr, /* the index */
+                                           float* queries, /* query points */
+                                           int tcount, /* number of query points */
+                                           int* indptr, /* array of size tcount+1 for storing the row offsets (will be modified) */
+                                           int** indices, /* set to an array with the indices found */
+                                           float** dists, /* set to an array with the distances found */
+                                           float radius, /* search radius (squared radius for euclidian metric) */
+                                           struct FLANNParameters* flann_params);
+
+FLANN_EXPORT int flann_radius_search_multi_float(flann_index_t index_ptr, /* the index */
+                                                 float* queries, /* query points */
+                                                 int tcount, /* number of query points */
+                                                 int* indptr, /* array of size tcount+1 for storing the row offsets (will be modified) */
+                                                 int** indices, /* set to an array with the indices found */
+                                                 float** dists, /* set to an array with the distances found */
+                                                 float radius, /* search radius (squared radius for euclidian metric) */
+                                                 struct FLANNParameters* flann_params);
+
+FLANN_EXPORT int flann_radius_search_multi_double(flann_index_t index_ptr, /* the index */
+                                                  double* queries, /* query points */
+                                                  int tcount, /* number of query points */
+                                                  int* indptr, /* array of size tcount+1 for storing the row offsets (will be modified) */
+                                                  int** indices, /* set to an array with the indices found */
+                                                  double** dists, /* set to an array with the distances found */
+                                                  float radius, /* search radius (squared radius for euclidian metric) */
+                                                  struct FLANNParameters* flann_params);
+
+FLANN_EXPORT int flann_radius_search_multi_byte(flann_index_t index_ptr, /* the index */
+                                                unsigned char* queries, /* query points */
+                                                int tcount, /* number of query points */
+                                                int* indptr, /* array of size tcount+1 for storing the row offsets (will be modified) */
+                                                int** indices, /* set to an array with the indices found */
+                                                float** dists, /* set to an array with the distances found */
+                                                float radius, /* search radius (squared radius for euclidian metric) */
+                                                struct FLANNParameters* flann_params);
+
+FLANN_EXPORT int flann_radius_search_multi_int(flann_index_t index_ptr, /* the index */
+                                               int* queries, /* query points */
+                                               int tcount, /* number of query points */
+                                               int* indptr, /* array of size tcount+1 for storing the row offsets (will be modified) */
+                                               int** indices, /* set to an array with the indices found */
+                                               float** dists, /* set to an array with the distances found */
+                                               float radius, /* search radius (squared radius for euclidian metric) */
+                                               struct FLANNParameters* flann_params);
+
+FLANN_EXPORT int flann_radius_search_multi_int8(flann_index_t index_ptr, /* the index */
+                                                signed char* queries, /* query points */
+                                                int tcount, /* number of query points */
+                                                int* indptr, /* array of size tcount+1 for storing the row offsets (will be modified) */
+                                                int** indices, /* set to an array with the indices found */
+                                                float** dists, /* set to an array with the distances found */
+                                                float radius, /* search radius (squared radius for euclidian metric) */
+                                                struct FLANNParameters* flann_params);
+
+FLANN_EXPORT int flann_radius_search_multi_float16(flann_index_t index_ptr, /* the index */
+                                                   flann_float16_t* queries, /* query points */
+                                                   int tcount, /* number of query points */
+                                                   int* indptr, /* array of size tcount+1 for storing the row offsets (will be modified) */
+                                                   int** indices, /* set to an array with the indices found */
+                                                   float** dists, /* set to an array with the distances found */
+                                                   float radius, /* search radius (squared radius for euclidian metric) */
+                                                   struct FLANNParameters* flann_params);
+
+/**
+ * Releases a buffer allocated by FLANN (for example the result arrays of
+ * flann_radius_search_multi).
+ */
+FLANN_EXPORT void flann_free_buffer(void* buffer);
+
 /**
    Deletes an index and releases the memory used by it.
 
@@ -541,6 +1244,12 @@ FLANN_EXPORT int flann_free_index_byte(flann_index_t index_id,
 FLANN_EXPORT int flann_free_index_int(flann_index_t index_id,
                                       struct FLANNParameters* flann_params);
 
+FLANN_EXPORT int flann_free_index_int8(flann_index_t index_id,
+                                       struct FLANNParameters* flann_params);
+
+FLANN_EXPORT int flann_free_index_float16(flann_index_t index_id,
+                                          struct FLANNParameters* flann_params);
+
 /**
    Clusters the features in the dataset using a hierarchical kmeans clustering approach.
    This is significantly faster than using a flat kmeans clustering for a large number
@@ -595,6 +1304,267 @@ FLANN_EXPORT int flann_compute_cluster_centers_int(int* dataset,
                                                    float* result,
                                                    struct FLANNParameters* flann_params);
 
+FLANN_EXPORT int flann_compute_cluster_centers_int8(signed char* dataset,
+                                                    int rows,
+                                                    int cols,
+                                                    int clusters,
+                                                    float* result,
+                                                    struct FLANNParameters* flann_params);
+
+FLANN_EXPORT int flann_compute_cluster_centers_float16(flann_float16_t* dataset,
+                                                       int rows,
+                                                       int cols,
+                                                       int clusters,
+                                                       float* result,
+                                                       struct FLANNParameters* flann_params);
+
+/**
+   Same as flann_compute_cluster_centers, but uses the given distance instead of the one
+   set with flann_set_distance_type().
+ */
+FLANN_EXPORT int flann_compute_cluster_centers_with_distance(float* dataset,
+                                                             int rows,
+                                                             int cols,
+                                                             int clusters,
+                                                             float* result,
+                                                             struct FLANNParameters* flann_params,
+                                                             enum flann_distance_t distance_type,
+                                                             int order);
+
+FLANN_EXPORT int flann_compute_cluster_centers_with_distance_float(float* dataset,
+                                                                   int rows,
+                                                                   int cols,
+                                                                   int clusters,
+                                                                   float* result,
+                                                                   struct FLANNParameters* flann_params,
+                                                                   enum flann_distance_t distance_type,
+                                                                   int order);
+
+FLANN_EXPORT int flann_compute_cluster_centers_with_distance_double(double* dataset,
+                                                                    int rows,
+                                                                    int cols,
+                                                                    int clusters,
+                                                                    double* result,
+                                                                    struct FLANNParameters* flann_params,
+                                                                    enum flann_distance_t distance_type,
+                                                                    int order);
+
+FLANN_EXPORT int flann_compute_cluster_centers_with_distance_byte(unsigned char* dataset,
+                                                                  int rows,
+                                                                  int cols,
+                                                                  int clusters,
+                                                                  float* result,
+                                                                  struct FLANNParameters* flann_params,
+                                                                  enum flann_distance_t distance_type,
+                                                                  int order);
+
+FLANN_EXPORT int flann_compute_cluster_centers_with_distance_int(int* dataset,
+                                                                 int rows,
+                                                                 int cols,
+                                                                 int clusters,
+                                                                 float* result,
+                                                                 struct FLANNParameters* flann_params,
+                                                                 enum flann_distance_t distance_type,
+                                                                 int order);
+
+FLANN_EXPORT int flann_compute_cluster_centers_with_distance_int8(signed char* dataset,
+                                                                  int rows,
+                                                                  int cols,
+                                                                  int clusters,
+                                                                  float* result,
+                                                                  struct FLANNParameters* flann_params,
+                                                                  enum flann_distance_t distance_type,
+                                                                  int order);
+
+FLANN_EXPORT int flann_compute_cluster_centers_with_distance_float16(flann_float16_t* dataset,
+                                                                     int rows,
+                                                                     int cols,
+                                                                     int clusters,
+                                                                     float* result,
+                                                                     struct FLANNParameters* flann_params,
+                                                                     enum flann_distance_t distance_type,
+                                                                     int order);
+
+
+/**
+   Computes the exact nearest neighbors of the points in the testset with a
+   linear search of the dataset (the ground truth used to measure the precision
+   of the approximate searches). The test points are searched in parallel on
+   flann_params->cores threads.
+
+   Params:
+    dataset = pointer to a data set stored in row major order
+    rows = number of rows (features) in the dataset
+    cols = number of columns in the dataset (feature dimensionality)
+    testset = pointer to a query set stored in row major order
+    tcount = number of rows (features) in the query dataset (same dimensionality as features in the dataset)
+    result = pointer to matrix for the indices of the nearest neighbors of the testset features in the dataset
+            (must have tcount number of rows and nn number of columns)
+    nn = how many nearest neighbors to return
+    skip = how many of the nearest neighbors to skip (e.g. 1 when the testset is part of the dataset)
+    flann_params = generic flann parameters
+
+   Returns: zero or -1 for error
+ */
+
+FLANN_EXPORT int flann_compute_ground_truth(float* dataset,
+                                            int rows,
+                                            int cols,
+                                            float* testset,
+                                            int tcount,
+                                            int* result,
+                                            int nn,
+                                            int skip,
+                                            struct FLANNParameters* flann_params);
+
+FLANN_EXPORT int flann_compute_ground_truth_float(float* dataset,
+                                                  int rows,
+                                                  int cols,
+                                                  float* testset,
+                                                  int tcount,
+                                                  int* result,
+                                                  int nn,
+                                                  int skip,
+                                                  struct FLANNParameters* flann_params);
+
+FLANN_EXPORT int flann_compute_ground_truth_double(double* dataset,
+                                                   int rows,
+                                                   int cols,
+                                                   double* testset,
+                                                   int tcount,
+                                                   int* result,
+                                                   int nn,
+                                                   int skip,
+                                                   struct FLANNParameters* flann_params);
+
+FLANN_EXPORT int flann_compute_ground_truth_byte(unsigned char* dataset,
+                                                 int rows,
+                                                 int cols,
+                                                 unsigned char* testset,
+                                                 int tcount,
+                                                 int* result,
+                                                 int nn,
+                                                 int skip,
+                                                 struct FLANNParameters* flann_params);
+
+FLANN_EXPORT int flann_compute_ground_truth_int(int* dataset,
+                                                int rows,
+                                                int cols,
+                                                int* testset,
+                                                int tcount,
+                                                int* result,
+                                                int nn,
+                                                int skip,
+                                                struct FLANNParameters* flann_params);
+
+FLANN_EXPORT int flann_compute_ground_truth_int8(signed char* dataset,
+                                                 int rows,
+                                                 int cols,
+                                                 signed char* testset,
+                                                 int tcount,
+                                                 int* result,
+                                                 int nn,
+                                                 int skip,
+                                                 struct FLANNParameters* flann_params);
+
+FLANN_EXPORT int flann_compute_ground_truth_float16(flann_float16_t* dataset,
+                                                    int rows,
+                                                    int cols,
+                                                    flann_float16_t* testset,
+                                                    int tcount,
+                                                    int* result,
+                                                    int nn,
+                                                    int skip,
+                                                    struct FLANNParameters* flann_params);
+
+/**
+   Same as flann_compute_ground_truth, but uses the given distance instead of the one
+   set with flann_set_distance_type().
+ */
+FLANN_EXPORT int flann_compute_ground_truth_with_distance(float* dataset,
+                                                          int rows,
+                                                          int cols,
+                                                          float* testset,
+                                                          int tcount,
+                                                          int* result,
+                                                          int nn,
+                                                          int skip,
+                                                          struct FLANNParameters* flann_params,
+                                                          enum flann_distance_t distance_type,
+                                                          int order);
+
+FLANN_EXPORT int flann_compute_ground_truth_with_distance_float(float* dataset,
+                                                                int rows,
+                                                                int cols,
+                                                                float* testset,
+                                                                int tcount,
+                                                                int* result,
+                                                                int nn,
+                                                                int skip,
+                                                                struct FLANNParameters* flann_params,
+                                                                enum flann_distance_t distance_type,
+                                                                int order);
+
+FLANN_EXPORT int flann_compute_ground_truth_with_distance_double(double* dataset,
+                                                                 int rows,
+                                                                 int cols,
+                                                                 double* testset,
+                                                                 int tcount,
+                                                                 int* result,
+                                                                 int nn,
+                                                                 int skip,
+                                                                 struct FLANNParameters* flann_params,
+                                                                 enum flann_distance_t distance_type,
+                                                                 int order);
+
+FLANN_EXPORT int flann_compute_ground_truth_with_distance_byte(unsigned char* dataset,
+                                                               int rows,
+                                                               int cols,
+                                                               unsigned char* testset,
+                                                               int tcount,
+                                                               int* result,
+                                                               int nn,
+                                                               int skip,
+                                                               struct FLANNParameters* flann_params,
+                                                               enum flann_distance_t distance_type,
+                                                               int order);
+
+FLANN_EXPORT int flann_compute_ground_truth_with_distance_int(int* dataset,
+                                                              int rows,
+                                                              int cols,
+                                                              int* testset,
+                                                              int tcount,
+                                                              int* result,
+                                                              int nn,
+                                                              int skip,
+                                                              struct FLANNParameters* flann_params,
+                                                              enum flann_distance_t distance_type,
+                                                              int order);
+
+FLANN_EXPORT int flann_compute_ground_truth_with_distance_int8(signed char* dataset,
+                                                               int rows,
+                                                               int cols,
+                                                               signed char* testset,
+                                                               int tcount,
+                                                               int* result,
+                                                               int nn,
+                                                               int skip,
+                                                               struct FLANNParameters* flann_params,
+                                                               enum flann_distance_t distance_type,
+                                                               int order);
+
+FLANN_EXPORT int flann_compute_ground_truth_with_distance_float16(flann_float16_t* dataset,
+                                                                  int rows,
+                                                                  int cols,
+                                                                  flann_float16_t* testset,
+                                                                  int tcount,
+                                                                  int* result,
+                                                                  int nn,
+                                                                  int skip,
+                                                                  struct FLANNParameters* flann_params,
+                                                                  enum flann_distance_t distance_type,
+                                                                  int order);
+
 
 #ifdef __cplusplus
 }
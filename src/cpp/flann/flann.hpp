@@ -115,6 +115,17 @@ public:
     }
 
 
+    /**
+     * Loads an index saved with save(FILE*) from a stream.
+     */
+    Index(const Matrix<ElementType>& features, FILE* stream, Distance distance = Distance() )
+    {
+        index_params_["algorithm"] = FLANN_INDEX_SAVED;
+        nnIndex_ = load_saved_index(features, stream, distance);
+        loaded_ = true;
+    }
+
+
     Index(const Index& other) : loaded_(other.loaded_), index_params_(other.index_params_)
     {
     	nnIndex_ = other.nnIndex_->clone();
@@ -184,6 +195,15 @@ public:
         fclose(fout);
     }
 
+    /**
+     * Save index to a stream
+     * @param stream
+     */
+    void save(FILE* stream)
+    {
+        nnIndex_->saveIndex(stream);
+    }
+
     /**
      * \returns number of features in this index.
      */
@@ -211,7 +231,7 @@ public:
     /**
      * \returns The amount of memory (in bytes) used by the index.
      */
-    int usedMemory() const
+    size_t usedMemory() const
     {
         return nnIndex_->usedMemory();
     }
@@ -374,6 +394,15 @@ private:
         if (fin == NULL) {
             return NULL;
         }
+        IndexType* nnIndex = load_saved_index(dataset, fin, distance);
+        fclose(fin);
+
+        return nnIndex;
+    }
+
+    IndexType* load_saved_index(const Matrix<ElementType>& dataset, FILE* fin, Distance distance)
+    {
+        long pos = ftell(fin);
         IndexHeader header = load_header(fin);
         if (header.h.data_type != flann_datatype_value<ElementType>::value) {
             throw FLANNException("Datatype of saved index is different than of the one to be loaded.");
@@ -382,9 +411,8 @@ private:
         IndexParams params;
         params["algorithm"] = header.h.index_type;
         IndexType* nnIndex = create_index_by_type<Distance>(header.h.index_type, dataset, params, distance);
-        rewind(fin);
+        fseek(fin, pos, SEEK_SET);
         nnIndex->loadIndex(fin);
-        fclose(fin);
 
         return nnIndex;
     }
@@ -32,6 +32,7 @@
 #define FLANN_GENERAL_H_
 
 #include "defines.h"
+#include "flann/util/float16.h"
 #include <stdexcept>
 #include <cassert>
 #include <limits.h>
@@ -60,6 +61,12 @@ struct flann_datatype_value<char>
 	static const flann_datatype_t value = FLANN_INT8;
 };
 
+template<>
+struct flann_datatype_value<signed char>
+{
+	static const flann_datatype_t value = FLANN_INT8;
+};
+
 template<>
 struct flann_datatype_value<short>
 {
@@ -119,6 +126,12 @@ struct flann_datatype_value<double>
 	static const flann_datatype_t value = FLANN_FLOAT64;
 };
 
+template<>
+struct flann_datatype_value<float16>
+{
+	static const flann_datatype_t value = FLANN_FLOAT16;
+};
+
 
 
 template <flann_datatype_t datatype>
@@ -192,6 +205,12 @@ struct flann_datatype_type<FLANN_FLOAT64>
 	typedef double type;
 };
 
+template<>
+struct flann_datatype_type<FLANN_FLOAT16>
+{
+	typedef float16 type;
+};
+
 
 inline size_t flann_datatype_size(flann_datatype_t type)
 {
@@ -216,6 +235,8 @@ inline size_t flann_datatype_size(flann_datatype_t type)
 		return sizeof(flann_datatype_type<FLANN_FLOAT32>::type);
 	case FLANN_FLOAT64:
 		return sizeof(flann_datatype_type<FLANN_FLOAT64>::type);
+	case FLANN_FLOAT16:
+		return sizeof(flann_datatype_type<FLANN_FLOAT16>::type);
 	default:
 		return 0;
 	}
@@ -85,9 +85,11 @@ void find_nearest(const Matrix<typename Distance::ElementType>& dataset, typenam
 
 template <typename Distance>
 void compute_ground_truth(const Matrix<typename Distance::ElementType>& dataset, const Matrix<typename Distance::ElementType>& testset, Matrix<size_t>& matches,
-                          int skip=0, Distance d = Distance())
+                          int skip=0, Distance d = Distance(), int cores = 1)
 {
-    for (size_t i=0; i<testset.rows; ++i) {
+    int rows = (int)testset.rows;
+#pragma omp parallel for schedule(dynamic, 16) num_threads(cores)
+    for (int i=0; i<rows; ++i) {
         find_nearest<Distance>(dataset, testset[i], matches[i], matches.cols, skip, d);
     }
 }
@@ -82,7 +82,12 @@ typename Distance::ResultType computeDistanceRaport(const Matrix<typename Distan
     return ret;
 }
 
-template <typename Index, typename Distance>
+/**
+ * Searches testData in the index with the given checks and returns the
+ * precision. The time of a search of the whole testData, measured with a
+ * Timer (see util/timer.h), is returned in time.
+ */
+template <typename Timer = StartStopTimer, typename Index, typename Distance>
 float search_with_ground_truth(Index& index, const Matrix<typename Distance::ElementType>& inputData,
                                const Matrix<typename Distance::ElementType>& testData, const Matrix<size_t>& matches, int nn, int checks,
                                float& time, typename Distance::ResultType& dist, const Distance& distance, int skipMatches)
@@ -107,7 +112,7 @@ float search_with_ground_truth(Index& index, const Matrix<typename Distance::Ele
 
     int correct = 0;
     DistanceType distR = 0;
-    StartStopTimer t;
+    Timer t;
     int repeats = 0;
     while (t.value<0.2) {
         repeats++;
@@ -155,7 +160,7 @@ float test_index_checks(Index& index, const Matrix<typename Distance::ElementTyp
     return time;
 }
 
-template <typename Index, typename Distance>
+template <typename Timer = StartStopTimer, typename Index, typename Distance>
 float test_index_precision(Index& index, const Matrix<typename Distance::ElementType>& inputData,
                            const Matrix<typename Distance::ElementType>& testData, const Matrix<size_t>& matches,
                            float precision, int& checks, const Distance& distance, int nn = 1, int skipMatches = 0)
@@ -173,7 +178,7 @@ float test_index_precision(Index& index, const Matrix<typename Distance::Element
     float time;
     DistanceType dist;
 
-    p2 = search_with_ground_truth(index, inputData, testData, matches, nn, c2, time, dist, distance, skipMatches);
+    p2 = search_with_ground_truth<Timer>(index, inputData, testData, matches, nn, c2, time, dist, distance, skipMatches);
 
     if (p2>precision) {
         Logger::info("Got as close as I can\n");
@@ -185,7 +190,7 @@ float test_index_precision(Index& index, const Matrix<typename Distance::Element
         c1 = c2;
 //         p1 = p2;
         c2 *=2;
-        p2 = search_with_ground_truth(index, inputData, testData, matches, nn, c2, time, dist, distance, skipMatches);
+        p2 = search_with_ground_truth<Timer>(index, inputData, testData, matches, nn, c2, time, dist, distance, skipMatches);
     }
 
     int cx;
@@ -196,7 +201,7 @@ float test_index_precision(Index& index, const Matrix<typename Distance::Element
         // use linear approximation get a better estimation
 
         cx = (c1+c2)/2;
-        realPrecision = search_with_ground_truth(index, inputData, testData, matches, nn, cx, time, dist, distance, skipMatches);
+        realPrecision = search_with_ground_truth<Timer>(index, inputData, testData, matches, nn, cx, time, dist, distance, skipMatches);
         while (fabs(realPrecision-precision)>SEARCH_EPS) {
 
             if (realPrecision<precision) {
@@ -210,7 +215,7 @@ float test_index_precision(Index& index, const Matrix<typename Distance::Element
                 Logger::info("Got as close as I can\n");
                 break;
             }
-            realPrecision = search_with_ground_truth(index, inputData, testData, matches, nn, cx, time, dist, distance, skipMatches);
+            realPrecision = search_with_ground_truth<Timer>(index, inputData, testData, matches, nn, cx, time, dist, distance, skipMatches);
         }
 
         c2 = cx;
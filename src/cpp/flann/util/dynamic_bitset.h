@@ -42,6 +42,10 @@ typedef boost::dynamic_bitset<> DynamicBitset;
 #else
 
 #include <limits.h>
+#include <algorithm>
+#include <vector>
+
+#include "flann/util/serialization.h"
 
 namespace flann {
 
@@ -0,0 +1,147 @@
+/***********************************************************************
+ * Software License Agreement (BSD License)
+ *
+ * Copyright 2008-2009  Marius Muja (mariusm@cs.ubc.ca). All rights reserved.
+ * Copyright 2008-2009  David G. Lowe (lowe@cs.ubc.ca). All rights reserved.
+ *
+ * THE BSD LICENSE
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ *
+ * 1. Redistributions of source code must retain the above copyright
+ *    notice, this list of conditions and the following disclaimer.
+ * 2. Redistributions in binary form must reproduce the above copyright
+ *    notice, this list of conditions and the following disclaimer in the
+ *    documentation and/or other materials provided with the distribution.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+ * IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+ * OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+ * IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY DIRECT, INDIRECT,
+ * INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+ * NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+ * DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+ * THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+ * THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ *************************************************************************/
+
+
+#ifndef FLANN_FLOAT16_H
+#define FLANN_FLOAT16_H
+
+#include <cstring>
+
+
+namespace flann
+{
+
+/**
+ * IEEE 754 half precision floating point number.
+ *
+ * Only used to store points in half the memory of floats: a float16 converts
+ * to float, in which all the computations are done (see Accumulator in dist.h).
+ */
+struct float16
+{
+    unsigned short bits;
+
+    float16() {}
+
+    explicit float16(float f) : bits(from_float(f)) {}
+
+    operator float() const
+    {
+        return to_float(bits);
+    }
+
+    static float to_float(unsigned short h)
+    {
+        // without the F16C instructions, looking the 65536 values up is
+        // faster than converting them
+        return table().values[h];
+    }
+
+    static unsigned short from_float(float value)
+    {
+        // rounds to nearest even
+        const unsigned int f32_infinity = 255u << 23;
+        const unsigned int f16_max = (127u + 16) << 23;
+        const unsigned int denorm_magic_bits = ((127u - 15) + (23 - 10) + 1) << 23;
+
+        unsigned int u;
+        std::memcpy(&u, &value, sizeof(u));
+        unsigned int sign = u & 0x80000000u;
+        u ^= sign;
+
+        unsigned short h;
+        if (u >= f16_max) {
+            // overflows to infinity, NaN stays NaN
+            h = (u > f32_infinity) ? 0x7e00 : 0x7c00;
+        }
+        else if (u < (113u << 23)) {
+            // zero or subnormal, rounded by a float addition
+            float f, denorm_magic;
+            std::memcpy(&f, &u, sizeof(f));
+            std::memcpy(&denorm_magic, &denorm_magic_bits, sizeof(denorm_magic));
+            f += denorm_magic;
+            std::memcpy(&u, &f, sizeof(u));
+            h = (unsigned short)(u - denorm_magic_bits);
+        }
+        else {
+            unsigned int mant_odd = (u >> 13) & 1;
+            u += ((unsigned int)(15 - 127) << 23) + 0xfff;
+            u += mant_odd;
+            h = (unsigned short)(u >> 13);
+        }
+        return (unsigned short)(h | (sign >> 16));
+    }
+
+private:
+    struct Table
+    {
+        float values[65536];
+
+        Table()
+        {
+            for (unsigned int h = 0; h < 65536; ++h) {
+                values[h] = convert((unsigned short)h);
+            }
+        }
+    };
+
+    static const Table& table()
+    {
+        // a local static is built on first use, so the conversions done
+        // during the static initialization of other translation units do
+        // not depend on the order in which they are initialized
+        static const Table instance;
+        return instance;
+    }
+
+    static float convert(unsigned short h)
+    {
+        // the exponent is rebiased by a multiplication by 2^112, which also
+        // normalizes the subnormals
+        const unsigned int rebias_bits = (127u + 112) << 23;
+        float f, rebias;
+        unsigned int u = (h & 0x7fffu) << 13;
+        std::memcpy(&f, &u, sizeof(f));
+        std::memcpy(&rebias, &rebias_bits, sizeof(rebias));
+        f *= rebias;
+        std::memcpy(&u, &f, sizeof(u));
+        if ((h & 0x7c00u) == 0x7c00u) {
+            // infinity or NaN
+            u |= 0x7f800000u;
+        }
+        u |= (h & 0x8000u) << 16;
+        std::memcpy(&f, &u, sizeof(f));
+        return f;
+    }
+};
+
+}
+
+#endif // FLANN_FLOAT16_H
@@ -49,6 +49,7 @@
 #include <math.h>
 #include <stddef.h>
 
+#include "flann/general.h"
 #include "flann/util/dynamic_bitset.h"
 #include "flann/util/matrix.h"
 
@@ -151,8 +152,7 @@ public:
      */
     LshTable(unsigned int /*feature_size*/, unsigned int /*key_size*/)
     {
-        std::cerr << "LSH is not implemented for that type" << std::endl;
-        throw;
+        throw FLANNException("LSH is not implemented for that type");
     }
 
     /** Add a feature to the table
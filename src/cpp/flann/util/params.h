@@ -32,6 +32,7 @@
 
 #include "any.h"
 #include "flann/general.h"
+#include "flann/util/dynamic_bitset.h"
 #include <iostream>
 #include <map>
 
@@ -67,6 +68,7 @@ struct SearchParams
     	use_heap = FLANN_Undefined;
     	cores = 1;
     	matrices_in_gpu_ram = false;
+    	filter = NULL;
     }
 
     // how many leafs to visit when searching for neighbours (-1 for unlimited)
@@ -83,6 +85,8 @@ struct SearchParams
     int cores;
     // for GPU search indicates if matrices are already in GPU ram
     bool matrices_in_gpu_ram;
+    // if not NULL, only the points whose id has its bit set are searched (default: NULL)
+    const DynamicBitset* filter;
 };
 
 
@@ -43,12 +43,23 @@ namespace flann
 {
 
 /**
- * Seeds the random number generator
+ * Returns the random number generator of the calling thread. Each thread
+ * has its own, so that the indexes built concurrently (as the autotuning
+ * candidates are) each draw the numbers of the seed they were given.
+ */
+inline std::mt19937& random_generator()
+{
+    static thread_local std::mt19937 generator;
+    return generator;
+}
+
+/**
+ * Seeds the random number generator of the calling thread
  *  @param seed Random seed
  */
 inline void seed_random(unsigned int seed)
 {
-    srand(seed);
+    random_generator().seed(seed);
 }
 
 /**
@@ -59,7 +70,7 @@ inline void seed_random(unsigned int seed)
  */
 inline double rand_double(double high = 1.0, double low = 0)
 {
-  return low + ((high - low) * (std::rand() / (RAND_MAX + 1.0)));
+  return low + ((high - low) * (random_generator()() / (std::mt19937::max() + 1.0)));
 }
 
 /**
@@ -70,7 +81,7 @@ inline double rand_double(double high = 1.0, double low = 0)
  */
 inline int rand_int(int high = RAND_MAX, int low = 0)
 {
-  return low + (int)(double(high - low) * (std::rand() / (RAND_MAX + 1.0)));
+  return low + (int)(double(high - low) * (random_generator()() / (std::mt19937::max() + 1.0)));
 }
 
 
@@ -106,9 +117,7 @@ public:
         size_ = n;
         for (int i = 0; i < size_; ++i) vals_[i] = i;
 
-        std::random_device rd;
-        std::mt19937 g(rd());
-        std::shuffle(vals_.begin(), vals_.end(), g);
+        std::shuffle(vals_.begin(), vals_.end(), random_generator());
 
         counter_ = 0;
     }
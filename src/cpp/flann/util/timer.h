@@ -90,6 +90,67 @@ public:
 
 };
 
+
+/**
+ * A start-stop timer measuring the CPU time of the calling thread (the
+ * process CPU time where that is not available).
+ *
+ * Used to time code that runs concurrently in several threads, each
+ * being charged for its own work only. Unlike StartStopTimer, it does not
+ * account for the work of other threads started by the code it times.
+ */
+class ThreadCPUTimer
+{
+    double startTime;
+
+    static double now()
+    {
+#ifdef CLOCK_THREAD_CPUTIME_ID
+        struct timespec ts;
+        if (clock_gettime(CLOCK_THREAD_CPUTIME_ID, &ts) == 0) {
+            return ts.tv_sec + ts.tv_nsec * 1e-9;
+        }
+#endif
+        return (double)clock() / CLOCKS_PER_SEC;
+    }
+
+public:
+    /**
+     * Value of the timer.
+     */
+    double value;
+
+    ThreadCPUTimer()
+    {
+        reset();
+    }
+
+    /**
+     * Starts the timer.
+     */
+    void start()
+    {
+        startTime = now();
+    }
+
+    /**
+     * Stops the timer and updates timer value.
+     */
+    double stop()
+    {
+        value += now() - startTime;
+        return value;
+    }
+
+    /**
+     * Resets the timer value to 0.
+     */
+    void reset()
+    {
+        value = 0;
+    }
+};
+
 }
 
 #endif // FLANN_TIMER_H
@@ -75,6 +75,7 @@ static void matlabStructToFlannStruct( const mxArray* mexParams, FLANNParameters
     flannParams.build_weight = (float)*(mxGetPr(mxGetField(mexParams, 0,"build_weight")));
     flannParams.memory_weight = (float)*(mxGetPr(mxGetField(mexParams, 0,"memory_weight")));
     flannParams.sample_fraction = (float)*(mxGetPr(mxGetField(mexParams, 0,"sample_fraction")));
+    flannParams.max_tuning_seconds = 0;
 
     // misc
     flannParams.log_level = (flann_log_level_t)(int)*(mxGetPr(mxGetField(mexParams, 0,"log_level")));
@@ -91,11 +92,16 @@ static void matlabStructToFlannStruct( const mxArray* mexParams, FLANNParameters
     flannParams.table_number_ = (unsigned int)*(mxGetPr(mxGetField(mexParams, 0, "table_number")));
     flannParams.key_size_ = (unsigned int)*(mxGetPr(mxGetField(mexParams, 0, "key_size")));
     flannParams.multi_probe_level_ = (unsigned int)*(mxGetPr(mxGetField(mexParams, 0, "multi_probe_level")));
+
+    // pq
+    flannParams.subquantizers = (int)*(mxGetPr(mxGetField(mexParams, 0, "subquantizers")));
+    flannParams.code_bits = (int)*(mxGetPr(mxGetField(mexParams, 0, "code_bits")));
+    flannParams.coarse_clusters = (int)*(mxGetPr(mxGetField(mexParams, 0, "coarse_clusters")));
 }
 
 static mxArray* flannStructToMatlabStruct( const FLANNParameters& flannParams )
 {
-    const char* fieldnames[] = {"algorithm", "checks", "eps", "sorted", "max_neighbors", "cores", "trees", "leaf_max_size", "branching", "iterations", "centers_init", "cb_index", "table_number", "key_size", "multi_probe_level"};
+    const char* fieldnames[] = {"algorithm", "checks", "eps", "sorted", "max_neighbors", "cores", "trees", "leaf_max_size", "branching", "iterations", "centers_init", "cb_index", "table_number", "key_size", "multi_probe_level", "subquantizers", "code_bits", "coarse_clusters"};
     mxArray* mexParams = mxCreateStructMatrix(1, 1, sizeof(fieldnames)/sizeof(const char*), fieldnames);
 
     mxSetField(mexParams, 0, "algorithm", to_mx_array(flannParams.algorithm));
@@ -117,6 +123,10 @@ static mxArray* flannStructToMatlabStruct( const FLANNParameters& flannParams )
     mxSetField(mexParams, 0, "key_size", to_mx_array(flannParams.key_size_));
     mxSetField(mexParams, 0, "multi_probe_level", to_mx_array(flannParams.multi_probe_level_));
 
+    mxSetField(mexParams, 0, "subquantizers", to_mx_array(flannParams.subquantizers));
+    mxSetField(mexParams, 0, "code_bits", to_mx_array(flannParams.code_bits));
+    mxSetField(mexParams, 0, "coarse_clusters", to_mx_array(flannParams.coarse_clusters));
+
     return mexParams;
 }
 
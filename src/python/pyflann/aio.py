@@ -0,0 +1,138 @@
+#Copyright 2008-2010  Marius Muja (mariusm@cs.ubc.ca). All rights reserved.
+#Copyright 2008-2010  David G. Lowe (lowe@cs.ubc.ca). All rights reserved.
+#
+#THE BSD LICENSE
+#
+#Redistribution and use in source and binary forms, with or without
+#modification, are permitted provided that the following conditions
+#are met:
+#
+#1. Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+#2. Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+#
+#THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+#IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+#OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+#IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY DIRECT, INDIRECT,
+#INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+#NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+#THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# asyncio front-end of pyflann, requires python 3 and is therefore not
+# imported by the pyflann package itself.
+
+import asyncio
+import functools
+import numpy as np
+
+
+class _Batch(object):
+
+    def __init__(self):
+        self.queries = []
+        self.futures = []
+        self.size = 0
+        self.timer = None
+
+
+class AsyncFLANN(object):
+    """
+    asyncio front-end to a FLANN index that coalesces concurrent searches.
+
+    The queries of the searches issued within max_wait seconds of each
+    other are stacked and searched with a single nn_index call, run on
+    executor (the default executor of the event loop if None), so that
+    they use the parallel batch search of the index instead of a library
+    call each. A batch is searched as soon as it holds max_batch queries.
+    Only searches with the same num_neighbors and search parameters are
+    batched together, and only queries of the same dimension, so that a
+    search with queries of the wrong dimension fails on its own. Searches
+    restricted by the allowed or excluded filters of nn_index, or writing
+    their results to the out arrays, are not batched, each being searched
+    with its own nn_index call.
+    """
+
+    def __init__(self, flann, max_batch=256, max_wait=0.0005, executor=None):
+        self.flann = flann
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.executor = executor
+        self.__pending = {}
+        self.__tasks = set()
+
+    async def search(self, qpts, num_neighbors=1, **kwargs):
+        """
+        Returns the (result, dists) of the num_neighbors nearest neighbors
+        of qpts, with shape (num_neighbors,) if qpts is a single point and
+        (nqpts, num_neighbors) otherwise. The keyword arguments are the
+        search parameters passed to nn_index.
+        """
+        qpts = np.asarray(qpts)
+        single_query = qpts.ndim == 1
+        qpts = qpts.reshape(-1, qpts.shape[-1])
+
+        loop = asyncio.get_running_loop()
+        if any(kwargs.get(k) is not None for k in ('allowed', 'excluded', 'out')):
+            result, dists = await loop.run_in_executor(
+                self.executor, functools.partial(
+                    self.flann.nn_index, qpts, num_neighbors, **kwargs))
+            result = result.reshape(-1, num_neighbors)
+            dists = dists.reshape(-1, num_neighbors)
+        else:
+            key = (qpts.dtype, qpts.shape[1], num_neighbors, tuple(sorted(kwargs.items())))
+            batch = self.__pending.get(key)
+            if batch is None:
+                batch = self.__pending[key] = _Batch()
+                batch.timer = loop.call_later(self.max_wait, self.__flush, key)
+
+            future = loop.create_future()
+            batch.queries.append(qpts)
+            batch.futures.append(future)
+            batch.size += qpts.shape[0]
+            if batch.size >= self.max_batch:
+                self.__flush(key)
+
+            result, dists = await future
+
+        if single_query:
+            return (result[0], dists[0])
+        else:
+            return (result, dists)
+
+    def __flush(self, key):
+        batch = self.__pending.pop(key, None)
+        if batch is None:
+            return
+        batch.timer.cancel()
+        task = asyncio.ensure_future(self.__search(key, batch))
+        self.__tasks.add(task)
+        task.add_done_callback(self.__tasks.discard)
+
+    async def __search(self, key, batch):
+        dtype, dim, num_neighbors, params = key
+        loop = asyncio.get_running_loop()
+        try:
+            qpts = np.concatenate(batch.queries)
+            result, dists = await loop.run_in_executor(
+                self.executor, functools.partial(
+                    self.flann.nn_index, qpts, num_neighbors, **dict(params)))
+        except Exception as e:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        result = result.reshape(batch.size, num_neighbors)
+        dists = dists.reshape(batch.size, num_neighbors)
+        start = 0
+        for query, future in zip(batch.queries, batch.futures):
+            end = start + query.shape[0]
+            if not future.done():
+                future.set_result((result[start:end], dists[start:end]))
+            start = end
@@ -0,0 +1,205 @@
+#Copyright 2008-2010  Marius Muja (mariusm@cs.ubc.ca). All rights reserved.
+#Copyright 2008-2010  David G. Lowe (lowe@cs.ubc.ca). All rights reserved.
+#
+#THE BSD LICENSE
+#
+#Redistribution and use in source and binary forms, with or without
+#modification, are permitted provided that the following conditions
+#are met:
+#
+#1. Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+#2. Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+#
+#THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+#IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+#OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+#IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY DIRECT, INDIRECT,
+#INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+#NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+#THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Build and search benchmark of the FLANN algorithms:
+#
+#   python -m pyflann.bench --points 100000 --dim 128 --output bench.json
+
+import argparse
+import json
+import multiprocessing
+import platform
+import sys
+import time
+import numpy as np
+
+from pyflann.index import FLANN, load_dataset, ground_truth
+from pyflann.flann_ctypes import FLANNParameters
+from pyflann.exceptions import FLANNException
+
+
+algorithms = [a for a in sorted(FLANNParameters._translation_['algorithm'],
+                                key=FLANNParameters._translation_['algorithm'].get)
+              if a not in ('linear', 'saved', 'default')]
+
+
+def recall(result, exact):
+    """
+    Returns the fraction of the exact neighbors found in result, both
+    (nqpts, num_neighbors) arrays of point ids.
+    """
+    result = result.reshape(exact.shape)
+    found = sum(len(np.intersect1d(r, e)) for r, e in zip(result, exact))
+    return float(found) / exact.size
+
+
+def benchmark_algorithm(data, queries, exact, algorithm, num_neighbors=10,
+                        cores=(1,), latency_queries=1000, **kwargs):
+    """
+    Builds an index of data with the given algorithm and build
+    parameters and searches queries with it. Returns a dict with the
+    build time, the memory used by the index, the recall against the
+    exact neighbors, the queries per second for each number of cores and
+    the latency percentiles (in seconds) of single query searches.
+    """
+    nn = FLANN()
+    start = time.perf_counter()
+    params = nn.build_index(data, algorithm=algorithm, **kwargs)
+    build_time = time.perf_counter() - start
+
+    # autotuned indexes choose their own checks
+    search_params = {'checks': params['checks']}
+    if 'checks' in kwargs:
+        search_params['checks'] = kwargs['checks']
+
+    qps = {}
+    for c in cores:
+        start = time.perf_counter()
+        result, dists = nn.nn_index(queries, num_neighbors, cores=c, **search_params)
+        qps[str(c)] = len(queries) / max(time.perf_counter() - start, 1e-9)
+
+    latencies = []
+    for q in queries[:latency_queries]:
+        start = time.perf_counter()
+        nn.nn_index(q, num_neighbors, cores=1, **search_params)
+        latencies.append(time.perf_counter() - start)
+
+    stats = {'algorithm': algorithm,
+             'params': params,
+             'build_time': build_time,
+             'used_memory': nn.used_memory(),
+             'recall': recall(result, exact),
+             'qps': qps,
+             'latency_p50': float(np.percentile(latencies, 50)),
+             'latency_p99': float(np.percentile(latencies, 99))}
+    nn.delete_index()
+    return stats
+
+
+def run_benchmark(data, queries, num_neighbors=10, algorithms=algorithms,
+                  cores=(1,), latency_queries=1000, cache_dir=None, **kwargs):
+    """
+    Benchmarks each of the algorithms on data and queries, see
+    benchmark_algorithm. The exact neighbors used to compute the recall
+    are found with ground_truth, and cached in cache_dir if given. An
+    algorithm that fails (e.g. lsh, which only handles uint8 data) is
+    reported with its error.
+    """
+    # the errors are in the report, the library would log them to stdout
+    kwargs.setdefault('log_level', 'none')
+    exact = ground_truth(data, queries, num_neighbors, cache_dir=cache_dir)
+
+    report = {'dataset': {'points': data.shape[0], 'dim': data.shape[1],
+                          'dtype': str(data.dtype), 'queries': len(queries)},
+              'num_neighbors': num_neighbors,
+              'python': platform.python_version(),
+              'numpy': np.__version__,
+              'cpu_count': multiprocessing.cpu_count(),
+              'results': []}
+    for algorithm in algorithms:
+        try:
+            stats = benchmark_algorithm(data, queries, exact, algorithm,
+                                        num_neighbors, cores, latency_queries,
+                                        **kwargs)
+        except FLANNException as e:
+            stats = {'algorithm': algorithm, 'error': str(e)}
+        report['results'].append(stats)
+    return report
+
+
+def parse_value(value):
+    for t in (int, float):
+        try:
+            return t(value)
+        except ValueError:
+            pass
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m pyflann.bench',
+                                     description='Benchmarks the FLANN algorithms.')
+    parser.add_argument('--dataset', help='.npy dataset file (random data if not given)')
+    parser.add_argument('--queries', help='.npy query file (sampled from the dataset if not given)')
+    parser.add_argument('--points', type=int, default=100000, help='points of the random dataset')
+    parser.add_argument('--dim', type=int, default=64, help='dimension of the random dataset')
+    parser.add_argument('--dtype', default='float32', help='type of the random dataset')
+    parser.add_argument('--num-queries', type=int, default=1000, help='number of queries')
+    parser.add_argument('-k', '--num-neighbors', type=int, default=10)
+    parser.add_argument('--algorithms', default=','.join(algorithms),
+                        help='comma separated algorithms (default: %(default)s)')
+    parser.add_argument('--cores', default='1,%d' % multiprocessing.cpu_count(),
+                        help='comma separated numbers of cores (default: %(default)s)')
+    parser.add_argument('--latency-queries', type=int, default=1000,
+                        help='single queries timed for the latency percentiles')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-p', '--param', action='append', default=[], metavar='NAME=VALUE',
+                        help='index or search parameter, e.g. -p trees=8 -p checks=128')
+    parser.add_argument('--cache-dir', help='directory caching the exact neighbors')
+    parser.add_argument('--output', help='JSON output file (default: standard output)')
+    args = parser.parse_args(argv)
+
+    rng = np.random.RandomState(args.seed)
+    if args.dataset is not None:
+        data = load_dataset(args.dataset)
+    else:
+        dtype = np.dtype(args.dtype)
+        if dtype.kind in 'iu':
+            # values spread over the byte range (the range of uint8 and
+            # int8), casting uniform values in [0, 1) would give only 0s
+            info = np.iinfo(dtype)
+            data = rng.randint(max(info.min, -128), min(info.max + 1, 256),
+                               (args.points, args.dim)).astype(dtype)
+        else:
+            data = rng.rand(args.points, args.dim).astype(dtype)
+    if args.queries is not None:
+        queries = np.asarray(load_dataset(args.queries))
+    else:
+        if args.num_queries > len(data):
+            parser.error('--num-queries (%d) is larger than the number of points (%d)'
+                         % (args.num_queries, len(data)))
+        queries = np.array(data[rng.choice(len(data), args.num_queries, replace=False)])
+        if queries.dtype.kind == 'f':
+            # perturbed dataset points, so that the queries are not in it
+            queries += (rng.rand(*queries.shape) * 0.1 * queries.std()).astype(queries.dtype)
+
+    params = dict((k, parse_value(v)) for k, v in (p.split('=', 1) for p in args.param))
+    report = run_benchmark(data, queries, args.num_neighbors,
+                           algorithms=args.algorithms.split(','),
+                           cores=[int(c) for c in args.cores.split(',')],
+                           latency_queries=args.latency_queries,
+                           cache_dir=args.cache_dir, **params)
+
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
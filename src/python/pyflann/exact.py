@@ -0,0 +1,276 @@
+#Copyright 2008-2010  Marius Muja (mariusm@cs.ubc.ca). All rights reserved.
+#Copyright 2008-2010  David G. Lowe (lowe@cs.ubc.ca). All rights reserved.
+#
+#THE BSD LICENSE
+#
+#Redistribution and use in source and binary forms, with or without
+#modification, are permitted provided that the following conditions
+#are met:
+#
+#1. Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+#2. Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+#
+#THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+#IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+#OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+#IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY DIRECT, INDIRECT,
+#INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+#NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+#THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import numpy as np
+
+from pyflann.index import index_type
+from pyflann.exceptions import FLANNException
+
+
+metrics = ('euclidean', 'inner_product')
+
+
+class ExactSearch(object):
+    """
+    Exact nearest neighbor search computing the distances with matrix
+    products.
+
+    The squared euclidean distances between a block of queries q and a
+    block of points x are |q|^2 - 2 q.x + |x|^2, where all the q.x are a
+    single matrix product done by the BLAS numpy is linked with. For
+    large batches of queries in high dimension this is much faster than
+    computing the distances one point at a time. The norms of the points
+    are computed once and cached.
+
+    The points are processed data_block at a time and the queries
+    query_block at a time, only the num_neighbors best candidates of each
+    query being kept between blocks, so that the memory used is bounded
+    by query_block * data_block distances whatever the number of points.
+    As these distances are rounded, more candidates than num_neighbors are
+    kept and ranked again by their distances computed in np.float64 from
+    the points. The queries for which a point left out could still be
+    closer than the last neighbor, given the bound on the rounding errors
+    of the np.float32 products, are searched again in np.float64, so that
+    the neighbors returned are exact.
+
+    With metric='inner_product' the points with the largest inner
+    products with the query are returned, along with these products.
+
+    pts is a 2d array or a list of 2d arrays (the points being numbered
+    across them). The distances are computed in np.float64 for np.float64
+    points and in np.float32 otherwise. The distances returned are
+    recomputed in np.float64 from the neighbors found, so that they do not
+    suffer from the cancellation in |q|^2 - 2 q.x + |x|^2.
+    """
+
+    def __init__(self, pts, metric='euclidean', query_block=1024, data_block=16384):
+        if metric not in metrics:
+            raise FLANNException('Unknown metric: %s' % metric)
+        if query_block < 1 or data_block < 1:
+            raise FLANNException('query_block and data_block must be >= 1')
+
+        chunks = pts if isinstance(pts, (list, tuple)) else [pts]
+        chunks = [np.asarray(c) for c in chunks]
+        if not chunks or any(c.ndim != 2 for c in chunks) or \
+                len(set(c.shape[1] for c in chunks)) != 1:
+            raise FLANNException('pts must be 2d arrays of the same dimension')
+
+        self.metric = metric
+        self.query_block = query_block
+        self.dim = chunks[0].shape[1]
+        if chunks[0].dtype == np.float64:
+            self.dtype = np.float64
+        else:
+            self.dtype = np.float32
+
+        # (first id, points) of each block, and the squared norms of the
+        # points of each block for the euclidean distance
+        self.__blocks = []
+        self.__norms = []
+        self.rows = 0
+        for chunk in chunks:
+            for start in range(0, chunk.shape[0], data_block):
+                block = chunk[start:start + data_block]
+                self.__blocks.append((self.rows + start, block))
+                if metric == 'euclidean':
+                    x = block.astype(self.dtype, copy=False)
+                    self.__norms.append(np.einsum('ij,ij->i', x, x))
+            self.rows += chunk.shape[0]
+        self.__offsets = np.array([offset for offset, block in self.__blocks], dtype=np.int64)
+        self.__removed = [None] * len(self.__blocks)
+
+        # the largest norm of the points, bounding the rounding errors of
+        # the np.float32 distances
+        self.__max_norm = 0.0
+        if self.dtype == np.float32:
+            for b, (offset, block) in enumerate(self.__blocks):
+                if metric == 'euclidean':
+                    norms = self.__norms[b]
+                else:
+                    x = block.astype(np.float32, copy=False)
+                    norms = np.einsum('ij,ij->i', x, x)
+                if norms.size > 0:
+                    self.__max_norm = max(self.__max_norm, np.sqrt(float(norms.max()) * 1.001))
+
+    def remove(self, ids):
+        """
+        Leaves the points with the given ids out of the following searches.
+        """
+        ids = np.asarray(ids, dtype=np.int64).ravel()
+        if ids.size > 0 and (ids.min() < 0 or ids.max() >= self.rows):
+            raise FLANNException('Point ids must be between 0 and %d' % (self.rows - 1))
+        for b in np.unique(np.searchsorted(self.__offsets, ids, side='right') - 1):
+            offset, block = self.__blocks[b]
+            if self.__removed[b] is None:
+                self.__removed[b] = np.zeros(block.shape[0], dtype=bool)
+            in_block = ids[(ids >= offset) & (ids < offset + block.shape[0])]
+            self.__removed[b][in_block - offset] = True
+
+    def search(self, queries, num_neighbors=1, allowed=None):
+        """
+        Returns the (result, dists) arrays of shape (nqueries,
+        num_neighbors) of the exact nearest neighbors of each query,
+        sorted by distance (by decreasing inner product).
+
+        allowed is an optional boolean mask over the point ids restricting
+        the search to some of the points. If less than num_neighbors
+        points are searched, the missing neighbors are returned as -1 at
+        an infinite distance (a -inf inner product).
+        """
+        queries = np.asarray(queries)
+        if queries.ndim == 1:
+            queries = queries.reshape(1, -1)
+        if queries.shape[1] != self.dim:
+            raise FLANNException('Data and queries must have the same dimension')
+        if num_neighbors < 1 or num_neighbors > self.rows:
+            raise FLANNException('more neighbors than there are points')
+        if allowed is not None and np.shape(allowed) != (self.rows,):
+            raise FLANNException('allowed must have one value per point')
+
+        # the candidates ranked again once all the blocks are searched
+        candidates = min(num_neighbors + max(num_neighbors, 16), self.rows)
+        q = queries.astype(self.dtype, copy=False)
+        best_dists, best_ids = self.__candidates(q, candidates, allowed)
+        result, dists, unsure = self.__rank(q, best_dists, best_ids, num_neighbors)
+        if unsure.any():
+            q = queries[unsure].astype(np.float64)
+            best_dists, best_ids = self.__candidates(q, candidates, allowed)
+            result[unsure], dists[unsure], _ = self.__rank(q, best_dists, best_ids, num_neighbors)
+        return result, dists
+
+    def __candidates(self, q, candidates, allowed):
+        """
+        Returns the (dists, ids) arrays of the candidates best ranked by the
+        distances computed with matrix products in the dtype of q.
+        """
+        nqueries = q.shape[0]
+        best_dists = np.full((nqueries, candidates), np.inf, dtype=q.dtype)
+        best_ids = np.zeros((nqueries, candidates), dtype=np.int64)
+
+        # each block of points is converted once and compared with all the
+        # queries; the dists are minimized, hence the negated inner products
+        for b, (offset, block) in enumerate(self.__blocks):
+            x = block.astype(q.dtype, copy=False)
+            if self.metric == 'euclidean':
+                if q.dtype == self.dtype:
+                    norms = self.__norms[b]
+                else:
+                    norms = np.einsum('ij,ij->i', x, x)
+            for start in range(0, nqueries, self.query_block):
+                stop = min(start + self.query_block, nqueries)
+                dists = np.dot(q[start:stop], x.T)
+                if self.metric == 'euclidean':
+                    dists *= -2
+                    dists += norms
+                else:
+                    np.negative(dists, out=dists)
+                if self.__removed[b] is not None:
+                    dists[:, self.__removed[b]] = np.inf
+                if allowed is not None:
+                    dists[:, ~allowed[offset:offset + block.shape[0]]] = np.inf
+                self.__merge(best_dists[start:stop], best_ids[start:stop], dists, offset)
+        return best_dists, best_ids
+
+    def __rank(self, q, best_dists, best_ids, num_neighbors):
+        """
+        Ranks the candidates by their distances computed in np.float64 and
+        returns the (result, dists) of the num_neighbors first, along with
+        a mask of the queries for which a point not among the candidates
+        could be closer than the last neighbor, the distances of q.dtype
+        being rounded.
+        """
+        nqueries, candidates = best_ids.shape
+        result = np.empty((nqueries, num_neighbors), dtype=index_type)
+        dists = np.empty((nqueries, num_neighbors), dtype=self.dtype)
+        unsure = np.zeros(nqueries, dtype=bool)
+        # the float64 neighbors of about 4M values at a time
+        step = max(1, min(self.query_block, (1 << 22) // (candidates * self.dim)))
+        for start in range(0, nqueries, step):
+            stop = min(start + step, nqueries)
+            ids = best_ids[start:stop]
+            neighbors = self.__points(ids.ravel()).reshape(ids.shape + (self.dim,))
+            neighbors = neighbors.astype(np.float64, copy=False)
+            qb = q[start:stop].astype(np.float64)
+            # the slots not filled with a point searched stay at np.inf
+            missing = np.isinf(best_dists[start:stop])
+            if self.metric == 'euclidean':
+                neighbors -= qb[:, None, :]
+                d = np.einsum('ijk,ijk->ij', neighbors, neighbors)
+                d[missing] = np.inf
+                order = np.argsort(d, axis=1, kind='stable')[:, :num_neighbors]
+            else:
+                d = np.einsum('ijk,ik->ij', neighbors, qb)
+                d[missing] = -np.inf
+                order = np.argsort(-d, axis=1, kind='stable')[:, :num_neighbors]
+            ids = np.where(missing, -1, ids)
+            result[start:stop] = np.take_along_axis(ids, order, axis=1)
+            dists[start:stop] = np.take_along_axis(d, order, axis=1)
+
+            if q.dtype == np.float32 and candidates < self.rows:
+                # the points left out have rounded dists of at least the
+                # last candidate one, each product of dim terms being
+                # rounded by at most (dim + 2) * eps / 2 * |q| |x|, of which
+                # twice is allowed for
+                qnorms = np.sqrt(np.einsum('ij,ij->i', qb, qb))
+                error = (self.dim + 2) * np.finfo(np.float32).eps * self.__max_norm
+                last = best_dists[start:stop].max(axis=1).astype(np.float64)
+                kth = np.take_along_axis(d, order[:, -1:], axis=1)[:, 0]
+                if self.metric == 'euclidean':
+                    error *= self.__max_norm + 2 * qnorms
+                    unsure[start:stop] = last - error + qnorms ** 2 < kth
+                else:
+                    error *= qnorms
+                    unsure[start:stop] = last - error < -kth
+        return result, dists, unsure
+
+    def __merge(self, best_dists, best_ids, dists, offset):
+        """
+        Keeps in best_dists and best_ids the smallest of their dists and of
+        the dists of a block of points starting at offset.
+        """
+        num_neighbors = best_dists.shape[1]
+        if dists.shape[1] > num_neighbors:
+            ids = np.argpartition(dists, num_neighbors - 1, axis=1)[:, :num_neighbors]
+            dists = np.take_along_axis(dists, ids, axis=1)
+        else:
+            ids = np.broadcast_to(np.arange(dists.shape[1]), dists.shape)
+        all_dists = np.concatenate((best_dists, dists), axis=1)
+        all_ids = np.concatenate((best_ids, ids + offset), axis=1)
+        keep = np.argpartition(all_dists, num_neighbors - 1, axis=1)[:, :num_neighbors]
+        best_dists[...] = np.take_along_axis(all_dists, keep, axis=1)
+        best_ids[...] = np.take_along_axis(all_ids, keep, axis=1)
+
+    def __points(self, ids):
+        """
+        Returns the points with the given ids, in the dtype of the distances.
+        """
+        points = np.empty((len(ids), self.dim), dtype=self.dtype)
+        blocks = np.searchsorted(self.__offsets, ids, side='right') - 1
+        for b in np.unique(blocks):
+            offset, block = self.__blocks[b]
+            rows = np.nonzero(blocks == b)[0]
+            points[rows] = block[ids[rows] - offset]
+        return points
@@ -26,13 +26,14 @@
 
 #from ctypes import *
 #from ctypes.util import find_library
-from numpy import (float32, float64, uint8, int32, require)
+from numpy import (float16, float32, float64, int8, uint8, int32, uint32, require)
 #import ctypes
 #import numpy as np
-from ctypes import (Structure, c_char_p, c_int, c_float, c_uint, c_long,
-                    c_void_p, cdll, POINTER)
+from ctypes import (Structure, c_char_p, c_int, c_float, c_double, c_uint,
+                    c_long, c_void_p, c_size_t, cdll, POINTER)
 from numpy.ctypeslib import ndpointer
 import os
+import re
 import sys
 
 STRING = c_char_p
@@ -109,6 +110,11 @@ class FLANNParameters(CustomStructure):
         ('multi_probe_level_', c_uint),
         ('log_level', c_int),
         ('random_seed', c_long),
+        ('max_tuning_seconds', c_float),
+        ('tuning_candidates', c_int),
+        ('subquantizers', c_int),
+        ('code_bits', c_int),
+        ('coarse_clusters', c_int),
     ]
     _defaults_ = {
         'algorithm' : 'kdtree',
@@ -131,17 +137,22 @@ class FLANNParameters(CustomStructure):
         'key_size_': 20,
         'multi_probe_level_': 2,
         'log_level' : 'warning',
-        'random_seed' : -1
+        'random_seed' : -1,
+        'max_tuning_seconds' : 0.0,
+        'tuning_candidates' : 0,
+        'subquantizers' : 8,
+        'code_bits' : 8,
+        'coarse_clusters' : 0
     }
     _translation_ = {
-        'algorithm'     : {'linear'    : 0, 'kdtree'    : 1, 'kmeans'    : 2, 'composite' : 3, 'kdtree_single' : 4, 'hierarchical': 5, 'lsh': 6, 'saved': 254, 'autotuned' : 255, 'default'   : 1},
+        'algorithm'     : {'linear'    : 0, 'kdtree'    : 1, 'kmeans'    : 2, 'composite' : 3, 'kdtree_single' : 4, 'hierarchical': 5, 'lsh': 6, 'pq': 8, 'saved': 254, 'autotuned' : 255, 'default'   : 1},
         'centers_init'  : {'random'    : 0, 'gonzales'  : 1, 'kmeanspp'  : 2, 'default'   : 0},
         'log_level'     : {'none'      : 0, 'fatal'     : 1, 'error'     : 2, 'warning'   : 3, 'info'      : 4, 'default'   : 2}
     }
 
 
 default_flags = ['C_CONTIGUOUS', 'ALIGNED']
-allowed_types = [ float32, float64, uint8, int32]
+allowed_types = [ float32, float64, uint8, int32, float16, int8]
 
 FLANN_INDEX = c_void_p
 
@@ -211,17 +222,52 @@ flannlib.flann_set_distance_type.argtypes = [
     c_int,
 ]
 
+flannlib.flann_get_distance_type.restype = c_int
+flannlib.flann_get_distance_type.argtypes = []
+
+flannlib.flann_get_distance_order.restype = c_int
+flannlib.flann_get_distance_order.argtypes = []
+
 type_mappings = ( ('float', 'float32'),
                   ('double', 'float64'),
                   ('byte', 'uint8'),
-                  ('int', 'int32') )
+                  ('int', 'int32'),
+                  ('int8', 'int8'),
+                  ('float16', 'float16') )
 
 
-def define_functions(str):
-    for type in type_mappings:
-        eval(compile(str % {'C': type[0], 'numpy': type[1]}, '<string>', 'exec'))
+class FunctionTable(dict):
+    """
+        Maps numpy types to the C function implementing an entry point
+        for that type. The ctypes prototype of a function is only set
+        up the first time the function is used, so importing pyflann
+        doesn't have to look up and bind the whole library.
+    """
 
-flann.build_index = {}
+    def __init__(self):
+        dict.__init__(self)
+        self.definitions = {}
+
+    def __missing__(self, numpy_type):
+        if numpy_type not in self.definitions:
+            raise KeyError(numpy_type)
+        eval(compile(self.definitions[numpy_type], '<string>', 'exec'))
+        return dict.__getitem__(self, numpy_type)
+
+
+def define_functions(str, types=type_mappings):
+    """
+        Registers the code binding the functions of an entry point,
+        str being a template of the code for one type. The code fills
+        the FunctionTable named in it and only runs when the function
+        for a type is first used.
+    """
+    table = getattr(flann, re.search(r'^flann\.(\w+)\[', str, re.M).group(1))
+    for type in types:
+        table.definitions[globals()[type[1]]] = \
+            str % {'C': type[0], 'numpy': type[1]}
+
+flann.build_index = FunctionTable()
 define_functions(r"""
 flannlib.flann_build_index_%(C)s.restype = FLANN_INDEX
 flannlib.flann_build_index_%(C)s.argtypes = [
@@ -234,7 +280,22 @@ flannlib.flann_build_index_%(C)s.argtypes = [
 flann.build_index[%(numpy)s] = flannlib.flann_build_index_%(C)s
 """)
 
-flann.save_index = {}
+flann.build_index_with_distance = FunctionTable()
+define_functions(r"""
+flannlib.flann_build_index_with_distance_%(C)s.restype = FLANN_INDEX
+flannlib.flann_build_index_with_distance_%(C)s.argtypes = [
+        ndpointer(%(numpy)s, ndim=2, flags='aligned, c_contiguous'),  # dataset
+        c_int,  # rows
+        c_int,  # cols
+        POINTER(c_float),  # speedup
+        POINTER(FLANNParameters),  # flann_params
+        c_int,  # distance_type
+        c_int,  # order
+]
+flann.build_index_with_distance[%(numpy)s] = flannlib.flann_build_index_with_distance_%(C)s
+""")
+
+flann.save_index = FunctionTable()
 define_functions(r"""
 flannlib.flann_save_index_%(C)s.restype = None
 flannlib.flann_save_index_%(C)s.argtypes = [
@@ -244,7 +305,7 @@ flannlib.flann_save_index_%(C)s.argtypes = [
 flann.save_index[%(numpy)s] = flannlib.flann_save_index_%(C)s
 """)
 
-flann.load_index = {}
+flann.load_index = FunctionTable()
 define_functions(r"""
 flannlib.flann_load_index_%(C)s.restype = FLANN_INDEX
 flannlib.flann_load_index_%(C)s.argtypes = [
@@ -256,7 +317,47 @@ flannlib.flann_load_index_%(C)s.argtypes = [
 flann.load_index[%(numpy)s] = flannlib.flann_load_index_%(C)s
 """)
 
-flann.used_memory = {}
+flann.load_index_with_distance = FunctionTable()
+define_functions(r"""
+flannlib.flann_load_index_with_distance_%(C)s.restype = FLANN_INDEX
+flannlib.flann_load_index_with_distance_%(C)s.argtypes = [
+        c_char_p,  #filename
+        ndpointer(%(numpy)s, ndim=2, flags='aligned, c_contiguous'),  # dataset
+        c_int,  # rows
+        c_int,  # cols
+        c_int,  # distance_type
+        c_int,  # order
+]
+flann.load_index_with_distance[%(numpy)s] = flannlib.flann_load_index_with_distance_%(C)s
+""")
+
+flann.save_index_to_buffer = FunctionTable()
+define_functions(r"""
+flannlib.flann_save_index_to_buffer_%(C)s.restype = c_int
+flannlib.flann_save_index_to_buffer_%(C)s.argtypes = [
+        FLANN_INDEX,  # index_id
+        POINTER(c_void_p),  # buffer
+        POINTER(c_size_t),  # size
+]
+flann.save_index_to_buffer[%(numpy)s] = flannlib.flann_save_index_to_buffer_%(C)s
+""")
+
+flann.load_index_from_buffer_with_distance = FunctionTable()
+define_functions(r"""
+flannlib.flann_load_index_from_buffer_with_distance_%(C)s.restype = FLANN_INDEX
+flannlib.flann_load_index_from_buffer_with_distance_%(C)s.argtypes = [
+        c_char_p,  # buffer
+        c_size_t,  # size
+        ndpointer(%(numpy)s, ndim=2, flags='aligned, c_contiguous'),  # dataset
+        c_int,  # rows
+        c_int,  # cols
+        c_int,  # distance_type
+        c_int,  # order
+]
+flann.load_index_from_buffer_with_distance[%(numpy)s] = flannlib.flann_load_index_from_buffer_with_distance_%(C)s
+""")
+
+flann.used_memory = FunctionTable()
 define_functions(r"""
 flannlib.flann_used_memory_%(C)s.restype = c_int
 flannlib.flann_used_memory_%(C)s.argtypes = [
@@ -265,7 +366,7 @@ flannlib.flann_used_memory_%(C)s.argtypes = [
 flann.used_memory[%(numpy)s] = flannlib.flann_used_memory_%(C)s
 """)
 
-flann.add_points = {}
+flann.add_points = FunctionTable()
 define_functions(r"""
 flannlib.flann_add_points_%(C)s.restype = None
 flannlib.flann_add_points_%(C)s.argtypes = [ 
@@ -278,7 +379,7 @@ flannlib.flann_add_points_%(C)s.argtypes = [
 flann.add_points[%(numpy)s] = flannlib.flann_add_points_%(C)s
 """)
 
-flann.remove_point = {}
+flann.remove_point = FunctionTable()
 define_functions(r"""
 flannlib.flann_remove_point_%(C)s.restype = None
 flannlib.flann_remove_point_%(C)s.argtypes = [ 
@@ -288,7 +389,18 @@ flannlib.flann_remove_point_%(C)s.argtypes = [
 flann.remove_point[%(numpy)s] = flannlib.flann_remove_point_%(C)s
 """)
 
-flann.find_nearest_neighbors = {}
+flann.remove_points = FunctionTable()
+define_functions(r"""
+flannlib.flann_remove_points_%(C)s.restype = c_int
+flannlib.flann_remove_points_%(C)s.argtypes = [
+        FLANN_INDEX, # index_id
+        ndpointer(uint32, ndim=1, flags='aligned, c_contiguous'), # point_ids
+        c_int, # count
+]
+flann.remove_points[%(numpy)s] = flannlib.flann_remove_points_%(C)s
+""")
+
+flann.find_nearest_neighbors = FunctionTable()
 define_functions(r"""
 flannlib.flann_find_nearest_neighbors_%(C)s.restype = c_int
 flannlib.flann_find_nearest_neighbors_%(C)s.argtypes = [
@@ -307,6 +419,7 @@ flann.find_nearest_neighbors[%(numpy)s] = flannlib.flann_find_nearest_neighbors_
 
 # fix definition for the 'double' case
 
+define_functions(r"""
 flannlib.flann_find_nearest_neighbors_double.restype = c_int
 flannlib.flann_find_nearest_neighbors_double.argtypes = [
     ndpointer(float64, ndim=2, flags='aligned, c_contiguous'),  # dataset
@@ -320,9 +433,47 @@ flannlib.flann_find_nearest_neighbors_double.argtypes = [
     POINTER(FLANNParameters)  # flann_params
 ]
 flann.find_nearest_neighbors[float64] = flannlib.flann_find_nearest_neighbors_double
+""", [('double', 'float64')])
+
+flann.find_nearest_neighbors_with_distance = FunctionTable()
+define_functions(r"""
+flannlib.flann_find_nearest_neighbors_with_distance_%(C)s.restype = c_int
+flannlib.flann_find_nearest_neighbors_with_distance_%(C)s.argtypes = [
+        ndpointer(%(numpy)s, ndim=2, flags='aligned, c_contiguous'),  # dataset
+        c_int,  # rows
+        c_int,  # cols
+        ndpointer(%(numpy)s, ndim=2, flags='aligned, c_contiguous'),  # testset
+        c_int,  # tcount
+        ndpointer(int32, ndim=2, flags='aligned, c_contiguous, writeable'),  # result
+        ndpointer(float32, ndim=2, flags='aligned, c_contiguous, writeable'),  # dists
+        c_int,  # nn
+        POINTER(FLANNParameters),  # flann_params
+        c_int,  # distance_type
+        c_int,  # order
+]
+flann.find_nearest_neighbors_with_distance[%(numpy)s] = flannlib.flann_find_nearest_neighbors_with_distance_%(C)s
+""")
+
+define_functions(r"""
+flannlib.flann_find_nearest_neighbors_with_distance_double.restype = c_int
+flannlib.flann_find_nearest_neighbors_with_distance_double.argtypes = [
+    ndpointer(float64, ndim=2, flags='aligned, c_contiguous'),  # dataset
+    c_int,  # rows
+    c_int,  # cols
+    ndpointer(float64, ndim=2, flags='aligned, c_contiguous'),  # testset
+    c_int,  # tcount
+    ndpointer(int32, ndim=2, flags='aligned, c_contiguous, writeable'),  # result
+    ndpointer(float64, ndim=2, flags='aligned, c_contiguous, writeable'),  # dists
+    c_int,  # nn
+    POINTER(FLANNParameters),  # flann_params
+    c_int,  # distance_type
+    c_int,  # order
+]
+flann.find_nearest_neighbors_with_distance[float64] = flannlib.flann_find_nearest_neighbors_with_distance_double
+""", [('double', 'float64')])
 
 
-flann.find_nearest_neighbors_index = {}
+flann.find_nearest_neighbors_index = FunctionTable()
 define_functions(r"""
 flannlib.flann_find_nearest_neighbors_index_%(C)s.restype = c_int
 flannlib.flann_find_nearest_neighbors_index_%(C)s.argtypes = [
@@ -337,6 +488,7 @@ flannlib.flann_find_nearest_neighbors_index_%(C)s.argtypes = [
 flann.find_nearest_neighbors_index[%(numpy)s] = flannlib.flann_find_nearest_neighbors_index_%(C)s
 """)
 
+define_functions(r"""
 flannlib.flann_find_nearest_neighbors_index_double.restype = c_int
 flannlib.flann_find_nearest_neighbors_index_double.argtypes = [
     FLANN_INDEX,  # index_id
@@ -348,8 +500,42 @@ flannlib.flann_find_nearest_neighbors_index_double.argtypes = [
     POINTER(FLANNParameters)  # flann_params
 ]
 flann.find_nearest_neighbors_index[float64] = flannlib.flann_find_nearest_neighbors_index_double
+""", [('double', 'float64')])
+
+flann.find_nearest_neighbors_index_filtered = FunctionTable()
+define_functions(r"""
+flannlib.flann_find_nearest_neighbors_index_filtered_%(C)s.restype = c_int
+flannlib.flann_find_nearest_neighbors_index_filtered_%(C)s.argtypes = [
+        FLANN_INDEX,  # index_id
+        ndpointer(%(numpy)s, ndim=2, flags='aligned, c_contiguous'),  # testset
+        c_int,  # tcount
+        ndpointer(int32, ndim=2, flags='aligned, c_contiguous, writeable'),  # result
+        ndpointer(float32, ndim=2, flags='aligned, c_contiguous, writeable'),  # dists
+        c_int,  # nn
+        ndpointer(uint8, ndim=1, flags='aligned, c_contiguous'),  # filter
+        c_int,  # filter_size
+        POINTER(FLANNParameters) # flann_params
+]
+flann.find_nearest_neighbors_index_filtered[%(numpy)s] = flannlib.flann_find_nearest_neighbors_index_filtered_%(C)s
+""")
+
+define_functions(r"""
+flannlib.flann_find_nearest_neighbors_index_filtered_double.restype = c_int
+flannlib.flann_find_nearest_neighbors_index_filtered_double.argtypes = [
+    FLANN_INDEX,  # index_id
+    ndpointer(float64, ndim=2, flags='aligned, c_contiguous'),  # testset
+    c_int,  # tcount
+    ndpointer(int32, ndim=2, flags='aligned, c_contiguous, writeable'),  # result
+    ndpointer(float64, ndim=2, flags='aligned, c_contiguous, writeable'),  # dists
+    c_int,  # nn
+    ndpointer(uint8, ndim=1, flags='aligned, c_contiguous'),  # filter
+    c_int,  # filter_size
+    POINTER(FLANNParameters)  # flann_params
+]
+flann.find_nearest_neighbors_index_filtered[float64] = flannlib.flann_find_nearest_neighbors_index_filtered_double
+""", [('double', 'float64')])
 
-flann.radius_search = {}
+flann.radius_search = FunctionTable()
 define_functions(r"""
 flannlib.flann_radius_search_%(C)s.restype = c_int
 flannlib.flann_radius_search_%(C)s.argtypes = [
@@ -364,6 +550,7 @@ flannlib.flann_radius_search_%(C)s.argtypes = [
 flann.radius_search[%(numpy)s] = flannlib.flann_radius_search_%(C)s
 """)
 
+define_functions(r"""
 flannlib.flann_radius_search_double.restype = c_int
 flannlib.flann_radius_search_double.argtypes = [
     FLANN_INDEX,  # index_id
@@ -375,9 +562,46 @@ flannlib.flann_radius_search_double.argtypes = [
     POINTER(FLANNParameters)  # flann_params
 ]
 flann.radius_search[float64] = flannlib.flann_radius_search_double
+""", [('double', 'float64')])
+
+flann.radius_search_multi = FunctionTable()
+define_functions(r"""
+flannlib.flann_radius_search_multi_%(C)s.restype = c_int
+flannlib.flann_radius_search_multi_%(C)s.argtypes = [
+        FLANN_INDEX,  # index_id
+        ndpointer(%(numpy)s, ndim=2, flags='aligned, c_contiguous'),  # queries
+        c_int,  # tcount
+        ndpointer(int32, ndim=1, flags='aligned, c_contiguous, writeable'),  # indptr
+        POINTER(POINTER(c_int)),  # indices
+        POINTER(POINTER(c_float)),  # dists
+        c_float,  # radius
+        POINTER(FLANNParameters) # flann_params
+]
+flann.radius_search_multi[%(numpy)s] = flannlib.flann_radius_search_multi_%(C)s
+""")
+
+define_functions(r"""
+flannlib.flann_radius_search_multi_double.restype = c_int
+flannlib.flann_radius_search_multi_double.argtypes = [
+    FLANN_INDEX,  # index_id
+    ndpointer(float64, ndim=2, flags='aligned, c_contiguous'),  # queries
+    c_int,  # tcount
+    ndpointer(int32, ndim=1, flags='aligned, c_contiguous, writeable'),  # indptr
+    POINTER(POINTER(c_int)),  # indices
+    POINTER(POINTER(c_double)),  # dists
+    c_float,  # radius
+    POINTER(FLANNParameters)  # flann_params
+]
+flann.radius_search_multi[float64] = flannlib.flann_radius_search_multi_double
+""", [('double', 'float64')])
 
+flannlib.flann_free_buffer.restype = None
+flannlib.flann_free_buffer.argtypes = [
+    c_void_p,  # buffer
+]
 
-flann.compute_cluster_centers = {}
+
+flann.compute_cluster_centers = FunctionTable()
 define_functions(r"""
 flannlib.flann_compute_cluster_centers_%(C)s.restype = c_int
 flannlib.flann_compute_cluster_centers_%(C)s.argtypes = [
@@ -391,6 +615,7 @@ flannlib.flann_compute_cluster_centers_%(C)s.argtypes = [
 flann.compute_cluster_centers[%(numpy)s] = flannlib.flann_compute_cluster_centers_%(C)s
 """)
 # double is an exception
+define_functions(r"""
 flannlib.flann_compute_cluster_centers_double.restype = c_int
 flannlib.flann_compute_cluster_centers_double.argtypes = [
     ndpointer(float64, ndim=2, flags='aligned, c_contiguous'),  # dataset
@@ -401,9 +626,59 @@ flannlib.flann_compute_cluster_centers_double.argtypes = [
     POINTER(FLANNParameters)  # flann_params
 ]
 flann.compute_cluster_centers[float64] = flannlib.flann_compute_cluster_centers_double
+""", [('double', 'float64')])
+
+flann.compute_cluster_centers_with_distance = FunctionTable()
+define_functions(r"""
+flannlib.flann_compute_cluster_centers_with_distance_%(C)s.restype = c_int
+flannlib.flann_compute_cluster_centers_with_distance_%(C)s.argtypes = [
+        ndpointer(%(numpy)s, ndim=2, flags='aligned, c_contiguous'),  # dataset
+        c_int,  # rows
+        c_int,  # cols
+        c_int,  # clusters
+        ndpointer(float32, flags='aligned, c_contiguous, writeable'),  # result
+        POINTER(FLANNParameters),  # flann_params
+        c_int,  # distance_type
+        c_int,  # order
+]
+flann.compute_cluster_centers_with_distance[%(numpy)s] = flannlib.flann_compute_cluster_centers_with_distance_%(C)s
+""")
+define_functions(r"""
+flannlib.flann_compute_cluster_centers_with_distance_double.restype = c_int
+flannlib.flann_compute_cluster_centers_with_distance_double.argtypes = [
+    ndpointer(float64, ndim=2, flags='aligned, c_contiguous'),  # dataset
+    c_int,  # rows
+    c_int,  # cols
+    c_int,  # clusters
+    ndpointer(float64, flags='aligned, c_contiguous, writeable'),  # result
+    POINTER(FLANNParameters),  # flann_params
+    c_int,  # distance_type
+    c_int,  # order
+]
+flann.compute_cluster_centers_with_distance[float64] = flannlib.flann_compute_cluster_centers_with_distance_double
+""", [('double', 'float64')])
+
 
+flann.compute_ground_truth_with_distance = FunctionTable()
+define_functions(r"""
+flannlib.flann_compute_ground_truth_with_distance_%(C)s.restype = c_int
+flannlib.flann_compute_ground_truth_with_distance_%(C)s.argtypes = [
+        ndpointer(%(numpy)s, ndim=2, flags='aligned, c_contiguous'),  # dataset
+        c_int,  # rows
+        c_int,  # cols
+        ndpointer(%(numpy)s, ndim=2, flags='aligned, c_contiguous'),  # testset
+        c_int,  # tcount
+        ndpointer(int32, ndim=2, flags='aligned, c_contiguous, writeable'),  # result
+        c_int,  # nn
+        c_int,  # skip
+        POINTER(FLANNParameters),  # flann_params
+        c_int,  # distance_type
+        c_int,  # order
+]
+flann.compute_ground_truth_with_distance[%(numpy)s] = flannlib.flann_compute_ground_truth_with_distance_%(C)s
+""")
 
-flann.free_index = {}
+flann.free_index = FunctionTable()
 define_functions(r"""
 flannlib.flann_free_index_%(C)s.restype = None
 flannlib.flann_free_index_%(C)s.argtypes = [
@@ -25,8 +25,15 @@
 #THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 #from pyflann.flann_ctypes import *  # NOQA
+import collections
+import hashlib
+import json
+import os
 import sys
-from ctypes import pointer, c_float, byref, c_char_p
+import threading
+import time
+from ctypes import (pointer, POINTER, c_int, c_float, c_double, byref, c_char_p,
+                    c_void_p, c_size_t, memmove, sizeof, string_at)
 from pyflann.flann_ctypes import (flannlib, FLANNParameters, allowed_types,
                                   ensure_2d_array, default_flags, flann)
 import numpy as np
@@ -38,23 +45,33 @@ import numpy.random as _rn
 index_type = np.int32
 
 
+distance_translation = {'euclidean': 1,
+                        'manhattan': 2,
+                        'minkowski': 3,
+                        'max_dist': 4,
+                        'hik': 5,
+                        'hellinger': 6,
+                        'chi_square': 7,
+                        'cs': 7,
+                        'kullback_leibler': 8,
+                        'kl': 8,
+                        'hamming': 9,
+                        }
+
+
 def set_distance_type(distance_type, order=0):
     """
     Sets the distance type used. Possible values: euclidean, manhattan, minkowski, max_dist,
-    hik, hellinger, cs, kl.
+    hik, hellinger, cs, kl, hamming.
+
+    hamming counts the differing bits of the points, for matching binary
+    descriptors (ORB, BRIEF, ...) stored as uint8 arrays with the linear,
+    lsh and hierarchical algorithms. It is not supported for float points.
+
+    This is the default distance of the FLANN instances created without
+    a distance_type. Indexes keep the distance they were built with.
     """
 
-    distance_translation = {'euclidean': 1,
-                            'manhattan': 2,
-                            'minkowski': 3,
-                            'max_dist': 4,
-                            'hik': 5,
-                            'hellinger': 6,
-                            'chi_square': 7,
-                            'cs': 7,
-                            'kullback_leibler': 8,
-                            'kl': 8,
-                            }
     if isinstance(distance_type, str):
         distance_type = distance_translation[distance_type]
 
@@ -66,6 +83,316 @@ def to_bytes(string):
         return bytes(string, 'utf-8')
     return string
 
+
+def load_dataset(filename, dtype=None, shape=None):
+    """
+    Memory maps a dataset file read-only, so that it can be indexed
+    without loading it in memory. Processes mapping the same file share
+    the same physical pages.
+
+    Files ending in .npy are opened with numpy.load, other files are
+    treated as raw row major data, for which the dtype and the
+    (rows, cols) shape must be given.
+    """
+    if filename.endswith('.npy'):
+        return np.load(filename, mmap_mode='r')
+
+    if dtype is None or shape is None:
+        raise FLANNException('The dtype and shape of raw dataset files must be given')
+    return np.memmap(filename, dtype=dtype, mode='r', shape=shape)
+
+
+def ground_truth(data, queries, num_neighbors=1, distance_type=None,
+                 distance_order=0, skip=0, cores=0, cache_dir=None,
+                 algorithm='linear'):
+    """
+    Returns the ids of the exact num_neighbors nearest neighbors in data
+    of each point in queries, as a (nqueries, num_neighbors) array. They
+    are found with a linear search of data running on cores threads (0
+    for all the cores). The skip nearest neighbors of each query are left
+    out, e.g. skip=1 when the queries are points of data.
+
+    With algorithm='gemm' the euclidean distances are computed with
+    matrix products instead (see pyflann.exact.ExactSearch), which is
+    much faster for large batches of queries in high dimension.
+
+    distance_type and distance_order are as for FLANN, the distance set
+    with set_distance_type being used if distance_type is None. As for
+    build_index, data can be a np.memmap or the name of a dataset file.
+
+    If cache_dir is given, the result is saved in this directory, named
+    after a hash of the contents of data and queries and of the other
+    arguments, and calls with the same arguments load it back instead of
+    searching again.
+    """
+    data = _prepare_dataset(data)
+    queries = ensure_2d_array(queries, default_flags)
+    rows, dim = data.shape
+    nqueries = queries.shape[0]
+
+    if queries.dtype != data.dtype:
+        raise FLANNException('Data and queries must have the same type')
+    if queries.shape[1] != dim:
+        raise FLANNException('Data and queries must have the same dimension')
+    if num_neighbors + skip > rows:
+        raise FLANNException('more neighbors than there are points')
+
+    if isinstance(distance_type, str):
+        distance_type = distance_translation[distance_type]
+    if distance_type is None:
+        distance_type = flannlib.flann_get_distance_type()
+        distance_order = flannlib.flann_get_distance_order()
+    if algorithm not in ('linear', 'gemm'):
+        raise FLANNException('Unknown ground truth algorithm: %s' % algorithm)
+    if algorithm == 'gemm' and distance_type != distance_translation['euclidean']:
+        raise FLANNException('algorithm="gemm" only supports the euclidean distance')
+    _check_distance(data.dtype, distance_type)
+
+    if cache_dir is not None:
+        key = hashlib.sha1(repr((data.dtype.str, data.shape, queries.shape,
+                                 num_neighbors, skip, distance_type,
+                                 distance_order)).encode())
+        for pts in (data, queries):
+            # hash memory mapped datasets without reading them at once
+            for start in range(0, pts.shape[0], 65536):
+                key.update(np.ascontiguousarray(pts[start:start + 65536]).data)
+        filename = os.path.join(cache_dir, 'ground_truth_%s.npy' % key.hexdigest())
+        if os.path.exists(filename):
+            return np.load(filename)
+
+    result = np.empty((nqueries, num_neighbors), dtype=index_type)
+    if algorithm == 'gemm':
+        from pyflann.exact import ExactSearch
+        if nqueries > 0:
+            ids, _ = ExactSearch(data).search(queries, num_neighbors + skip)
+            result[:] = ids[:, skip:]
+    else:
+        params = FLANNParameters()
+        params.update({'cores': cores})
+        if nqueries > 0 and flann.compute_ground_truth_with_distance[data.dtype.type](
+                data, rows, dim, queries, nqueries, result, num_neighbors, skip,
+                pointer(params), distance_type, distance_order) != 0:
+            raise FLANNException('Error occured while computing the ground truth.')
+
+    if cache_dir is not None:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        # written under a temporary name so that a concurrent run never
+        # loads a partial file
+        tmpname = '%s.%d.tmp' % (filename, os.getpid())
+        with open(tmpname, 'wb') as f:
+            np.save(f, result)
+        getattr(os, 'replace', os.rename)(tmpname, filename)
+
+    return result
+
+
+def _prepare_dataset(pts, dtype=None, shape=None):
+    """
+    Returns pts as an array suitable for indexing. Memory mapped datasets
+    are never copied, an exception is raised instead if their layout
+    cannot be used as is.
+    """
+    if isinstance(pts, str):
+        pts = load_dataset(pts, dtype, shape)
+
+    if pts.dtype.type not in allowed_types:
+        raise FLANNException('Cannot handle type: %s' % pts.dtype)
+
+    if isinstance(pts, np.memmap):
+        if not (pts.flags['C_CONTIGUOUS'] and pts.flags['ALIGNED']):
+            raise FLANNException('Memory mapped datasets must be C contiguous and aligned')
+
+    return ensure_2d_array(pts, default_flags)
+
+
+def _tuning_fingerprint(pts, distance, params):
+    """
+    Returns a hash of what the autotuning of pts depends on: the number
+    of points (to the nearest power of two), the dimension, type and
+    distance, the tuning parameters and the rounded statistics of a
+    sample of the points, so that a dataset whose distribution barely
+    changed gets the same fingerprint.
+    """
+    npts, dim = pts.shape
+    sample = np.asarray(pts[np.linspace(0, npts - 1, min(npts, 1000)).astype(int)],
+                        dtype=np.float64)
+    scale = sample.std() or 1.0
+    # the rounded values are hashed as integers, which have no signed
+    # zero and whose repr does not depend on the numpy version
+    key = (int(round(np.log2(max(npts, 1)))), dim, pts.dtype.str,
+           tuple(int(d) for d in distance),
+           tuple(int(round(params[k] * 10000)) for k in ('target_precision', 'build_weight',
+                                                        'memory_weight', 'sample_fraction',
+                                                        'max_tuning_seconds')),
+           int(np.round(10 * np.log10(scale))),
+           tuple(np.round(2 * sample.mean(axis=0) / scale).astype(int).tolist()),
+           tuple(np.round(2 * sample.std(axis=0) / scale).astype(int).tolist()))
+    return hashlib.sha1(repr(key).encode()).hexdigest()
+
+
+def _check_distance(dtype, distance_type):
+    """
+    Raises an exception for the hamming distance of points that are not
+    integers, whose bits it would compare.
+    """
+    if distance_type == distance_translation['hamming'] and \
+            not np.issubdtype(dtype, np.integer):
+        raise FLANNException('The hamming distance is only supported for integer types')
+
+
+def _output_arrays(out, nqpts, num_neighbors, dists_type):
+    """
+    Returns the (result, dists) arrays of a query with nqpts points,
+    either allocated or taken from the out=(result, dists) pair given
+    by the caller after checking that they can be written to directly.
+    """
+    if out is None:
+        return (np.empty((nqpts, num_neighbors), dtype=index_type),
+                np.empty((nqpts, num_neighbors), dtype=dists_type))
+
+    if len(out) != 2:
+        raise FLANNException('out must be a (result, dists) pair of arrays')
+
+    arrays = []
+    for arr, dtype in zip(out, (index_type, dists_type)):
+        if not isinstance(arr, np.ndarray) or arr.dtype != dtype:
+            raise FLANNException('out arrays must be numpy arrays of types %s and %s'
+                                 % (np.dtype(index_type), np.dtype(dists_type)))
+        if arr.size != nqpts * num_neighbors or \
+                arr.shape[0] != nqpts or arr.ndim > 2:
+            raise FLANNException('out arrays must have shape (%d, %d)'
+                                 % (nqpts, num_neighbors))
+        if not (arr.flags['C_CONTIGUOUS'] and arr.flags['ALIGNED'] and arr.flags['WRITEABLE']):
+            raise FLANNException('out arrays must be writeable, C contiguous and aligned')
+        if arr.ndim != 2:
+            arr = arr.reshape(nqpts, num_neighbors)
+        arrays.append(arr)
+    return tuple(arrays)
+
+
+class _PointStore(object):
+    """
+    Holds the points referenced by an index.
+
+    The index keeps pointers to the rows of the arrays it was built or
+    extended with, so these arrays must stay alive and must never move.
+    Added points are copied into chunks that are only ever appended to.
+    A new chunk is allocated with room for the points that can be added
+    before the index rebuilds itself (the rebuild_threshold growth factor
+    of add_points), so adding points in small batches costs amortized
+    O(batch) instead of copying the whole dataset every time.
+
+    The exact neighbors computed by FLANN.tune_curve are cached with the
+    points, so that they are discarded along with them, and the ids of the
+    points removed from the index are kept (sorted, without duplicates) so
+    that they can be left out.
+    """
+
+    def __init__(self, pts):
+        self.chunks = [pts]
+        self.exact_neighbors = {}
+        self.removed = np.empty(0, dtype=np.int64)
+        self.rows, self.dim = pts.shape
+        self.dtype = pts.dtype
+        self.__tail = None
+        self.__tail_rows = 0
+
+    shape = property(lambda self: (self.rows, self.dim))
+
+    def reserve(self, npts, capacity=None):
+        """
+        Makes room for npts more points, allocating a chunk of capacity
+        points if there is not enough room.
+        """
+        if self.__tail is None or self.__tail_rows + npts > self.__tail.shape[0]:
+            self.__tail = np.empty((max(npts, capacity or 0), self.dim), dtype=self.dtype)
+            self.__tail_rows = 0
+            self.chunks.append(self.__tail[:0])
+
+    def append(self, pts, growth=2.0):
+        """
+        Copies pts at the end of the store and returns the copy.
+        """
+        npts = pts.shape[0]
+        if growth <= 1:
+            growth = 2.0
+        self.reserve(npts, int(self.rows * (growth - 1)))
+
+        stored = self.__tail[self.__tail_rows:self.__tail_rows + npts]
+        stored[...] = pts
+        self.__tail_rows += npts
+        self.chunks[-1] = self.__tail[:self.__tail_rows]
+        self.rows += npts
+        return stored
+
+    def remove(self, ids):
+        """
+        Records the ids of points removed from the index, the exact
+        neighbors cached being outdated.
+        """
+        ids = np.asarray(ids, dtype=np.int64).ravel()
+        ids = ids[(ids >= 0) & (ids < self.rows)]
+        self.removed = np.union1d(self.removed, ids)
+        self.exact_neighbors.clear()
+
+    def toarray(self):
+        """
+        Returns all the points as a single array.
+        """
+        if len(self.chunks) == 1:
+            return self.chunks[0]
+        return np.concatenate(self.chunks)
+
+
+class _ResultCache(object):
+    """
+    Least recently used cache of nn_index results, one entry per query
+    point, holding at most max_bytes of keys and results. The search
+    threads share it, hence the lock.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.__entries = collections.OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def get(self, key):
+        with self.__lock:
+            entry = self.__entries.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.__entries[key] = entry
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        size = len(key[0]) + entry[0].nbytes + entry[1].nbytes
+        if size > self.max_bytes:
+            return
+        with self.__lock:
+            old = self.__entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= len(key[0]) + old[0].nbytes + old[1].nbytes
+            self.__entries[key] = entry
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                k, e = self.__entries.popitem(last=False)
+                self.nbytes -= len(k[0]) + e[0].nbytes + e[1].nbytes
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.nbytes = 0
+
+
 # This class is derived from an initial implementation by Hoyt Koepke
 # (hoytak@cs.ubc.ca)
 
@@ -78,32 +405,70 @@ class FLANN(object):
 
     _as_parameter_ = property(lambda self: self.__curindex)
 
-    def __init__(self, **kwargs):
+    def __init__(self, distance_type=None, distance_order=0,
+                 result_cache_bytes=0, **kwargs):
         """
         Constructor for the class and returns a class that can bind to
         the flann libraries.  Any keyword arguments passed to __init__
         override the global defaults given.
+
+        distance_type is the distance used by this instance (see
+        set_distance_type for the possible values). When it is None the
+        distance set with set_distance_type is used, as it was when the
+        index was built.
+
+        If result_cache_bytes is not 0, the results of nn_index are kept
+        in a least recently used cache of at most this size, so that
+        repeated query points are not searched again. The cache is
+        emptied whenever the index changes, see result_cache_info.
         """
 
         self.__rn_gen.seed()
 
+        if isinstance(distance_type, str):
+            distance_type = distance_translation[distance_type]
+        self.__distance_type = distance_type
+        self.__distance_order = distance_order
+
         self.__curindex = None
         self.__curindex_data = None
         self.__curindex_type = None
+        # (distance_type, order) the current index was built or loaded with
+        self.__index_distance = None
+
+        # metric of an algorithm='gemm' index, searched with an ExactSearch
+        # built when first queried
+        self.__exact_metric = None
+        self.__exact = None
 
         self.__flann_parameters = FLANNParameters()
         self.__flann_parameters.update(kwargs)
 
+        self.__result_cache = None
+        if result_cache_bytes:
+            self.__result_cache = _ResultCache(result_cache_bytes)
+
     def __del__(self):
         self.delete_index()
 
     ##########################################################################
     # actual workhorse functions
 
-    def nn(self, pts, qpts, num_neighbors=1, **kwargs):
+    def nn(self, pts, qpts, num_neighbors=1, out=None, **kwargs):
         """
         Returns the num_neighbors nearest points in dataset for each point
         in testset.
+
+        out can be a (result, dists) pair of preallocated arrays of shape
+        (nqpts, num_neighbors) the results are written to, so that no
+        arrays are allocated by the call. result must be of index_type
+        and dists of the same type as pts for float64 data, float32
+        otherwise.
+
+        With algorithm='gemm' the exact neighbors are found with matrix
+        products, see pyflann.exact.ExactSearch, for metric='euclidean'
+        (the default) or metric='inner_product', in which case the points
+        with the largest inner products are returned along with them.
         """
 
         if pts.dtype.type not in allowed_types:
@@ -124,25 +489,35 @@ class FLANN(object):
         assert qpts.shape[1] == dim, 'data and query must have the same dims'
         assert npts >= num_neighbors, 'more neighbors than there are points'
 
-        result = np.empty((nqpts, num_neighbors), dtype=index_type)
         if pts.dtype == np.float64:
-            dists = np.empty((nqpts, num_neighbors), dtype=np.float64)
+            dists_type = np.float64
         else:
-            dists = np.empty((nqpts, num_neighbors), dtype=np.float32)
-
-        self.__flann_parameters.update(kwargs)
+            dists_type = np.float32
+        result, dists = _output_arrays(out, nqpts, num_neighbors, dists_type)
+
+        if kwargs.get('algorithm') == 'gemm':
+            kwargs = dict(kwargs)
+            del kwargs['algorithm']
+            metric = self.__exact_search_metric(kwargs)
+            self.__flann_parameters.update(kwargs)
+            from pyflann.exact import ExactSearch
+            result[:], dists[:] = ExactSearch(pts, metric).search(qpts, num_neighbors)
+        else:
+            _check_distance(pts.dtype, self.__distance()[0])
+            self.__flann_parameters.update(kwargs)
 
-        flann.find_nearest_neighbors[
-            pts.dtype.type](
-            pts, npts, dim, qpts, nqpts, result, dists, num_neighbors,
-            pointer(self.__flann_parameters))
+            flann.find_nearest_neighbors_with_distance[
+                pts.dtype.type](
+                pts, npts, dim, qpts, nqpts, result, dists, num_neighbors,
+                pointer(self.__flann_parameters), *self.__distance())
 
         if num_neighbors == 1:
             return (result.reshape(nqpts), dists.reshape(nqpts))
         else:
             return (result, dists)
 
-    def build_index(self, pts, **kwargs):
+    def build_index(self, pts, dtype=None, shape=None, tuning_cache=None,
+                    **kwargs):
         """
         This builds and internally stores an index to be used for
         future nearest neighbor matchings.  It erases any previously
@@ -150,34 +525,147 @@ class FLANN(object):
         work with multiple stored indices.  Use nn_index(...) to find
         the nearest neighbors in this index.
 
-        pts is a 2d numpy array or matrix. All the computation is done
-        in np.float32 type, but pts may be any type that is convertable
-        to np.float32.
+        pts is a 2d numpy array or matrix of type np.float32,
+        np.float64, np.uint8, np.int32, np.int8 or np.float16. The
+        distances are computed in np.float32 (np.float64 for np.float64
+        data), so that np.float16 and np.int8 datasets take half and a
+        quarter of the memory of np.float32 ones, the queries being of
+        the same type as the dataset.
+
+        pts can also be a np.memmap or the name of a file holding the
+        dataset (see load_dataset), in which case the index references
+        the memory mapped file directly instead of a copy in memory.
+
+        If tuning_cache is the name of a directory, the parameters chosen
+        by algorithm='autotuned' are saved in it, under a fingerprint of
+        the size, dimension, type, distance and sampled statistics of the
+        dataset. Later autotuned builds of datasets with the same
+        fingerprint reuse them and directly build the chosen index,
+        returning the speedup measured when tuning.
+
+        With algorithm='gemm' the index is searched exactly with matrix
+        products, as by nn, for metric='euclidean' or 'inner_product'.
         """
 
-        if pts.dtype.type not in allowed_types:
-            raise FLANNException('Cannot handle type: %s' % pts.dtype)
-
-        pts = ensure_2d_array(pts, default_flags)
+        pts = _prepare_dataset(pts, dtype, shape)
         npts, dim = pts.shape
 
         self.__ensureRandomSeed(kwargs)
+        distance = self.__distance()
+        _check_distance(pts.dtype, distance[0])
+
+        exact_metric = None
+        if kwargs.get('algorithm') == 'gemm':
+            # a linear index holds the points for add_points, remove_points
+            # and save_index, the searches being done by an ExactSearch
+            kwargs = dict(kwargs, algorithm='linear')
+            exact_metric = self.__exact_search_metric(kwargs)
 
         self.__flann_parameters.update(kwargs)
 
+        tuning_file = None
+        tuned = None
+        if tuning_cache is not None and self.__flann_parameters['algorithm'] == 'autotuned':
+            tuning_file = os.path.join(tuning_cache, 'autotune_%s.json' % _tuning_fingerprint(
+                pts, distance, self.__flann_parameters))
+            if os.path.exists(tuning_file):
+                with open(tuning_file) as f:
+                    tuned = json.load(f)
+                self.__flann_parameters.update(
+                    dict((k, v) for k, v in tuned.items() if k != 'speedup'))
+
         if self.__curindex is not None:
             flann.free_index[self.__curindex_type](
                 self.__curindex, pointer(self.__flann_parameters))
             self.__curindex = None
 
+        self.__clear_result_cache()
         speedup = c_float(0)
-        self.__curindex = flann.build_index[pts.dtype.type](
-            pts, npts, dim, byref(speedup), pointer(self.__flann_parameters))
-        self.__curindex_data = pts
+        self.__curindex = flann.build_index_with_distance[pts.dtype.type](
+            pts, npts, dim, byref(speedup), pointer(self.__flann_parameters),
+            *distance)
+        if self.__curindex is None:
+            raise FLANNException('Error occured while building the index.')
+        self.__curindex_data = _PointStore(pts)
         self.__curindex_type = pts.dtype.type
+        self.__index_distance = distance
+        self.__reset_exact_search(exact_metric)
 
         params = dict(self.__flann_parameters)
         params['speedup'] = speedup.value
+        if exact_metric is not None:
+            params['algorithm'] = 'gemm'
+            params['metric'] = exact_metric
+
+        if tuned is not None:
+            params['speedup'] = tuned['speedup']
+        elif tuning_file is not None:
+            if not os.path.isdir(tuning_cache):
+                os.makedirs(tuning_cache)
+            tuned = dict((k, v) for k, v in params.items()
+                         if k not in ('random_seed', 'log_level', 'cores'))
+            tmpname = '%s.%d.tmp' % (tuning_file, os.getpid())
+            with open(tmpname, 'w') as f:
+                json.dump(tuned, f, indent=2, sort_keys=True)
+            getattr(os, 'replace', os.rename)(tmpname, tuning_file)
+
+        return params
+
+    def build_index_from_chunks(self, chunks, num_points=None,
+                                initial_points=100000, rebuild_threshold=2.0,
+                                **kwargs):
+        """
+        Builds an index of the points of an iterable of 2d arrays (numpy
+        arrays, memory mapped arrays, HDF5 dataset slices, ...) without
+        first gathering them in a single array.
+
+        The index is built as by build_index, with the parameters in
+        kwargs, from the first chunks, at least initial_points points of
+        them (an autotuned index is tuned on these points only). The
+        following chunks are copied in the index with add_points, which
+        rebuilds it each time it grows by a factor of rebuild_threshold,
+        and the index is rebuilt a last time with the last chunk, so that
+        all the points are in search structures built from the whole
+        dataset. If the total number of points num_points is given, room
+        is made for them at once, so that the memory used is that of the
+        final dataset.
+
+        Returns the parameters of the initial build.
+        """
+        if rebuild_threshold <= 1:
+            raise FLANNException('rebuild_threshold must be greater than 1')
+
+        chunks = (chunk for chunk in chunks if len(chunk) > 0)
+        initial = []
+        npts = 0
+        for chunk in chunks:
+            initial.append(chunk)
+            npts += len(chunk)
+            if npts >= initial_points:
+                break
+        if npts == 0:
+            raise FLANNException('No points to index')
+
+        pts = initial[0] if len(initial) == 1 else np.concatenate(initial)
+        del initial
+        params = self.build_index(pts, **kwargs)
+        if num_points is not None and num_points > npts:
+            self.__curindex_data.reserve(num_points - npts)
+
+        # number of points when the index was last rebuilt, add_points
+        # rebuilds it once it has more than rebuilt * threshold points
+        rebuilt = npts
+        chunk = next(chunks, None)
+        while chunk is not None:
+            next_chunk = next(chunks, None)
+            npts += len(chunk)
+            threshold = rebuild_threshold
+            if next_chunk is None:
+                threshold = min(threshold, (1.0 + float(npts) / rebuilt) / 2)
+            self.add_points(chunk, threshold)
+            if rebuilt * threshold < npts:
+                rebuilt = npts
+            chunk = next_chunk
 
         return params
 
@@ -189,16 +677,16 @@ class FLANN(object):
             flann.save_index[self.__curindex_type](
                 self.__curindex, c_char_p(to_bytes(filename)))
 
-    def load_index(self, filename, pts):
+    def load_index(self, filename, pts, dtype=None, shape=None):
         """
-        Loads an index previously saved to disk.
+        Loads an index previously saved to disk. pts is the dataset the
+        index was built for and, as for build_index, can be a np.memmap
+        or the name of a file holding the dataset.
         """
 
-        if pts.dtype.type not in allowed_types:
-            raise FLANNException('Cannot handle type: %s' % pts.dtype)
-
-        pts = ensure_2d_array(pts, default_flags)
+        pts = _prepare_dataset(pts, dtype, shape)
         npts, dim = pts.shape
+        _check_distance(pts.dtype, self.__distance()[0])
 
         if self.__curindex is not None:
             flann.free_index[self.__curindex_type](
@@ -207,12 +695,103 @@ class FLANN(object):
             self.__curindex_data = None
             self.__curindex_type = None
 
-        self.__curindex = flann.load_index[pts.dtype.type](
-            c_char_p(to_bytes(filename)), pts, npts, dim)
-        self.__curindex_data = pts
+        self.__clear_result_cache()
+        distance = self.__distance()
+        self.__curindex = flann.load_index_with_distance[pts.dtype.type](
+            c_char_p(to_bytes(filename)), pts, npts, dim, *distance)
+        self.__curindex_data = _PointStore(pts)
         self.__curindex_type = pts.dtype.type
+        self.__index_distance = distance
+        self.__reset_exact_search(None)
         
-        
+    def to_bytes(self):
+        """
+        Returns the index serialized in memory, in the same format as
+        the files written by save_index. As with save_index, the dataset
+        is not included.
+        """
+        if self.__curindex is None:
+            raise FLANNException(
+                'build_index(...) method not called first or current index deleted.')
+
+        buffer = c_void_p()
+        size = c_size_t()
+        if flann.save_index_to_buffer[self.__curindex_type](
+                self.__curindex, byref(buffer), byref(size)) != 0:
+            raise FLANNException('Error occured while saving the index.')
+        try:
+            return string_at(buffer, size.value)
+        finally:
+            flannlib.flann_free_buffer(buffer)
+
+    def from_bytes(self, data, pts, dtype=None, shape=None):
+        """
+        Loads an index serialized with to_bytes. As for load_index, pts
+        is the dataset the index was built for.
+        """
+
+        pts = _prepare_dataset(pts, dtype, shape)
+        npts, dim = pts.shape
+        _check_distance(pts.dtype, self.__distance()[0])
+
+        if self.__curindex is not None:
+            flann.free_index[self.__curindex_type](
+                self.__curindex, pointer(self.__flann_parameters))
+            self.__curindex = None
+            self.__curindex_data = None
+            self.__curindex_type = None
+
+        self.__clear_result_cache()
+        distance = self.__distance()
+        self.__curindex = flann.load_index_from_buffer_with_distance[pts.dtype.type](
+            data, len(data), pts, npts, dim, *distance)
+        if self.__curindex is None:
+            raise FLANNException('Error occured while loading the index.')
+        self.__curindex_data = _PointStore(pts)
+        self.__curindex_type = pts.dtype.type
+        self.__index_distance = distance
+        self.__reset_exact_search(None)
+
+    def __getstate__(self):
+        state = {'params': dict(self.__flann_parameters),
+                 'distance': self.__distance(),
+                 'index': None,
+                 'data': None,
+                 'result_cache_bytes': 0,
+                 'exact_metric': self.__exact_metric,
+                 'removed_ids': []}
+        if self.__result_cache is not None:
+            state['result_cache_bytes'] = self.__result_cache.max_bytes
+        if self.__curindex is not None:
+            # the copy searches with the distance the index was built with,
+            # whatever the global distance is now
+            state['distance'] = self.__index_distance
+            state['index'] = self.to_bytes()
+            state['data'] = np.asarray(self.__curindex_data.toarray())
+            state['removed_ids'] = self.__curindex_data.removed
+        return state
+
+    def __setstate__(self, state):
+        self.__init__(*state['distance'],
+                      result_cache_bytes=state.get('result_cache_bytes', 0))
+        self.__flann_parameters.update(state['params'])
+        if state['index'] is not None:
+            self.from_bytes(state['index'], state['data'])
+            self.__exact_metric = state.get('exact_metric')
+            self.__curindex_data.remove(state.get('removed_ids', []))
+
+    def result_cache_info(self):
+        """
+        Returns the hits, misses (counted per query point), entries and
+        bytes of the result cache, or None if it is disabled.
+        """
+        cache = self.__result_cache
+        if cache is None:
+            return None
+        return {'hits': cache.hits, 'misses': cache.misses,
+                'entries': len(cache), 'bytes': cache.nbytes,
+                'max_bytes': cache.max_bytes}
+
     def used_memory(self):
         """
         Returns the number of bytes consumed by the index.
@@ -230,26 +809,86 @@ class FLANN(object):
                 efficient but less computationally efficient. Must be greater \
                 than 1.           
         """
+        if self.__curindex is None:
+            raise FLANNException(
+                'build_index(...) method not called first or current index deleted.')
+
         if not pts.dtype.type in allowed_types:
             raise FLANNException("Cannot handle type: %s"%pts.dtype)
+
+        if self.__curindex_type != pts.dtype.type:
+            raise FLANNException('Index and points must have the same type')
+
         pts = ensure_2d_array(pts,default_flags) 
         npts, dim = pts.shape
+        # the index keeps pointers to the rows it is given, so pass it the
+        # copy held by the point store rather than the caller's array
+        pts = self.__curindex_data.append(pts, rebuild_threshold)
         flann.add_points[self.__curindex_type](self.__curindex, pts, npts, dim, rebuild_threshold)
-        self.__curindex_data = np.row_stack((self.__curindex_data,pts))
+        self.__clear_result_cache()
+        self.__exact = None
         
     def remove_point(self, idx):
         """
         Removes a point from a pre-built index.         
         """
+        # the point data is left in place since the index still references it
         flann.remove_point[self.__curindex_type](self.__curindex, idx)
-        self.__curindex_data = np.delete(self.__curindex_data,idx,axis=0)
+        self.__clear_result_cache()
+        self.__remove_ids([idx])
 
-    def nn_index(self, qpts, num_neighbors=1, **kwargs):
+    def remove_points(self, ids):
+        """
+        Removes several points from a pre-built index in a single call.
+
+        ids is an array (or list) with the ids of the points to remove,
+        as returned by nn_index. The removed points are only marked as
+        such in the index, their data is left in place.
+        """
+        if self.__curindex is None:
+            raise FLANNException(
+                'build_index(...) method not called first or current index deleted.')
+
+        ids = np.asarray(ids).ravel()
+        if ids.size > 0 and ids.min() < 0:
+            raise FLANNException('Point ids must be non-negative')
+        ids = np.require(ids, np.uint32, default_flags)
+
+        self.__clear_result_cache()
+        if flann.remove_points[self.__curindex_type](
+                self.__curindex, ids, ids.size) != 0:
+            raise FLANNException('Error occured while removing points.')
+        self.__remove_ids(ids)
+
+    def nn_index(self, qpts, num_neighbors=1, out=None, allowed=None,
+                 excluded=None, **kwargs):
         """
         For each point in querypts, (which may be a single point), it
         returns the num_neighbors nearest points in the index built by
         calling build_index.
+
+        The keyword arguments (checks, eps, cores, ...) only apply to this
+        query, so several threads can query the same index at the same
+        time with different parameters.
+
+        As for nn, out can be a (result, dists) pair of preallocated
+        arrays the results are written to.
+
+        allowed and excluded restrict the search to some of the points,
+        each being an array of point ids or a boolean mask over the ids:
+        only the allowed points (all if None) that are not excluded are
+        returned. The other points are skipped while searching, as removed
+        points are, so they do not use up the checks. If less than
+        num_neighbors points pass the filter, the missing neighbors are
+        returned as -1 at an infinite distance. Filtered searches do not
+        use the result cache.
         """
+        return self.__nn_index(qpts, num_neighbors, out, allowed, excluded, **kwargs)
+
+    def __nn_index(self, qpts, num_neighbors=1, out=None, allowed=None,
+                   excluded=None, use_cache=True, **kwargs):
+        # nn_index, searching the index rather than the result cache when
+        # use_cache is False, as tune_curve times the searches
 
         if self.__curindex is None:
             raise FLANNException(
@@ -273,18 +912,21 @@ class FLANN(object):
         assert qpts.shape[1] == dim, 'data and query must have the same dims'
         assert npts >= num_neighbors, 'more neighbors than there are points'
 
-        result = np.empty((nqpts, num_neighbors), dtype=index_type)
         if self.__curindex_type == np.float64:
-            dists = np.empty((nqpts, num_neighbors), dtype=np.float64)
+            dists_type = np.float64
         else:
-            dists = np.empty((nqpts, num_neighbors), dtype=np.float32)
+            dists_type = np.float32
+        result, dists = _output_arrays(out, nqpts, num_neighbors, dists_type)
 
-        self.__flann_parameters.update(kwargs)
+        params = self.__search_parameters(kwargs)
+        allowed = self.__search_filter(allowed, excluded)
 
-        flann.find_nearest_neighbors_index[
-            self.__curindex_type](
-            self.__curindex, qpts, nqpts, result, dists, num_neighbors,
-            pointer(self.__flann_parameters))
+        if allowed is not None:
+            self.__find_nearest_neighbors(qpts, result, dists, num_neighbors, params, allowed)
+        elif self.__result_cache is not None and use_cache:
+            self.__cached_nn_index(qpts, result, dists, num_neighbors, params)
+        else:
+            self.__find_nearest_neighbors(qpts, result, dists, num_neighbors, params)
 
         if num_neighbors == 1:
             return (result.reshape(nqpts), dists.reshape(nqpts))
@@ -292,6 +934,17 @@ class FLANN(object):
             return (result, dists)
 
     def nn_radius(self, query, radius, **kwargs):
+        """
+        Returns the points in the index that are within the given radius
+        of the query (for the euclidean distance the radius is squared).
+
+        If query is a single point, the (indices, dists) of its neighbors
+        are returned. If query is a 2d array of points, all the points are
+        searched at once and the results are returned in compressed row
+        format as (indptr, indices, dists): the neighbors of query point i
+        are indices[indptr[i]:indptr[i+1]]. The max_neighbors parameter
+        limits the number of neighbors returned for each query point.
+        """
 
         if self.__curindex is None:
             raise FLANNException(
@@ -303,23 +956,152 @@ class FLANN(object):
         if self.__curindex_type != query.dtype.type:
             raise FLANNException('Index and query must have the same type')
 
+        single_query = query.ndim == 1
+        qpts = ensure_2d_array(query, default_flags)
+
         npts, dim = self.__curindex_data.shape
-        assert query.shape[0] == dim, 'data and query must have the same dims'
+        nqpts = qpts.shape[0]
+        assert qpts.shape[1] == dim, 'data and query must have the same dims'
 
-        result = np.empty(npts, dtype=index_type)
+        if self.__exact_metric == 'inner_product':
+            raise FLANNException('Radius search is not supported for metric="inner_product"')
+
+        indptr = np.empty(nqpts + 1, dtype=index_type)
+        indices_ptr = POINTER(c_int)()
         if self.__curindex_type == np.float64:
-            dists = np.empty(npts, dtype=np.float64)
+            dists_ptr = POINTER(c_double)()
         else:
-            dists = np.empty(npts, dtype=np.float32)
+            dists_ptr = POINTER(c_float)()
 
-        self.__flann_parameters.update(kwargs)
+        params = self.__search_parameters(kwargs)
 
-        nn = flann.radius_search[
+        nn = flann.radius_search_multi[
             self.__curindex_type](
-            self.__curindex, query, result, dists, npts, radius,
-            pointer(self.__flann_parameters))
+            self.__curindex, qpts, nqpts, indptr, byref(indices_ptr),
+            byref(dists_ptr), radius, pointer(params))
+
+        try:
+            if nn < 0:
+                raise FLANNException('Error occured during radius search.')
+            result = np.ctypeslib.as_array(indices_ptr, shape=(nn,)).copy()
+            dists = np.ctypeslib.as_array(dists_ptr, shape=(nn,)).copy()
+        finally:
+            flannlib.flann_free_buffer(indices_ptr)
+            flannlib.flann_free_buffer(dists_ptr)
+
+        if single_query:
+            return (result, dists)
+        else:
+            return (indptr, result, dists)
 
-        return (result[0:nn], dists[0:nn])
+    def query_many(self, batches, num_neighbors=1, executor=None, **kwargs):
+        """
+        Runs nn_index on each query batch in batches and returns the list
+        of the (result, dists) of each batch.
+
+        The batches are searched in parallel on the threads of executor
+        (a concurrent.futures.Executor), or on a thread pool created for
+        the call if executor is None. The searches run without holding
+        the GIL and all share this index. The keyword arguments are
+        passed to nn_index.
+
+        When the thread pool is created for the call, it already has a
+        thread per core, so each batch is searched with cores=1 unless
+        cores is given, instead of starting a thread per core for each
+        of them.
+        """
+
+        if executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            from multiprocessing import cpu_count
+            kwargs.setdefault('cores', 1)
+            with ThreadPoolExecutor(max_workers=cpu_count()) as pool:
+                return self.query_many(batches, num_neighbors, pool, **kwargs)
+
+        futures = [executor.submit(self.nn_index, qpts, num_neighbors, **kwargs)
+                   for qpts in batches]
+        return [f.result() for f in futures]
+
+    def tune_curve(self, queries, num_neighbors=1,
+                   checks=(16, 32, 64, 128, 256, 512, 1024, 2048), eps=(0.0,),
+                   exact=None, repeat=3, **kwargs):
+        """
+        Measures the precision and the search time of the index for each
+        combination of the checks and eps values, without rebuilding it.
+        Returns the settings of the precision vs search time frontier
+        (those for which no other setting is both faster and at least as
+        precise) sorted by search time, as a list of dicts with the
+        checks, eps, precision and search_time (seconds per query, the
+        best of repeat runs) of each setting. Any of them can then be
+        passed to nn_index.
+
+        The precision is the fraction of the num_neighbors exact nearest
+        neighbors of queries that are found. Unless they are given as
+        exact, these are computed with a linear search of the points left
+        in the index (with the metric of a gemm index) and cached until
+        points are added or removed. The
+        other keyword arguments (cores, ...) are passed to nn_index. The
+        result cache is neither read nor filled, so that the searches are
+        timed.
+        """
+
+        if self.__curindex is None:
+            raise FLANNException(
+                'build_index(...) method not called first or current index deleted.')
+
+        queries = ensure_2d_array(queries, default_flags)
+        nqpts = queries.shape[0]
+
+        if exact is None:
+            store = self.__curindex_data
+            key = (hashlib.sha1(queries.tobytes()).hexdigest(), queries.shape,
+                   num_neighbors, store.rows)
+            exact = store.exact_neighbors.get(key)
+            if exact is None:
+                if self.__exact_metric is not None:
+                    # the metric of a gemm index is not one the linear
+                    # search of ground_truth knows
+                    from pyflann.exact import ExactSearch
+                    reference = ExactSearch(store.chunks, self.__exact_metric)
+                    reference.remove(store.removed)
+                    exact = reference.search(queries, num_neighbors)[0]
+                elif store.removed.size > 0:
+                    # only the points left in the index are searched
+                    data = store.toarray()
+                    live = np.ones(store.rows, dtype=bool)
+                    live[store.removed] = False
+                    live = np.flatnonzero(live)
+                    exact = live[ground_truth(data[live], queries, num_neighbors,
+                                              *self.__index_distance)]
+                else:
+                    exact = ground_truth(store.toarray(), queries, num_neighbors,
+                                         *self.__index_distance)
+                store.exact_neighbors[key] = exact
+        exact = np.asarray(exact).reshape(nqpts, num_neighbors)
+
+        settings = []
+        for c in checks:
+            for e in eps:
+                search_time = None
+                for i in range(repeat):
+                    start = time.perf_counter()
+                    result = self.__nn_index(queries, num_neighbors, checks=c,
+                                             eps=e, use_cache=False, **kwargs)[0]
+                    elapsed = (time.perf_counter() - start) / nqpts
+                    if search_time is None or elapsed < search_time:
+                        search_time = elapsed
+                result = result.reshape(nqpts, num_neighbors)
+                found = sum(len(np.intersect1d(r, x)) for r, x in zip(result, exact))
+                settings.append({'checks': c, 'eps': e,
+                                 'precision': float(found) / exact.size,
+                                 'search_time': search_time})
+
+        settings.sort(key=lambda s: (s['search_time'], -s['precision']))
+        frontier = []
+        for setting in settings:
+            if not frontier or setting['precision'] > frontier[-1]['precision']:
+                frontier.append(setting)
+        return frontier
 
     def delete_index(self, **kwargs):
         """
@@ -334,6 +1116,9 @@ class FLANN(object):
                 self.__curindex, pointer(self.__flann_parameters))
             self.__curindex = None
             self.__curindex_data = None
+            self.__index_distance = None
+            self.__clear_result_cache()
+            self.__reset_exact_search(None)
 
     ##########################################################################
     # Clustering functions
@@ -424,9 +1209,9 @@ class FLANN(object):
 
         self.__flann_parameters.update(params)
 
-        numclusters = flann.compute_cluster_centers[pts.dtype.type](
+        numclusters = flann.compute_cluster_centers_with_distance[pts.dtype.type](
             pts, npts, dim, num_clusters, result,
-            pointer(self.__flann_parameters))
+            pointer(self.__flann_parameters), *self.__distance())
         if numclusters <= 0:
             raise FLANNException('Error occured during clustering procedure.')
 
@@ -438,6 +1223,125 @@ class FLANN(object):
     ##########################################################################
     # internal bookkeeping functions
 
+    def __cached_nn_index(self, qpts, result, dists, num_neighbors, params):
+        # the key holds the effective search parameters, the base parameters
+        # being changed by nn, hierarchical_kmeans and delete_index; the
+        # results do not depend on the number of cores
+        search = (num_neighbors,
+                  tuple(params[k] for k in ('checks', 'eps', 'sorted', 'max_neighbors')))
+        result = result.reshape(qpts.shape[0], num_neighbors)
+        dists = dists.reshape(qpts.shape[0], num_neighbors)
+        missing = collections.OrderedDict()
+        for i, row in enumerate(qpts):
+            key = (row.tobytes(), search)
+            entry = self.__result_cache.get(key)
+            if entry is None:
+                missing.setdefault(key, []).append(i)
+            else:
+                result[i], dists[i] = entry
+
+        if not missing:
+            return
+
+        # only the distinct query points that missed are searched
+        rows = [i[0] for i in missing.values()]
+        mqpts = np.ascontiguousarray(qpts[rows])
+        mresult = np.empty((len(rows), num_neighbors), dtype=result.dtype)
+        mdists = np.empty((len(rows), num_neighbors), dtype=dists.dtype)
+        self.__find_nearest_neighbors(mqpts, mresult, mdists, num_neighbors, params)
+
+        for (key, i), r, d in zip(missing.items(), mresult, mdists):
+            result[i] = r
+            dists[i] = d
+            self.__result_cache.put(key, (r.copy(), d.copy()))
+
+    def __find_nearest_neighbors(self, qpts, result, dists, num_neighbors, params,
+                                 allowed=None):
+        if self.__exact_metric is None and allowed is not None:
+            flann.find_nearest_neighbors_index_filtered[
+                self.__curindex_type](
+                self.__curindex, qpts, qpts.shape[0], result, dists, num_neighbors,
+                np.packbits(allowed, bitorder='little'), allowed.size, pointer(params))
+            return
+        if self.__exact_metric is None:
+            flann.find_nearest_neighbors_index[
+                self.__curindex_type](
+                self.__curindex, qpts, qpts.shape[0], result, dists, num_neighbors,
+                pointer(params))
+            return
+
+        if self.__exact is None:
+            from pyflann.exact import ExactSearch
+            self.__exact = ExactSearch(self.__curindex_data.chunks, self.__exact_metric)
+            if self.__curindex_data.removed.size > 0:
+                self.__exact.remove(self.__curindex_data.removed)
+        r, d = self.__exact.search(qpts, num_neighbors, allowed)
+        result.reshape(r.shape)[:] = r
+        dists.reshape(d.shape)[:] = d
+
+    def __search_filter(self, allowed, excluded):
+        """
+        Returns the boolean mask over the point ids of the points passing
+        the allowed and excluded filters of nn_index, or None.
+        """
+        if allowed is None and excluded is None:
+            return None
+        nids = self.__curindex_data.shape[0]
+
+        def mask(ids):
+            ids = np.asarray(ids)
+            if ids.dtype == np.bool_:
+                if ids.shape != (nids,):
+                    raise FLANNException('Filter masks must have one value per point id')
+                return ids
+            ids = ids.ravel()
+            if ids.size > 0 and (ids.min() < 0 or ids.max() >= nids):
+                raise FLANNException('Point ids must be between 0 and %d' % (nids - 1))
+            m = np.zeros(nids, dtype=np.bool_)
+            m[ids.astype(np.int64)] = True
+            return m
+
+        if allowed is None:
+            return ~mask(excluded)
+        if excluded is None:
+            return mask(allowed)
+        return mask(allowed) & ~mask(excluded)
+
+    def __exact_search_metric(self, kwargs):
+        from pyflann.exact import metrics
+        metric = kwargs.pop('metric', 'euclidean')
+        if metric not in metrics:
+            raise FLANNException('Unknown metric: %s' % metric)
+        if metric == 'euclidean' and self.__distance()[0] != distance_translation['euclidean']:
+            raise FLANNException('algorithm="gemm" only supports the euclidean distance '
+                                 'and metric="inner_product"')
+        return metric
+
+    def __reset_exact_search(self, metric):
+        self.__exact_metric = metric
+        self.__exact = None
+
+    def __remove_ids(self, ids):
+        self.__curindex_data.remove(ids)
+        if self.__exact is not None:
+            self.__exact.remove(ids)
+
+    def __clear_result_cache(self):
+        if self.__result_cache is not None:
+            self.__result_cache.clear()
+
+    def __search_parameters(self, kwargs):
+        params = FLANNParameters()
+        memmove(byref(params), byref(self.__flann_parameters), sizeof(params))
+        params.update(kwargs)
+        return params
+
+    def __distance(self):
+        if self.__distance_type is None:
+            return (flannlib.flann_get_distance_type(),
+                    flannlib.flann_get_distance_order())
+        return (self.__distance_type, self.__distance_order)
+
     def __ensureRandomSeed(self, kwargs):
         if 'random_seed' not in kwargs:
             kwargs['random_seed'] = self.__rn_gen.randint(2 ** 30)
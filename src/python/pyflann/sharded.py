@@ -0,0 +1,249 @@
+#Copyright 2008-2010  Marius Muja (mariusm@cs.ubc.ca). All rights reserved.
+#Copyright 2008-2010  David G. Lowe (lowe@cs.ubc.ca). All rights reserved.
+#
+#THE BSD LICENSE
+#
+#Redistribution and use in source and binary forms, with or without
+#modification, are permitted provided that the following conditions
+#are met:
+#
+#1. Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+#2. Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+#
+#THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+#IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+#OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+#IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY DIRECT, INDIRECT,
+#INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+#NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+#THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import multiprocessing
+import numpy as np
+
+from pyflann.index import FLANN, index_type
+from pyflann.exceptions import FLANNException
+
+
+def _worker(conn, distance_type, distance_order):
+    """
+    Main loop of a shard process: runs the FLANN methods it is sent on
+    its own index and sends back their results.
+    """
+    flann = FLANN(distance_type, distance_order)
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        method, args, kwargs = request
+        try:
+            conn.send((True, getattr(flann, method)(*args, **kwargs)))
+        except Exception as e:
+            conn.send((False, e))
+    flann.delete_index()
+    conn.close()
+
+
+def _shard_filter(ids, offset, size, npts):
+    """
+    Returns the part of an allowed or excluded filter of nn_index (a
+    boolean mask or an array of ids of the whole dataset) for the shard
+    of size points starting at offset, with the ids of the shard.
+    """
+    if ids is None:
+        return None
+    ids = np.asarray(ids)
+    if ids.dtype == np.bool_:
+        if ids.shape != (npts,):
+            raise FLANNException('Filter masks must have one value per point id')
+        return ids[offset:offset + size]
+    ids = ids.ravel().astype(np.int64)
+    if ids.size > 0 and (ids.min() < 0 or ids.max() >= npts):
+        raise FLANNException('Point ids must be between 0 and %d' % (npts - 1))
+    return ids[(ids >= offset) & (ids < offset + size)] - offset
+
+
+class ShardedFLANN(object):
+    """
+    An index partitioned across worker processes.
+
+    The dataset is split in num_shards contiguous shards, each indexed
+    by its own FLANN object in a separate process. Queries are sent to
+    all the shards, which search them in parallel, and the results of
+    the shards are merged, with the ids of the points in the whole
+    dataset. The same parameters as for FLANN.build_index, nn_index and
+    nn_radius are accepted.
+    """
+
+    def __init__(self, num_shards=None, distance_type=None, distance_order=0):
+        if num_shards is None:
+            num_shards = multiprocessing.cpu_count()
+        if num_shards < 1:
+            raise FLANNException('num_shards must be >= 1')
+        self.num_shards = num_shards
+        self.__distance_type = distance_type
+        self.__distance_order = distance_order
+        self.__workers = []
+        self.__offsets = None
+        self.__sizes = None
+
+    def __del__(self):
+        self.delete_index()
+
+    def __start(self):
+        for i in range(self.num_shards):
+            conn, worker_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_worker,
+                args=(worker_conn, self.__distance_type, self.__distance_order))
+            process.daemon = True
+            process.start()
+            worker_conn.close()
+            self.__workers.append((process, conn))
+
+    def __call(self, method, args_per_shard, **kwargs):
+        # send all the requests first so that the shards work in parallel
+        try:
+            for (process, conn), args in zip(self.__workers, args_per_shard):
+                conn.send((method, args, kwargs))
+            results = [conn.recv() for (process, conn) in self.__workers]
+        except (EOFError, IOError, OSError):
+            # a worker died, the pipes of the others may still hold its
+            # results, so all the shards are stopped
+            self.delete_index()
+            raise FLANNException('A shard worker process died, the index was deleted.')
+        for ok, result in results:
+            if not ok:
+                raise result
+        return [result for ok, result in results]
+
+    def build_index(self, pts, **kwargs):
+        """
+        Splits pts in shards and builds the index of each shard. Returns
+        the parameters used by each shard.
+        """
+        pts = np.asarray(pts)
+        if pts.ndim != 2 or pts.shape[0] < self.num_shards:
+            raise FLANNException('pts must be a 2d array with at least one point per shard')
+
+        self.delete_index()
+        self.__start()
+
+        bounds = np.linspace(0, pts.shape[0], self.num_shards + 1).astype(index_type)
+        self.__offsets = bounds[:-1]
+        self.__sizes = np.diff(bounds)
+        return self.__call('build_index',
+                           [(pts[bounds[i]:bounds[i + 1]],)
+                            for i in range(self.num_shards)], **kwargs)
+
+    def nn_index(self, qpts, num_neighbors=1, allowed=None, excluded=None, **kwargs):
+        """
+        For each point in qpts returns the num_neighbors nearest points
+        of all the shards, as FLANN.nn_index. The allowed and excluded
+        filters hold ids of (or are masks over) the whole dataset, each
+        shard getting its own part of them.
+        """
+        if not self.__workers:
+            raise FLANNException(
+                'build_index(...) method not called first or current index deleted.')
+        if num_neighbors > self.__sizes.sum():
+            raise FLANNException('more neighbors than there are points')
+
+        qpts = np.asarray(qpts)
+        nqpts = qpts.size // qpts.shape[-1]
+        shard_neighbors = np.minimum(self.__sizes, num_neighbors)
+        npts = int(self.__sizes.sum())
+        args = []
+        for k, offset, size in zip(shard_neighbors, self.__offsets, self.__sizes):
+            args.append((qpts, int(k), None,
+                         _shard_filter(allowed, offset, size, npts),
+                         _shard_filter(excluded, offset, size, npts)))
+        results = self.__call('nn_index', args, **kwargs)
+
+        # the -1 ids of the neighbors missing when the filters leave less
+        # than num_neighbors points are kept as such
+        result = np.concatenate(
+            [np.where(r < 0, r, r + offset).reshape(nqpts, k) for (r, d), k, offset
+             in zip(results, shard_neighbors, self.__offsets)], axis=1)
+        dists = np.concatenate(
+            [d.reshape(nqpts, k) for (r, d), k in zip(results, shard_neighbors)],
+            axis=1)
+
+        # per query, the num_neighbors closest of all the shard results
+        order = np.argsort(dists, axis=1, kind='mergesort')[:, :num_neighbors]
+        rows = np.arange(nqpts)[:, None]
+        result = result[rows, order].astype(index_type)
+        dists = dists[rows, order]
+
+        if num_neighbors == 1:
+            return (result.reshape(nqpts), dists.reshape(nqpts))
+        else:
+            return (result, dists)
+
+    def nn_radius(self, query, radius, **kwargs):
+        """
+        Returns the points of all the shards within the given radius of
+        the query, as FLANN.nn_radius. The neighbors of each query point
+        are sorted by distance.
+        """
+        if not self.__workers:
+            raise FLANNException(
+                'build_index(...) method not called first or current index deleted.')
+
+        query = np.asarray(query)
+        single_query = query.ndim == 1
+        qpts = query.reshape(-1, query.shape[-1])
+        nqpts = qpts.shape[0]
+        results = self.__call('nn_radius', [(qpts, radius)] * self.num_shards,
+                              **kwargs)
+
+        # merge the compressed rows of the shards: tag each neighbor with
+        # its query point, then sort by query point and distance
+        rows = np.concatenate([np.repeat(np.arange(nqpts), np.diff(indptr))
+                               for indptr, indices, dists in results])
+        indices = np.concatenate([indices + offset for (indptr, indices, dists), offset
+                                  in zip(results, self.__offsets)])
+        dists = np.concatenate([dists for indptr, indices, dists in results])
+        order = np.lexsort((dists, rows))
+        rows = rows[order]
+        indices = indices[order].astype(index_type)
+        dists = dists[order]
+
+        max_neighbors = kwargs.get('max_neighbors', -1)
+        if max_neighbors >= 0:
+            counts = np.bincount(rows, minlength=nqpts)
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            keep = np.arange(len(rows)) - starts[rows] < max_neighbors
+            rows = rows[keep]
+            indices = indices[keep]
+            dists = dists[keep]
+
+        if single_query:
+            return (indices, dists)
+
+        indptr = np.zeros(nqpts + 1, dtype=index_type)
+        np.cumsum(np.bincount(rows, minlength=nqpts), out=indptr[1:])
+        return (indptr, indices, dists)
+
+    def delete_index(self):
+        """
+        Deletes the shard indexes and stops the worker processes.
+        """
+        for process, conn in self.__workers:
+            try:
+                conn.send(None)
+            except (IOError, OSError):
+                pass
+            conn.close()
+        for process, conn in self.__workers:
+            process.join()
+        self.__workers = []
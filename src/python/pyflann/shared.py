@@ -0,0 +1,137 @@
+#Copyright 2008-2010  Marius Muja (mariusm@cs.ubc.ca). All rights reserved.
+#Copyright 2008-2010  David G. Lowe (lowe@cs.ubc.ca). All rights reserved.
+#
+#THE BSD LICENSE
+#
+#Redistribution and use in source and binary forms, with or without
+#modification, are permitted provided that the following conditions
+#are met:
+#
+#1. Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+#2. Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+#
+#THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+#IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+#OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+#IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY DIRECT, INDIRECT,
+#INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+#NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+#THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import numpy as np
+
+from pyflann.index import FLANN, load_dataset
+from pyflann.exceptions import FLANNException
+
+
+def _attach_shared_memory(name):
+    from multiprocessing import shared_memory
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # before python 3.13 attaching always registers the segment with
+        # the resource tracker, which pool workers share with the process
+        # that created the segment, so that this is harmless for them
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedIndex(object):
+    """
+    Publishes a built index so that the processes of a worker pool can
+    attach to it instead of each loading or building its own copy.
+
+    The dataset and the serialized index are stored in shared memory
+    segments (multiprocessing.shared_memory, python >= 3.8), or in files
+    if path is given, in which case the dataset is memory mapped by the
+    workers. Either way the workers index the dataset in place, so its
+    physical pages are shared by all of them. The search structures
+    (trees, clusters, hash tables) are deserialized in each worker from
+    the shared copy, which is much faster than building them.
+
+    A SharedIndex can be pickled and sent to the workers, where attach()
+    returns a FLANN object using the shared data. This object must not
+    outlive the SharedIndex it was attached from. The creating process
+    must call unlink() once the workers are done to free the segments.
+    """
+
+    def __init__(self, flann, path=None):
+        state = flann.__getstate__()
+        if state['index'] is None:
+            raise FLANNException(
+                'build_index(...) method not called first or current index deleted.')
+
+        data = state['data']
+        # the state of the index but its serialized index and dataset, which
+        # the workers read from the shared copies
+        self.state = dict(state, index=None, data=None)
+        self.shape = data.shape
+        self.dtype = data.dtype.str
+        self.path = path
+        self.__owner = True
+        self.__segments = []
+
+        if path is not None:
+            np.save(path + '.npy', data)
+            with open(path + '.index', 'wb') as f:
+                f.write(state['index'])
+            self.names = None
+        else:
+            from multiprocessing import shared_memory
+            index = state['index']
+            data_segment = shared_memory.SharedMemory(create=True, size=max(data.nbytes, 1))
+            index_segment = shared_memory.SharedMemory(create=True, size=len(index))
+            np.ndarray(data.shape, dtype=data.dtype, buffer=data_segment.buf)[...] = data
+            index_segment.buf[:len(index)] = index
+            self.__segments = [data_segment, index_segment]
+            self.names = (data_segment.name, index_segment.name)
+            self.index_size = len(index)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_SharedIndex__owner'] = False
+        state['_SharedIndex__segments'] = []
+        return state
+
+    def attach(self):
+        """
+        Returns a FLANN object searching the shared index. Its dataset is
+        read-only.
+        """
+        if self.path is not None:
+            with open(self.path + '.index', 'rb') as f:
+                index = f.read()
+            data = load_dataset(self.path + '.npy')
+        else:
+            if not self.__segments:
+                self.__segments = [_attach_shared_memory(name) for name in self.names]
+            data_segment, index_segment = self.__segments
+            index = bytes(index_segment.buf[:self.index_size])
+            data = np.ndarray(self.shape, dtype=np.dtype(self.dtype),
+                              buffer=data_segment.buf)
+            data.flags.writeable = False
+
+        flann = FLANN.__new__(FLANN)
+        flann.__setstate__(dict(self.state, index=index, data=data))
+        return flann
+
+    def unlink(self):
+        """
+        Frees the shared data. Only the process that created the shared
+        index can unlink it.
+        """
+        if not self.__owner:
+            raise FLANNException('Only the process sharing an index can unlink it')
+        if self.path is not None:
+            import os
+            os.remove(self.path + '.npy')
+            os.remove(self.path + '.index')
+        for segment in self.__segments:
+            segment.close()
+            segment.unlink()
+        self.__segments = []
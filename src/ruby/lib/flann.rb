@@ -37,12 +37,15 @@ module Flann
   ffi_lib "libflann"
 
   # Declare enumerators
-  Algorithm    = enum(:algorithm, [:linear, :kdtree, :kmeans, :composite, :kdtree_single, :hierarchical, :lsh, :kdtree_cuda, :saved, 254, :autotuned, 255])
+  Algorithm    = enum(:algorithm, [:linear, :kdtree, :kmeans, :composite, :kdtree_single, :hierarchical, :lsh, :kdtree_cuda, :pq, :saved, 254, :autotuned, 255])
   CentersInit  = enum(:centers_init, [:random, :gonzales, :kmeanspp])
   LogLevel     = enum(:log_level, [:none, :fatal, :error, :warn, :info, :debug])
 
-  # Note that Hamming and beyond are not supported in the C API. We include them here just in case of future improvements.
-  DistanceType = enum(:distance_type, [:undefined, :euclidean, :l2, :manhattan, :l1, :minkowski, :max, :hist_intersect, :hellinger, :chi_square, :kullback_leibler, :hamming, :hamming_lut, :hamming_popcnt, :l2_simple])
+  # Of the hamming distances only :hamming (for binary descriptors stored as bytes) is supported in the C API,
+  # :max, :hamming_lut, :hamming_popcnt and :l2_simple are not. We include them here just in case of future improvements.
+  DistanceType = enum(:distance_type, [:undefined, 0, :euclidean, 1, :l2, 1, :manhattan, 2, :l1, 2, :minkowski, 3, :max, 4,
+                                       :hist_intersect, 5, :hellinger, 6, :chi_square, 7, :kullback_leibler, 8,
+                                       :hamming, 9, :hamming_lut, 10, :hamming_popcnt, 11, :l2_simple, 12])
 
   # For NMatrix compatibility
   typedef :float,   :float32
@@ -76,7 +79,7 @@ module Flann
 
   # A nearest neighbor search index for a given dataset.
   class Parameters < InitializableStruct
-    layout :algorithm, Flann::Algorithm,    # The algorithm to use (linear, kdtree, kmeans, composite, kdtree_single, saved, autotuned)
+    layout :algorithm, Flann::Algorithm,    # The algorithm to use (linear, kdtree, kmeans, composite, kdtree_single, pq, saved, autotuned)
            :checks, :int,                   # How many leaves (features) to use (for kdtree)
            :eps, :float,                    # eps parameter for eps-knn search
            :sorted, :int,                   # indicates if results returned by radius search should be sorted or not
@@ -101,7 +104,14 @@ module Flann
            :multi_probe_level, :uint,       # Number of levels to use in multi-probe LSH, 0 for standard LSH
 
            :log_level, Flann::LogLevel,     # Determines the verbosity of each flann function
-           :random_seed, :long              # Random seed to use
+           :random_seed, :long,             # Random seed to use
+
+           :max_tuning_seconds, :float,     # Wall clock time limit of the autotuning, 0 for none
+           :tuning_candidates, :int,        # Set by the autotuning: number of configurations evaluated
+
+           :subquantizers, :int,            # Number of subvectors each point is split in (pq)
+           :code_bits, :int,                # Bits of the code of a subvector, at most 8 (pq)
+           :coarse_clusters, :int           # Inverted lists of the coarse quantizer, 0 for none (pq)
 
     DEFAULT       = {algorithm: :kdtree,
                      checks: 32, eps: 0.0,
@@ -117,7 +127,9 @@ module Flann
                      table_number: 12,
                      key_size: 20,
                      multi_probe_level: 2,
-                     log_level: :warn, random_seed: -1}
+                     log_level: :warn, random_seed: -1,
+                     max_tuning_seconds: 0.0,
+                     subquantizers: 8, code_bits: 8, coarse_clusters: 0}
 
 
   end
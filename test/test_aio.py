@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+
+from pyflann import *
+from numpy import *
+from numpy.random import *
+import sys
+import unittest
+
+if sys.version_info >= (3, 7):
+    import asyncio
+    from pyflann.aio import AsyncFLANN
+
+
+@unittest.skipIf(sys.version_info < (3, 7), 'requires asyncio.get_running_loop')
+class Test_PyFLANN_aio(unittest.TestCase):
+
+    def setUp(self):
+        self.x = rand(1000, 8)
+        self.nn = FLANN()
+        self.nn.build_index(self.x, algorithm='kdtree', trees=4)
+
+    def run_searches(self, searcher, queries, return_exceptions=False, **kwargs):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            return loop.run_until_complete(asyncio.gather(
+                *[searcher.search(q, **kwargs) for q in queries],
+                return_exceptions=return_exceptions))
+        finally:
+            loop.close()
+            asyncio.set_event_loop(None)
+
+    def testsearch_coalesced(self):
+        searcher = AsyncFLANN(self.nn, max_batch=64, max_wait=0.01)
+        results = self.run_searches(searcher, self.x[:200], num_neighbors=3,
+                                    checks=-1)
+        self.assertEqual(len(results), 200)
+        for i, (nnidx, nndist) in enumerate(results):
+            self.assertEqual(nnidx.shape, (3,))
+            self.assertEqual(nnidx[0], i)
+
+    def testsearch_batches(self):
+        searcher = AsyncFLANN(self.nn)
+        queries = [self.x[i:i+10] for i in range(0, 100, 10)]
+        results = self.run_searches(searcher, queries, checks=-1)
+        for i, (nnidx, nndist) in enumerate(results):
+            self.assertEqual(nnidx.shape, (10, 1))
+            self.assertTrue(all(nnidx[:, 0] == arange(i * 10, (i + 1) * 10)))
+
+    def testsearch_error(self):
+        searcher = AsyncFLANN(self.nn)
+        self.assertRaises(FLANNException, lambda: self.run_searches(
+            searcher, [self.x[0].astype(float32)]))
+
+    def testsearch_wrong_dimension(self):
+        # the bad query is not batched with the others, which succeed
+        searcher = AsyncFLANN(self.nn, max_wait=0.01)
+        queries = [self.x[0], self.x[1, :4], self.x[2]]
+        results = self.run_searches(searcher, queries, return_exceptions=True)
+        self.assertEqual(results[0][0][0], 0)
+        self.assertTrue(isinstance(results[1], Exception))
+        self.assertEqual(results[2][0][0], 2)
+
+    def testsearch_filtered(self):
+        # the filter arrays are not batch keys, each search is run alone
+        searcher = AsyncFLANN(self.nn, max_wait=0.01)
+        even = arange(0, 1000, 2)
+        results = self.run_searches(searcher, self.x[:10], num_neighbors=3,
+                                    checks=-1, allowed=even)
+        for i, (nnidx, nndist) in enumerate(results):
+            self.assertEqual(nnidx.shape, (3,))
+            self.assertTrue(all(nnidx % 2 == 0))
+            if i % 2 == 0:
+                self.assertEqual(nnidx[0], i)
+
+        results = self.run_searches(searcher, [self.x[:5]], excluded=arange(5),
+                                    checks=-1)
+        self.assertEqual(results[0][0].shape, (5, 1))
+        self.assertFalse(any(results[0][0] < 5))
+
+    def testsearch_out(self):
+        # each search writes to its own arrays, so it is not batched
+        searcher = AsyncFLANN(self.nn, max_wait=0.01)
+        outs = [(empty((5, 2), dtype=index_type), empty((5, 2))) for i in range(3)]
+
+        async def searches():
+            return await asyncio.gather(
+                *[searcher.search(self.x[i*5:(i+1)*5], 2, out=out, checks=-1)
+                  for i, out in enumerate(outs)])
+
+        loop = asyncio.new_event_loop()
+        try:
+            results = loop.run_until_complete(searches())
+        finally:
+            loop.close()
+        for i, ((nnidx, nndist), (result, dists)) in enumerate(zip(results, outs)):
+            self.assertTrue(all(result[:, 0] == arange(i * 5, (i + 1) * 5)))
+            self.assertTrue(all(nnidx == result))
+            self.assertTrue(all(nndist == dists))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+
+from pyflann import *
+from pyflann import bench
+from numpy import *
+from numpy.random import *
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class Test_PyFLANN_bench(unittest.TestCase):
+
+    def testrun_benchmark(self):
+        x = rand(1000, 8).astype(float32)
+        q = rand(20, 8).astype(float32)
+        report = bench.run_benchmark(x, q, num_neighbors=5, cores=(1, 2),
+                                     algorithms=['kdtree', 'kmeans', 'lsh'],
+                                     latency_queries=10, checks=-1)
+        results = dict((r['algorithm'], r) for r in report['results'])
+        self.assertEqual(report['dataset']['points'], 1000)
+        self.assertEqual(results['kdtree']['recall'], 1.0)
+        self.assertEqual(sorted(results['kmeans']['qps']), ['1', '2'])
+        self.assertTrue(results['kmeans']['latency_p50'] <= results['kmeans']['latency_p99'])
+        self.assertTrue(results['kmeans']['used_memory'] > 0)
+        # lsh only handles uint8 data
+        self.assertEqual(results['lsh']['error'], 'Error occured while building the index.')
+
+    def testrecall(self):
+        exact = array([[0, 1], [2, 3]])
+        self.assertEqual(bench.recall(array([[1, 0], [2, 4]]), exact), 0.75)
+
+    def testmain(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            output = os.path.join(tmpdir, 'bench.json')
+            bench.main(['--points', '500', '--dim', '4', '--num-queries', '10',
+                        '--algorithms', 'kdtree,autotuned', '--cores', '1',
+                        '-p', 'target_precision=0.8', '--output', output])
+            with open(output) as f:
+                report = json.load(f)
+            self.assertEqual([r['algorithm'] for r in report['results']],
+                             ['kdtree', 'autotuned'])
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def testmain_uint8(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            output = os.path.join(tmpdir, 'bench.json')
+            bench.main(['--points', '1000', '--dim', '16', '--dtype', 'uint8',
+                        '--num-queries', '10', '--algorithms', 'lsh', '--cores', '1',
+                        '--latency-queries', '5', '--output', output])
+            with open(output) as f:
+                report = json.load(f)
+            # the queries are dataset points, an all zero dataset would
+            # make the recall meaningless
+            self.assertTrue(report['results'][0]['recall'] > 0)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def testmain_too_many_queries(self):
+        self.assertRaises(SystemExit, lambda: bench.main(
+            ['--points', '10', '--num-queries', '20']))
+
+
+if __name__ == '__main__':
+    unittest.main()
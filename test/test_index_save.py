@@ -5,6 +5,10 @@ from copy import copy
 from numpy import *
 from numpy.random import *
 import unittest
+import pickle
+import os
+import tempfile
+import shutil
 
 
 class Test_PyFLANN_nn(unittest.TestCase):
@@ -102,5 +106,175 @@ class Test_PyFLANN_nn_index(unittest.TestCase):
         correct = all(nnidx == nnidx2)
         self.assertTrue(correct)
 
+class Test_PyFLANN_memmap(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def testbuild_index_npy(self):
+        x = rand(1000, 16).astype(float32)
+        filename = os.path.join(self.tmpdir, "data.npy")
+        save(filename, x)
+
+        nn = FLANN()
+        nn.build_index(filename, algorithm="kdtree", trees=4)
+        nnidx, nndist = nn.nn_index(x, checks=-1)
+        self.assertTrue(all(nnidx == arange(1000, dtype = index_type)))
+
+    def testbuild_index_raw(self):
+        x = rand(1000, 16).astype(float32)
+        filename = os.path.join(self.tmpdir, "data.f32")
+        x.tofile(filename)
+
+        self.assertRaises(FLANNException, lambda: FLANN().build_index(filename))
+
+        nn = FLANN()
+        nn.build_index(filename, dtype=float32, shape=x.shape, algorithm="kmeans")
+        nnidx, nndist = nn.nn_index(x, checks=-1)
+        self.assertTrue(all(nnidx == arange(1000, dtype = index_type)))
+
+    def testload_index_memmap(self):
+        x = rand(1000, 16)
+        filename = os.path.join(self.tmpdir, "data.npy")
+        index_filename = os.path.join(self.tmpdir, "index.dat")
+        save(filename, x)
+
+        nn = FLANN()
+        nn.build_index(x, algorithm="kdtree", trees=4)
+        nnidx, nndist = nn.nn_index(x[:100], num_neighbors=5)
+        nn.save_index(index_filename)
+        del nn
+
+        nn = FLANN()
+        nn.load_index(index_filename, load_dataset(filename))
+        nnidx2, nndist2 = nn.nn_index(x[:100], num_neighbors=5)
+        self.assertTrue(all(nnidx == nnidx2))
+
+    def testmemmap_not_copied(self):
+        x = rand(100, 16)
+        filename = os.path.join(self.tmpdir, "data.npy")
+        save(filename, x)
+
+        data = load_dataset(filename)
+        self.assertRaises(FLANNException, lambda: FLANN().build_index(data[:, :8]))
+
+
+class Test_PyFLANN_element_types(unittest.TestCase):
+
+    def testsave_float16_int8(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            for x in (rand(1000, 16).astype(float16),
+                      randint(-128, 128, (1000, 16)).astype(int8)):
+                filename = os.path.join(tmpdir, 'index.dat')
+                nn = FLANN()
+                nn.build_index(x, algorithm='kdtree', trees=4)
+                nnidx, nndist = nn.nn_index(x[:100], num_neighbors=5)
+                nn.save_index(filename)
+
+                nn2 = FLANN()
+                nn2.load_index(filename, x)
+                nnidx2, nndist2 = nn2.nn_index(x[:100], num_neighbors=5)
+                self.assertTrue(all(nnidx == nnidx2))
+                self.assertTrue(all(nndist == nndist2))
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+class Test_PyFLANN_pq(unittest.TestCase):
+
+    def testsave_pq(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            x = rand(2000, 16).astype(float32)
+            for coarse_clusters in (0, 8):
+                filename = os.path.join(tmpdir, 'index.dat')
+                nn = FLANN()
+                nn.build_index(x, algorithm='pq', coarse_clusters=coarse_clusters)
+                nnidx, nndist = nn.nn_index(x[:100], num_neighbors=5)
+                nn.save_index(filename)
+
+                nn2 = FLANN()
+                nn2.load_index(filename, x)
+                nnidx2, nndist2 = nn2.nn_index(x[:100], num_neighbors=5)
+                self.assertTrue(all(nnidx == nnidx2))
+                self.assertTrue(all(nndist == nndist2))
+                self.assertEqual(nn2.used_memory(), nn.used_memory())
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+class Test_PyFLANN_bytes(unittest.TestCase):
+
+    def testto_bytes(self):
+        x = rand(1000, 16)
+        nn = FLANN()
+        nn.build_index(x, algorithm="kmeans", branching=8)
+        nnidx, nndist = nn.nn_index(x[:100], num_neighbors=5)
+
+        data = nn.to_bytes()
+        nn2 = FLANN()
+        nn2.from_bytes(data, x)
+        nnidx2, nndist2 = nn2.nn_index(x[:100], num_neighbors=5)
+        self.assertTrue(all(nnidx == nnidx2))
+
+        nn2.delete_index()
+        self.assertRaises(FLANNException, lambda: nn2.to_bytes())
+        self.assertRaises(FLANNException, lambda: nn2.from_bytes(b"not an index", x))
+
+    def testpickle(self):
+        x = rand(1000, 16).astype(float32)
+        added = rand(100, 16).astype(float32)
+        nn = FLANN(distance_type='manhattan')
+        nn.build_index(x, algorithm="kdtree", trees=4, checks=64)
+        nn.add_points(added)
+        nnidx, nndist = nn.nn_index(added, num_neighbors=3)
+
+        nn2 = pickle.loads(pickle.dumps(nn))
+        nnidx2, nndist2 = nn2.nn_index(added, num_neighbors=3)
+        self.assertTrue(all(nnidx == nnidx2))
+        self.assertTrue(all(nndist == nndist2))
+
+        nn = FLANN()
+        nn.build_index(x, algorithm="gemm", metric="inner_product")
+        nn.remove_points([0, 1])
+        nnidx, nndist = nn.nn_index(added, num_neighbors=3)
+        nn2 = pickle.loads(pickle.dumps(nn))
+        nnidx2, nndist2 = nn2.nn_index(added, num_neighbors=3)
+        self.assertTrue(all(nnidx == nnidx2))
+
+        # the copy knows the removed points are not exact neighbors
+        nn = FLANN()
+        nn.build_index(x, algorithm="linear")
+        nn.remove_points(arange(0, 1000, 2))
+        nn2 = pickle.loads(pickle.dumps(nn))
+        curve = nn2.tune_curve(added[:10], num_neighbors=3, checks=(-1,), repeat=1)
+        self.assertEqual(curve[0]['precision'], 1.0)
+
+        nn3 = pickle.loads(pickle.dumps(FLANN()))
+        self.assertRaises(FLANNException, lambda: nn3.nn_index(added))
+
+    def testpickle_global_distance_changed(self):
+        x = rand(1000, 16).astype(float32)
+        q = rand(20, 16).astype(float32)
+        nn = FLANN()
+        nn.build_index(x, algorithm="linear")
+        nnidx, nndist = nn.nn_index(q, num_neighbors=2)
+        set_distance_type('manhattan')
+        try:
+            nn2 = pickle.loads(pickle.dumps(nn))
+            nnidx2, nndist2 = nn2.nn_index(q, num_neighbors=2)
+            curve = nn.tune_curve(q, num_neighbors=2, checks=(16,), repeat=1)
+        finally:
+            set_distance_type('euclidean')
+        self.assertTrue(all(nnidx == nnidx2))
+        self.assertTrue(allclose(nndist, nndist2))
+        # the exact neighbors are computed with the distance of the index
+        self.assertEqual(curve[-1]['precision'], 1.0)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -113,6 +113,58 @@ class Test_PyFLANN_nn(unittest.TestCase):
 
         self.assertTrue(correctness / N >= 0.99,
                      'failed #2: N=%d,correctness=%f' % (N, correctness/N))
-        
+
+
+class Test_PyFLANN_ground_truth(unittest.TestCase):
+
+    def testground_truth(self):
+        x = rand(1000, 8).astype(float32)
+        q = rand(50, 8).astype(float32)
+        exact = ground_truth(x, q, 5)
+        expected = argsort(((x[None, :, :] - q[:, None, :])**2).sum(axis=2), axis=1)[:, :5]
+        self.assertEqual(exact.shape, (50, 5))
+        self.assertTrue(all(exact == expected))
+
+        exact = ground_truth(x, x[:20], 3, skip=1, cores=2)
+        self.assertTrue(all(exact[:, 0] != arange(20)))
+
+        exact = ground_truth(x, q, 2, distance_type='manhattan')
+        expected = argsort(abs(x[None, :, :] - q[:, None, :]).sum(axis=2), axis=1)[:, :2]
+        self.assertTrue(all(exact == expected))
+
+    def testground_truth_cache(self):
+        import tempfile, shutil
+        tmpdir = tempfile.mkdtemp()
+        try:
+            x = rand(500, 4)
+            q = rand(10, 4)
+            exact = ground_truth(x, q, 3, cache_dir=tmpdir)
+            self.assertEqual(len(os.listdir(tmpdir)), 1)
+            self.assertTrue(all(ground_truth(x, q, 3, cache_dir=tmpdir) == exact))
+            self.assertEqual(len(os.listdir(tmpdir)), 1)
+
+            # any change of the arguments or data is a different entry
+            ground_truth(x, q, 2, cache_dir=tmpdir)
+            x[0] += 1
+            ground_truth(x, q, 3, cache_dir=tmpdir)
+            self.assertEqual(len(os.listdir(tmpdir)), 3)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def testground_truth_errors(self):
+        x = rand(10, 4)
+        self.assertRaises(FLANNException, lambda: ground_truth(x, x, 11))
+        self.assertRaises(FLANNException, lambda: ground_truth(x, x.astype(float32), 1))
+        self.assertRaises(FLANNException, lambda: ground_truth(x, x, 1, algorithm='gemm',
+                                                               distance_type='manhattan'))
+
+    def testground_truth_gemm(self):
+        x = rand(1000, 32).astype(float32)
+        q = rand(50, 32).astype(float32)
+        self.assertTrue(all(ground_truth(x, q, 5, algorithm='gemm') == ground_truth(x, q, 5)))
+        exact = ground_truth(x, x[:20], 3, skip=1, algorithm='gemm')
+        self.assertTrue(all(exact == ground_truth(x, x[:20], 3, skip=1)))
+
+
 if __name__ == '__main__':
     unittest.main()
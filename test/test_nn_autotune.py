@@ -72,6 +72,101 @@ class Test_PyFLANN_nn(unittest.TestCase):
             correctness /= N
             self.assertTrue(correctness >= tp*0.9,
                          'failed #1: targ_prec=%f, N=%d,correctness=%f' % (tp, N, correctness))
-        
+
+
+class Test_PyFLANN_tuning_cache(unittest.TestCase):
+
+    def testtuning_cache(self):
+        import tempfile, shutil, json
+        tmpdir = tempfile.mkdtemp()
+        try:
+            seed(0)
+            x = rand(300, 4)
+            params = FLANN().build_index(x, algorithm='autotuned', target_precision=0.8,
+                                         tuning_cache=tmpdir)
+            self.assertEqual(len(os.listdir(tmpdir)), 1)
+            self.assertNotEqual(params['algorithm'], 'autotuned')
+
+            # the speedup saved is marked, to tell the parameters read from
+            # the cache from those of a new tuning
+            tuning_file = os.path.join(tmpdir, os.listdir(tmpdir)[0])
+            with open(tuning_file) as f:
+                tuned = json.load(f)
+            tuned['speedup'] = -1.0
+            with open(tuning_file, 'w') as f:
+                json.dump(tuned, f)
+            params['speedup'] = -1.0
+
+            # a slightly changed dataset reuses the parameters
+            nn = FLANN()
+            cached = nn.build_index(x + rand(300, 4) * 0.001, algorithm='autotuned',
+                                    target_precision=0.8, tuning_cache=tmpdir)
+            self.assertEqual(len(os.listdir(tmpdir)), 1)
+            for k in ('algorithm', 'checks', 'trees', 'branching', 'speedup'):
+                self.assertEqual(cached[k], params[k])
+            nnidx, nndist = nn.nn_index(x[:10])
+            self.assertEqual(nnidx.shape, (10,))
+
+            # other tuning parameters or distributions are tuned again
+            FLANN().build_index(x, algorithm='autotuned', target_precision=0.7,
+                                tuning_cache=tmpdir)
+            FLANN().build_index(x * 100 + 5, algorithm='autotuned', target_precision=0.8,
+                                tuning_cache=tmpdir)
+            self.assertEqual(len(os.listdir(tmpdir)), 3)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def testtuning_fingerprint_centered(self):
+        from pyflann.index import _tuning_fingerprint
+        params = {'target_precision': 0.9, 'build_weight': 0.01, 'memory_weight': 0,
+                  'sample_fraction': 0.1, 'max_tuning_seconds': 0}
+        seed(0)
+        # resamples of centered data, whose means round to signed zeros
+        fingerprints = set(_tuning_fingerprint(randn(20000, 16).astype(float32), (1, 0), params)
+                           for i in range(5))
+        self.assertEqual(len(fingerprints), 1)
+
+
+class Test_PyFLANN_tuning_budget(unittest.TestCase):
+
+    def testmax_tuning_seconds(self):
+        seed(0)
+        x = rand(5000, 16).astype(float32)
+        nn = FLANN()
+        # the 25 candidates take about a minute to evaluate on one thread,
+        # all of them being evaluated without a budget (see below)
+        params = nn.build_index(x, algorithm='autotuned', target_precision=0.9,
+                                max_tuning_seconds=1, cores=1)
+        # the count leaves out the linear search baseline
+        self.assertTrue(1 <= params['tuning_candidates'] < 25)
+        self.assertNotEqual(params['algorithm'], 'autotuned')
+
+        nnidx, nndist = nn.nn_index(x[:10], checks=-1)
+        self.assertTrue(all(nnidx == arange(10)))
+
+    def testparallel_candidates(self):
+        seed(0)
+        x = rand(5000, 4).astype(float32)
+        chosen = []
+        for cores in (1, 2):
+            nn = FLANN()
+            # without a budget the threads evaluate all the candidates. With
+            # the build time weighted fully, the single kd-tree costs less
+            # than half as much as any other candidate, so the choice does
+            # not depend on the timings
+            params = nn.build_index(x, algorithm='autotuned', target_precision=0.5,
+                                    build_weight=1, sample_fraction=1.0,
+                                    random_seed=1, cores=cores)
+            self.assertEqual(params['tuning_candidates'], 25)
+            chosen.append(dict((k, params[k]) for k in
+                               ('algorithm', 'trees', 'branching', 'iterations')))
+
+            nnidx, nndist = nn.nn_index(x[:10], checks=-1)
+            self.assertTrue(all(nnidx == arange(10)))
+
+        # the candidates are built with the same seeds whatever the threads
+        self.assertEqual(chosen[0], chosen[1])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -77,5 +77,753 @@ class Test_PyFLANN_nn_index(unittest.TestCase):
         self.assertRaises(FLANNException, lambda: nn.nn_index(rand(5,5)))
 
 
+class Test_PyFLANN_add_points(unittest.TestCase):
+
+    def testadd_points_small_batches(self):
+        dim = 8
+        N = 100
+
+        x = rand(N, dim)
+        nn = FLANN()
+        nn.build_index(x, algorithm='kdtree', trees=4)
+
+        added = rand(1000, dim)
+        for i in range(0, len(added), 5):
+            batch = added[i:i+5].copy()
+            nn.add_points(batch)
+            # the index must not depend on the caller's array
+            batch[:] = -1
+
+        nnidx, nndist = nn.nn_index(concatenate((x, added)), checks=-1)
+        self.assertTrue(all(nnidx == arange(N + len(added), dtype=index_type)))
+
+    def testadd_points_rebuild_threshold(self):
+        dim = 8
+        N = 100
+
+        x = rand(N, dim)
+        added = rand(1000, dim)
+        nn = FLANN()
+        nn.build_index(x, algorithm='kdtree', trees=4)
+        for i in range(0, len(added), 10):
+            nn.add_points(added[i:i+10], rebuild_threshold=1.5)
+
+        nnidx, nndist = nn.nn_index(added, checks=-1)
+        self.assertTrue(all(nnidx == arange(N, N + len(added), dtype=index_type)))
+
+    def testadd_points_type_mismatch(self):
+        nn = FLANN()
+        nn.build_index(rand(10, 3))
+        self.assertRaises(FLANNException,
+                          lambda: nn.add_points(rand(10, 3).astype(float32)))
+
+
+class Test_PyFLANN_build_index_from_chunks(unittest.TestCase):
+
+    def testbuild_index_from_chunks(self):
+        x = rand(2000, 8).astype(float32)
+        for num_points in (None, len(x)):
+            nn = FLANN()
+            chunks = (x[i:i+150] for i in range(0, len(x), 150))
+            params = nn.build_index_from_chunks(chunks, num_points=num_points,
+                                                initial_points=200,
+                                                algorithm='kdtree', trees=4)
+            self.assertEqual(params['algorithm'], 'kdtree')
+
+            nnidx, nndist = nn.nn_index(x, checks=-1)
+            self.assertTrue(all(nnidx == arange(len(x), dtype=index_type)))
+
+    def testbuild_index_from_single_chunk(self):
+        x = rand(100, 4).astype(float32)
+        nn = FLANN()
+        nn.build_index_from_chunks([x, x[:0]], algorithm='kdtree')
+        nnidx, nndist = nn.nn_index(x, checks=-1)
+        self.assertTrue(all(nnidx == arange(len(x), dtype=index_type)))
+
+    def testbuild_index_from_no_chunks(self):
+        nn = FLANN()
+        self.assertRaises(FLANNException, lambda: nn.build_index_from_chunks([]))
+        self.assertRaises(FLANNException,
+                          lambda: nn.build_index_from_chunks([rand(10, 3)],
+                                                             rebuild_threshold=1))
+
+
+class Test_PyFLANN_element_types(unittest.TestCase):
+
+    def __compare_with_float32(self, x, q, **kwargs):
+        # the distances of both types are computed in float32
+        nn = FLANN()
+        nn.build_index(x, **kwargs)
+        nnidx, nndist = nn.nn_index(q, num_neighbors=5, checks=-1)
+        nn32 = FLANN()
+        nn32.build_index(x.astype(float32), **kwargs)
+        nnidx32, nndist32 = nn32.nn_index(q.astype(float32), num_neighbors=5, checks=-1)
+        self.assertEqual(nndist.dtype, float32)
+        self.assertTrue(all(nndist == nndist32))
+        self.assertTrue(all(nnidx[:, 0] == nnidx32[:, 0]))
+
+    def testfloat16(self):
+        x = (rand(1000, 16) * 10).astype(float16)
+        q = (rand(50, 16) * 10).astype(float16)
+        self.__compare_with_float32(x, q, algorithm='linear')
+        self.__compare_with_float32(x, q, algorithm='kdtree', trees=4, random_seed=1)
+
+        nn = FLANN()
+        nn.build_index(x, algorithm='kmeans', branching=16)
+        nnidx, nndist = nn.nn_index(x[:100], checks=-1)
+        self.assertTrue(all(nnidx == arange(100, dtype=index_type)))
+
+    def testint8(self):
+        x = randint(-128, 128, (1000, 8)).astype(int8)
+        q = randint(-128, 128, (50, 8)).astype(int8)
+        self.__compare_with_float32(x, q, algorithm='linear')
+
+        nn = FLANN()
+        nn.build_index(x, algorithm='kdtree', trees=4)
+        nn.add_points(q)
+        nnidx, nndist = nn.nn_index(q, checks=-1)
+        self.assertTrue(all(nndist == 0))
+
+    def testfloat16_conversion(self):
+        # exact for every representable value, including the subnormals
+        values = arange(2**16, dtype=uint16).view(float16)
+        values = values[isfinite(values)].reshape(-1, 1)
+        nn = FLANN()
+        nn.build_index(values, algorithm='linear')
+        nnidx, nndist = nn.nn_index(zeros((1, 1), dtype=float16), num_neighbors=len(values))
+        self.assertTrue(all(sort(nndist) == sort(values.astype(float32).ravel() ** 2)))
+
+
+class Test_PyFLANN_pq(unittest.TestCase):
+
+    def setUp(self):
+        self.x = rand(5000, 16).astype(float32)
+        self.q = rand(100, 16).astype(float32)
+        self.exact, _ = FLANN().nn(self.x, self.q, 10, algorithm='linear')
+
+    def __recall(self, nn, **kwargs):
+        nnidx, nndist = nn.nn_index(self.q, num_neighbors=10, **kwargs)
+        return mean([len(intersect1d(r, e)) for r, e in zip(nnidx, self.exact)]) / 10
+
+    def testpq(self):
+        nn = FLANN()
+        nn.build_index(self.x, algorithm='pq', subquantizers=8)
+        self.assertTrue(self.__recall(nn) > 0.7)
+        # one byte per subquantizer and the codebooks
+        self.assertTrue(nn.used_memory() < self.x.nbytes / 3)
+
+        nnidx, nndist = nn.nn_index(self.x[:100], num_neighbors=10)
+        self.assertTrue(all([i in r for i, r in enumerate(nnidx)]))
+
+    def testivf_pq(self):
+        nn = FLANN()
+        nn.build_index(self.x, algorithm='pq', subquantizers=8, coarse_clusters=16)
+        recall = self.__recall(nn, checks=-1)
+        self.assertTrue(recall > 0.7)
+        self.assertTrue(self.__recall(nn, checks=32) < recall)
+        # the codes, a 32 bit id per point, the codebooks and the coarse centers
+        self.assertTrue(nn.used_memory() <= 5000 * (8 + 4) + 256 * 16 * 4 + 16 * 16 * 4)
+
+        # the residuals of clustered points to the coarse centers are
+        # encoded more finely than the points
+        seed(0)
+        centers = rand(64, 16) * 10
+        x = (centers[randint(0, 64, 5000)] + randn(5000, 16)).astype(float32)
+        q = (centers[randint(0, 64, 100)] + randn(100, 16)).astype(float32)
+        exact, _ = FLANN().nn(x, q, 10, algorithm='linear')
+        recalls = []
+        for coarse_clusters in (0, 64):
+            nn = FLANN()
+            nn.build_index(x, algorithm='pq', subquantizers=8, coarse_clusters=coarse_clusters)
+            nnidx, nndist = nn.nn_index(q, num_neighbors=10, checks=-1)
+            recalls.append(mean([len(intersect1d(r, e)) for r, e in zip(nnidx, exact)]))
+        self.assertTrue(recalls[1] > recalls[0] + 0.5)
+
+        # the other distances encode the points
+        nn = FLANN(distance_type='hellinger')
+        nn.build_index(self.x, algorithm='pq', subquantizers=8, coarse_clusters=16)
+        nnidx, nndist = nn.nn_index(self.x[:100], num_neighbors=10, checks=-1)
+        self.assertTrue(all([i in r for i, r in enumerate(nnidx)]))
+
+    def testpq_add_remove_points(self):
+        nn = FLANN()
+        nn.build_index(self.x[:4000], algorithm='pq', coarse_clusters=8)
+        nn.add_points(self.x[4000:])
+        nn.remove_points(arange(100))
+        nnidx, nndist = nn.nn_index(self.x[:200], num_neighbors=10, checks=-1)
+        self.assertEqual(len(intersect1d(nnidx.ravel(), arange(100))), 0)
+        self.assertTrue(all([i in r for i, r in enumerate(nnidx[100:], 100)]))
+        nnidx, nndist = nn.nn_index(self.x[4000:4100], num_neighbors=10, checks=-1)
+        self.assertTrue(all([i in r for i, r in enumerate(nnidx, 4000)]))
+
+    def testpq_bad_parameters(self):
+        nn = FLANN()
+        self.assertRaises(FLANNException, lambda: nn.build_index(self.x, algorithm='pq', subquantizers=17))
+        self.assertRaises(FLANNException, lambda: nn.build_index(self.x, algorithm='pq', code_bits=9))
+
+
+class Test_PyFLANN_gemm(unittest.TestCase):
+
+    def setUp(self):
+        seed(0)
+        self.x = rand(3000, 64).astype(float32)
+        self.q = rand(200, 64).astype(float32)
+        self.exact, self.exact_dists = FLANN().nn(self.x, self.q, 10, algorithm='linear')
+
+    def testgemm(self):
+        nnidx, nndist = FLANN().nn(self.x, self.q, 10, algorithm='gemm')
+        self.assertTrue(all(nnidx == self.exact))
+        self.assertTrue(allclose(nndist, self.exact_dists, rtol=1e-5))
+
+        x = randint(0, 256, (3000, 16)).astype(uint8)
+        nnidx, nndist = FLANN().nn(x, x[:100], 1, algorithm='gemm')
+        self.assertTrue(all(nndist == 0))
+        self.assertTrue(all(nnidx == FLANN().nn(x, x[:100], 1, algorithm='linear')[0]))
+
+    def testgemm_blocks(self):
+        from pyflann.exact import ExactSearch
+        search = ExactSearch([self.x[:1000], self.x[1000:]], query_block=64, data_block=700)
+        nnidx, nndist = search.search(self.q, 10)
+        self.assertTrue(all(nnidx == self.exact))
+
+    def testgemm_rounding(self):
+        from pyflann.exact import ExactSearch
+        # far from the origin the float32 products cannot rank the points
+        x = (1000 + rand(2000, 32) * 0.01).astype(float32)
+        q = (1000 + rand(20, 32) * 0.01).astype(float32)
+        dists = ((x.astype(float64)[None] - q.astype(float64)[:, None]) ** 2).sum(axis=2)
+        nnidx, nndist = ExactSearch(x).search(q, 5)
+        self.assertTrue(all(nnidx == argsort(dists, axis=1)[:, :5]))
+
+    def testinner_product(self):
+        nnidx, nndist = FLANN().nn(self.x, self.q, 5, algorithm='gemm', metric='inner_product')
+        products = dot(self.q, self.x.T)
+        self.assertTrue(all(nnidx == argsort(-products, axis=1)[:, :5]))
+        self.assertTrue(allclose(nndist, -sort(-products, axis=1)[:, :5], rtol=1e-5))
+
+    def testbuild_index_gemm(self):
+        nn = FLANN()
+        params = nn.build_index(self.x[:2000], algorithm='gemm')
+        self.assertEqual(params['algorithm'], 'gemm')
+        nn.add_points(self.x[2000:])
+        nnidx, nndist = nn.nn_index(self.q, num_neighbors=10)
+        self.assertTrue(all(nnidx == self.exact))
+
+        nn.remove_points(self.exact[:, 0])
+        nnidx, nndist = nn.nn_index(self.q, num_neighbors=5)
+        self.assertEqual(len(intersect1d(nnidx.ravel(), self.exact[:, 0])), 0)
+        nn.remove_point(int(nnidx[0, 0]))
+        self.assertTrue(nnidx[0, 0] not in nn.nn_index(self.q[:1], num_neighbors=5)[0])
+
+    def testtune_curve_inner_product(self):
+        x = rand(2000, 8).astype(float32)
+        nn = FLANN()
+        nn.build_index(x, algorithm='gemm', metric='inner_product')
+        curve = nn.tune_curve(x[:100], num_neighbors=5, checks=(16, 128), repeat=1)
+        # the exact neighbors are the largest inner products, as searched
+        self.assertTrue(all(s['precision'] == 1.0 for s in curve))
+
+    def testgemm_errors(self):
+        self.assertRaises(FLANNException, lambda: FLANN().nn(self.x, self.q, algorithm='gemm', metric='cosine'))
+        nn = FLANN(distance_type='manhattan')
+        self.assertRaises(FLANNException, lambda: nn.build_index(self.x, algorithm='gemm'))
+        nn.build_index(self.x, algorithm='gemm', metric='inner_product')
+        self.assertRaises(FLANNException, lambda: nn.nn_radius(self.q[0], 1.0))
+
+
+class Test_PyFLANN_remove_points(unittest.TestCase):
+
+    def testremove_points(self):
+        dim = 8
+        N = 1000
+
+        x = rand(N, dim)
+        nn = FLANN()
+        nn.build_index(x, algorithm='kdtree', trees=4)
+
+        removed = permutation(N)[:N//2]
+        nn.remove_points(removed)
+
+        nnidx, nndist = nn.nn_index(x, num_neighbors=5, checks=-1)
+        self.assertEqual(len(intersect1d(nnidx.ravel(), removed)), 0)
+
+        kept = setdiff1d(arange(N), removed)
+        self.assertTrue(all(nnidx[kept, 0] == kept))
+
+    def testremove_points_after_add(self):
+        dim = 8
+        N = 100
+
+        x = rand(N, dim)
+        added = rand(N, dim)
+        nn = FLANN()
+        nn.build_index(x, algorithm='linear')
+        nn.remove_points([0, 1, 2])
+        nn.add_points(added)
+        nn.remove_points(arange(N, N + 10))
+
+        nnidx, nndist = nn.nn_index(added[10:])
+        self.assertTrue(all(nnidx == arange(N + 10, 2 * N)))
+        nnidx, nndist = nn.nn_index(x[3:])
+        self.assertTrue(all(nnidx == arange(3, N)))
+
+    def testremove_points_bad_ids(self):
+        nn = FLANN()
+        nn.build_index(rand(10, 3))
+        self.assertRaises(FLANNException, lambda: nn.remove_points([-1]))
+
+
+class Test_PyFLANN_filter(unittest.TestCase):
+
+    def setUp(self):
+        self.x = rand(2000, 8).astype(float32)
+        self.q = rand(100, 8).astype(float32)
+        self.category = randint(0, 4, 2000)
+
+    def __expected(self, allowed, num_neighbors):
+        ids = flatnonzero(allowed)
+        exact, _ = FLANN().nn(self.x[ids], self.q, num_neighbors, algorithm='linear')
+        return ids[exact]
+
+    def testfilter_exact(self):
+        allowed = self.category == 1
+        expected = self.__expected(allowed, 5)
+        for params in [dict(algorithm='linear'), dict(algorithm='kdtree', trees=1),
+                       dict(algorithm='kmeans', branching=16), dict(algorithm='kdtree_single'),
+                       dict(algorithm='gemm')]:
+            nn = FLANN()
+            nn.build_index(self.x, **params)
+            nnidx, nndist = nn.nn_index(self.q, num_neighbors=5, checks=-1, allowed=allowed)
+            self.assertTrue(all(nnidx == expected), params['algorithm'])
+            nnidx, nndist = nn.nn_index(self.q, num_neighbors=5, checks=-1,
+                                        excluded=flatnonzero(~allowed))
+            self.assertTrue(all(nnidx == expected), params['algorithm'])
+
+    def testfilter_approximate(self):
+        allowed = self.category == 2
+        for params in [dict(algorithm='kdtree', trees=4), dict(algorithm='kmeans'),
+                       dict(algorithm='hierarchical'), dict(algorithm='pq', coarse_clusters=8)]:
+            nn = FLANN()
+            nn.build_index(self.x, **params)
+            # the points filtered out do not use up the checks
+            nnidx, nndist = nn.nn_index(self.q, num_neighbors=10, checks=32, allowed=allowed)
+            self.assertTrue(all(allowed[nnidx]), params['algorithm'])
+
+    def testfilter_autotuned(self):
+        allowed = self.category == 3
+        nn = FLANN()
+        nn.build_index(self.x, algorithm='autotuned', target_precision=0.8,
+                       max_tuning_seconds=1)
+        # the filter is kept with the tuned search parameters
+        nnidx, nndist = nn.nn_index(self.q, num_neighbors=5, checks=-2, allowed=allowed)
+        self.assertTrue(all(allowed[nnidx]))
+
+    def testfilter_removed_points(self):
+        nn = FLANN()
+        nn.build_index(self.x[:1000], algorithm='kdtree', trees=1)
+        nn.remove_points(arange(0, 1000, 2))
+        # the index is rebuilt without the removed points
+        nn.add_points(self.x[1000:], rebuild_threshold=1.5)
+
+        allowed = arange(1, 2000, 3)
+        nnidx, nndist = nn.nn_index(self.x, num_neighbors=3, checks=-1,
+                                    allowed=allowed, excluded=arange(1500, 2000))
+        self.assertTrue(all(isin(nnidx, allowed)))
+        self.assertFalse(any((nnidx < 1000) & (nnidx % 2 == 0)))
+        self.assertTrue(all(nnidx < 1500))
+        kept = allowed[(allowed % 2 == 1) | (allowed >= 1000)]
+        kept = kept[kept < 1500]
+        self.assertTrue(all(nnidx[kept, 0] == kept))
+
+    def testfilter_too_few_points(self):
+        for algorithm in ('kdtree', 'gemm'):
+            nn = FLANN()
+            nn.build_index(self.x, algorithm=algorithm)
+            nnidx, nndist = nn.nn_index(self.q, num_neighbors=5, allowed=[3, 7, 11])
+            self.assertTrue(all(sort(nnidx[:, :3], axis=1) == [3, 7, 11]))
+            self.assertTrue(all(nnidx[:, 3:] == -1))
+            self.assertTrue(all(isinf(nndist[:, 3:])))
+
+    def testfilter_bad_filters(self):
+        nn = FLANN()
+        nn.build_index(self.x)
+        self.assertRaises(FLANNException, lambda: nn.nn_index(self.q, allowed=[2000]))
+        self.assertRaises(FLANNException, lambda: nn.nn_index(self.q, excluded=[-1]))
+        self.assertRaises(FLANNException, lambda: nn.nn_index(self.q, allowed=ones(10, dtype=bool)))
+
+
+class Test_PyFLANN_nn_radius(unittest.TestCase):
+
+    def testnn_radius_single(self):
+        dim = 3
+        N = 500
+
+        x = rand(N, dim)
+        nn = FLANN()
+        nn.build_index(x, algorithm='linear')
+
+        radius = 0.05
+        idx, dists = nn.nn_radius(x[0], radius)
+        expected = where(sum((x - x[0])**2, axis=1) <= radius)[0]
+        self.assertEqual(set(idx), set(expected))
+        self.assertTrue(all(dists <= radius))
+
+    def testnn_radius_multi(self):
+        dim = 3
+        N = 500
+
+        x = rand(N, dim)
+        q = rand(50, dim)
+        nn = FLANN()
+        nn.build_index(x, algorithm='kdtree', trees=4)
+
+        radius = 0.05
+        indptr, idx, dists = nn.nn_radius(q, radius, checks=-1)
+        self.assertEqual(len(indptr), len(q) + 1)
+        self.assertEqual(indptr[-1], len(idx))
+        self.assertEqual(len(idx), len(dists))
+        for i in range(len(q)):
+            single_idx, single_dists = nn.nn_radius(q[i], radius, checks=-1)
+            self.assertEqual(set(idx[indptr[i]:indptr[i+1]]), set(single_idx))
+
+    def testnn_radius_multi_max_neighbors(self):
+        dim = 3
+        N = 500
+
+        x = rand(N, dim)
+        nn = FLANN()
+        nn.build_index(x, algorithm='linear')
+
+        indptr, idx, dists = nn.nn_radius(x[:20], 1.0, max_neighbors=5)
+        self.assertTrue(all(diff(indptr) <= 5))
+        self.assertTrue(all(diff(indptr) >= 1))
+
+        indptr, idx, dists = nn.nn_radius(x[:20], 1e-10, max_neighbors=-1)
+        self.assertTrue(all(idx == arange(20)))
+        self.assertTrue(all(dists == 0))
+
+
+class Test_PyFLANN_out(unittest.TestCase):
+
+    def testnn_index_out(self):
+        x = rand(100, 4)
+        nn = FLANN()
+        nn.build_index(x, algorithm='linear')
+
+        result = empty((100, 3), dtype=index_type)
+        dists = empty((100, 3), dtype=float64)
+        nnidx, nndist = nn.nn_index(x, num_neighbors=3, out=(result, dists))
+        self.assertTrue(nnidx is result)
+        self.assertTrue(nndist is dists)
+        self.assertTrue(all(result[:, 0] == arange(100)))
+
+        result = empty(100, dtype=index_type)
+        dists = empty(100, dtype=float64)
+        nn.nn_index(x, out=(result, dists))
+        self.assertTrue(all(result == arange(100)))
+
+    def testnn_out(self):
+        x = rand(100, 4).astype(float32)
+        result = empty((100, 2), dtype=index_type)
+        dists = empty((100, 2), dtype=float32)
+        FLANN().nn(x, x, num_neighbors=2, out=(result, dists), algorithm='linear')
+        self.assertTrue(all(result[:, 0] == arange(100)))
+
+    def testnn_index_bad_out(self):
+        x = rand(100, 4)
+        nn = FLANN()
+        nn.build_index(x, algorithm='linear')
+
+        result = empty((100, 2), dtype=index_type)
+        self.assertRaises(FLANNException, lambda: nn.nn_index(
+            x, num_neighbors=2, out=(result, empty((100, 2), dtype=float32))))
+        self.assertRaises(FLANNException, lambda: nn.nn_index(
+            x, num_neighbors=2, out=(result, empty((50, 4), dtype=float64))))
+        self.assertRaises(FLANNException, lambda: nn.nn_index(
+            x, num_neighbors=2, out=(result, empty((2, 100), dtype=float64).T)))
+
+
+class Test_PyFLANN_query_many(unittest.TestCase):
+
+    def testquery_many(self):
+        dim = 8
+        N = 1000
+
+        x = rand(N, dim)
+        nn = FLANN()
+        nn.build_index(x, algorithm='kdtree', trees=4)
+
+        batches = [x[i:i+100] for i in range(0, N, 100)]
+        results = nn.query_many(batches, num_neighbors=3, checks=-1, cores=1)
+        self.assertEqual(len(results), len(batches))
+        for i, (nnidx, nndist) in enumerate(results):
+            self.assertTrue(all(nnidx[:, 0] == arange(i * 100, (i + 1) * 100)))
+
+    def testquery_many_parameters(self):
+        dim = 8
+        N = 1000
+
+        x = rand(N, dim)
+        q = rand(100, dim)
+        nn = FLANN()
+        nn.build_index(x, algorithm='kdtree', trees=1)
+        exact = nn.nn_index(q, num_neighbors=5, checks=-1)[0]
+        approx = nn.nn_index(q, num_neighbors=5, checks=1)[0]
+
+        results = [nn.query_many([q] * 8, num_neighbors=5, checks=checks)
+                   for checks in (-1, 1)]
+        for nnidx, nndist in results[0]:
+            self.assertTrue(all(nnidx == exact))
+        for nnidx, nndist in results[1]:
+            self.assertTrue(all(nnidx == approx))
+
+    def testquery_many_cores(self):
+        nn = FLANN()
+        nn.build_index(rand(100, 4))
+        cores = []
+        nn_index = nn.nn_index
+        def record(qpts, num_neighbors, **kwargs):
+            cores.append(kwargs.get('cores'))
+            return nn_index(qpts, num_neighbors, **kwargs)
+        nn.nn_index = record
+
+        # a batch per thread of the pool created for the call
+        nn.query_many([rand(5, 4)] * 4)
+        self.assertEqual(cores, [1] * 4)
+        del cores[:]
+        nn.query_many([rand(5, 4)] * 4, cores=2)
+        self.assertEqual(cores, [2] * 4)
+
+
+class Test_PyFLANN_distance(unittest.TestCase):
+
+    def testper_index_distance(self):
+        x = rand(100, 4)
+        q = rand(10, 4)
+
+        l2 = FLANN(distance_type='euclidean')
+        l2.build_index(x, algorithm='linear')
+        l1 = FLANN(distance_type='manhattan')
+        l1.build_index(x, algorithm='linear')
+
+        nnidx, nndist = l1.nn_index(q)
+        expected = abs(x[nnidx] - q).sum(axis=1)
+        self.assertTrue(allclose(nndist, expected))
+
+        nnidx, nndist = l2.nn_index(q)
+        expected = ((x[nnidx] - q)**2).sum(axis=1)
+        self.assertTrue(allclose(nndist, expected))
+
+    def testglobal_distance_captured_at_build(self):
+        x = rand(100, 4)
+        q = rand(10, 4)
+
+        nn = FLANN()
+        set_distance_type('manhattan')
+        try:
+            nn.build_index(x, algorithm='linear')
+        finally:
+            set_distance_type('euclidean')
+
+        nnidx, nndist = nn.nn_index(q)
+        expected = abs(x[nnidx] - q).sum(axis=1)
+        self.assertTrue(allclose(nndist, expected))
+
+    def testhamming(self):
+        x = randint(0, 256, (2000, 32)).astype(uint8)
+        q = randint(0, 256, (100, 32)).astype(uint8)
+        exact = (unpackbits(q, axis=1)[:, None, :] != unpackbits(x, axis=1)[None, :, :]).sum(2)
+
+        nn = FLANN(distance_type='hamming')
+        nn.build_index(x, algorithm='linear')
+        nnidx, nndist = nn.nn_index(q, num_neighbors=5)
+        self.assertTrue(all(nndist == sort(exact, axis=1)[:, :5]))
+
+        for algorithm in ('lsh', 'hierarchical'):
+            nn = FLANN(distance_type='hamming')
+            nn.build_index(x, algorithm=algorithm)
+            nnidx, nndist = nn.nn_index(x[:100])
+            self.assertTrue(all(nnidx == arange(100)))
+            self.assertTrue(all(nndist == 0))
+
+        # the kd-tree needs a distance that is a sum over the dimensions
+        nn = FLANN(distance_type='hamming')
+        self.assertRaises(FLANNException, lambda: nn.build_index(x, algorithm='kdtree', log_level='none'))
+
+    def testhamming_float(self):
+        # the bits of floats are not compared
+        x = rand(100, 8).astype(float32)
+        nn = FLANN(distance_type='hamming')
+        self.assertRaises(FLANNException, lambda: nn.build_index(x, algorithm='linear'))
+        self.assertRaises(FLANNException, lambda: nn.nn(x, x[:10], algorithm='linear'))
+        self.assertRaises(FLANNException, lambda: ground_truth(x, x[:10], distance_type='hamming'))
+
+        # nor by the C bindings
+        from ctypes import byref, c_float, pointer
+        from pyflann.flann_ctypes import flann, FLANNParameters
+        params = FLANNParameters()
+        params.update({'algorithm': 'linear', 'log_level': 'none'})
+        index = flann.build_index_with_distance[float32](
+            x, 100, 8, byref(c_float(0)), pointer(params), 9, 0)
+        self.assertEqual(index, None)
+
+    def testhamming_odd_size(self):
+        # descriptors whose size is not a multiple of the popcount word
+        x = randint(0, 256, (500, 13)).astype(uint8)
+        q = randint(0, 256, (20, 13)).astype(uint8)
+        exact = (unpackbits(q, axis=1)[:, None, :] != unpackbits(x, axis=1)[None, :, :]).sum(2)
+        nnidx, nndist = FLANN(distance_type='hamming').nn(x, q, 1, algorithm='linear')
+        self.assertTrue(all(nndist == exact.min(1)))
+
+    def testnn_distance(self):
+        x = rand(100, 4)
+        q = rand(10, 4)
+
+        nnidx, nndist = FLANN(distance_type='manhattan').nn(x, q, algorithm='linear')
+        expected = abs(x[nnidx] - q).sum(axis=1)
+        self.assertTrue(allclose(nndist, expected))
+
+
+class Test_PyFLANN_tune_curve(unittest.TestCase):
+
+    def testtune_curve(self):
+        x = rand(2000, 8)
+        q = rand(100, 8)
+        nn = FLANN()
+        nn.build_index(x, algorithm='kdtree', trees=4)
+
+        frontier = nn.tune_curve(q, num_neighbors=5, checks=(1, 8, 64, -1),
+                                 eps=(0.0, 0.5))
+        self.assertTrue(len(frontier) >= 1)
+        for a, b in zip(frontier, frontier[1:]):
+            self.assertTrue(a['search_time'] <= b['search_time'])
+            self.assertTrue(a['precision'] < b['precision'])
+        self.assertEqual(frontier[-1]['precision'], 1.0)
+
+        setting = frontier[0]
+        nnidx = nn.nn_index(q, 5, checks=setting['checks'], eps=setting['eps'])[0]
+        exact = FLANN().nn(x, q, 5, algorithm='linear')[0]
+        found = [len(intersect1d(r, e)) for r, e in zip(nnidx, exact)]
+        self.assertEqual(sum(found) / 500.0, setting['precision'])
+
+    def testtune_curve_exact(self):
+        x = rand(500, 4)
+        q = rand(20, 4)
+        nn = FLANN()
+        nn.build_index(x, algorithm='kmeans', branching=8)
+        exact = FLANN().nn(x, q, 3, algorithm='linear')[0]
+        frontier = nn.tune_curve(q, 3, checks=(-1,), exact=exact)
+        self.assertEqual(frontier[0]['precision'], 1.0)
+
+        # the exact neighbors are recomputed when the dataset changes
+        nn.add_points(q)
+        frontier = nn.tune_curve(q, 1, checks=(-1,))
+        self.assertEqual(frontier[0]['precision'], 1.0)
+
+    def testtune_curve_removed(self):
+        x = rand(500, 4)
+        q = rand(20, 4)
+        nn = FLANN()
+        nn.build_index(x, algorithm='linear')
+        self.assertEqual(nn.tune_curve(q, 5, checks=(-1,))[0]['precision'], 1.0)
+
+        # the removed points are not exact neighbors, even once cached
+        nn.remove_points(arange(0, 500, 2))
+        self.assertEqual(nn.tune_curve(q, 5, checks=(-1,))[0]['precision'], 1.0)
+        nn.remove_point(1)
+        self.assertEqual(nn.tune_curve(q, 5, checks=(-1,))[0]['precision'], 1.0)
+
+
+class Test_PyFLANN_result_cache(unittest.TestCase):
+
+    def setUp(self):
+        self.x = rand(1000, 8)
+        self.nn = FLANN(result_cache_bytes=1 << 20)
+        self.nn.build_index(self.x, algorithm='kdtree', trees=4)
+
+    def testcached_results(self):
+        q = rand(100, 8)
+        expected = self.nn.nn_index(q, 5, checks=-1)
+        info = self.nn.result_cache_info()
+        self.assertEqual((info['hits'], info['misses'], info['entries']), (0, 100, 100))
+
+        # a batch mixing cached and new rows, with a repeated new row
+        q2 = concatenate((q[:50], rand(10, 8)))
+        q2 = concatenate((q2, q2[-1:]))
+        nnidx, nndist = self.nn.nn_index(q2, 5, checks=-1)
+        uncached = FLANN().nn(self.x, q2, 5, algorithm='linear')
+        self.assertTrue(all(nnidx[:50] == expected[0][:50]))
+        self.assertTrue(all(nnidx == uncached[0]))
+        self.assertTrue(allclose(nndist, uncached[1]))
+        info = self.nn.result_cache_info()
+        self.assertEqual((info['hits'], info['misses'], info['entries']), (50, 111, 110))
+
+        # other search parameters are other entries, cores is ignored
+        self.nn.nn_index(q[:10], 5, checks=1)
+        self.nn.nn_index(q[:10], 5, checks=-1, cores=2)
+        info = self.nn.result_cache_info()
+        self.assertEqual((info['hits'], info['misses']), (60, 121))
+
+        nnidx, nndist = self.nn.nn_index(q[0])
+        self.assertEqual(nnidx.shape, (1,))
+
+    def testtune_curve_uncached(self):
+        q = rand(100, 8)
+        cached = FLANN(result_cache_bytes=1 << 20)
+        cached.build_index(self.x, algorithm='kdtree', trees=4, random_seed=1)
+        uncached = FLANN()
+        uncached.build_index(self.x, algorithm='kdtree', trees=4, random_seed=1)
+        cached.nn_index(q, 5, checks=1)
+        for checks in (1, 8, -1):
+            curve = cached.tune_curve(q, 5, checks=(checks,), repeat=2)
+            expected = uncached.tune_curve(q, 5, checks=(checks,), repeat=2)
+            self.assertEqual(curve[0]['precision'], expected[0]['precision'])
+        # the searches timed neither hit the cache nor fill it
+        info = cached.result_cache_info()
+        self.assertEqual((info['hits'], info['misses'], info['entries']), (0, 100, 100))
+
+    def testinvalidation(self):
+        q = rand(20, 8)
+        self.nn.nn_index(q)
+        self.nn.add_points(q)
+        self.assertEqual(self.nn.result_cache_info()['entries'], 0)
+        nnidx, nndist = self.nn.nn_index(q, checks=-1)
+        self.assertTrue(all(nnidx == arange(1000, 1020)))
+
+        self.nn.remove_points(arange(1000, 1020))
+        nnidx, nndist = self.nn.nn_index(q, checks=-1)
+        self.assertTrue(all(nnidx < 1000))
+
+        self.nn.build_index(self.x[:500], algorithm='linear')
+        self.assertEqual(self.nn.result_cache_info()['entries'], 0)
+        self.assertTrue(all(self.nn.nn_index(q)[0] < 500))
+
+    def testbase_parameters(self):
+        q = rand(100, 8)
+        nn = FLANN(result_cache_bytes=1 << 20)
+        nn.build_index(self.x, algorithm='kdtree', trees=1, checks=1)
+        nn.nn_index(q, 5)
+        # nn changes the base search parameters without a new index
+        nn.nn(self.x[:100], q[:1], checks=-1)
+        nnidx, nndist = nn.nn_index(q, 5)
+        self.assertTrue(all(nnidx == FLANN().nn(self.x, q, 5, algorithm='linear')[0]))
+        self.assertEqual(nn.result_cache_info()['hits'], 0)
+
+    def testeviction(self):
+        nn = FLANN(result_cache_bytes=2000)
+        nn.build_index(self.x, algorithm='linear')
+        nn.nn_index(self.x[:100], 3)
+        info = nn.result_cache_info()
+        self.assertTrue(0 < info['bytes'] <= 2000)
+        self.assertTrue(info['entries'] < 100)
+        # the most recent entries are kept
+        nn.nn_index(self.x[99])
+        nn.nn_index(self.x[99], 3)
+        self.assertEqual(nn.result_cache_info()['hits'], 1)
+
+    def testdisabled(self):
+        self.assertEqual(FLANN().result_cache_info(), None)
+
+
 if __name__ == '__main__':
     unittest.main()
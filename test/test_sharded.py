@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+
+from pyflann import *
+from pyflann.sharded import ShardedFLANN
+from numpy import *
+from numpy.random import *
+import unittest
+
+
+class Test_PyFLANN_sharded(unittest.TestCase):
+
+    def setUp(self):
+        self.x = rand(1000, 4)
+        self.q = rand(50, 4)
+        self.nn = FLANN()
+        self.nn.build_index(self.x, algorithm='linear')
+        self.sharded = ShardedFLANN(num_shards=3)
+        self.sharded.build_index(self.x, algorithm='linear')
+
+    def tearDown(self):
+        self.sharded.delete_index()
+
+    def testnn_index(self):
+        nnidx, nndist = self.nn.nn_index(self.q, num_neighbors=5)
+        snnidx, snndist = self.sharded.nn_index(self.q, num_neighbors=5)
+        self.assertTrue(all(nnidx == snnidx))
+        self.assertTrue(allclose(nndist, snndist))
+
+        nnidx, nndist = self.sharded.nn_index(self.x[500])
+        self.assertEqual(nnidx[0], 500)
+
+    def testnn_index_filters(self):
+        allowed = arange(1, 1000, 3)
+        excluded = arange(600, 700)
+        nnidx, nndist = self.nn.nn_index(self.q, num_neighbors=5, allowed=allowed,
+                                         excluded=excluded)
+        snnidx, snndist = self.sharded.nn_index(self.q, num_neighbors=5, allowed=allowed,
+                                                excluded=excluded)
+        self.assertTrue(all(nnidx == snnidx))
+
+        mask = zeros(1000, dtype=bool)
+        mask[allowed] = True
+        snnidx, snndist = self.sharded.nn_index(self.q, num_neighbors=5, allowed=mask,
+                                                excluded=excluded)
+        self.assertTrue(all(nnidx == snnidx))
+
+        # less allowed points than neighbors
+        snnidx, snndist = self.sharded.nn_index(self.q, num_neighbors=5, allowed=[10, 900])
+        self.assertTrue(all(sort(snnidx[:, :2], axis=1) == [10, 900]))
+        self.assertTrue(all(snnidx[:, 2:] == -1))
+        self.assertTrue(all(isinf(snndist[:, 2:])))
+
+    def testnn_radius(self):
+        indptr, idx, dists = self.nn.nn_radius(self.q, 0.01)
+        sindptr, sidx, sdists = self.sharded.nn_radius(self.q, 0.01)
+        self.assertTrue(all(indptr == sindptr))
+        for i in range(len(self.q)):
+            self.assertEqual(set(idx[indptr[i]:indptr[i+1]]),
+                             set(sidx[sindptr[i]:sindptr[i+1]]))
+            self.assertTrue(all(diff(sdists[sindptr[i]:sindptr[i+1]]) >= 0))
+
+        sindptr, sidx, sdists = self.sharded.nn_radius(self.q, 0.05, max_neighbors=2)
+        self.assertTrue(all(diff(sindptr) <= 2))
+
+    def testerrors(self):
+        self.assertRaises(FLANNException,
+                          lambda: self.sharded.nn_index(self.q.astype(float32)))
+        self.sharded.delete_index()
+        self.assertRaises(FLANNException, lambda: self.sharded.nn_index(self.q))
+
+    def testworker_died(self):
+        import multiprocessing
+        worker = multiprocessing.active_children()[0]
+        worker.terminate()
+        worker.join()
+        self.assertRaises(FLANNException, lambda: self.sharded.nn_index(self.q))
+        # the index is deleted rather than left with misaligned pipes
+        self.assertRaises(FLANNException, lambda: self.sharded.nn_index(self.q))
+        self.assertEqual(multiprocessing.active_children(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+from pyflann import *
+from pyflann.shared import SharedIndex
+from numpy import *
+from numpy.random import *
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+
+def search_shared(args):
+    shared, q = args
+    nn = shared.attach()
+    return nn.nn_index(q, num_neighbors=3)
+
+
+class Test_PyFLANN_shared(unittest.TestCase):
+
+    def setUp(self):
+        self.x = rand(1000, 8)
+        self.q = rand(50, 8)
+        self.nn = FLANN()
+        self.nn.build_index(self.x, algorithm='kdtree', trees=4)
+        self.expected = self.nn.nn_index(self.q, num_neighbors=3)
+
+    def check_pool(self, shared):
+        pool = multiprocessing.Pool(2)
+        try:
+            results = pool.map(search_shared, [(shared, self.q)] * 4)
+        finally:
+            pool.close()
+            pool.join()
+        for nnidx, nndist in results:
+            self.assertTrue(all(nnidx == self.expected[0]))
+            self.assertTrue(allclose(nndist, self.expected[1]))
+
+    @unittest.skipIf(sys.version_info < (3, 8), 'requires multiprocessing.shared_memory')
+    def testshared_memory(self):
+        shared = SharedIndex(self.nn)
+        try:
+            self.check_pool(shared)
+            nnidx, nndist = shared.attach().nn_index(self.q, num_neighbors=3)
+            self.assertTrue(all(nnidx == self.expected[0]))
+        finally:
+            shared.unlink()
+
+    def testgemm_inner_product(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            nn = FLANN()
+            nn.build_index(self.x, algorithm='gemm', metric='inner_product')
+            nn.remove_points([0, 1, 2])
+            self.nn = nn
+            self.expected = nn.nn_index(self.q, num_neighbors=3)
+            shared = SharedIndex(nn, path=os.path.join(tmpdir, 'index'))
+            self.check_pool(shared)
+            shared.unlink()
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def testfile_backed(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            shared = SharedIndex(self.nn, path=os.path.join(tmpdir, 'index'))
+            self.check_pool(shared)
+            shared.unlink()
+            self.assertEqual(os.listdir(tmpdir), [])
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def testno_index(self):
+        self.assertRaises(FLANNException, lambda: SharedIndex(FLANN()))
+
+
+if __name__ == '__main__':
+    unittest.main()